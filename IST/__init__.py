@@ -1,15 +1,38 @@
 # Internal modules
+from .cache import DecodeCache
+from .core import decode, encode, extract_entry, list_entries
 from .decoder import Decoder
 from .encoder import Encoder
 from .pattern import Pattern
+from .pipeline import Pipeline, Transform
+from .progress import CancelToken, Progress
+from .session import CoverSession, CoverVariant
+from .sharding import ShardedDecoder, ShardedEncoder
+from .strips import StripEncoder
+from .watch import FolderWatcher
 from .exceptions import *
 from .__version__ import __version__ as version
 
 
 __all__ = [
+    "encode",
+    "decode",
+    "list_entries",
+    "extract_entry",
     "Decoder",
+    "DecodeCache",
     "Encoder",
     "Pattern",
+    "Pipeline",
+    "Transform",
+    "CancelToken",
+    "Progress",
+    "CoverSession",
+    "CoverVariant",
+    "ShardedEncoder",
+    "ShardedDecoder",
+    "StripEncoder",
+    "FolderWatcher",
     "exceptions",
     "version",
 ]
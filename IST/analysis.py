@@ -0,0 +1,376 @@
+# Internal modules
+from math import exp, inf, lgamma, log, log10, sqrt
+from typing import Union
+
+# Project modules
+from .exceptions import ImageSizeMismatchError, UnsupportedTypeForParameterError
+from .utils import check_image_array, get_image_array, get_image_bit_depth, get_image_channels
+
+# External modules
+import numpy as np
+from PIL import Image
+
+"""
+Analysis.py is a module in the IST (Image Steganography Tools) library that provides functionality for checking encoded images before they
+are shipped. It measures the distortion between a cover and its stego image, and runs standard LSB steganalysis statistics on an image to
+estimate how detectable the embedding is. Every metric is computed on the values arrays, without any per-pixel Python loop.
+
+Functions:
+- load_values(image, mode=None) -> (np.ndarray, str, int): Returns the values array (height, width, bands), channels and bit depth of an
+  image (path, Pillow image or array).
+- psnr(cover, stego, max_value=255) -> float: Returns the peak signal-to-noise ratio in dB (inf for identical images).
+- ssim(cover, stego, max_value=255, window=8) -> float: Returns the mean structural similarity over non-overlapping windows.
+- changed_bits(cover, stego, channels) -> dict: Returns the changed values and bits of each channel, and the changed bits of each bit
+  plane.
+- modified_regions(cover, stego, block_size=16) -> (np.ndarray, tuple or None): Returns the map of the modified blocks, and the bounding
+  box of the modified pixels.
+- chi_square_attack(values) -> float: Returns the probability of an LSB embedding according to the chi-square attack (Westfeld and
+  Pfitzmann).
+- rs_analysis(values) -> float: Returns the LSB embedding rate estimated by the RS analysis (Fridrich, Goljan and Du).
+- sample_pair_analysis(values) -> float: Returns the LSB embedding rate estimated by the sample pair analysis (Dumitrescu, Wu and Wang).
+- analyze(stego, cover=None, mode=None, block_size=16) -> dict: Runs the steganalysis of the stego image, and measures the distortion
+  when its cover is given.
+
+Usage:
+    from IST.analysis import analyze
+
+    report = analyze("path/to/processed_image.png", cover="path/to/image.png")
+
+    if report["quality"]["psnr"] < 50 or max(report["detectability"].values()) > 0.1:
+        raise ValueError("The processed image is too easy to spot")
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+
+# Channels of arrays loaded without a mode, by number of bands
+DEFAULT_ARRAY_MODES = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}
+
+# Size of the groups of the RS analysis, groups of 4 consecutive values of a row whose two middle values are flipped
+RS_GROUP_SIZE = 4
+
+# Minimum expected count of a pair of values considered by the chi-square attack
+CHI_SQUARE_MIN_EXPECTED = 5
+
+
+def load_values(image: Union[str, Image.Image, np.ndarray], mode: Union[str, None] = None) -> (np.ndarray, str, int):
+    """
+    Returns the values of an image.
+    :param image: The path of the image, the Pillow image or its values array (of shape (height, width, bands) or (height, width))
+    :param mode: The image mode of an array, deduced from its number of bands when None
+    :return: The values array of shape (height, width, bands), the channels and the bit depth of the values
+    """
+    if isinstance(image, str):
+        with Image.open(image) as img:
+            return get_image_array(img), get_image_channels(img.mode), get_image_bit_depth(img.mode)
+
+    if isinstance(image, Image.Image):
+        return get_image_array(image, writable=False), get_image_channels(image.mode), get_image_bit_depth(image.mode)
+
+    if not isinstance(image, np.ndarray):
+        raise UnsupportedTypeForParameterError("image", image, (str, Image.Image, np.ndarray))
+
+    bands = image.shape[2] if image.ndim == 3 else 1
+    mode = mode or DEFAULT_ARRAY_MODES.get(bands, "RGBA")
+    check_image_array(image, mode)
+
+    bit_depth = 16 if image.dtype == np.uint16 else 8
+    return image.reshape(image.shape[0], image.shape[1], bands), get_image_channels(mode), bit_depth
+
+
+def _check_shapes(cover: np.ndarray, stego: np.ndarray) -> None:
+    if cover.shape != stego.shape:
+        raise ImageSizeMismatchError(cover.shape, stego.shape)
+
+
+def psnr(cover: np.ndarray, stego: np.ndarray, max_value: int = 255) -> float:
+    """
+    Returns the peak signal-to-noise ratio between the cover and the stego values.
+    :param cover: The cover values
+    :param stego: The stego values, of the same shape
+    :param max_value: The maximum value of the channels (255 for 8-bit images, 65535 for 16-bit images)
+    :return: The PSNR in dB, inf for identical values
+    """
+    _check_shapes(cover, stego)
+
+    difference = (cover.astype(np.int64) - stego).reshape(-1)
+    mse = np.dot(difference, difference) / max(difference.size, 1)
+
+    return inf if mse == 0 else 10 * log10(max_value ** 2 / mse)
+
+
+def ssim(cover: np.ndarray, stego: np.ndarray, max_value: int = 255, window: int = 8) -> float:
+    """
+    Returns the mean structural similarity between the cover and the stego values. The SSIM is computed on non-overlapping windows of
+    each channel, without the gaussian weighting of the reference implementation (the borders left by the windows are ignored).
+    :param cover: The cover values, of shape (height, width, bands)
+    :param stego: The stego values, of the same shape
+    :param max_value: The maximum value of the channels
+    :param window: The side of the windows, in pixels
+    :return: The mean SSIM, 1.0 for identical values
+    """
+    _check_shapes(cover, stego)
+
+    height, width, bands = cover.shape
+    window = max(1, min(window, height, width))
+    rows, columns = height // window, width // window
+    pixels = window * window
+    c1, c2 = (0.01 * max_value) ** 2, (0.03 * max_value) ** 2
+
+    # Sums of 8-bit values and of their products fit in 32 bits, the windows holding at most 65536 products
+    dtype = np.int32 if cover.dtype == np.uint8 and pixels <= 1 << 16 else np.int64
+
+    def window_means(values: np.ndarray) -> np.ndarray:
+        # Sums over the rows of each window, then over its columns
+        sums = values.reshape(rows, window, columns * window).sum(axis=1).reshape(rows, columns, window).sum(axis=2)
+        return sums / pixels
+
+    # One band at a time, the copies of the cropped values being the largest temporary arrays
+    similarity = np.empty((bands, rows, columns))
+    for band in range(bands):
+        x = cover[:rows * window, :columns * window, band].astype(dtype)
+        y = stego[:rows * window, :columns * window, band].astype(dtype)
+
+        mean_x, mean_y = window_means(x), window_means(y)
+        variance_x = window_means(x * x) - mean_x ** 2
+        variance_y = window_means(y * y) - mean_y ** 2
+        covariance = window_means(x * y) - mean_x * mean_y
+
+        similarity[band] = ((2 * mean_x * mean_y + c1) * (2 * covariance + c2)) / ((mean_x ** 2 + mean_y ** 2 + c1) * (variance_x + variance_y + c2))
+
+    return float(similarity.mean())
+
+
+def changed_bits(cover: np.ndarray, stego: np.ndarray, channels: str) -> dict:
+    """
+    Counts the changes of each channel.
+    :param cover: The cover values, of shape (height, width, bands)
+    :param stego: The stego values, of the same shape
+    :param channels: The channels of the bands
+    :return: A dict of channel name to a dict of the changed values ("values"), changed bits ("bits") and changed bits of each bit plane,
+    least significant first ("planes")
+    """
+    _check_shapes(cover, stego)
+
+    changes = {}
+    for band, channel in enumerate(channels):
+        difference = cover[..., band] ^ stego[..., band]
+
+        changes[channel] = {
+            "values": int(np.count_nonzero(difference)),
+            "bits": int(np.bitwise_count(difference).sum(dtype=np.int64)),
+            "planes": [int(np.count_nonzero(difference & (1 << plane))) for plane in range(difference.dtype.itemsize * 8)],
+        }
+
+    return changes
+
+
+def modified_regions(cover: np.ndarray, stego: np.ndarray, block_size: int = 16) -> (np.ndarray, Union[tuple[int, int, int, int], None]):
+    """
+    Locates the modified pixels.
+    :param cover: The cover values, of shape (height, width, bands)
+    :param stego: The stego values, of the same shape
+    :param block_size: The side of the blocks of the map, in pixels
+    :return: The boolean map of the blocks holding modified pixels, of shape (ceil(height / block_size), ceil(width / block_size)), and the
+    bounding box (left, top, right, bottom) of the modified pixels, right and bottom excluded, or None when no pixel was modified
+    """
+    _check_shapes(cover, stego)
+
+    modified = (cover != stego).any(axis=2)
+    height, width = modified.shape
+
+    rows, columns = -(-height // block_size), -(-width // block_size)
+    padded = np.zeros((rows * block_size, columns * block_size), dtype=bool)
+    padded[:height, :width] = modified
+    blocks = padded.reshape(rows, block_size, columns, block_size).any(axis=(1, 3))
+
+    modified_rows, modified_columns = np.flatnonzero(modified.any(axis=1)), np.flatnonzero(modified.any(axis=0))
+    if not modified_rows.size:
+        return blocks, None
+
+    return blocks, (int(modified_columns[0]), int(modified_rows[0]), int(modified_columns[-1]) + 1, int(modified_rows[-1]) + 1)
+
+
+def _chi_square_survival(statistic: float, degrees_of_freedom: int) -> float:
+    # Regularized upper incomplete gamma function Q(k / 2, statistic / 2), with a series for small statistics and a continued fraction
+    # (modified Lentz) otherwise
+    a, x = degrees_of_freedom / 2, statistic / 2
+    if x <= 0:
+        return 1.0
+
+    scale = exp(-x + a * log(x) - lgamma(a))
+
+    if x < a + 1:
+        term = total = 1 / a
+        for n in range(1, 10000):
+            term *= x / (a + n)
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1 - total * scale)
+
+    tiny = 1e-300
+    b = x + 1 - a
+    c, d = 1 / tiny, 1 / b
+    fraction = d
+    for n in range(1, 10000):
+        an = -n * (n - a)
+        b += 2
+        d = an * d + b
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = b + an / c
+        c = c if abs(c) > tiny else tiny
+        fraction *= d * c
+        if abs(d * c - 1) < 1e-15:
+            break
+
+    return fraction * scale
+
+
+def chi_square_attack(values: np.ndarray) -> float:
+    """
+    Returns the probability of an LSB embedding according to the chi-square attack. An LSB replacement equalizes the frequencies of each
+    pair of values (2i, 2i + 1): the statistic compares the frequencies of the even values to the means of their pairs. The attack detects
+    embeddings spread over all the values analyzed, sparse embeddings going unnoticed.
+    :param values: The values of a channel
+    :return: The probability, between 0 and 1
+    """
+    histogram = np.bincount(values.reshape(-1))
+    histogram = np.append(histogram, [0] * (histogram.size % 2)).reshape(-1, 2).astype(np.float64)
+
+    expected = histogram.mean(axis=1)
+    kept = expected >= CHI_SQUARE_MIN_EXPECTED
+    if np.count_nonzero(kept) < 2:
+        return 0.0
+
+    statistic = float((((histogram[kept, 0] - expected[kept]) ** 2) / expected[kept]).sum())
+
+    return _chi_square_survival(statistic, int(np.count_nonzero(kept)) - 1)
+
+
+def _smaller_root(a: float, b: float, c: float) -> Union[float, None]:
+    # Root of a * x ** 2 + b * x + c = 0 of the smallest magnitude. Near full embeddings, both roots merge and the sampling noise can make
+    # the discriminant slightly negative: the double root is then returned.
+    if abs(a) < 1e-12:
+        return -c / b if b else None
+
+    discriminant = max(b * b - 4 * a * c, 0.0)
+    roots = ((-b + sqrt(discriminant)) / (2 * a), (-b - sqrt(discriminant)) / (2 * a))
+    return min(roots, key=abs)
+
+
+def _rs_groups(groups: np.ndarray) -> (float, float, float, float):
+    # Proportions of regular and singular groups for the mask (R_M, S_M) and the negative mask (R_-M, S_-M). The values of the groups are
+    # given as 4 columns, the mask flipping the two middle ones.
+    first, second, third, fourth = groups
+    reference = np.abs(second - first) + np.abs(third - second) + np.abs(fourth - third)
+
+    def flipped_smoothness(second_flipped: np.ndarray, third_flipped: np.ndarray) -> np.ndarray:
+        return np.abs(second_flipped - first) + np.abs(third_flipped - second_flipped) + np.abs(fourth - third_flipped)
+
+    positive = flipped_smoothness(second ^ 1, third ^ 1)
+
+    # The negative flipping swaps the values (2i - 1, 2i): -1 and 0, 1 and 2, ...
+    negative = flipped_smoothness(((second + 1) ^ 1) - 1, ((third + 1) ^ 1) - 1)
+
+    count = reference.size
+    return (np.count_nonzero(positive > reference) / count, np.count_nonzero(positive < reference) / count,
+            np.count_nonzero(negative > reference) / count, np.count_nonzero(negative < reference) / count)
+
+
+def rs_analysis(values: np.ndarray) -> float:
+    """
+    Returns the LSB embedding rate estimated by the RS analysis. The values of each row are split into groups of 4, classified as regular
+    or singular depending on whether flipping their middle LSBs makes them noisier or smoother. The proportions of both classes, measured on
+    the values and on the values with all their LSBs flipped, give the rate of LSB replacement.
+    :param values: The values of a channel, of shape (height, width)
+    :return: The estimated rate, between 0 (no embedding) and 1 (every value carries a bit)
+    """
+    width = values.shape[1] // RS_GROUP_SIZE * RS_GROUP_SIZE
+    if not width or not values.shape[0]:
+        return 0.0
+
+    # The smoothness of 8-bit groups (values from -1 to 256 once flipped) fits in 16 bits
+    dtype = np.int16 if values.dtype == np.uint8 else np.int32
+    groups = [values[:, column:width:RS_GROUP_SIZE].astype(dtype) for column in range(RS_GROUP_SIZE)]
+
+    r_m, s_m, r_nm, s_nm = _rs_groups(groups)
+    r_m1, s_m1, r_nm1, s_nm1 = _rs_groups([column ^ 1 for column in groups])
+
+    d0, d1, n0, n1 = r_m - s_m, r_m1 - s_m1, r_nm - s_nm, r_nm1 - s_nm1
+    x = _smaller_root(2 * (d1 + d0), n0 - n1 - d1 - 3 * d0, d0 - n0)
+    if x is None or x == 0.5:
+        return 0.0
+
+    return float(min(max(0.0, x / (x - 0.5)), 1.0))
+
+
+def sample_pair_analysis(values: np.ndarray) -> float:
+    """
+    Returns the LSB embedding rate estimated by the sample pair analysis, on the pairs of horizontally adjacent values.
+    :param values: The values of a channel, of shape (height, width)
+    :return: The estimated rate, between 0 (no embedding) and 1 (every value carries a bit)
+    """
+    dtype = np.int16 if values.dtype == np.uint8 else np.int32
+    u, v = values[:, :-1].astype(dtype), values[:, 1:].astype(dtype)
+    pairs = u.size
+    if not pairs:
+        return 0.0
+
+    even = (v & 1) == 0
+    x = np.count_nonzero(np.where(even, u < v, u > v))
+    y = np.count_nonzero(np.where(even, u > v, u < v))
+    k = np.count_nonzero((u >> 1) == (v >> 1))
+
+    rate = _smaller_root(k / 2, 2 * x - pairs, y - x)
+    if rate is None:
+        return 0.0
+
+    return float(min(max(0.0, rate), 1.0))
+
+
+def analyze(stego: Union[str, Image.Image, np.ndarray], cover: Union[str, Image.Image, np.ndarray, None] = None, mode: Union[str, None] = None,
+            block_size: int = 16) -> dict:
+    """
+    Analyzes a stego image.
+    :param stego: The path, Pillow image or values array of the stego image
+    :param cover: optional: The path, Pillow image or values array of its cover image, to measure the distortion
+    :param mode: optional: The image mode of arrays, deduced from their number of bands when None
+    :param block_size: optional: The side of the blocks of the modified regions map, in pixels
+    :return: A dict with the size ("size", (width, height)), channels ("channels") and the steganalysis statistics of each channel
+    ("steganalysis", with "chi_square", "rs" and "sample_pairs" entries), their maximum for each channel ("detectability"), and when the
+    cover is given, the distortion ("quality", with "psnr", "ssim", "changed_bits", "modified_blocks", "modified_box" and "block_size")
+    """
+    values, channels, bit_depth = load_values(stego, mode)
+
+    steganalysis = {}
+    for band, channel in enumerate(channels):
+        channel_values = values[..., band]
+        steganalysis[channel] = {
+            "chi_square": chi_square_attack(channel_values),
+            "rs": rs_analysis(channel_values),
+            "sample_pairs": sample_pair_analysis(channel_values),
+        }
+
+    report = {
+        "size": (values.shape[1], values.shape[0]),
+        "channels": channels,
+        "steganalysis": steganalysis,
+        "detectability": {channel: max(statistics.values()) for channel, statistics in steganalysis.items()},
+    }
+
+    if cover is not None:
+        cover_values, _, _ = load_values(cover, mode)
+        max_value = (1 << bit_depth) - 1
+        blocks, box = modified_regions(cover_values, values, block_size)
+
+        report["quality"] = {
+            "psnr": psnr(cover_values, values, max_value),
+            "ssim": ssim(cover_values, values, max_value),
+            "changed_bits": changed_bits(cover_values, values, channels),
+            "modified_blocks": blocks,
+            "modified_box": box,
+            "block_size": block_size,
+        }
+
+    return report
@@ -1,11 +1,10 @@
 # Internal modules
 from abc import ABC, abstractmethod
-from typing import Union
+from typing import BinaryIO, Union
 
 # Project modules
+from .core import open_image, save_image
 from .pattern import Pattern
-from .exceptions import UnsupportedImageFormatError
-from .constants import currently_supported_formats
 from .log_config import get_logger
 
 # External modules
@@ -16,19 +15,16 @@ class BaseSteganography(ABC):
     def __init__(self):
         self.pattern = None
         self.image: Image = None
+        self._opened_image: Image = None
         self.logger = get_logger(self.__class__.__name__)
 
-    def _perform_load_image(self, file_path: str) -> Image:
-        if file_path.split('.')[-1].upper() not in currently_supported_formats:
-            raise UnsupportedImageFormatError()
+    def _perform_load_image(self, file_path: Union[str, BinaryIO]) -> Image:
+        image = open_image(file_path)
 
-        image = Image.open(file_path)
+        # Only the images opened by the object are closed with it, the ones given by the caller are left open
+        self._opened_image = image
 
-        if image.format not in currently_supported_formats:
-            image.close()
-            raise UnsupportedImageFormatError()
-
-        self.logger.info(f"Image loaded from {file_path}")
+        self.logger.info(f"Image loaded from {getattr(file_path, 'name', file_path)}")
         return image
 
     def load_image(self, file_path: str) -> None:
@@ -43,28 +39,10 @@ class BaseSteganography(ABC):
         self._perform_unload_image(self.image)
         self.image = None
 
-    def _perform_save_image(self, image: Image, output_path: str, image_format: Union[str, None] = None, quality: int = 100) -> None:
-        if image_format is None:
-            image_format = output_path.split('.')[-1].upper()
-
-        if not image_format:
-            raise ValueError("Image format not specified")
-
-        if image_format not in currently_supported_formats:
-            raise UnsupportedImageFormatError()
-
-        # If the image_format is PGM, set the image_format to PPM
-        if image_format in ["PGM", "PPM"]:
-            image_format = "PPM"
-
-            with open(output_path, "w+b") as f:
-                image.save(f, format=image_format)
-        elif image_format in ["JPEG", "JPG", "WEBP"]:
-            image.save(output_path, format=image_format, quality=quality)
-        else:
-            image.save(output_path, format=image_format)
-
-        self.logger.info(f"Image saved to {output_path}")
+    def _perform_save_image(self, image: Image, output_path: Union[str, BinaryIO], image_format: Union[str, None] = None,
+                            quality: int = 100) -> None:
+        save_image(image, output_path, image_format, quality)
+        self.logger.info(f"Image saved to {getattr(output_path, 'name', output_path)}")
 
     @abstractmethod
     def load_pattern(self, pattern: Pattern):
@@ -75,6 +53,6 @@ class BaseSteganography(ABC):
         pass
 
     def __del__(self):
-        if self.image is not None:
+        if self.image is not None and self.image is self._opened_image:
             self.image.close()
             self.logger.info("Image closed")
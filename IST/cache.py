@@ -0,0 +1,280 @@
+# Internal modules
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Union
+
+# Project modules
+from . import exceptions
+from .exceptions import UnsupportedTypeForParameterError
+from .pattern import Pattern
+from .log_config import get_logger
+
+# External modules
+from PIL import Image
+from reedsolo import ReedSolomonError
+
+"""
+Cache.py is a module in the IST (Image Steganography Tools) library that provides a persistent cache of decoding results. Decoding the same
+image again with the same pattern returns the stored payload, or raises the stored failure, without loading the image. The results are keyed
+by the hash of the image content and the fingerprint of the pattern (and of the decoding options). The content hash of a file is only
+computed again when its size or modification time changed, so that a repeated decoding of an unchanged file costs one stat() call and one
+SQLite lookup.
+
+The cache stores the extracted payloads (before the data type is processed), so that extracted files are written again on each decoding. The
+least recently used results are evicted once the stored results exceed the maximum size.
+
+Classes and Methods:
+- DecodeCache: A SQLite decoding results cache, safe to share between threads and processes.
+    - __init__(self, path: str, max_size: int = DEFAULT_CACHE_SIZE): Opens or creates the cache database.
+    - image_hash(self, image: Union[str, Image.Image]) -> str: Returns the content hash of an image file or of a Pillow image.
+    - lookup(self, image_hash: str, fingerprint: str) -> (bool, Union[bytes, BaseException, None]): Returns whether a result is stored, and
+      the stored payload or failure.
+    - store(self, image_hash: str, fingerprint: str, data=None, error=None): Stores a payload or a failure, and evicts the least recently
+      used results.
+    - decode(self, image, fingerprint: str, decode: Callable[[], bytes]) -> bytes: Returns the stored payload, raises the stored failure, or
+      decodes and stores the result.
+    - clear(self): Removes every stored result.
+    - close(self): Closes the database.
+- file_content_hash(path: str) -> str: Returns the content hash of a file.
+- pattern_fingerprint(pattern: Pattern, **options) -> str: Returns the fingerprint of a pattern and of decoding options.
+
+Usage:
+    from IST import Decoder, DecodeCache, Pattern
+
+    cache = DecodeCache("path/to/decode_cache.sqlite")
+    decoder = Decoder(pattern=Pattern(), cache=cache)
+
+    data = decoder.process(file_path="path/to/image.png")  # Decoded and stored
+    data = decoder.process(file_path="path/to/image.png")  # Returned from the cache
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+logger = get_logger("cache")
+
+# Default maximum size of the stored results, in bytes
+DEFAULT_CACHE_SIZE = 256 << 20
+
+# Size of the chunks of the files read to compute their content hash
+HASH_CHUNK_SIZE = 1 << 20
+
+# Failures stored: the decoding failures caused by the image content or the pattern, never the cancellations or the I/O errors
+CACHED_ERRORS = (ValueError, ReedSolomonError)
+
+# The only error classes rebuilt from a cache file, by their stored type name, so that a cache file never chooses the modules imported
+REBUILT_ERRORS = {f"{error_class.__module__}.{error_class.__qualname__}": error_class
+                  for error_class in [*vars(exceptions).values(), ReedSolomonError]
+                  if isinstance(error_class, type) and issubclass(error_class, CACHED_ERRORS)}
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    image_hash TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    data BLOB,
+    error_type TEXT,
+    error_message TEXT,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (image_hash, fingerprint)
+);
+CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+"""
+
+
+def file_content_hash(path: str) -> str:
+    """
+    Returns the content hash of a file, read in chunks.
+    :param path: The path of the file
+    :return: The hexadecimal content hash
+    """
+    content_hash = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            content_hash.update(chunk)
+
+    return content_hash.hexdigest()
+
+
+def pattern_fingerprint(pattern: Pattern, **options) -> str:
+    """
+    Returns the fingerprint of a pattern and of decoding options. Equivalent spellings of the parameters (e.g. "RGB" and "rgb" channels)
+    have the same fingerprint.
+    :param pattern: The pattern
+    :param options: The decoding options changing the result (e.g. data_length, enforce_provided_pattern)
+    :return: The hexadecimal fingerprint
+    """
+    parameters = {key: value.lower() if isinstance(value, str) and key != "scatter_seed" else value
+                  for key, value in vars(pattern).items() if key != "logger"}
+    description = json.dumps([parameters, options], sort_keys=True, default=repr)
+
+    return hashlib.blake2b(description.encode(), digest_size=16).hexdigest()
+
+
+class DecodeCache:
+    def __init__(self, path: str, max_size: int = DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        # A single connection, shared by the threads of the process. The write-ahead log lets other processes read while one writes.
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(CACHE_SCHEMA)
+
+    def image_hash(self, image: Union[str, Image.Image]) -> str:
+        """
+        Returns the content hash of an image. The hash of a file is stored along with its size and modification time, and only computed
+        again when they changed.
+        :param image: The path of the image file, or a Pillow image
+        :return: The hexadecimal content hash
+        """
+        if isinstance(image, Image.Image):
+            content_hash = hashlib.blake2b(f"{image.mode} {image.size}".encode(), digest_size=16)
+            content_hash.update(image.tobytes())
+            return content_hash.hexdigest()
+
+        if not isinstance(image, str):
+            raise UnsupportedTypeForParameterError("image", image, (str, Image.Image))
+
+        path = os.path.abspath(image)
+        stat = os.stat(path)
+
+        with self._lock:
+            row = self._connection.execute("SELECT size, mtime_ns, content_hash FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        content_hash = file_content_hash(path)
+
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (path, stat.st_size, stat.st_mtime_ns, content_hash))
+
+        return content_hash
+
+    def lookup(self, image_hash: str, fingerprint: str) -> (bool, Union[bytes, BaseException, None]):
+        """
+        Looks up a stored result, and marks it as the most recently used.
+        :param image_hash: The content hash of the image
+        :param fingerprint: The fingerprint of the pattern and decoding options
+        :return: Whether a result is stored, and the stored payload or failure (None when no result is stored)
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT data, error_type, error_message FROM results WHERE image_hash = ? AND fingerprint = ?",
+                                           (image_hash, fingerprint)).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+
+            self.hits += 1
+            self._connection.execute("UPDATE results SET last_access = ? WHERE image_hash = ? AND fingerprint = ?",
+                                     (time.time(), image_hash, fingerprint))
+
+        data, error_type, error_message = row
+        if error_type is None:
+            return True, data
+
+        return True, self._rebuild_error(error_type, error_message)
+
+    @staticmethod
+    def _rebuild_error(error_type: str, error_message: str) -> BaseException:
+        # The stored failure is raised again with its type and message, its constructor (which may take other arguments) being bypassed.
+        # Any type but the IST and Reed Solomon errors is raised as a ValueError.
+        error_class = REBUILT_ERRORS.get(error_type, None)
+        if error_class is None:
+            return ValueError(error_message)
+
+        error = error_class.__new__(error_class)
+        error.args = (error_message,)
+        return error
+
+    def store(self, image_hash: str, fingerprint: str, data: Union[bytes, bytearray, None] = None,
+              error: Union[BaseException, None] = None) -> None:
+        """
+        Stores a payload or a failure, then evicts the least recently used results while the stored results exceed the maximum size.
+        :param image_hash: The content hash of the image
+        :param fingerprint: The fingerprint of the pattern and decoding options
+        :param data: The payload, when the decoding succeeded
+        :param error: The failure, when the decoding failed
+        """
+        if error is not None:
+            data, error_type, error_message = None, f"{type(error).__module__}.{type(error).__qualname__}", str(error)
+            size = len(error_type) + len(error_message)
+        else:
+            data, error_type, error_message = bytes(data), None, None
+            size = len(data)
+
+        # A result larger than the whole cache is not stored
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                         (image_hash, fingerprint, data, error_type, error_message, size, time.time()))
+
+                total_size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+                if total_size > self.max_size:
+                    evicted = 0
+                    for evicted_hash, evicted_fingerprint, evicted_size in self._connection.execute(
+                            "SELECT image_hash, fingerprint, size FROM results ORDER BY last_access").fetchall():
+                        if total_size <= self.max_size:
+                            break
+                        self._connection.execute("DELETE FROM results WHERE image_hash = ? AND fingerprint = ?",
+                                                 (evicted_hash, evicted_fingerprint))
+                        total_size -= evicted_size
+                        evicted += 1
+
+                    logger.debug(f"Evicted {evicted} results from the decoding cache")
+
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def decode(self, image: Union[str, Image.Image], fingerprint: str, decode: Callable[[], bytes]) -> bytes:
+        """
+        Returns the stored payload of an image, raises its stored failure, or decodes it and stores the result.
+        :param image: The path of the image file, or a Pillow image
+        :param fingerprint: The fingerprint of the pattern and decoding options
+        :param decode: The function decoding the image, returning the payload
+        :return: The payload
+        """
+        image_hash = self.image_hash(image)
+
+        found, result = self.lookup(image_hash, fingerprint)
+        if found:
+            if isinstance(result, BaseException):
+                raise result
+            return result
+
+        try:
+            data = decode()
+        except CACHED_ERRORS as error:
+            self.store(image_hash, fingerprint, error=error)
+            raise
+
+        self.store(image_hash, fingerprint, data=data)
+        return data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM results")
+            self._connection.execute("DELETE FROM files")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
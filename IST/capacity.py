@@ -0,0 +1,115 @@
+# Internal modules
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Union
+
+# Project modules
+from .constants import currently_supported_formats
+from .exceptions import UnsupportedImageFormatError
+from .pattern import Pattern
+from .log_config import get_logger
+
+# External modules
+from PIL import Image
+
+"""
+Capacity.py is a module in the IST (Image Steganography Tools) library that computes the payload capacity of cover images without loading
+them. Only the image headers are read (dimensions, mode and format), the capacity of each pattern being then computed from them like the
+encoder would, so that large cover pools can be sized in seconds. The capacities of the images sharing a size and a mode are computed once.
+
+Functions:
+- read_image_info(path: str) -> dict: Reads the size, mode and format of an image from its header.
+- list_images(paths: Iterable[str]) -> list[str]: Expands directories into the supported images they contain.
+- capacity_report(paths, patterns, file=False, workers=None) -> Iterator[dict]: Yields the capacity of each image with each pattern.
+
+Usage:
+    from IST import Pattern
+    from IST.capacity import capacity_report
+
+    patterns = {"plain": Pattern(channels="RGB"), "dense": Pattern(channels="RGB", bit_frequency=2)}
+    for result in capacity_report(["path/to/covers"], patterns):
+        print(result["path"], result["pattern"], result["capacity"], result["efficiency"])
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+logger = get_logger("capacity")
+
+
+def read_image_info(path: str) -> dict:
+    """
+    Reads the size, mode and format of an image from its header, without decoding its pixels.
+    :param path: The path of the image
+    :return: A dict with the width, height, mode and format of the image
+    """
+    # Pillow only parses the header when opening an image, the pixels are decoded by load()
+    with Image.open(path) as image:
+        if image.format not in currently_supported_formats:
+            raise UnsupportedImageFormatError()
+
+        return {"width": image.width, "height": image.height, "mode": image.mode, "format": image.format}
+
+
+def list_images(paths: Iterable[str]) -> list[str]:
+    """
+    Expands the directories of a list of paths into the images they contain, with a supported extension. Other paths are kept as they are.
+    :param paths: The paths of images or directories
+    :return: The paths of the images
+    """
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                images += sorted(entry.path for entry in entries
+                                 if entry.is_file() and entry.name.rsplit(".", 1)[-1].upper() in currently_supported_formats)
+        else:
+            images.append(path)
+
+    return images
+
+
+def capacity_report(paths: Iterable[str], patterns: Union[Pattern, dict[str, Pattern]], file: bool = False,
+                    workers: Union[int, None] = None) -> Iterator[dict]:
+    """
+    Computes the capacity of images with one or many patterns, reading only their headers.
+    :param paths: The paths of the images, directories being expanded with list_images()
+    :param patterns: A pattern, or a dict of patterns by name
+    :param file: optional: Whether the payload is a file, whose name is stored along with it
+    :param workers: optional: The number of threads reading the headers (default: number of CPUs)
+    :return: For each image and pattern, in order, a dict with the path, width, height, mode, format, pattern name, capacity in bytes
+    (Pattern.max_payload_size()) and embedding efficiency in data bits per changed value (Pattern.embedding_efficiency()), or with the path, pattern name and error when the image or the pattern does not apply
+    """
+    if isinstance(patterns, Pattern):
+        patterns = {"default": patterns}
+
+    capacities = {}
+    paths = list_images(paths)
+
+    def read(path: str) -> Union[dict, Exception]:
+        try:
+            return read_image_info(path)
+        except (OSError, ValueError) as error:
+            return error
+
+    # The headers are read in parallel, most of the time being spent waiting for the storage
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        for path, info in zip(paths, executor.map(read, paths)):
+            if isinstance(info, Exception):
+                logger.info(f"Skipping {path}: {info}")
+                for name in patterns:
+                    yield {"path": path, "pattern": name, "error": f"{type(info).__name__}: {info}"}
+                continue
+
+            for name, pattern in patterns.items():
+                key = (name, info["width"], info["height"], info["mode"])
+                if key not in capacities:
+                    try:
+                        capacities[key] = pattern.max_payload_size((info["width"], info["height"]), info["mode"], file)
+                    except ValueError as error:
+                        capacities[key] = error
+
+                capacity = capacities[key]
+                if isinstance(capacity, Exception):
+                    yield {"path": path, "pattern": name, "error": f"{type(capacity).__name__}: {capacity}"}
+                else:
+                    yield {"path": path, **info, "pattern": name, "capacity": capacity, "efficiency": pattern.embedding_efficiency()}
@@ -0,0 +1,305 @@
+# Internal modules
+import copy
+import io
+import os
+import struct
+from typing import Callable, Iterable, NamedTuple, Sequence, Union
+
+# Project modules
+from .exceptions import ContainerEntryNotFoundError, DataIntegrityCheckFailedError, DuplicateContainerEntryError, InvalidContainerError, \
+    InvalidContainerEntryNameError, UnsupportedTypeForParameterError
+from .pattern import Pattern
+from .pipeline import Pipeline, RedundancyTransform, Transform
+
+# External modules
+from reedsolo import ReedSolomonError
+
+"""
+Container.py is a module in the IST (Image Steganography Tools) library that hides several files into a single image, in a container that
+can be listed and extracted file by file. The regular payload is a single buffer transformed as a whole, so reading any part of it means
+reading, correcting and hashing all of it. A container is instead made of independent blocks, each one starting on a block of carrier slots
+(SlotLayout.alignment_bytes), so that a reader only extracts and corrects the slots of the blocks it needs:
+
+- The preamble: the magic, the version, the number of entries and the size of the index. It has a fixed size, only protected by the
+  redundancy of the pattern, so that it is read before anything else.
+- The index: for each entry, its name, its size, the position and size of its encoded data, and the digest of its content (with the hash
+  algorithm of the pattern). It goes through the whole data pipeline of the pattern (hash, compression, custom transforms, redundancy).
+- The entries: the content of each file, through the data pipeline of the pattern without the hash check, their digest being in the index.
+  Each entry is Reed-Solomon coded on its own, its chunks never spanning two entries.
+
+Listing the entries reads the preamble and the index only, and extracting a file reads them and the slots of its entry.
+
+Classes and Methods:
+- ContainerEntry: An entry of the index, as a (name, size, offset, length, digest) named tuple. The offset is relative to the first entry.
+- ContainerReader: Reads the entries of a container through a function reading a part of the container data.
+    - __init__(self, read: Callable[[int, int], bytes], pattern: Pattern, transforms=(), encoding="utf-8", alignment: int = 1): Initializes
+      the reader, read(offset, length) returning the container bytes [offset, offset + length[.
+    - entries: The entries of the container, the preamble and the index being read on first access.
+    - entry(self, name: str) -> ContainerEntry: Returns the entry of a file.
+    - read_entry(self, entry: Union[ContainerEntry, str]) -> bytes: Reads, corrects and checks the content of an entry.
+    - read_all(self) -> list[tuple[str, bytes]]: Reads the content of every entry.
+
+Functions:
+- read_container_files(files, encoding="utf-8") -> list[tuple[str, bytes]]: Reads the files to store (paths, named binary streams or (name,
+  content) tuples).
+- build_container(files, pattern, alignment=1, transforms=(), encoding="utf-8") -> (bytearray, list[ContainerEntry]): Builds the container
+  data of files, its blocks being aligned to the given number of bytes.
+- pack_files(files, encoding="utf-8") -> bytearray: Packs the (name, content) files extracted from a container into a single buffer.
+- unpack_files(data, encoding="utf-8") -> list[tuple[str, bytes]]: Unpacks files packed with pack_files().
+
+Usage:
+    from IST import Decoder, Encoder, Pattern
+
+    Encoder(pattern=Pattern()).process(input_path="path/to/image.png", output_path="path/to/processed_image.png",
+                                       files=["report.pdf", "notes.txt", ("key.bin", key)])
+
+    decoder = Decoder(pattern=Pattern())
+    names = [entry.name for entry in decoder.list_entries(file_path="path/to/processed_image.png")]
+    notes = decoder.extract_entry("notes.txt", file_path="path/to/processed_image.png").content
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+# Magic, version, number of entries and size of the encoded index
+CONTAINER_PREAMBLE = struct.Struct(">4sBII")
+CONTAINER_MAGIC = b"ISTC"
+CONTAINER_VERSION = 1
+
+# Per entry of the index: size of the name, size of the content, offset and size of the encoded data, followed by the name and the digest
+CONTAINER_ENTRY = struct.Struct(">HQQQ")
+
+# Per file packed by pack_files(): size of the name and size of the content, followed by the name and the content
+CONTAINER_FILE = struct.Struct(">HQ")
+
+
+class ContainerEntry(NamedTuple):
+    name: str
+    size: int
+    offset: int
+    length: int
+    digest: bytes
+
+
+def _align(size: int, alignment: int) -> int:
+    return -(-size // alignment) * alignment
+
+
+def _preamble_pipeline(pattern: Pattern) -> Pipeline:
+    # The preamble is read before its size could be, its encoded size only depends on the redundancy
+    return Pipeline([RedundancyTransform(pattern.repetitive_redundancy, pattern.repetitive_redundancy_mode, pattern.advanced_redundancy,
+                                         pattern.advanced_redundancy_correction_factor)])
+
+
+def _entry_pipeline(pattern: Pattern, transforms: Sequence[Transform]) -> Pipeline:
+    # The digest of each entry is written in the index, where it is read without extracting the entry
+    entry_pattern = copy.copy(pattern)
+    entry_pattern.hash_check = False
+
+    return Pipeline.from_pattern(entry_pattern, transforms)
+
+
+def read_container_files(files: Iterable[Union[str, io.IOBase, tuple[str, Union[str, bytes, bytearray]]]],
+                         encoding: str = "utf-8") -> list[tuple[str, bytes]]:
+    """
+    Reads the files to store into a container, checking their names are unique file names, without any path.
+    :param files: The files: paths, binary streams with a name (e.g. io.BytesIO with its name attribute set), or (name, content) tuples,
+        a str content being encoded
+    :param encoding: optional: The encoding of the names and of the str contents
+    :return: The (name, content) files, in order
+    """
+    contents = []
+    names = set()
+    for file in files:
+        if isinstance(file, str):
+            with open(file, "rb") as file_handler:
+                name, content = os.path.basename(file), file_handler.read()
+        elif isinstance(file, io.IOBase):
+            name, content = os.path.basename(getattr(file, "name", "")), file.read()
+        elif isinstance(file, tuple) and len(file) == 2:
+            name, content = file
+            if isinstance(content, str):
+                content = content.encode(encoding)
+        else:
+            raise UnsupportedTypeForParameterError("files", file, (str, io.IOBase, tuple))
+
+        if not isinstance(name, str) or not isinstance(content, (bytes, bytearray)):
+            raise UnsupportedTypeForParameterError("files", file, tuple)
+        if name in ("", ".", "..") or any(character in name for character in "/\\\0"):
+            # The entries are extracted as files of their name, which must neither be empty nor hold a path (on any system)
+            raise InvalidContainerEntryNameError(name)
+        if name in names:
+            raise DuplicateContainerEntryError(name)
+        if len(name.encode(encoding)) > 0xFFFF:
+            raise ValueError(f"The name of the file \"{name[:64]}...\" is too long to be stored in a container.")
+
+        names.add(name)
+        contents.append((name, bytes(content)))
+
+    return contents
+
+
+def build_container(files: Sequence[tuple[str, Union[bytes, bytearray]]], pattern: Pattern, alignment: int = 1,
+                    transforms: Sequence[Transform] = (), encoding: str = "utf-8") -> (bytearray, list[ContainerEntry]):
+    """
+    Builds the container data of files: the preamble, the index and the entries, each one starting on a multiple of the alignment.
+    :param files: The (name, content) files, as returned by read_container_files()
+    :param pattern: The pattern providing the hash, compression and redundancy parameters
+    :param alignment: optional: The alignment of the blocks in bytes, the data held by a block of slots (SlotLayout.alignment_bytes)
+    :param transforms: optional: The custom transforms of the data pipeline
+    :param encoding: optional: The encoding of the names
+    :return: The container data and its entries
+    """
+    entry_pipeline = _entry_pipeline(pattern, transforms)
+    hashed = pattern.get_hash_size() > 0
+
+    # The entries are encoded first, their offsets being relative to the first one
+    entries, blocks, position = [], [], 0
+    for name, content in files:
+        block = entry_pipeline.encode(content)
+        digest = pattern.compute_hash(content) if hashed else b""
+
+        position = _align(position, alignment)
+        entries.append(ContainerEntry(name, len(content), position, len(block), digest))
+        blocks.append(block)
+        position += len(block)
+
+    index = bytearray()
+    for entry in entries:
+        name = entry.name.encode(encoding)
+        index += CONTAINER_ENTRY.pack(len(name), entry.size, entry.offset, entry.length) + name + entry.digest
+    index = Pipeline.from_pattern(pattern, transforms).encode(index)
+
+    preamble = _preamble_pipeline(pattern).encode(CONTAINER_PREAMBLE.pack(CONTAINER_MAGIC, CONTAINER_VERSION, len(entries), len(index)))
+
+    index_offset = _align(len(preamble), alignment)
+    entries_offset = _align(index_offset + len(index), alignment)
+
+    data = bytearray(entries_offset + position)
+    data[:len(preamble)] = preamble
+    data[index_offset:index_offset + len(index)] = index
+    for entry, block in zip(entries, blocks):
+        data[entries_offset + entry.offset:entries_offset + entry.offset + entry.length] = block
+
+    return data, entries
+
+
+class ContainerReader:
+    def __init__(self, read: Callable[[int, int], Union[bytes, bytearray, memoryview]], pattern: Pattern,
+                 transforms: Sequence[Transform] = (), encoding: str = "utf-8", alignment: int = 1):
+        # read(offset, length) returns the container bytes [offset, offset + length[, offset being a multiple of the alignment
+        self.read = read
+        self.pattern = pattern
+        self.transforms = transforms
+        self.encoding = encoding
+        self.alignment = alignment
+
+        self._entries: Union[list[ContainerEntry], None] = None
+        self._entries_offset = 0
+
+    @property
+    def entries(self) -> list[ContainerEntry]:
+        if self._entries is None:
+            self._entries = self._read_index()
+
+        return self._entries
+
+    def _read_index(self) -> list[ContainerEntry]:
+        preamble_pipeline = _preamble_pipeline(self.pattern)
+        try:
+            preamble = preamble_pipeline.decode(self.read(0, preamble_pipeline.encoded_size(CONTAINER_PREAMBLE.size)))
+            magic, version, count, index_length = CONTAINER_PREAMBLE.unpack_from(preamble)
+        except (ValueError, struct.error, ReedSolomonError):
+            raise InvalidContainerError()
+
+        if magic != CONTAINER_MAGIC or version != CONTAINER_VERSION:
+            raise InvalidContainerError()
+
+        index_offset = _align(preamble_pipeline.encoded_size(CONTAINER_PREAMBLE.size), self.alignment)
+        self._entries_offset = _align(index_offset + index_length, self.alignment)
+        index = memoryview(Pipeline.from_pattern(self.pattern, self.transforms).decode(self.read(index_offset, index_length)))
+
+        digest_size = self.pattern.get_hash_size()
+        entries, position = [], 0
+        try:
+            for _ in range(count):
+                name_size, size, offset, length = CONTAINER_ENTRY.unpack_from(index, position)
+                position += CONTAINER_ENTRY.size
+                name = str(index[position:position + name_size], self.encoding)
+                digest = bytes(index[position + name_size:position + name_size + digest_size])
+                position += name_size + digest_size
+
+                if len(digest) != digest_size or offset % self.alignment:
+                    raise InvalidContainerError()
+                entries.append(ContainerEntry(name, size, offset, length, digest))
+        except (struct.error, UnicodeDecodeError):
+            raise InvalidContainerError()
+
+        return entries
+
+    def entry(self, name: str) -> ContainerEntry:
+        """
+        Returns the entry of a file.
+        :param name: The name of the file
+        :return: The entry
+        """
+        for entry in self.entries:
+            if entry.name == name:
+                return entry
+
+        raise ContainerEntryNotFoundError(name)
+
+    def read_entry(self, entry: Union[ContainerEntry, str]) -> bytes:
+        """
+        Reads the data of an entry only, and reverts its redundancy, custom transforms and compression.
+        :param entry: The entry, or the name of its file
+        :return: The content of the file, checked against the digest of the index
+        """
+        if isinstance(entry, str):
+            entry = self.entry(entry)
+
+        content = bytes(_entry_pipeline(self.pattern, self.transforms).decode(self.read(self._entries_offset + entry.offset, entry.length)))
+
+        if len(content) != entry.size or (entry.digest and self.pattern.compute_hash(content) != entry.digest):
+            raise DataIntegrityCheckFailedError()
+
+        return content
+
+    def read_all(self) -> list[tuple[str, bytes]]:
+        """
+        Reads the content of every entry.
+        :return: The (name, content) files, in order
+        """
+        return [(entry.name, self.read_entry(entry)) for entry in self.entries]
+
+
+def pack_files(files: Iterable[tuple[str, Union[bytes, bytearray]]], encoding: str = "utf-8") -> bytearray:
+    """
+    Packs the files extracted from a container into a single buffer, the payload of a decoded container.
+    :param files: The (name, content) files
+    :param encoding: optional: The encoding of the names
+    :return: The packed files
+    """
+    data = bytearray()
+    for name, content in files:
+        name = name.encode(encoding)
+        data += CONTAINER_FILE.pack(len(name), len(content)) + name + content
+
+    return data
+
+
+def unpack_files(data: Union[bytes, bytearray, memoryview], encoding: str = "utf-8") -> list[tuple[str, bytes]]:
+    """
+    Unpacks files packed with pack_files().
+    :param data: The packed files
+    :param encoding: optional: The encoding of the names
+    :return: The (name, content) files, in order
+    """
+    data = memoryview(data)
+    files, position = [], 0
+    while position < len(data):
+        name_size, size = CONTAINER_FILE.unpack_from(data, position)
+        position += CONTAINER_FILE.size
+        files.append((str(data[position:position + name_size], encoding), bytes(data[position + name_size:position + name_size + size])))
+        position += name_size + size
+
+    return files
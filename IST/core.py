@@ -0,0 +1,634 @@
+# Internal modules
+import io
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, NamedTuple, Sequence, Union
+
+# Project modules
+from .constants import currently_supported_formats
+from .container import ContainerEntry, ContainerReader, build_container, pack_files, read_container_files, unpack_files
+from .exceptions import ConflictingParametersError, DataSizeTooLargeError, InvalidContainerError, InvalidDataTypeEncounteredDecodingError, \
+    RequiredParameterMissingError, UnsupportedImageFormatError, UnsupportedTypeForParameterError
+from .pattern import HEADER_FLAG_CONTAINER, HEADER_FLAG_PATTERN, Pattern
+from .pipeline import BufferPool, Pipeline, Transform, shared_buffer_pool
+from .progress import Progress
+from .slots import MIN_BAND_SLOTS, SlotLayout, plan_slot_layouts
+from .utils import check_image_array, create_image_from_array, get_image_array, get_image_channels
+
+# External modules
+import numpy as np
+from PIL import Image
+
+"""
+Core.py is a module in the IST (Image Steganography Tools) library that provides the stateless encoding and decoding functions. They only
+read their arguments (the pattern included) and keep nothing between calls, so that they can be called concurrently from a thread pool,
+with the same pattern and transforms. The Encoder and Decoder classes are thin wrappers around them.
+
+Classes and Functions:
+- ExtractedFile: A file extracted from an image, as a (name, content) named tuple.
+- open_image(source) -> Image.Image: Opens an image from a path, a binary stream or the bytes of an image file, checking its format.
+- save_image(image: Image.Image, output, image_format=None, quality=100): Saves an image to a path or a binary stream.
+- default_pattern() -> Pattern: Returns the pattern used without any pattern, reading the pattern of the image from its header.
+- prepare_payload(data=None, file=None, encoding="utf-8", reserved_size=0) -> bytearray: Assembles the payload (data type, file name
+  for files, then the data) into a single buffer.
+- split_payload(data_bytes, encoding="utf-8") -> (int, Union[str, None], memoryview): Splits an extracted payload into its data type,
+  the file name of a file, and its content (the packed files of a container, see container.unpack_files()).
+- transform_payload(payload, pattern, image_size, image_mode, bit_depth, transforms=(), pool=shared_buffer_pool, progress=None,
+  hash_reserved=False): Applies the data pipeline of the pattern to the payload, checking it fits in the image.
+- generate_header(pattern: Pattern, pattern_data: dict, data_length: int, container: bool = False) -> bytes: Returns the header of the
+  encoded data, if any.
+- embed_payload(flat, payload, image_mode, image_size, pattern, **options): Hides a prepared payload into the flat array of the image
+  values.
+- embed_container(flat, files, image_mode, image_size, pattern, **options): Hides several files into the flat array of the image values,
+  in a multi-file container (see container.py).
+- read_header(flat, image_mode, image_size, pattern, data_length=None, enforce_provided_pattern=False) -> (Pattern, SlotLayout, int,
+  Union[bool, None]): Reads the header of the image, if any, and plans the data layout.
+- extract_payload(flat, image_mode, image_size, pattern, **options) -> (bytes, Pattern): Extracts the payload from the flat array of the
+  image values, with the pattern read from the header, if any.
+- open_container(flat, image_mode, image_size, pattern, **options) -> ContainerReader: Returns the reader of the container of the flat
+  array of the image values, reading only the slots of the parts it needs.
+- encode(image, payload=None, pattern=None, **options): Hides the payload, a file (file option) or several files (files option) into a
+  copy of the image, and returns the encoded image. The pattern is required.
+- decode(image, pattern=None, **options): Extracts the hidden data from the image.
+- list_entries(image, pattern=None, **options) -> list[ContainerEntry]: Lists the files of the container of the image.
+- extract_entry(image, name: str, pattern=None, **options) -> ExtractedFile: Extracts a single file from the container of the image.
+
+Usage:
+    from concurrent.futures import ThreadPoolExecutor
+    from IST import Pattern, encode, decode
+
+    pattern = Pattern(channels="RGB")
+    encoded = encode("path/to/image.png", "Secret message", pattern, output="path/to/processed_image.png")
+
+    with ThreadPoolExecutor() as executor:
+        messages = list(executor.map(lambda path: decode(path, pattern), paths))
+
+    # Several files, listed and extracted one by one
+    encode("path/to/image.png", pattern=pattern, files=["report.pdf", "notes.txt"], output="path/to/processed_image.png")
+    notes = extract_entry("path/to/processed_image.png", "notes.txt", pattern).content
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+ImageSource = Union[str, BinaryIO, bytes, bytearray, memoryview, Image.Image, np.ndarray]
+
+
+class ExtractedFile(NamedTuple):
+    name: str
+    content: bytes
+
+
+def open_image(source: Union[str, BinaryIO, bytes, bytearray, memoryview]) -> Image.Image:
+    """
+    Opens an image, reading its header only, and checks its format is supported.
+    :param source: The path of the image, a binary stream, or the bytes of an image file
+    :return: The image
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif isinstance(source, str):
+        # Binary streams have no extension, only the format read from their content is checked
+        if source.split('.')[-1].upper() not in currently_supported_formats:
+            raise UnsupportedImageFormatError()
+    elif not isinstance(source, io.IOBase):
+        raise UnsupportedTypeForParameterError("image", source, (str, io.IOBase, bytes))
+
+    image = Image.open(source)
+
+    if image.format not in currently_supported_formats:
+        image.close()
+        raise UnsupportedImageFormatError()
+
+    return image
+
+
+def save_image(image: Image.Image, output: Union[str, BinaryIO], image_format: Union[str, None] = None, quality: int = 100) -> None:
+    """
+    Saves an image.
+    :param image: The image to save
+    :param output: The path of the image or a binary stream
+    :param image_format: optional: The format of the image, from the extension of the path when None
+    :param quality: optional: The quality of the lossy formats
+    """
+    if image_format is None and isinstance(output, str):
+        image_format = output.split('.')[-1].upper()
+
+    if not image_format:
+        raise ValueError("Image format not specified")
+    image_format = image_format.upper()
+
+    if image_format not in currently_supported_formats:
+        raise UnsupportedImageFormatError()
+
+    # If the image_format is PGM, set the image_format to PPM
+    if image_format in ["PGM", "PPM"]:
+        image_format = "PPM"
+
+        # Pillow writes 16-bit Netpbm images from the "I" mode only
+        if image.mode.startswith("I;16"):
+            image = image.convert("I")
+
+        if isinstance(output, str):
+            with open(output, "w+b") as f:
+                image.save(f, format=image_format)
+        else:
+            image.save(output, format=image_format)
+    elif image_format in ["JPEG", "JPG", "WEBP"]:
+        image.save(output, format=image_format, quality=quality)
+    else:
+        image.save(output, format=image_format)
+
+
+def default_pattern() -> Pattern:
+    """
+    Returns the pattern used when none is given: the image must hold its pattern in a header with the default parameters, read from the
+    channels of the image, whatever they are.
+    :return: A new Pattern
+    """
+    return Pattern(header_write_pattern=True, channels="auto")
+
+
+def prepare_payload(data: Union[str, bytes, bytearray, None] = None, file: Union[str, io.BytesIO, None] = None, encoding: str = "utf-8",
+                    reserved_size: int = 0) -> bytearray:
+    """
+    Assembles the payload (data type, file name for files, then the data) into a single preallocated buffer, files being read straight
+    into it.
+    :param data: The data to hide (str or bytes), or None when a file is given
+    :param file: The file to hide (path or io.BytesIO), when data is None
+    :param encoding: optional: The encoding of the str data and of the file name
+    :param reserved_size: optional: The number of bytes reserved at the end of the buffer, to write the hash in place
+    :return: The payload buffer
+    """
+    if data is not None:
+        if isinstance(data, str):
+            data_type = 0
+            data = data.encode(encoding)
+        elif isinstance(data, (bytes, bytearray)):
+            data_type = 2
+        else:
+            raise UnsupportedTypeForParameterError("data", data, (str, bytes, bytearray))
+
+        payload = bytearray(1 + len(data) + reserved_size)
+        payload[0] = data_type
+        payload[1:1 + len(data)] = data
+    elif file is not None:
+        if isinstance(file, str):
+            with open(file, 'rb') as file_handler:
+                payload = _read_file_payload(os.path.basename(file), file_handler, os.fstat(file_handler.fileno()).st_size, reserved_size,
+                                             encoding)
+        elif isinstance(file, io.BytesIO):
+            position = file.tell()
+            file_size = file.seek(0, io.SEEK_END) - position
+            file.seek(position)
+
+            payload = _read_file_payload(file.name, file, file_size, reserved_size, encoding)
+        else:
+            raise UnsupportedTypeForParameterError("file", file, (str, io.BytesIO))
+    else:
+        raise RequiredParameterMissingError("data or file_path")
+
+    return payload
+
+
+def _read_file_payload(file_name: str, file_handler, file_size: int, reserved_size: int, encoding: str) -> bytearray:
+    file_name = file_name[:64].ljust(64, '\0').encode(encoding)
+    start = 1 + len(file_name)
+
+    payload = bytearray(start + file_size + reserved_size)
+    payload[0] = 1
+    payload[1:start] = file_name
+
+    # The file is read into the buffer, stopping early if it turns out shorter than announced
+    read_size = 0
+    with memoryview(payload) as view:
+        while read_size < file_size:
+            count = file_handler.readinto(view[start + read_size:start + file_size])
+            if not count:
+                break
+            read_size += count
+
+    if read_size < file_size:
+        del payload[start + read_size:start + file_size]
+
+    return payload
+
+
+def split_payload(data_bytes: Union[bytes, bytearray], encoding: str = "utf-8") -> (int, Union[str, None], memoryview):
+    """
+    Splits an extracted payload into its data type, the file name of a file, and its content, without copying the content.
+    :param data_bytes: The extracted payload, data type included
+    :param encoding: optional: The encoding of the file name
+    :return: The data type (0 for str, 1 for a file, 2 for bytes, 3 for the files of a container), the file name (None but for a file) and
+    the content
+    """
+    data_type = int(data_bytes[0])
+    content = memoryview(data_bytes)[1:]
+
+    if data_type in (0, 2, 3):
+        return data_type, None, content
+    elif data_type == 1:
+        return data_type, bytes(content[:64]).decode(encoding).rstrip('\0'), content[64:]
+    else:
+        raise InvalidDataTypeEncounteredDecodingError()
+
+
+def transform_payload(payload: Union[bytes, bytearray], pattern: Pattern, image_size: tuple[int, int], image_mode: str,
+                      bit_depth: Union[int, None] = None, transforms: Sequence[Transform] = (),
+                      pool: Union[BufferPool, None] = shared_buffer_pool, progress: Union[Progress, None] = None,
+                      hash_reserved: bool = False) -> Union[bytes, bytearray, memoryview]:
+    """
+    Applies the hash check, compression, custom transforms and redundancy of the pattern to the payload.
+    :param payload: The payload, as returned by prepare_payload()
+    :param pattern: The pattern
+    :param image_size: The size of the image
+    :param image_mode: The mode of the image
+    :param bit_depth: optional: The bit depth of the carrier values
+    :param transforms: optional: The custom transforms inserted into the pipeline
+    :param pool: optional: The pool of the reused buffers, the returned data may be one of its buffers
+    :param progress: optional: The progress reporter
+    :param hash_reserved: optional: Whether the payload buffer reserved the room of the hash, written in place
+    :return: The data to hide
+    """
+    data = Pipeline.from_pattern(pattern, transforms, pool).encode(payload, progress, reserved=hash_reserved)
+
+    max_size = pattern.calculate_max_data_size(image_size, image_mode, bit_depth)
+    if len(data) > max_size:
+        raise DataSizeTooLargeError(len(data), max_size)
+
+    return data
+
+
+def generate_header(pattern: Pattern, pattern_data: dict, data_length: int, container: bool = False) -> bytes:
+    """
+    Returns the header of the encoded data, if the pattern enables it.
+    :param pattern: The pattern
+    :param pattern_data: The pattern dictionary, as returned by Pattern.generate_pattern()
+    :param data_length: The length of the encoded data
+    :param container: optional: Whether the data is a multi-file container
+    :return: The header, empty when disabled
+    """
+    if pattern_data["header_enabled"] and (pattern_data["header_write_data_size"] or pattern_data["header_write_pattern"]):
+        return pattern.generate_header(data_length, container)
+
+    return b""
+
+
+def embed_payload(flat: np.ndarray, payload: Union[bytes, bytearray], image_mode: str, image_size: tuple[int, int], pattern: Pattern,
+                  transforms: Sequence[Transform] = (), pool: Union[BufferPool, None] = shared_buffer_pool,
+                  progress: Union[Progress, None] = None, workers: int = 1, min_band_slots: int = MIN_BAND_SLOTS,
+                  hash_reserved: bool = False) -> None:
+    """
+    Hides a prepared payload into the flat array of the image values, in place.
+    :param flat: The flat uint8 or uint16 array of the image values
+    :param payload: The payload, as returned by prepare_payload()
+    :param image_mode: The mode of the image
+    :param image_size: The size of the image
+    :param pattern: The pattern
+    :param transforms: optional: The custom transforms inserted into the pipeline
+    :param pool: optional: The pool of the reused buffers
+    :param progress: optional: The progress reporter
+    :param workers: optional: The number of threads the slots can be split on
+    :param min_band_slots: optional: The minimum number of slots per thread
+    :param hash_reserved: optional: Whether the payload buffer reserved the room of the hash
+    """
+    progress = progress or Progress()
+    image_channels = get_image_channels(image_mode)
+    pattern_data = pattern.generate_pattern(image_channels)
+
+    # The bit depth of the carriers is the one of the values array (8 or 16 bits)
+    data = transform_payload(payload, pattern, image_size, image_mode, flat.dtype.itemsize * 8, transforms, pool, progress, hash_reserved)
+    header = generate_header(pattern, pattern_data, len(data))
+
+    header_layout, data_layout = plan_slot_layouts(pattern_data, image_channels, image_size, len(header))
+
+    if header_layout is not None:
+        header_layout.embed(flat, header)
+    data_layout.embed(flat, data, workers, min_band_slots, progress.stage("embed"))
+
+
+def embed_container(flat: np.ndarray, files: Sequence[tuple[str, Union[bytes, bytearray]]], image_mode: str, image_size: tuple[int, int],
+                    pattern: Pattern, transforms: Sequence[Transform] = (), encoding: str = "utf-8", progress: Union[Progress, None] = None,
+                    workers: int = 1, min_band_slots: int = MIN_BAND_SLOTS) -> None:
+    """
+    Hides several files into the flat array of the image values, in place, in a multi-file container whose blocks start on blocks of
+    carrier slots, so that each file can be extracted on its own (see container.py).
+    :param flat: The flat uint8 or uint16 array of the image values
+    :param files: The (name, content) files, as returned by container.read_container_files()
+    :param image_mode: The mode of the image
+    :param image_size: The size of the image
+    :param pattern: The pattern
+    :param transforms: optional: The custom transforms inserted into the pipeline
+    :param encoding: optional: The encoding of the file names
+    :param progress: optional: The progress reporter
+    :param workers: optional: The number of threads the slots can be split on
+    :param min_band_slots: optional: The minimum number of slots per thread
+    """
+    progress = progress or Progress()
+    image_channels = get_image_channels(image_mode)
+    pattern_data = pattern.generate_pattern(image_channels)
+
+    # The data position only depends on the header size, the blocks are aligned on the slots of the data layout
+    _, data_layout = plan_slot_layouts(pattern_data, image_channels, image_size, len(generate_header(pattern, pattern_data, 0, True)))
+    data, _ = build_container(files, pattern, data_layout.alignment_bytes, transforms, encoding)
+
+    max_size = pattern.calculate_max_data_size(image_size, image_mode, flat.dtype.itemsize * 8)
+    if len(data) > max_size:
+        raise DataSizeTooLargeError(len(data), max_size)
+
+    header = generate_header(pattern, pattern_data, len(data), True)
+    header_layout, data_layout = plan_slot_layouts(pattern_data, image_channels, image_size, len(header))
+
+    if header_layout is not None:
+        header_layout.embed(flat, header)
+    data_layout.embed(flat, data, workers, min_band_slots, progress.stage("embed"))
+
+
+def read_header(flat: np.ndarray, image_mode: str, image_size: tuple[int, int], pattern: Pattern, data_length: Union[int, None] = None,
+                enforce_provided_pattern: bool = False) -> (Pattern, SlotLayout, Union[int, None], Union[bool, None]):
+    """
+    Reads the header of the image, if any, and plans the data layout.
+    :param flat: The flat uint8 or uint16 array of the image values
+    :param image_mode: The mode of the image
+    :param image_size: The size of the image
+    :param pattern: The pattern
+    :param data_length: optional: The data length, when it can't be read from the header
+    :param enforce_provided_pattern: optional: Whether to use the provided pattern and data length over the header ones
+    :return: The pattern of the data (the header one when written), the data layout, the data length, and whether the data is a multi-file
+    container (None without header)
+    """
+    image_channels = get_image_channels(image_mode)
+    pattern_data = pattern.generate_pattern(image_channels=image_channels)
+
+    header_size = 0
+    if pattern_data["header_enabled"]:
+        # Get the expected header data size
+        header_size = len(pattern.generate_header(0))
+
+    header_layout, data_layout = plan_slot_layouts(pattern_data, image_channels, image_size, header_size)
+    container = None
+
+    if header_layout is not None:
+        # Extract the header data
+        header_data, _ = header_layout.extract(flat, header_size)
+
+        # Remove redundancy from the header data
+        header_data = pattern.reconstruct_redundancy(header_data, "header")
+
+        # Extract the data length and other information from the header_data
+        size_field_length = 4 if pattern_data["header_write_data_size"] else 0
+        if size_field_length and (not data_length or not enforce_provided_pattern):
+            data_length = int.from_bytes(header_data[:4], "big") if not enforce_provided_pattern or not data_length else data_length
+
+        header_flags = header_data[size_field_length]
+        container = bool(header_flags & HEADER_FLAG_CONTAINER)
+
+        if header_flags & HEADER_FLAG_PATTERN and not enforce_provided_pattern:
+            # The data parameters are read from the header, the header parameters and the scatter seed remaining the provided ones
+            pattern = Pattern.from_bytes(header_data[size_field_length + 1:], pattern)
+            pattern_data = pattern.generate_pattern(image_channels=image_channels)
+            _, data_layout = plan_slot_layouts(pattern_data, image_channels, image_size, header_size)
+
+    return pattern, data_layout, data_length, container
+
+
+def extract_payload(flat: np.ndarray, image_mode: str, image_size: tuple[int, int], pattern: Pattern,
+                    transforms: Sequence[Transform] = (), data_length: Union[int, None] = None, enforce_provided_pattern: bool = False,
+                    progress: Union[Progress, None] = None, workers: int = 1, min_band_slots: int = MIN_BAND_SLOTS,
+                    encoding: str = "utf-8") -> (Union[bytes, bytearray], Pattern):
+    """
+    Extracts the payload from the flat array of the image values.
+    :param flat: The flat uint8 or uint16 array of the image values
+    :param image_mode: The mode of the image
+    :param image_size: The size of the image
+    :param pattern: The pattern
+    :param transforms: optional: The custom transforms the image was encoded with
+    :param data_length: optional: The data length, when it can't be read from the header
+    :param enforce_provided_pattern: optional: Whether to use the provided pattern and data length over the header ones
+    :param progress: optional: The progress reporter
+    :param workers: optional: The number of threads the slots can be split on
+    :param min_band_slots: optional: The minimum number of slots per thread
+    :param encoding: optional: The encoding of the file names of a container
+    :return: The payload, data type included, and the pattern the data was read with (the header one when written)
+    """
+    progress = progress or Progress()
+    pattern, data_layout, data_length, container = read_header(flat, image_mode, image_size, pattern, data_length,
+                                                               enforce_provided_pattern)
+    if data_length is None:
+        # Neither written in the header nor provided
+        raise RequiredParameterMissingError("data_length")
+
+    data_bytes, _ = data_layout.extract(flat, data_length, workers, min_band_slots, progress.stage("extract"))
+
+    if container:
+        # The whole container is read at once, its files being packed after their data type
+        reader = ContainerReader(lambda offset, length: memoryview(data_bytes)[offset:offset + length], pattern, transforms, encoding,
+                                 data_layout.alignment_bytes)
+        return bytearray(b"\x03") + pack_files(reader.read_all(), encoding), pattern
+
+    # Revert the redundancy, custom transforms, compression and hash check of the encoder
+    return Pipeline.from_pattern(pattern, transforms).decode(data_bytes, progress), pattern
+
+
+def open_container(flat: np.ndarray, image_mode: str, image_size: tuple[int, int], pattern: Pattern, transforms: Sequence[Transform] = (),
+                   encoding: str = "utf-8", workers: int = 1, min_band_slots: int = MIN_BAND_SLOTS) -> ContainerReader:
+    """
+    Returns the reader of the multi-file container of the flat array of the image values. The reader extracts and corrects the slots of
+    the parts it reads only: the header, then the preamble and the index of the container, then the entries of the files read.
+    :param flat: The flat uint8 or uint16 array of the image values
+    :param image_mode: The mode of the image
+    :param image_size: The size of the image
+    :param pattern: The pattern
+    :param transforms: optional: The custom transforms the image was encoded with
+    :param encoding: optional: The encoding of the file names
+    :param workers: optional: The number of threads the slots can be split on
+    :param min_band_slots: optional: The minimum number of slots per thread
+    :return: The container reader, with the pattern read from the header, if any
+    """
+    pattern, data_layout, _, container = read_header(flat, image_mode, image_size, pattern)
+    if container is False:
+        raise InvalidContainerError()
+
+    def read(offset: int, length: int) -> bytearray:
+        return data_layout.extract(flat, length, workers, min_band_slots, data_offset=offset)[0]
+
+    return ContainerReader(read, pattern, transforms, encoding, data_layout.alignment_bytes)
+
+
+def _progress(options: dict) -> Progress:
+    return Progress(options.get("progress_callback", None), options.get("cancel_token", None))
+
+
+@contextmanager
+def _image_values(image: ImageSource, options: dict) -> Iterator[tuple[np.ndarray, str, tuple[int, int]]]:
+    # The flat values of an image to read, its mode and its size
+    if isinstance(image, np.ndarray):
+        mode = options.get("mode", None)
+        if mode is None:
+            raise RequiredParameterMissingError("mode")
+
+        image_size = check_image_array(image, mode)
+        yield image.reshape(-1), mode, image_size
+    elif isinstance(image, Image.Image):
+        yield get_image_array(image, writable=False).reshape(-1), image.mode, image.size
+    else:
+        with open_image(image) as opened:
+            yield get_image_array(opened, writable=False).reshape(-1), opened.mode, opened.size
+
+
+def encode(image: ImageSource, payload: Union[str, bytes, bytearray, None] = None, pattern: Union[Pattern, None] = None,
+           **options) -> Union[Image.Image, np.ndarray]:
+    """
+    Hides the payload, a file or several files into a copy of the image. The image, the pattern and the transforms are only read.
+    :param image: The cover image: a Pillow image, a path, a binary stream, the bytes of an image file, or a values array (with mode)
+    :param payload: The data to hide (str or bytes), or None when a file or files are given
+    :param pattern: The pattern (required)
+    :param options: optional: mode (of a values array), file (a file to hide instead of the payload), files (several files hidden instead
+        of the payload in a multi-file container: paths, named binary streams or (name, content) tuples), output (a path or a binary stream
+        the encoded image is saved to), image_format (of the output, by default from its extension or the format of the cover image),
+        encoding, transforms, buffer_pool, workers (1 by default, the calls being parallelized by the caller), min_band_slots,
+        progress_callback and cancel_token
+    :return: The encoded image, or the encoded values array for an array
+    """
+    if pattern is None:
+        raise RequiredParameterMissingError("pattern")
+    if not isinstance(pattern, Pattern):
+        raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
+
+    # Exactly one of the payload, the file and the files is hidden
+    files = options.get("files", None)
+    given = [name for name, value in [("payload", payload), ("file", options.get("file", None)), ("files", files)] if value is not None]
+    if not given:
+        raise RequiredParameterMissingError("payload, file or files")
+    if len(given) > 1:
+        raise ConflictingParametersError(*given)
+
+    progress = _progress(options)
+    progress("prepare", 0.0)
+    encoding = options.get("encoding", "utf-8")
+
+    if files is not None:
+        files = read_container_files(files, encoding)
+        container_options = {"transforms": options.get("transforms", ()), "encoding": encoding, "progress": progress,
+                             "workers": options.get("workers", 1), "min_band_slots": options.get("min_band_slots", MIN_BAND_SLOTS)}
+
+        def embed(flat: np.ndarray, image_mode: str, image_size: tuple[int, int]) -> None:
+            embed_container(flat, files, image_mode, image_size, pattern, **container_options)
+    else:
+        payload = prepare_payload(payload, options.get("file", None), encoding,
+                                  Pipeline.from_pattern(pattern, options.get("transforms", ())).reserved_size)
+        embed_options = {"transforms": options.get("transforms", ()), "pool": options.get("buffer_pool", shared_buffer_pool),
+                         "progress": progress, "workers": options.get("workers", 1),
+                         "min_band_slots": options.get("min_band_slots", MIN_BAND_SLOTS), "hash_reserved": True}
+
+        def embed(flat: np.ndarray, image_mode: str, image_size: tuple[int, int]) -> None:
+            embed_payload(flat, payload, image_mode, image_size, pattern, **embed_options)
+
+    if isinstance(image, np.ndarray):
+        mode = options.get("mode", None)
+        if mode is None:
+            raise RequiredParameterMissingError("mode")
+
+        image_size = check_image_array(image, mode)
+        values = np.array(image, order="C")
+        embed(values.reshape(-1), mode, image_size)
+        return values
+
+    source_format = None
+    if not isinstance(image, Image.Image):
+        with open_image(image) as opened:
+            opened.load()
+            image, source_format = opened, opened.format
+
+    # The exported values are a copy, the cover image is left untouched
+    values = get_image_array(image)
+    embed(values.reshape(-1), image.mode, image.size)
+    encoded_image = create_image_from_array(values, image.mode, image.size)
+
+    output = options.get("output", None)
+    if output is not None:
+        progress("save", 0.0)
+        image_format = options.get("image_format", None)
+        if image_format is None and not isinstance(output, str):
+            image_format = source_format or image.format
+        save_image(encoded_image, output, image_format)
+        progress("save", 1.0, check=False)
+
+    return encoded_image
+
+
+def decode(image: ImageSource, pattern: Union[Pattern, None] = None, **options) -> Union[str, bytes, bytearray, ExtractedFile]:
+    """
+    Extracts the hidden data from the image. The image, the pattern and the transforms are only read, and nothing is written.
+    :param image: The encoded image: a Pillow image, a path, a binary stream, the bytes of an image file, or a values array (with mode)
+    :param pattern: optional: The pattern, without it the image must hold its pattern in a header with the default parameters
+    :param options: optional: mode (of a values array), data_length, enforce_provided_pattern, encoding, transforms, workers (1 by
+        default), min_band_slots, progress_callback, cancel_token and raw (returns the extracted payload, data type included)
+    :return: The str or bytes data, the ExtractedFile of a file, or the list of the ExtractedFile of a container
+    """
+    if pattern is None:
+        pattern = default_pattern()
+    elif not isinstance(pattern, Pattern):
+        raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
+
+    progress = _progress(options)
+    encoding = options.get("encoding", "utf-8")
+    extract_options = {"transforms": options.get("transforms", ()), "data_length": options.get("data_length", None),
+                       "enforce_provided_pattern": options.get("enforce_provided_pattern", False), "progress": progress,
+                       "workers": options.get("workers", 1), "min_band_slots": options.get("min_band_slots", MIN_BAND_SLOTS),
+                       "encoding": encoding}
+
+    progress("load", 0.0)
+    with _image_values(image, options) as (flat, image_mode, image_size):
+        data_bytes, _ = extract_payload(flat, image_mode, image_size, pattern, **extract_options)
+
+    if options.get("raw", False):
+        return data_bytes
+
+    data_type, file_name, content = split_payload(data_bytes, encoding)
+    progress("process", 1.0, check=False)
+
+    if data_type == 0:
+        return str(content, encoding)
+    elif data_type == 1:
+        return ExtractedFile(file_name, bytes(content))
+    elif data_type == 3:
+        return [ExtractedFile(name, content) for name, content in unpack_files(content, encoding)]
+    else:
+        return bytes(content)
+
+
+def _open_container(flat: np.ndarray, image_mode: str, image_size: tuple[int, int], pattern: Union[Pattern, None],
+                    options: dict) -> ContainerReader:
+    if pattern is None:
+        pattern = default_pattern()
+    elif not isinstance(pattern, Pattern):
+        raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
+
+    return open_container(flat, image_mode, image_size, pattern, options.get("transforms", ()), options.get("encoding", "utf-8"),
+                          options.get("workers", 1), options.get("min_band_slots", MIN_BAND_SLOTS))
+
+
+def list_entries(image: ImageSource, pattern: Union[Pattern, None] = None, **options) -> list[ContainerEntry]:
+    """
+    Lists the files of the multi-file container of the image, reading only the header, the preamble and the index of the container.
+    :param image: The encoded image: a Pillow image, a path, a binary stream, the bytes of an image file, or a values array (with mode)
+    :param pattern: optional: The pattern, without it the image must hold its pattern in a header with the default parameters
+    :param options: optional: mode (of a values array), encoding, transforms, workers (1 by default) and min_band_slots
+    :return: The entries of the container, in order
+    """
+    with _image_values(image, options) as (flat, image_mode, image_size):
+        return _open_container(flat, image_mode, image_size, pattern, options).entries
+
+
+def extract_entry(image: ImageSource, name: str, pattern: Union[Pattern, None] = None, **options) -> ExtractedFile:
+    """
+    Extracts a single file from the multi-file container of the image, reading and correcting only the header, the preamble and the
+    index of the container, and the slots of the entry of the file.
+    :param image: The encoded image: a Pillow image, a path, a binary stream, the bytes of an image file, or a values array (with mode)
+    :param name: The name of the file
+    :param pattern: optional: The pattern, without it the image must hold its pattern in a header with the default parameters
+    :param options: optional: mode (of a values array), encoding, transforms, workers (1 by default) and min_band_slots
+    :return: The ExtractedFile, checked against the digest of the index
+    """
+    with _image_values(image, options) as (flat, image_mode, image_size):
+        return ExtractedFile(name, _open_container(flat, image_mode, image_size, pattern, options).read_entry(name))
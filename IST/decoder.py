@@ -1,13 +1,22 @@
 # Internal modules
+import io
+import os
+from typing import Union
 
 # Project modules
 from .base import BaseSteganography
+from .cache import DecodeCache, pattern_fingerprint
+from .container import ContainerEntry, ContainerReader, unpack_files
+from .core import ExtractedFile, default_pattern, extract_payload, open_container, split_payload
 from .pattern import Pattern
-from .utils import get_image_pixels, ranges_overlap
-from .exceptions import DataIntegrityCheckFailedError, InvalidDataTypeEncounteredDecodingError, UnsupportedTypeForParameterError, NoImageLoadedError, \
-    NoPatternLoadedError
+from .pipeline import Transform
+from .progress import Progress
+from .slots import MIN_BAND_SLOTS, SlotLayout
+from .utils import check_image_array, get_image_array, get_image_channels
+from .exceptions import UnsupportedTypeForParameterError, NoImageLoadedError
 
 # External modules
+import numpy as np
 from PIL import Image
 
 
@@ -17,11 +26,20 @@ Decoder.py is a module in the IST (Image Steganography Tools) library that provi
 
 Classes and Methods:
 - Decoder: The main class that implements the decoding process.
-    - __init__(self, **kwargs): Initializes the Decoder object with optional keyword arguments.
+    - __init__(self, **kwargs): Initializes the Decoder object with optional keyword arguments (pattern, image, encoding, workers,
+      min_band_slots, progress_callback, cancel_token, cache, transforms).
     - load_pattern(self, pattern: Pattern): Loads a Pattern object for decoding.
-    - decode_data(self, pixels: list[tuple[int, ...], ...], data_length: int, channels: str, bit_frequency: int, byte_spacing: int, offset: int = 0): Decodes and extracts data from the given pixel values based on the specified parameters.
-    - extract_data(self, pixels: list[tuple[int, ...], ...], data_length=None, enforce_provided_pattern=False): Extracts the hidden data from the given pixel values based on the loaded pattern and optional data_length parameter.
-    - process(self, **kwargs): Main method that loads the image and pattern (if not already loaded) and extracts the hidden data. Accepts optional keyword arguments for file_path, pattern, data_length, and enforce_provided_pattern.
+    - decode_data(self, pixels: np.ndarray, data_length: int, channels: str, bit_frequency: int, byte_spacing: int, offset: int = 0): Decodes and extracts data from the given pixel values array based on the specified parameters.
+    - extract_data(self, pixels: np.ndarray, data_length=None, enforce_provided_pattern=False): Extracts the hidden data from the given pixel values based on the loaded pattern and optional data_length parameter. When the header holds the pattern (header_write_pattern), the decoder configures itself from it, unless enforce_provided_pattern is set.
+    - decode_array(self, array: np.ndarray, mode: str, pattern=None, data_length=None, enforce_provided_pattern=False): Extracts the hidden
+      data directly from a (height, width, bands) values array, without any Pillow image.
+    - split_payload(self, data_bytes) -> (int, Union[str, None], memoryview): Splits an extracted payload into its data type, the file
+      name of a file, and its content.
+    - list_entries(self, **kwargs) -> list[ContainerEntry]: Lists the files of the multi-file container of the image, reading only its
+      index. Accepts the file_path and pattern keyword arguments of process().
+    - extract_entry(self, name: str, **kwargs) -> ExtractedFile: Extracts a single file from the multi-file container of the image,
+      reading only the index and the slots of the file. Accepts the file_path and pattern keyword arguments of process().
+    - process(self, **kwargs): Main method that loads the image and pattern (if not already loaded) and extracts the hidden data. Without any pattern, the image must hold its pattern in a header with the default parameters. Accepts optional keyword arguments for file_path (a path or a binary stream), pattern, data_length, enforce_provided_pattern, progress_callback (called with the stage and the fraction done: load, extract, redundancy, decompress, hash, process), cancel_token (a CancelToken stopping the process at the next chunk boundary), cache (a DecodeCache returning the stored result of an image already decoded with the same pattern, without loading it) and raw (returns the extracted payload, data type included, without processing it).
 
 Usage:
 To use the Decoder module, create a Decoder object and load an image and pattern. Then, call the process() method to extract the hidden data. For example:
@@ -50,133 +68,158 @@ class Decoder(BaseSteganography):
     def __init__(self, **kwargs):
         super().__init__()
         self.pattern: Pattern = kwargs.get("pattern", None)
+        # The pattern given by the caller, each image is decoded from it, while self.pattern is the one read from the header of the last
+        # image decoded, if any
+        self.provided_pattern: Pattern = self.pattern
         self.encoding: str = kwargs.get("encoding", "utf-8")
         self.image: Image = kwargs.get("image", None)
 
-    def load_pattern(self, pattern: Pattern):
-        self.pattern = pattern
-
-    def decode_data(self, pixels: list[tuple[int, ...], ...], data_length: int, channels: str,
-                    bit_frequency: int, byte_spacing: int, offset: int = 0) -> (bytes, int):
-        data_bits = ""
-
-        channel_counters = {channel: 0 for channel in self.image.mode}
-
-        # If pixels list is not made of tuples but of integers, convert it to tuples
-        if isinstance(pixels[0], int):
-            pixels = [(pixel,) for pixel in pixels]
-
-        last_pixel = offset
-        for pixel_index, pixel in enumerate(pixels[offset:], start=offset):
-            # print(f"Processing pixel {pixel_index}: {pixel}")
-            for channel_index, value in enumerate(pixel):
-                channel = self.image.mode[channel_index % len(self.image.mode)]
-
-                if channel in channels:
-                    if channel_counters[channel] % byte_spacing == 0:
-                        value_bits = format(value, '08b')
-                        # print(value_bits)
-                        data_bits += value_bits[-bit_frequency:]
-
-                    channel_counters[channel] += 1
-
-                if len(data_bits) >= data_length * 8:
-                    last_pixel = pixel_index
-                    break
-            else:
-                continue
-
-            # print(f"Decoded from pixel {offset} to {last_pixel}")
-            break
-
-        # print(f"data_bits: {data_bits}")
-        data_bytes = bytearray()
-
-        for i in range(0, data_length * 8, 8):
-            #self.logger.debug(f"Extracting byte {i} to {i + 8}: {data_bits[i:i + 8]}")
-            byte = data_bits[i:i + 8]
-            data_bytes.append(int(byte, 2))
-
-        return data_bytes, last_pixel - offset
-
-    def extract_data(self, pixels: list[tuple[int, ...], ...], data_length=None, enforce_provided_pattern=False) -> bytes:
-        pattern_data = self.pattern.generate_pattern(image_channels=self.image.mode)
-
-        channels = pattern_data["channels"]
-        bit_frequency = pattern_data["bit_frequency"]
-        byte_spacing = pattern_data["byte_spacing"]
-        position = pattern_data["position"]
-
-        header_enabled = pattern_data["header_enabled"]
-        header_channels = pattern_data["header_channels"]
-        header_bit_frequency = pattern_data["header_bit_frequency"]
-        header_byte_spacing = pattern_data["header_byte_spacing"]
-
-        header_offset_size = 0
-        if header_enabled:
-            # Get the expected header data size and extract the header data from the specified position
-            header_size = len(self.pattern.generate_header(0))  # TODO: Optimize this to avoid generating the header twice
-
-            # Compute the header position
-            header_position = 0
-            if pattern_data["header_position"] == "image_start":
-                header_position = 0
-            elif pattern_data["header_position"] == "before_data":
-                header_position = position
-
-            # Extract the header data
-            header_data, header_offset_size = self.decode_data(pixels, header_size, header_channels, header_bit_frequency, header_byte_spacing,
-                                                               header_position)
-
-            # Remove redundancy from the header data
-            header_data = self.pattern.reconstruct_redundancy(header_data, "header")
+        # Large data is embedded / extracted on several threads, in contiguous bands of at least min_band_slots slots
+        self.workers: int = kwargs.get("workers", os.cpu_count() or 1)
+        self.min_band_slots: int = kwargs.get("min_band_slots", MIN_BAND_SLOTS)
 
-            # Extract the data length and other information from the header_data
-            if not data_length or not enforce_provided_pattern:
-                data_length = int.from_bytes(header_data[:4], "big") if not enforce_provided_pattern or not data_length else data_length
+        # Progress reporting and cooperative cancellation at chunk boundaries, see progress.py
+        self.progress: Progress = Progress(kwargs.get("progress_callback", None), kwargs.get("cancel_token", None))
 
-            pattern_flag = header_data[4]
+        # Optional persistent cache of the decoding results, see cache.py
+        self.cache: Union[DecodeCache, None] = kwargs.get("cache", None)
 
-            if pattern_flag == 1 and not enforce_provided_pattern:
-                # TODO: Support extracting and loading the pattern from the header_data
-                pass
+        # Custom transforms inserted into the data pipeline of the pattern, the ones the image was encoded with, see pipeline.py
+        self.transforms: list[Transform] = list(kwargs.get("transforms", None) or [])
 
-            if pattern_data["header_position"] == "image_start" and not ranges_overlap(0, header_offset_size, position, position):
-                header_offset_size = 0
-
-        data_bytes, _ = self.decode_data(pixels, data_length, channels, bit_frequency, byte_spacing, position + header_offset_size)
-
-        # Remove redundancy from the data
-        data_bytes = self.pattern.reconstruct_redundancy(data_bytes, "data")
-
-        if pattern_data["compression_enabled"]:
-            data_bytes = self.pattern.decompress_data(data_bytes)
-
-        if pattern_data["hash_check"]:
-            data_bytes, data_hash = data_bytes[:-32], data_bytes[-32:]
-            if self.pattern.compute_hash(data_bytes) != data_hash:
-                raise DataIntegrityCheckFailedError()
+    def load_pattern(self, pattern: Pattern):
+        self.pattern = self.provided_pattern = pattern
+
+    def decode_data(self, pixels: np.ndarray, data_length: int, channels: str, bit_frequency: int, byte_spacing: int,
+                    offset: int = 0) -> (bytes, int):
+        if not isinstance(pixels, np.ndarray):
+            pixels = np.array(pixels, dtype=np.uint8)
+
+        layout = SlotLayout(get_image_channels(self.image.mode), self.image.size, channels, bit_frequency, byte_spacing, offset)
+        return layout.extract(pixels.reshape(-1), data_length, self.workers, self.min_band_slots)
+
+    def extract_data(self, pixels: np.ndarray, data_length=None, enforce_provided_pattern=False) -> bytes:
+        return self._extract(pixels.reshape(-1), self.image.mode, self.image.size, data_length, enforce_provided_pattern)
+
+    def decode_array(self, array: np.ndarray, mode: str, pattern: Union[Pattern, None] = None, data_length: Union[int, None] = None,
+                     enforce_provided_pattern: bool = False):
+        """
+        Extracts the hidden data directly from an array of image values, without any Pillow image.
+        :param array: The uint8 or uint16 values array, of shape (height, width, bands) or (height, width) for single band modes
+        :param mode: The image mode of the array (e.g. "RGB", "RGBA", "L", "I;16")
+        :param pattern: optional: The pattern to use, the loaded pattern when None
+        :param data_length: optional: The data length, when it can't be read from the header
+        :param enforce_provided_pattern: optional: Whether to use the provided data length over the header one
+        :return: The extracted data, like process()
+        """
+        if pattern is not None:
+            if not isinstance(pattern, Pattern):
+                raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
+            self.load_pattern(pattern)
+        elif not self.provided_pattern:
+            # Without any pattern, the image must describe its own pattern in a header with the default parameters
+            self.load_pattern(default_pattern())
+
+        image_size = check_image_array(array, mode)
+
+        # Only the needed values are read, a non-contiguous array is flattened in a copy
+        data_bytes = self._extract(array.reshape(-1), mode, image_size, data_length, enforce_provided_pattern)
+        return self._process_data(data_bytes)
 
-        # data = data_bytes.decode(self.encoding)
+    def _extract(self, flat: np.ndarray, image_mode: str, image_size: tuple[int, int], data_length=None,
+                 enforce_provided_pattern=False) -> bytes:
+        data_bytes, pattern = extract_payload(flat, image_mode, image_size, self.provided_pattern, self.transforms, data_length,
+                                              enforce_provided_pattern, self.progress, self.workers, self.min_band_slots, self.encoding)
 
+        # The decoder keeps the pattern read from the header, if any
+        self.pattern = pattern
         return data_bytes
 
+    def split_payload(self, data_bytes: Union[bytes, bytearray]) -> (int, Union[str, None], memoryview):
+        """
+        Splits an extracted payload into its data type, the file name of a file, and its content, without copying the content.
+        :param data_bytes: The extracted payload, data type included
+        :return: The data type (0 for str, 1 for a file, 2 for bytes, 3 for the files of a container), the file name (None but for a
+            file) and the content
+        """
+        return split_payload(data_bytes, self.encoding)
+
     def _process_data(self, data_bytes):
-        data_type = int(data_bytes[0])
-        data_bytes = data_bytes[1:]
+        data_type, file_name, content = self.split_payload(data_bytes)
 
         if data_type == 0:
-            return data_bytes.decode(self.encoding)
+            return str(content, self.encoding)
         elif data_type == 1:
-            file_name = data_bytes[:64].decode(self.encoding).rstrip('\0')
-            file_data = data_bytes[64:]
             with open(file_name, 'wb') as file:
-                file.write(file_data)
+                file.write(content)
             return f"File '{file_name}' has been extracted."
-        elif data_type == 2:
-            return data_bytes
+        elif data_type == 3:
+            # The files of a container are written in the working directory, their names can't escape it, and a file written is never
+            # overwritten by another file of the same (base) name
+            names = []
+            for name, file_content in unpack_files(content, self.encoding):
+                name = os.path.basename(name) or "extracted_file"
+                stem, extension = os.path.splitext(name)
+                suffix = 1
+                while name in names:
+                    name = f"{stem}-{suffix}{extension}"
+                    suffix += 1
+
+                with open(name, 'wb') as file:
+                    file.write(file_content)
+                names.append(name)
+            return f"Files {', '.join(repr(name) for name in names)} have been extracted."
         else:
-            raise InvalidDataTypeEncounteredDecodingError()
+            return bytes(content)
+
+    def _load(self, kwargs: dict) -> None:
+        # Loads the image and the pattern of the keyword arguments, like process()
+        file_path = kwargs.get("file_path", None)
+        pattern = kwargs.get("pattern", None)
+
+        if file_path:
+            if not isinstance(file_path, (str, io.IOBase)):
+                raise UnsupportedTypeForParameterError("file_path", file_path, (str, io.IOBase))
+            self.image = self._perform_load_image(file_path)
+        elif not self.image:
+            raise NoImageLoadedError()
+
+        if pattern:
+            if not isinstance(pattern, Pattern):
+                raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
+            self.load_pattern(pattern)
+        elif not self.provided_pattern:
+            # Without any pattern, the image must describe its own pattern in a header with the default parameters
+            self.load_pattern(default_pattern())
+
+    def _open_container(self, kwargs: dict) -> ContainerReader:
+        self._load(kwargs)
+
+        pixels = get_image_array(self.image, writable=False)
+        reader = open_container(pixels.reshape(-1), self.image.mode, self.image.size, self.provided_pattern, self.transforms, self.encoding,
+                                self.workers, self.min_band_slots)
+
+        # The decoder keeps the pattern read from the header, if any
+        self.pattern = reader.pattern
+        return reader
+
+    def list_entries(self, **kwargs) -> list[ContainerEntry]:
+        """
+        Lists the files of the multi-file container of the image, reading only the header, the preamble and the index of the container.
+        :param kwargs: optional: file_path and pattern, like process()
+        :return: The entries of the container, in order
+        """
+        return self._open_container(kwargs).entries
+
+    def extract_entry(self, name: str, **kwargs) -> ExtractedFile:
+        """
+        Extracts a single file from the multi-file container of the image, reading and correcting only the index of the container and
+        the slots of the entry of the file. Nothing is written.
+        :param name: The name of the file
+        :param kwargs: optional: file_path and pattern, like process()
+        :return: The ExtractedFile, checked against the digest of the index
+        """
+        return ExtractedFile(name, self._open_container(kwargs).read_entry(name))
 
     def process(self, **kwargs) -> str:
         file_path: str = kwargs.get("file_path", None)
@@ -185,24 +228,62 @@ class Decoder(BaseSteganography):
         data_length: int = kwargs.get("data_length", None)
         enforce_provided_pattern: bool = kwargs.get("enforce_provided_pattern", False)
 
-        if not self.image or file_path:
-            if file_path:
-                if isinstance(file_path, str):
-                    self.image = self._perform_load_image(file_path)
-                else:
-                    raise UnsupportedTypeForParameterError("file_path", file_path, str)
-            else:
-                raise NoImageLoadedError()
-
-        if not self.pattern or pattern:
+        if file_path:
+            if isinstance(file_path, io.IOBase):
+                # A binary stream is read once, the cache then hashes the values of the image
+                self.image = self._perform_load_image(file_path)
+                file_path = None
+            elif not isinstance(file_path, str):
+                raise UnsupportedTypeForParameterError("file_path", file_path, (str, io.IOBase))
+        elif not self.image:
+            raise NoImageLoadedError()
+
+        if not self.provided_pattern or pattern:
             if pattern:
                 if isinstance(pattern, Pattern):
                     self.load_pattern(pattern)
                 else:
                     raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
             else:
-                raise NoPatternLoadedError()
+                # Without any pattern, the image must describe its own pattern in a header with the default parameters
+                self.load_pattern(default_pattern())
 
-        pixels = get_image_pixels(self.image)
-        data_bytes = self.extract_data(pixels, data_length=data_length, enforce_provided_pattern=enforce_provided_pattern)
-        return self._process_data(data_bytes)
+        if "progress_callback" in kwargs or "cancel_token" in kwargs:
+            self.progress = Progress(kwargs.get("progress_callback", self.progress.callback),
+                                     kwargs.get("cancel_token", self.progress.cancel_token))
+
+        def extract() -> bytes:
+            if file_path:
+                self.image = self._perform_load_image(file_path)
+
+            self.progress("load", 0.0)
+            # The values are only read, the array is a view of the exported image values
+            pixels = get_image_array(self.image, writable=False)
+            return self.extract_data(pixels, data_length=data_length, enforce_provided_pattern=enforce_provided_pattern)
+
+        cache: Union[DecodeCache, None] = kwargs.get("cache", self.cache)
+        if cache is not None:
+            # A stored result is returned without loading the image
+            options = {"data_length": data_length, "enforce_provided_pattern": enforce_provided_pattern}
+            if self.transforms:
+                # The custom transforms change the result, they are identified by their class and parameters
+                options["transforms"] = [[type(transform).__module__, type(transform).__qualname__, vars(transform)]
+                                         for transform in self.transforms]
+            # The image is identified with the pattern given by the caller, not with the pattern read from the header of the last image
+            fingerprint = pattern_fingerprint(self.provided_pattern, **options)
+
+            # A stored result leaves no pattern read from the header of another image
+            self.pattern = self.provided_pattern
+            data_bytes = cache.decode(file_path or self.image, fingerprint, extract)
+        else:
+            data_bytes = extract()
+
+        if kwargs.get("raw", False):
+            return data_bytes
+
+        # Last cancellation point, before a file may be written
+        self.progress("process", 0.0)
+        result = self._process_data(data_bytes)
+        self.progress("process", 1.0, check=False)
+
+        return result
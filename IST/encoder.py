@@ -5,13 +5,17 @@ from typing import Union
 
 # Project modules
 from .base import BaseSteganography
-from .exceptions import DataSizeTooLargeError, UnsupportedTypeForParameterError, RequiredParameterMissingError, NoImageLoadedError, \
-    NoPatternLoadedError
+from .core import embed_container, embed_payload, generate_header, prepare_payload, read_container_files, transform_payload
+from .exceptions import UnsupportedTypeForParameterError, NoImageLoadedError, NoPatternLoadedError, InvalidImageArrayError
 from .pattern import Pattern
-from .utils import get_image_pixels, create_image_from_pixels, ranges_overlap
+from .pipeline import BufferPool, Pipeline, Transform, shared_buffer_pool
+from .progress import Progress
+from .slots import MIN_BAND_SLOTS, SlotLayout
+from .utils import check_image_array, get_image_array, get_image_channels, create_image_from_array
 from .log_config import get_logger
 
 # External modules
+import numpy as np
 from PIL import Image
 
 """
@@ -19,13 +23,17 @@ Encoder.py is a module in the IST (Image Steganography Tools) library that provi
 
 Classes and Methods:
 - Encoder: The main class that implements the encoding process.
-    - __init__(self, **kwargs): Initializes the Encoder object with optional keyword arguments.
+    - __init__(self, **kwargs): Initializes the Encoder object with optional keyword arguments (pattern, image, encoding, workers,
+      min_band_slots, progress_callback, cancel_token, transforms, buffer_pool).
     - load_pattern(self, pattern: Pattern): Loads a Pattern object for encoding.
     - unload_processed_image(self): Unloads the processed image from memory.
+    - get_pipeline(self) -> Pipeline: Returns the data transforms pipeline of the loaded pattern, with the custom transforms (see pipeline.py).
     - available_bytes_for_data(self): Returns the number of available bytes for data based on the loaded pattern.
-    - apply_pattern(self, pixels: list[tuple[int, ...], ...], data: bytes): Applies the encoding pattern to the given pixel values and hides the data.
-    - encode_data(self, pixels: list[int | tuple[int, ...], ...], data: Union[bytes, bytearray], channels: str, bit_frequency: int, byte_spacing: int, offset: int = 0): Encodes the data into the given pixel values based on the specified parameters.
-    - process(self, **kwargs): Main method that loads the image and pattern (if not already loaded), hides the data, and saves the processed image. Accepts image and pattern as keyword arguments.
+    - apply_pattern(self, pixels: np.ndarray, data: bytes): Applies the encoding pattern to the given pixel values array and hides the data.
+    - encode_array(self, array: np.ndarray, mode: str, payload=None, pattern=None, out=None, file=None, files=None) -> np.ndarray: Hides
+      the payload directly into a (height, width, bands) values array, in place or into the out array, without any Pillow image.
+    - encode_data(self, pixels: np.ndarray, data: Union[bytes, bytearray], channels: str, bit_frequency: int, byte_spacing: int, offset: int = 0): Encodes the data into the given pixel values array based on the specified parameters.
+    - process(self, **kwargs): Main method that loads the image and pattern (if not already loaded), hides the data, and saves the processed image. Accepts image and pattern as keyword arguments, data, file or files (several files hidden in a multi-file container, see container.py), input_path and output_path as paths or binary streams (written in image_format, by default the format of the cover image), and progress_callback (called with the stage and the fraction done: prepare, hash, compress, redundancy, embed, save) and cancel_token (a CancelToken stopping the process at the next chunk boundary).
 
 Usage:
 To use the Encoder module, create an Encoder object and load an image and pattern. Then, call the process() method to hide the data and save the processed image. For example:
@@ -55,6 +63,18 @@ class Encoder(BaseSteganography):
         self.encoding: str = kwargs.get("encoding", "utf-8")
         self.image: Image = kwargs.get("image", None)
 
+        # Large data is embedded / extracted on several threads, in contiguous bands of at least min_band_slots slots
+        self.workers: int = kwargs.get("workers", os.cpu_count() or 1)
+        self.min_band_slots: int = kwargs.get("min_band_slots", MIN_BAND_SLOTS)
+
+        # Progress reporting and cooperative cancellation at chunk boundaries, see progress.py
+        self.progress: Progress = Progress(kwargs.get("progress_callback", None), kwargs.get("cancel_token", None))
+
+        # Custom transforms inserted into the data pipeline of the pattern, and the buffers reused across the jobs of a thread, see
+        # pipeline.py
+        self.transforms: list[Transform] = list(kwargs.get("transforms", None) or [])
+        self.buffer_pool: Union[BufferPool, None] = kwargs.get("buffer_pool", shared_buffer_pool)
+
         self.processed_image: Image = None
 
     def load_pattern(self, pattern: Pattern):
@@ -71,158 +91,104 @@ class Encoder(BaseSteganography):
     def available_bytes_for_data(self) -> int:
         return self.pattern.calculate_max_data_size((self.image.width, self.image.height), self.image.mode) or 0
 
-    def apply_pattern(self, pixels: list[tuple[int, ...], ...], data: bytes) -> list[tuple[int, ...]]:
-        pattern_data = self.pattern.generate_pattern(self.image.mode)
-
-        channels = pattern_data["channels"]
-        bit_frequency = pattern_data["bit_frequency"]
-        byte_spacing = pattern_data["byte_spacing"]
-        position = pattern_data["position"]
-        hash_check = pattern_data["hash_check"]
-        compression_enabled = pattern_data["compression_enabled"]
-
-        header_enabled = pattern_data["header_enabled"]
-        header_write_data_size = pattern_data["header_write_data_size"]
-        header_write_pattern = pattern_data["header_write_pattern"]
-        header_channels = pattern_data["header_channels"]
-        header_bit_frequency = pattern_data["header_bit_frequency"]
-        header_byte_spacing = pattern_data["header_byte_spacing"]
-
-        # Compute hash if enabled
-        if hash_check:
-            data_hash = self.pattern.compute_hash(data)
-            data += data_hash
-
-        # Compress if enabled
-        if compression_enabled:
-            data = self.pattern.compress_data(data)
-
-        # Add the redundancy
-        data = self.pattern.apply_redundancy(data)
-
-        if not self._validate_data_after_pattern_applied(data):
-            raise DataSizeTooLargeError(len(data), self.available_bytes_for_data())
-
-        header_added_offset = 0
-        # If header is enabled, accordingly generate the header
-        header = None
-        if header_enabled and (header_write_data_size or header_write_pattern):
-            header = self.pattern.generate_header(len(data))
-
-            # If the header is not null, encode it
-            if header:
-                # Compute the header position
-                header_position = 0
-                if pattern_data["header_position"] == "image_start":
-                    header_position = 0
-                elif pattern_data["header_position"] == "before_data":
-                    header_position = position
-
-                # Remember the header_added_offset to add it to the data offset if required
-                pixels, header_added_offset = self.encode_data(pixels, header, header_channels, header_bit_frequency, header_byte_spacing,
-                                                               header_position)
-
-        if header:
-            # If header is set to image_start, and the data is not overlapping with the header, don't add the header offset
-            if pattern_data["header_position"] == "image_start" and not ranges_overlap(0, header_added_offset, position, position):
-                pixels, _ = self.encode_data(pixels, data, channels, bit_frequency, byte_spacing, position)
-            else:
-                # Taking into account the header encoded size
-                pixels, _ = self.encode_data(pixels, data, channels, bit_frequency, byte_spacing, position + header_added_offset)
-        else:
-            # If the header is not enabled just encode the data not taking into account the header
-            pixels, _ = self.encode_data(pixels, data, channels, bit_frequency, byte_spacing, position)
-
-        return pixels
-
-    def encode_data(self, pixels: list[int | tuple[int, ...], ...], data: Union[bytes, bytearray],
-                    channels: str, bit_frequency: int, byte_spacing: int, offset: int = 0) -> (list[int | tuple[int, ...]], int):
-        data_bits = ''.join(format(byte, '08b') for byte in data)
-
-        bit_index = 0
-        channel_counters = {channel: 0 for channel in self.image.mode}
-
-        # If pixels list is not made of tuples but of integers, convert it to tuples
-        if isinstance(pixels[0], int):
-            pixels = [(pixel,) for pixel in pixels]
-
-        last_pixel = 0
-        # print(f"data_bits: {data_bits}")
-        encoded_pixels = pixels[0:max(offset, 0)]
-        for pixel_index, pixel in enumerate(pixels[offset:], start=offset):
-            new_pixel = []
+    def get_pipeline(self) -> Pipeline:
+        """
+        Returns the pipeline of the data transforms of the loaded pattern, with the custom transforms.
+        :return: The pipeline, taking its buffers from the buffer pool
+        """
+        if not self.pattern:
+            raise NoPatternLoadedError()
 
-            for channel_index, value in enumerate(pixel):
-                channel = self.image.mode[channel_index % len(self.image.mode)]
+        return Pipeline.from_pattern(self.pattern, self.transforms, self.buffer_pool)
 
-                if channel in channels and pixel_index >= offset:
-                    if bit_index < len(data_bits):
-                        if channel_counters[channel] % byte_spacing == 0:
-                            # self.logger.debug(f"Modifying pixel {pixel_index}, channel {channel_index} ({channel})")
+    def _apply_data_transforms(self, data: Union[bytes, bytearray], pattern_data: dict, image_size: Union[tuple[int, int], None] = None,
+                               image_mode: Union[str, None] = None, bit_depth: Union[int, None] = None,
+                               hash_reserved: bool = False) -> Union[bytes, bytearray, memoryview]:
+        # Hash, compression, custom transforms and redundancy, the hash being written in place when the payload buffer reserved its room
+        if image_size is None:
+            image_size, image_mode = self.image.size, self.image.mode
 
-                            value_bits = format(value, '08b')
+        return transform_payload(data, self.pattern, image_size, image_mode, bit_depth, self.transforms, self.buffer_pool, self.progress,
+                                 hash_reserved)
 
-                            new_value_bits = value_bits[:-bit_frequency] + data_bits[bit_index:bit_index + bit_frequency]
-                            new_value = int(new_value_bits, 2)
+    def _generate_header(self, data: Union[bytes, bytearray], pattern_data: dict) -> bytes:
+        return generate_header(self.pattern, pattern_data, len(data))
 
-                            bit_index += bit_frequency
-
-                            new_pixel.append(new_value)
-                        else:
-                            new_pixel.append(value)
-                    else:
-                        new_pixel.append(value)
+    def apply_pattern(self, pixels: np.ndarray, data: bytes) -> np.ndarray:
+        self._embed(pixels.reshape(-1), data, self.image.mode, self.image.size)
+        return pixels
 
-                    channel_counters[channel] += 1
-                else:
-                    new_pixel.append(value)
+    def _embed(self, flat: np.ndarray, data: bytes, image_mode: str, image_size: tuple[int, int], hash_reserved: bool = False) -> None:
+        embed_payload(flat, data, image_mode, image_size, self.pattern, self.transforms, self.buffer_pool, self.progress, self.workers,
+                      self.min_band_slots, hash_reserved)
+
+    def _embed_files(self, flat: np.ndarray, files: list[tuple[str, bytes]], image_mode: str, image_size: tuple[int, int]) -> None:
+        embed_container(flat, files, image_mode, image_size, self.pattern, self.transforms, self.encoding, self.progress, self.workers,
+                        self.min_band_slots)
+
+    def encode_array(self, array: np.ndarray, mode: str, payload: Union[str, bytes, bytearray, None] = None,
+                     pattern: Union[Pattern, None] = None, out: Union[np.ndarray, None] = None, file=None, files=None) -> np.ndarray:
+        """
+        Hides the payload directly into an array of image values, without any Pillow image.
+        :param array: The uint8 or uint16 values array, of shape (height, width, bands) or (height, width) for single band modes
+        :param mode: The image mode of the array (e.g. "RGB", "RGBA", "L", "I;16")
+        :param payload: The data to hide (str or bytes), or None when a file is given
+        :param pattern: optional: The pattern to use, the loaded pattern when None
+        :param out: optional: The array receiving the encoded values (same shape and dtype), the array itself is modified when None
+        :param file: optional: The path of a file to hide instead of the payload
+        :param files: optional: The files to hide in a multi-file container instead of the payload: paths, named binary streams or
+            (name, content) tuples
+        :return: The encoded array (array or out)
+        """
+        if pattern is not None:
+            if not isinstance(pattern, Pattern):
+                raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
+            self.load_pattern(pattern)
+        elif not self.pattern:
+            raise NoPatternLoadedError()
+
+        image_size = check_image_array(array, mode)
+        if out is not None:
+            check_image_array(out, mode)
+            if out.shape != array.shape:
+                raise InvalidImageArrayError(out.shape, mode)
+            np.copyto(out, array)
+            array = out
+
+        if files is not None:
+            files = read_container_files(files, self.encoding)
+
+            def embed(flat: np.ndarray) -> None:
+                self._embed_files(flat, files, mode, image_size)
+        else:
+            data = self._prepare_data(payload, file, self.get_pipeline().reserved_size)
 
-            encoded_pixels.append(tuple(new_pixel))
+            def embed(flat: np.ndarray) -> None:
+                self._embed(flat, data, mode, image_size, hash_reserved=True)
 
-            if bit_index >= len(data_bits):
-                last_pixel = pixel_index
-                # print(f"Encoded from pixel {offset} to {last_pixel}")
-                break  # No more bits to encode, stop encoding
+        # A contiguous array is encoded in place through a flat view, other arrays (e.g. slices of a larger frame) are encoded in a
+        # contiguous copy written back once done
+        if array.flags.c_contiguous:
+            embed(array.reshape(-1))
+        else:
+            values = np.ascontiguousarray(array)
+            embed(values.reshape(-1))
+            np.copyto(array, values)
 
-        # Add the rest of the pixels
-        # encoded_pixels += pixels[len(encoded_pixels):]
-        encoded_pixels += pixels[last_pixel + 1:]
+        return array
 
-        # If pixels list is made of tuples of only one integer, flatten it
-        if len(encoded_pixels[0]) == 1:
-            encoded_pixels = [pixel[0] for pixel in encoded_pixels]
+    def encode_data(self, pixels: np.ndarray, data: Union[bytes, bytearray], channels: str, bit_frequency: int, byte_spacing: int,
+                    offset: int = 0) -> (np.ndarray, int):
+        if not isinstance(pixels, np.ndarray):
+            pixels = np.array(pixels, dtype=np.uint8)
 
-        return encoded_pixels, last_pixel - offset
+        layout = SlotLayout(get_image_channels(self.image.mode), self.image.size, channels, bit_frequency, byte_spacing, offset)
+        last_pixel = layout.embed(pixels.reshape(-1), data, self.workers, self.min_band_slots)
 
-    def _prepare_data(self, data, file):
-        if data is not None:
-            if isinstance(data, str):
-                data_type = 0
-                data = data.encode(self.encoding)
-            elif isinstance(data, (bytes, bytearray)):
-                data_type = 2
-            else:
-                raise UnsupportedTypeForParameterError("data", data, (str, bytes, bytearray))
-        elif file is not None:
-            if isinstance(file, str):
-                data_type = 1
-                file_name = os.path.basename(file)
-                file_name = file_name[:64].ljust(64, '\0')
-                with open(file, 'rb') as file_handler:
-                    data = file_handler.read()
-                data = file_name.encode(self.encoding) + data
-            elif isinstance(file, io.BytesIO):
-                data_type = 1
-                file_name = file.name
-                file_name = file_name[:64].ljust(64, '\0')
-                data = file.read()
-                data = file_name.encode(self.encoding) + data
-            else:
-                raise UnsupportedTypeForParameterError("file", file, (str, io.BytesIO))
-        else:
-            raise RequiredParameterMissingError("data or file_path")
+        return pixels, last_pixel
 
-        return bytes([data_type]) + data
+    def _prepare_data(self, data, file, reserved_size: int = 0) -> bytearray:
+        return prepare_payload(data, file, self.encoding, reserved_size)
 
     def process(self, **kwargs) -> None:
         image: Image = kwargs.get("image", None)
@@ -235,10 +201,10 @@ class Encoder(BaseSteganography):
                 else:
                     raise UnsupportedTypeForParameterError("image", image, Image.Image)
             elif input_path:
-                if isinstance(input_path, str):
+                if isinstance(input_path, (str, io.IOBase)):
                     self.image = self._perform_load_image(input_path)
                 else:
-                    raise UnsupportedTypeForParameterError("input_path", input_path, str)
+                    raise UnsupportedTypeForParameterError("input_path", input_path, (str, io.IOBase))
             else:
                 raise NoImageLoadedError()
 
@@ -257,13 +223,31 @@ class Encoder(BaseSteganography):
         else:
             output_path = kwargs.get("output_path", f"ist_encoded.{self.image.format.lower()}")
 
+        if "progress_callback" in kwargs or "cancel_token" in kwargs:
+            self.progress = Progress(kwargs.get("progress_callback", self.progress.callback),
+                                     kwargs.get("cancel_token", self.progress.cancel_token))
+
         data = kwargs.get("data", None)
         file = kwargs.get("file", None)
+        files = kwargs.get("files", None)
 
-        data = self._prepare_data(data, file)
+        self.progress("prepare", 0.0)
+        if files is not None:
+            files = read_container_files(files, self.encoding)
+            pixels = get_image_array(self.image)
+            self._embed_files(pixels.reshape(-1), files, self.image.mode, self.image.size)
+        else:
+            data = self._prepare_data(data, file, self.get_pipeline().reserved_size)
+            pixels = get_image_array(self.image)
+            self._embed(pixels.reshape(-1), data, self.image.mode, self.image.size, hash_reserved=True)
+        encoded_image = create_image_from_array(pixels, self.image.mode, self.image.size)
 
-        pixels = get_image_pixels(self.image)
-        encoded_pixels = self.apply_pattern(pixels, data)
-        encoded_image = create_image_from_pixels(encoded_pixels, self.image.mode, self.image.size)
+        # Last cancellation point, nothing has been written yet
+        self.progress("save", 0.0)
         self.processed_image = encoded_image
-        self._perform_save_image(self.processed_image, output_path)
+        # Binary streams have no extension, they are written in the given format or in the format of the cover image
+        image_format = kwargs.get("image_format", None)
+        if image_format is None and not isinstance(output_path, str):
+            image_format = self.image.format
+        self._perform_save_image(self.processed_image, output_path, image_format)
+        self.progress("save", 1.0, check=False)
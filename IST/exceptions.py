@@ -35,6 +35,12 @@ class RequiredParameterMissingError(ValueError):
         super().__init__(f"Required parameter \"{parameter}\" missing.")
 
 
+class ConflictingParametersError(ValueError):
+    def __init__(self, *parameters: str):
+        parameters_str = ", ".join(f"\"{parameter}\"" for parameter in parameters)
+        super().__init__(f"Parameters {parameters_str} can't be given together.")
+
+
 # Encoding / Decoding exceptions
 class NoImageLoadedError(ValueError):
     def __init__(self):
@@ -46,6 +52,23 @@ class NoPatternLoadedError(ValueError):
         super().__init__("No pattern loaded, use load_pattern() or pass the pattern as a keyword argument.")
 
 
+class InvalidImageArrayError(ValueError):
+    def __init__(self, shape, mode, dtype=None):
+        dtype = "" if dtype is None else f" of type {dtype}"
+
+        super().__init__(
+            f"Invalid image array of shape {tuple(shape)}{dtype} for image mode \"{mode}\", "
+            f"expected an uint8 or uint16 array of shape (height, width, bands) or (height, width) for single band modes."
+        )
+
+
+class ImageValuesOutOfRangeError(ValueError):
+    def __init__(self, mode, extrema):
+        super().__init__(
+            f"Image values of mode \"{mode}\" range from {extrema[0]} to {extrema[1]}, only 16-bit values (0 to 65535) can carry data."
+        )
+
+
 class DataSizeTooLargeError(ValueError):
     def __init__(self, data_size, max_data_size):
         super().__init__(
@@ -64,6 +87,77 @@ class InvalidDataTypeEncounteredDecodingError(ValueError):
         super().__init__("Invalid data type encountered during decoding.")
 
 
+# Cancellation exceptions
+class OperationCancelledError(RuntimeError):
+    def __init__(self, message: str = "Operation cancelled."):
+        super().__init__(message)
+
+
+class DeadlineExceededError(OperationCancelledError):
+    def __init__(self):
+        super().__init__("Operation cancelled, its deadline has been exceeded.")
+
+
+# Sharding exceptions
+class ShardCountMismatchError(ValueError):
+    def __init__(self, images_count, shards_count):
+        super().__init__(f"Sharded encoding needs one cover image per shard ({images_count} images for {shards_count} shards).")
+
+
+class NotEnoughShardsError(ValueError):
+    def __init__(self, shards_count, data_shards_count):
+        super().__init__(
+            f"Not enough valid shards to rebuild the data ({shards_count}/{data_shards_count}). "
+            f"The images may be missing, corrupted or encoded with another pattern."
+        )
+
+
+class InvalidShardHeaderError(ValueError):
+    def __init__(self):
+        super().__init__("Invalid shard header, the image does not contain a shard of a sharded payload.")
+
+
+# Container exceptions
+class InvalidContainerError(ValueError):
+    def __init__(self):
+        super().__init__("Invalid container, the image does not hold a multi-file container or the container is damaged.")
+
+
+class ContainerEntryNotFoundError(ValueError):
+    def __init__(self, name: str):
+        super().__init__(f"No entry named \"{name}\" in the container.")
+
+
+class DuplicateContainerEntryError(ValueError):
+    def __init__(self, name: str):
+        super().__init__(f"Several files named \"{name}\" in the container, the names of the entries must be unique.")
+
+
+class InvalidContainerEntryNameError(ValueError):
+    def __init__(self, name: str):
+        super().__init__(f"Invalid entry name \"{name}\", the names of the entries must be non-empty file names, without any path.")
+
+
+# Watch exceptions
+class WatchDirectoryNotFoundError(ValueError):
+    def __init__(self, directory: str):
+        super().__init__(f"The watched directory \"{directory}\" does not exist.")
+
+
+# Strip exceptions
+class StripProcessingNotSupportedError(ValueError):
+    def __init__(self, reason: str):
+        super().__init__(f"The image can't be processed in strips: {reason}.")
+
+
+# Analysis exceptions
+class ImageSizeMismatchError(ValueError):
+    def __init__(self, cover_shape, stego_shape):
+        super().__init__(
+            f"The cover and stego images do not match, got values of shape {tuple(cover_shape)} and {tuple(stego_shape)}."
+        )
+
+
 # Pattern exceptions
 class InvalidChannelsError(ValueError):
     def __init__(self, channels, image_channels, initial=None):
@@ -74,6 +168,13 @@ class InvalidChannelsError(ValueError):
         )
 
 
+class InvalidBitFrequencyError(ValueError):
+    def __init__(self, bit_frequency, bit_depth):
+        super().__init__(
+            f"Invalid bit frequency {bit_frequency} for {bit_depth}-bit channel values, expected a value between 1 and {bit_depth}."
+        )
+
+
 class InvalidHeaderChannelsError(ValueError):
     def __init__(self, header_channels, image_channels):
         super().__init__(
@@ -88,6 +189,21 @@ class CompressionNotImplementedError(ValueError):
         )
 
 
+class InvalidLayoutError(ValueError):
+    def __init__(self, layout):
+        super().__init__(
+            f"Invalid layout \"{layout}\", expected \"interleaved\" or \"planar\"."
+        )
+
+
+class InvalidMatrixEmbeddingError(ValueError):
+    def __init__(self, matrix_embedding, bit_frequency):
+        super().__init__(
+            f"Invalid matrix embedding {matrix_embedding} with bit frequency {bit_frequency}, expected a value between 0 and 7 "
+            f"(0 to disable it) and a bit frequency of 1."
+        )
+
+
 class InvalidRepetitiveRedundancyModeError(ValueError):
     def __init__(self, repetitive_redundancy_mode):
         super().__init__(
@@ -123,6 +239,34 @@ class ShouldNotComputeHashError(ValueError):
         )
 
 
+class PatternNotEncodableError(ValueError):
+    def __init__(self, parameter, value):
+        super().__init__(
+            f"Pattern parameter \"{parameter}\" with value \"{value}\" cannot be written in the header."
+        )
+
+
+class InvalidHeaderPatternError(ValueError):
+    def __init__(self, version):
+        super().__init__(
+            f"Invalid pattern in the header (version {version}), the image header may be damaged or written by a newer version."
+        )
+
+
+class ScatterSeedRequiredError(ValueError):
+    def __init__(self):
+        super().__init__(
+            "The data of the image is scattered, the scatter seed must be provided with the pattern."
+        )
+
+
+class NoFittingPatternError(ValueError):
+    def __init__(self, payload_size):
+        super().__init__(
+            f"No pattern can hide a payload of {payload_size} bytes in the image within the given constraints."
+        )
+
+
 # Other exceptions
 class NoImageChannelsError(ValueError):
     def __init__(self):
@@ -1,18 +1,25 @@
 # Internal modules
+import copy
+import struct
 import zlib
 import hashlib
+from decimal import Decimal
 from itertools import chain
-from math import ceil
-from typing import Union
+from math import ceil, inf
+from typing import Callable, Union
 
 # Project modules
-from .utils import calculate_byte_distance, rs_decode, rs_encode
+from .progress import PROGRESS_CHUNK_SIZE
+from .slots import LAYOUTS, MAX_MATRIX_EMBEDDING, plan_slot_layouts
+from .utils import calculate_byte_distance, get_image_bit_depth, get_image_channels, rs_decode, rs_encode, rs_encoded_size
 from .log_config import get_logger, logging
 from .exceptions import CompressionNotImplementedError, InvalidHeaderChannelsError, AdvancedRedundancyNotImplementedError, \
     InvalidRepetitiveRedundancyModeError, InvalidAdvancedRedundancyModeError, ShouldNotComputeHashError, InvalidHashAlgorithmError, \
-    NoImageChannelsError, InvalidChannelsError
+    NoImageChannelsError, InvalidChannelsError, InvalidBitFrequencyError, PatternNotEncodableError, InvalidHeaderPatternError, \
+    ScatterSeedRequiredError, NoFittingPatternError, InvalidLayoutError, InvalidMatrixEmbeddingError
 
 # External modules
+import numpy as np
 
 """
 Pattern.py is a module in the IST (Image Steganography Tools) library that provides functionality for generating, interpreting, and applying patterns for encoding and decoding hidden data in images. It supports various redundancy and compression methods to enhance data integrity and reduce the size of the hidden data. The module contains a Pattern class that implements the pattern generation, redundancy, compression, and hashing processes.
@@ -21,13 +28,24 @@ Classes and Methods:
 - Pattern: The main class that implements the pattern generation, redundancy, compression, and hashing processes.
     - __init__(self, **kwargs): Initializes the Pattern object with optional keyword arguments.
     - generate_pattern(self, image_channels: str) -> dict: Generates a pattern dictionary from the Pattern object's attributes.
-    - generate_header(self, data_len: int) -> bytes: Generates the header based on the pattern's attributes.
-    - compress_data(self, data: bytes, parameters_source: str = "data") -> bytes: Compresses data using the pattern's compression pattern.
-    - decompress_data(self, data: bytes, parameters_source: str = "data") -> bytes: Decompresses data using the pattern's compression pattern.
-    - apply_redundancy(self, data: bytes, parameters_source: str = "data") -> bytes: Applies redundancy to data using the pattern's redundancy pattern.
-    - reconstruct_redundancy(self, data: bytes, parameters_source: str = "data") -> bytes: Reconstructs data using the pattern's redundancy pattern, if any and if applicable.
-    - compute_hash(self, data: Union[bytearray, bytes]) -> bytes: Computes the hash of a bytearray.
-    - calculate_max_data_size(self, image_size: tuple[int, int], image_mode: str) -> int: Calculates the maximum size of the data that can be stored in an image with current pattern settings.
+    - generate_header(self, data_len: int, container: bool = False) -> bytes: Generates the header based on the pattern's attributes.
+    - compress_data(self, data: bytes, parameters_source: str = "data", checkpoint=None) -> bytes: Compresses data using the pattern's compression pattern.
+    - decompress_data(self, data: bytes, parameters_source: str = "data", checkpoint=None) -> bytes: Decompresses data using the pattern's compression pattern.
+    - apply_redundancy(self, data: bytes, parameters_source: str = "data", checkpoint=None) -> bytes: Applies redundancy to data using the pattern's redundancy pattern.
+    - reconstruct_redundancy(self, data: bytes, parameters_source: str = "data", checkpoint=None) -> bytes: Reconstructs data using the pattern's redundancy pattern, if any and if applicable.
+    - majority_vote(data: bytes, repetitive_redundancy: int, checkpoint=None) -> bytearray: Reconstructs byte per byte repeated data by majority vote, voting only on the groups that are not unanimous.
+    - get_hash_size(self) -> int: Returns the size of the hash appended to the data, 0 when the hash check is disabled.
+    - compute_hash(self, data: Union[bytearray, bytes], checkpoint=None) -> bytes: Computes the hash of a bytearray.
+    - embedding_efficiency(self) -> float: Returns the expected number of data bits written per changed channel value.
+    - calculate_max_data_size(self, image_size: tuple[int, int], image_mode: str, bit_depth: Union[int, None] = None) -> int: Calculates the maximum size of the data that can be stored in an image with current pattern settings.
+    - static_redundant_size(data_size, repetitive_redundancy, repetitive_redundancy_mode, advanced_redundancy, advanced_redundancy_correction_factor) -> int: Returns the size of data once the redundancy applied.
+    - get_header_size(self) -> int: Returns the size of the header written in the image, redundancy included.
+    - get_encoded_data_size(self, data_size: int) -> int: Returns the size of data once transformed by the encoder (hash, compression and redundancy).
+    - fits(self, payload_size: int, image_size: tuple[int, int], image_mode: str, file: bool = False) -> bool: Checks whether a payload can be encoded into an image, without encoding it.
+    - max_payload_size(self, image_size: tuple[int, int], image_mode: str, file: bool = False) -> int: Returns the exact capacity of an image, the largest payload fits() accepts.
+    - auto_tune(cls, payload_size: int, image_size: tuple[int, int], image_mode: str, constraints=None, base=None) -> Pattern: Finds the pattern hiding a payload with the least distortion, or with the most redundancy within a distortion budget.
+    - to_bytes(self) -> bytes: Encodes the data parameters of the pattern into the compact binary form written in the header (header_write_pattern).
+    - from_bytes(cls, data: bytes, base=None) -> Pattern: Decodes a pattern from its compact binary form, the header parameters and the scatter seed being taken from the base pattern.
 
 Usage:
 To use the Pattern module, create a Pattern object and configure its attributes. Then, use the methods provided by the Pattern class to generate patterns, headers, apply redundancy, and compress/decompress data. For example:
@@ -52,6 +70,35 @@ To use the Pattern module, create a Pattern object and configure its attributes.
 This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
 """
 
+# Flags of the header, after the data size: the pattern follows them, the data is a multi-file container
+HEADER_FLAG_PATTERN = 0x01
+HEADER_FLAG_CONTAINER = 0x02
+
+# Compact binary form of the data parameters, written in the header when header_write_pattern is set: version, flags, channels mask,
+# bit frequency, byte spacing, offset, repetitive redundancy, compression and hash ids, advanced redundancy id, and the correction factor as
+# a decimal mantissa and exponent. Its size is fixed, so that the header size is known before reading it.
+PATTERN_BYTES = struct.Struct(">BBHBHIBBBHb")
+PATTERN_BYTES_VERSION = 1
+
+PATTERN_FLAG_ALL_CHANNELS = 0x01
+PATTERN_FLAG_BLOCK_REPETITION = 0x02
+PATTERN_FLAG_SCATTERED = 0x04  # The scatter seed itself is never written
+PATTERN_FLAG_PLANAR = 0x08
+PATTERN_MATRIX_EMBEDDING_SHIFT = 4  # The matrix embedding k takes the 3 upper bits of the flags
+
+PATTERN_CHANNELS = "RGBALPCMYKHSVIFX"
+PATTERN_COMPRESSIONS = ("none", "zlib")
+PATTERN_HASHES = ("none", "sha256", "sha3_256", "blake2s", "sha512_256")
+PATTERN_ADVANCED_REDUNDANCIES = {"none": 0, "no": 0, "reed_solomon": 1, "rs": 1, "hamming": 2, "ham": 2}
+
+# Bytes added by the encoder before the data: the data type, and the file name of files
+PAYLOAD_DATA_TYPE_SIZE = 1
+PAYLOAD_FILE_NAME_SIZE = 64
+
+# Reed-Solomon correction factors tried by auto_tune() when maximizing the redundancy, and the maximum repetitive redundancy tried
+AUTO_TUNE_CORRECTION_FACTORS = (0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5)
+AUTO_TUNE_MAX_REPETITIVE_REDUNDANCY = 9
+
 
 class Pattern:
     @classmethod
@@ -65,6 +112,15 @@ class Pattern:
 
         self.bit_frequency: int = kwargs.get("bit_frequency", 1)
         self.byte_spacing: int = kwargs.get("byte_spacing", 1)
+        # Order of the slots: "interleaved" visits the channels of each pixel in turn, "planar" fills the plane of each channel (e.g. all
+        # the B values, then all the G values) in turn.
+        self.layout: str = kwargs.get("layout", "interleaved")  # Options: "interleaved", "planar"
+        # Matrix embedding (Hamming syndrome coding): k bits are written into each group of 2^k - 1 slots of 1 bit, changing at most one of
+        # them, so fewer values are changed for the same data, at the cost of capacity. 0 (or 1) disables it, up to 7, with a bit frequency of 1.
+        self.matrix_embedding: int = kwargs.get("matrix_embedding", 0)
+        # Secret seed of the keyed slot scattering. When None, the data is written in consecutive slots from the offset, otherwise it is
+        # spread over all the slots after the offset following a pseudo-random permutation derived from the seed.
+        self.scatter_seed: Union[int, str, bytes, None] = kwargs.get("scatter_seed", None)
         self.hash_check: Union[str, bool, None] = kwargs.get("hash_check", "sha256")  # Default: "sha256", supports any hashes from hashlib.
 
         # Data compression
@@ -121,20 +177,19 @@ class Pattern:
         if not image_channels:
             raise NoImageChannelsError()
 
-        self.channels = self.channels.lower()
-        if self.channels is None or self.channels == "all" or self.channels == "":
-            channels = image_channels
-        elif self.channels == "auto":
+        # The fields are only read, so that a pattern can be shared by concurrent encodings and decodings
+        requested_channels = (self.channels or "").lower()
+        if requested_channels in ("", "all", "auto"):
             channels = image_channels
         else:
-            channels = self.channels.upper()
+            channels = requested_channels.upper()
 
         if not all([channel in image_channels for channel in channels]):
             raise InvalidChannelsError(channels, image_channels, initial=self.channels)
 
         # Decide which channels the header should be written in.
-        self.header_channels = self.header_channels.lower()
-        if self.header_channels == "auto":
+        requested_header_channels = (self.header_channels or "").lower()
+        if requested_header_channels == "auto":
             if self.header_enabled and self.header_write_data_size and (self.header_write_pattern or self.header_position == "image_start"):
                 if "A" in image_channels:
                     header_channels = "A"
@@ -144,14 +199,22 @@ class Pattern:
                     header_channels = image_channels[0]
             else:
                 header_channels = image_channels
-        elif self.header_channels is None or self.header_channels == "all" or self.header_channels == "":
+        elif requested_header_channels in ("", "all"):
             header_channels = image_channels
         else:
-            header_channels = self.header_channels.upper()
+            header_channels = requested_header_channels.upper()
 
         if not all([channel in image_channels for channel in header_channels]):
             raise InvalidHeaderChannelsError(header_channels, image_channels)
 
+        layout = (self.layout or "interleaved").lower()
+        if layout not in LAYOUTS:
+            raise InvalidLayoutError(self.layout)
+
+        matrix_embedding = self.matrix_embedding or 0
+        if not 0 <= matrix_embedding <= MAX_MATRIX_EMBEDDING or (matrix_embedding > 1 and self.bit_frequency != 1):
+            raise InvalidMatrixEmbeddingError(self.matrix_embedding, self.bit_frequency)
+
         # Decide where the header should be written.
         header_position = self.header_position.lower().strip()
         if header_position == "auto":
@@ -167,6 +230,9 @@ class Pattern:
             "channels": channels,
             "bit_frequency": self.bit_frequency,
             "byte_spacing": self.byte_spacing,
+            "layout": layout,
+            "matrix_embedding": matrix_embedding if matrix_embedding > 1 else 0,
+            "scatter_seed": self.scatter_seed,
             "hash_check": self.hash_check,
             "compression_enabled": self.compression and self.compression != "none",
             "compression": self.compression,
@@ -187,10 +253,11 @@ class Pattern:
             "header_advanced_redundancy_correction_factor": self.header_advanced_redundancy_correction_factor,
         }
 
-    def generate_header(self, data_len: int) -> bytes:
+    def generate_header(self, data_len: int, container: bool = False) -> bytes:
         """
         Generates the header.
         :param data_len: The length of the data.
+        :param container: optional: Whether the data is a multi-file container (see container.py).
         :return: The header.
         """
         header = b""
@@ -200,22 +267,23 @@ class Pattern:
         if self.header_write_data_size:
             header += data_len.to_bytes(4, "big")
 
+        flags = HEADER_FLAG_CONTAINER if container else 0
         if self.header_write_pattern:
-            # TODO: Allow writing pattern in header (and maybe separate offset).
-            header += b"\x01"
+            header += bytes((flags | HEADER_FLAG_PATTERN,)) + self.to_bytes()
         else:
-            header += b"\x00"
+            header += bytes((flags,))
 
         # Apply redundancy
         header = self.apply_redundancy(header, "header")
 
         return header
 
-    def compress_data(self, data: bytes, parameters_source: str = "data") -> bytes:
+    def compress_data(self, data: bytes, parameters_source: str = "data", checkpoint: Union[Callable[[float], None], None] = None) -> bytes:
         """
         Compresses data using the pattern's compression pattern.
         :param data: The data to compress.
         :param parameters_source: The source of the compression parameters. Can be "data" or "header".
+        :param checkpoint: optional: called before each compressed chunk with the fraction of the data compressed.
         :return: The compressed data.
         """
         if parameters_source == "header":
@@ -224,38 +292,46 @@ class Pattern:
             compression = self.compression
             compression_strength = self.compression_strength
 
-        return self.static_compress_data(data, compression, compression_strength)
+        return self.static_compress_data(data, compression, compression_strength, checkpoint)
 
     @staticmethod
-    def static_compress_data(data: bytes, compression: str, compression_strength: int) -> bytes:
+    def static_compress_data(data: bytes, compression: str, compression_strength: int,
+                             checkpoint: Union[Callable[[float], None], None] = None) -> bytes:
         logger = Pattern.get_logger()
 
         if compression and compression != "none":
             old_size = len(data)
 
             if compression == "zlib":
-                new_data = zlib.compress(data, compression_strength)
+                # Compressing chunk by chunk gives the same stream as zlib.compress(), written after the compression flag
+                compressor = zlib.compressobj(compression_strength)
+                new_data = bytearray(b'1')
+                with memoryview(data) as view:
+                    for start in range(0, old_size, PROGRESS_CHUNK_SIZE):
+                        if checkpoint is not None:
+                            checkpoint(start / old_size)
+                        new_data += compressor.compress(view[start:start + PROGRESS_CHUNK_SIZE])
+                new_data += compressor.flush()
             else:
                 raise CompressionNotImplementedError(compression)
 
-            compression_flag = b'0'
-            new_size = len(new_data)
+            new_size = len(new_data) - 1
             if new_size < old_size:
                 logger.debug(f"Compression reduced data size, using compressed data ({new_size}/{old_size} bytes).")
                 data = new_data
-                compression_flag = b'1'
             else:
                 logger.info(f"Compression did not reduce data size, skipping compression ({new_size}/{old_size} bytes).")
-
-            data = compression_flag + data
+                data = b'0' + data
 
         return data
 
-    def decompress_data(self, data: bytes, parameters_source: str = "data") -> bytes:
+    def decompress_data(self, data: bytes, parameters_source: str = "data",
+                        checkpoint: Union[Callable[[float], None], None] = None) -> bytes:
         """
         Decompresses data using the pattern's compression pattern.
         :param data: The data to decompress.
         :param parameters_source: The source of the compression parameters. Can be "data" or "header".
+        :param checkpoint: optional: called before decompressing with the fraction of the data decompressed.
         :return: The decompressed data.
         """
         if parameters_source == "header":
@@ -263,26 +339,33 @@ class Pattern:
         else:  # "data"
             compression = self.compression
 
+        if checkpoint is not None:
+            checkpoint(0.0)
+
         return self.static_decompress_data(data, compression)
 
     @staticmethod
     def static_decompress_data(data: bytes, compression: str) -> bytes:
         if compression and compression != "none":
             if compression == "zlib":
-                compression_flag, data_bytes = data[0], data[1:]
+                # The compression flag tells whether the data following it was compressed, or stored as is
+                compression_flag, data_bytes = data[:1], data[1:]
 
                 if compression_flag == b'1':
-                    return zlib.decompress(data)
+                    return zlib.decompress(data_bytes)
+                return data_bytes
             else:
                 raise CompressionNotImplementedError(compression)
 
         return data
 
-    def apply_redundancy(self, data: bytes, parameters_source: str = "data") -> bytes:
+    def apply_redundancy(self, data: bytes, parameters_source: str = "data",
+                         checkpoint: Union[Callable[[float], None], None] = None) -> bytes:
         """
         Applies redundancy to data using the pattern's redundancy pattern.
         :param data: The data to apply redundancy to.
         :param parameters_source: The source of the redundancy parameters. Can be "data" or "header".
+        :param checkpoint: optional: called before each Reed-Solomon chunk with the fraction of the data processed.
         :return: The data with redundancy applied.
         """
         if parameters_source == "header":
@@ -297,15 +380,16 @@ class Pattern:
             advanced_redundancy_correction_factor = self.advanced_redundancy_correction_factor
 
         return self.static_apply_redundancy(data, repetitive_redundancy, repetitive_redundancy_mode, advanced_redundancy,
-                                            advanced_redundancy_correction_factor)
+                                            advanced_redundancy_correction_factor, checkpoint)
 
     @staticmethod
     def static_apply_redundancy(data: bytes, repetitive_redundancy: int, repetitive_redundancy_mode: str, advanced_redundancy: str,
-                                advanced_redundancy_correction_factor: float) -> bytes:
+                                advanced_redundancy_correction_factor: float,
+                                checkpoint: Union[Callable[[float], None], None] = None) -> bytes:
         # Advanced redundancy
         match advanced_redundancy.lower():
             case "reed_solomon" | "rs":
-                data = rs_encode(data, advanced_redundancy_correction_factor)
+                data = rs_encode(data, advanced_redundancy_correction_factor, checkpoint)
             case "hamming" | "ham":
                 raise AdvancedRedundancyNotImplementedError("Hamming code")
             case "none" | "no" | None:
@@ -317,21 +401,22 @@ class Pattern:
         if repetitive_redundancy > 1:
             match repetitive_redundancy_mode.lower():
                 case "byte_per_byte":
-                    data = [byte for byte in data for _ in range(repetitive_redundancy)]
+                    data = np.repeat(np.frombuffer(data, dtype=np.uint8), repetitive_redundancy).tobytes()
                 case "block":
-                    data = data * repetitive_redundancy
+                    data = bytes(data) * repetitive_redundancy
                 case _:
                     raise InvalidRepetitiveRedundancyModeError(repetitive_redundancy_mode)
 
-            data = bytes(data)
-
         return data
 
-    def reconstruct_redundancy(self, data: bytes, parameters_source: str = "data") -> bytes:
+    def reconstruct_redundancy(self, data: bytes, parameters_source: str = "data",
+                               checkpoint: Union[Callable[[float], None], None] = None) -> bytes:
         """
         Reconstructs data using the pattern's redundancy pattern, if any and if applicable.
         :param data: The data to reconstruct.
         :param parameters_source: The source of the redundancy parameters. Can be "data" or "header".
+        :param checkpoint: optional: called regularly during the majority vote and before each Reed-Solomon chunk with the fraction of the
+        data processed.
         :return: The reconstructed data.
         """
         if parameters_source == "header":
@@ -346,11 +431,18 @@ class Pattern:
             advanced_redundancy_correction_factor = self.advanced_redundancy_correction_factor
 
         return self.static_reconstruct_redundancy(data, repetitive_redundancy, repetitive_redundancy_mode, advanced_redundancy,
-                                                  advanced_redundancy_correction_factor)
+                                                  advanced_redundancy_correction_factor, checkpoint)
 
     @staticmethod
     def static_reconstruct_redundancy(data: bytes, repetitive_redundancy: int, repetitive_redundancy_mode: str, advanced_redundancy: str,
-                                      advanced_redundancy_correction_factor: float) -> bytes:
+                                      advanced_redundancy_correction_factor: float,
+                                      checkpoint: Union[Callable[[float], None], None] = None) -> bytes:
+        # When both redundancies are applied, the vote is the first half of the progress and Reed-Solomon the second half
+        vote_checkpoint = rs_checkpoint = checkpoint
+        if checkpoint is not None and repetitive_redundancy > 1 and advanced_redundancy.lower() in ("reed_solomon", "rs"):
+            vote_checkpoint = lambda fraction: checkpoint(fraction / 2)  # noqa: E731
+            rs_checkpoint = lambda fraction: checkpoint(0.5 + fraction / 2)  # noqa: E731
+
         # Simple repetitive redundancy
         if repetitive_redundancy > 1:
             # Reconstruct data using a majority vote method if there is an odd number of repetitions or if the vote is inconclusive due to an
@@ -360,41 +452,21 @@ class Pattern:
                 case "byte_per_byte":
                     pass
                 case "block":
-                    # Using zip trick for fast alignment of bytes
                     chunk_size = len(data) // repetitive_redundancy
-                    data = bytes(chain.from_iterable(zip(*[data[i:i + chunk_size] for i in range(0, len(data), chunk_size)])))
+                    if chunk_size * repetitive_redundancy == len(data):
+                        data = np.frombuffer(data, dtype=np.uint8).reshape(repetitive_redundancy, chunk_size).T.tobytes()
+                    else:
+                        # Using zip trick for fast alignment of bytes
+                        data = bytes(chain.from_iterable(zip(*[data[i:i + chunk_size] for i in range(0, len(data), chunk_size)])))
                 case _:
                     raise InvalidRepetitiveRedundancyModeError(repetitive_redundancy_mode)
 
-            # Reconstructing data
-            reconstructed_data = bytearray()
-            for i in range(0, len(data), repetitive_redundancy):
-                group = data[i:i + repetitive_redundancy]
-                byte_counts = {byte: group.count(byte) for byte in set(group)}
-
-                if len(byte_counts) == 1:
-                    majority_byte = list(byte_counts.keys())[0]
-                else:
-                    max_count = max(byte_counts.values())
-                    candidates = [byte for byte, count in byte_counts.items() if count == max_count]
-
-                    if len(candidates) == 1:
-                        majority_byte = candidates[0]
-                    else:
-                        # Tie: Use neighbor checking mechanism
-                        neighbors = Pattern.get_redundancy_neighbors(len(reconstructed_data), reconstructed_data,
-                                                                     data, repetitive_redundancy)
-                        neighbor_similarity = {byte: calculate_byte_distance(byte, neighbors) for byte in candidates}
-                        majority_byte = min(neighbor_similarity, key=neighbor_similarity.get)
-
-                reconstructed_data.append(majority_byte)
-
-            data = reconstructed_data
+            data = Pattern.majority_vote(data, repetitive_redundancy, vote_checkpoint)
 
         # Advanced redundancy
         match advanced_redundancy.lower():
             case "reed_solomon" | "rs":
-                return rs_decode(data, advanced_redundancy_correction_factor)
+                return rs_decode(data, advanced_redundancy_correction_factor, rs_checkpoint)
             case "hamming" | "ham":
                 raise AdvancedRedundancyNotImplementedError("Hamming code")
             case "none" | "no" | None:
@@ -402,6 +474,54 @@ class Pattern:
             case _:
                 raise InvalidAdvancedRedundancyModeError(advanced_redundancy)
 
+    @staticmethod
+    def majority_vote(data: bytes, repetitive_redundancy: int, checkpoint: Union[Callable[[float], None], None] = None) -> bytearray:
+        """
+        Reconstructs byte per byte repeated data by majority vote. The unanimous groups, all of them in a clean image, are checked at once,
+        only the others are voted on.
+        :param data: The repeated data
+        :param repetitive_redundancy: The number of repetitions of each byte
+        :param checkpoint: optional: called regularly during the vote with the fraction of the data processed
+        :return: The reconstructed data
+        """
+        values = np.frombuffer(data, dtype=np.uint8)
+        groups_count = len(values) // repetitive_redundancy
+        groups = values[:groups_count * repetitive_redundancy].reshape(groups_count, repetitive_redundancy)
+
+        reconstructed_data = bytearray(groups[:, 0].tobytes())
+        contested = np.flatnonzero((groups != groups[:, :1]).any(axis=1)).tolist()
+
+        # A last incomplete group is always voted on
+        if groups_count * repetitive_redundancy < len(values):
+            reconstructed_data.append(0)
+            contested.append(groups_count)
+
+        if checkpoint is not None:
+            checkpoint(0.0)
+
+        # In order, the tie breaking looking at the previous reconstructed byte
+        for position, index in enumerate(contested):
+            if checkpoint is not None and position % PROGRESS_CHUNK_SIZE == PROGRESS_CHUNK_SIZE - 1:
+                checkpoint(index / len(reconstructed_data))
+
+            group = data[index * repetitive_redundancy:(index + 1) * repetitive_redundancy]
+            byte_counts = {byte: group.count(byte) for byte in set(group)}
+
+            max_count = max(byte_counts.values())
+            candidates = [byte for byte, count in byte_counts.items() if count == max_count]
+
+            if len(candidates) == 1:
+                majority_byte = candidates[0]
+            else:
+                # Tie: Use neighbor checking mechanism
+                neighbors = Pattern.get_redundancy_neighbors(index, reconstructed_data, data, repetitive_redundancy)
+                neighbor_similarity = {byte: calculate_byte_distance(byte, neighbors) for byte in candidates}
+                majority_byte = min(neighbor_similarity, key=neighbor_similarity.get)
+
+            reconstructed_data[index] = majority_byte
+
+        return reconstructed_data
+
     @staticmethod
     def get_redundancy_neighbors(index: int, reconstructed_data: bytearray, input_data: bytes,
                                  repetitive_redundancy: int) -> list[int]:
@@ -420,14 +540,9 @@ class Pattern:
 
         return neighbors
 
-    def compute_hash(self, data: Union[bytearray, bytes]) -> bytes:
-        """
-        Compute the hash of a bytearray.
-        :param data: Bytearray to hash
-        :return: The hash of the bytearray
-        """
+    def _get_hash_algorithm(self) -> Union[str, None]:
         if not self.hash_check:
-            raise ShouldNotComputeHashError()
+            return None
 
         if isinstance(self.hash_check, bool) and self.hash_check:
             hash_algorithm = 'sha256'
@@ -435,34 +550,88 @@ class Pattern:
             hash_algorithm = self.hash_check.lower()
 
         if hash_algorithm == "none":
-            raise ShouldNotComputeHashError()
+            return None
 
         if hash_algorithm not in hashlib.algorithms_available:
             raise InvalidHashAlgorithmError(hash_algorithm)
 
-        return hashlib.new(hash_algorithm, data).digest()
+        return hash_algorithm
+
+    def get_hash_size(self) -> int:
+        """
+        Returns the size of the hash appended to the data.
+        :return: The size of the digest in bytes, 0 when the hash check is disabled
+        """
+        hash_algorithm = self._get_hash_algorithm()
+        return hashlib.new(hash_algorithm).digest_size if hash_algorithm is not None else 0
 
-    def calculate_max_data_size(self, image_size: tuple[int, int], image_mode: str) -> int:
+    def compute_hash(self, data: Union[bytearray, bytes], checkpoint: Union[Callable[[float], None], None] = None) -> bytes:
+        """
+        Compute the hash of a bytearray.
+        :param data: Bytearray to hash
+        :param checkpoint: optional: called before each hashed chunk with the fraction of the data hashed
+        :return: The hash of the bytearray
+        """
+        hash_algorithm = self._get_hash_algorithm()
+        if hash_algorithm is None:
+            raise ShouldNotComputeHashError()
+
+        if checkpoint is None:
+            return hashlib.new(hash_algorithm, data).digest()
+
+        data_hash = hashlib.new(hash_algorithm)
+        view = memoryview(data)
+        for start in range(0, len(view), PROGRESS_CHUNK_SIZE):
+            checkpoint(start / len(view))
+            data_hash.update(view[start:start + PROGRESS_CHUNK_SIZE])
+
+        return data_hash.digest()
+
+    def embedding_efficiency(self) -> float:
+        """
+        Returns the expected number of data bits written per changed channel value, with random data. A slot of b bits keeps its value with
+        a probability of 2^-b, and a group of matrix embedding keeps all its values with a probability of 2^-k.
+        :return: The embedding efficiency, 2 bits per change with plain LSB replacement
+        """
+        matrix_embedding = self.matrix_embedding if self.matrix_embedding and self.matrix_embedding > 1 else 0
+        bits = matrix_embedding or self.bit_frequency
+
+        return bits / (1 - 2 ** -bits)
+
+    def calculate_max_data_size(self, image_size: tuple[int, int], image_mode: str, bit_depth: Union[int, None] = None) -> int:
         """
         Calculates the maximum size of the data that can be stored in an image with current pattern settings.
         :param image_size: The size of the image (width, height).
-        :param image_mode: The Pillow image mode string (e.g., "RGB", "RGBA", "L", etc.).
+        :param image_mode: The Pillow image mode string (e.g., "RGB", "RGBA", "L", "I;16", etc.).
+        :param bit_depth: optional: The number of bits of the channel values (8 or 16), deduced from the image mode when None.
         :return: The maximum size of the data.
         """
-        generated_pattern = self.generate_pattern(image_mode)
+        image_channels = get_image_channels(image_mode)
+        generated_pattern = self.generate_pattern(image_channels)
         pixels = image_size[0] * image_size[1]
 
+        # High bit-depth channel values carry up to 16 bits each
+        bit_depth = bit_depth or get_image_bit_depth(image_mode)
+        if not 1 <= self.bit_frequency <= bit_depth:
+            raise InvalidBitFrequencyError(self.bit_frequency, bit_depth)
+
         # Filter the pattern channels based on the image mode
-        available_channels = "".join([channel for channel in generated_pattern["channels"] if channel in image_mode])
+        available_channels = "".join([channel for channel in generated_pattern["channels"] if channel in image_channels])
 
-        # Calculate the number of bits per pixel
-        bits_per_pixel = len(available_channels) * self.bit_frequency
+        matrix_embedding = generated_pattern["matrix_embedding"]
+        if matrix_embedding:
+            # Each group of 2^k - 1 slots carries k bits
+            slots = (pixels * len(available_channels)) // self.byte_spacing
+            raw_data_bytes = (slots // ((1 << matrix_embedding) - 1) * matrix_embedding) // 8
+        else:
+            # Calculate the number of bits per pixel
+            bits_per_pixel = len(available_channels) * self.bit_frequency
 
-        # Calculate the number of bits per byte
-        bits_per_byte = 8 * self.byte_spacing
+            # Calculate the number of bits per byte
+            bits_per_byte = 8 * self.byte_spacing
 
-        # Calculate the number of bytes that can be stored in the image
-        raw_data_bytes = (pixels * bits_per_pixel) // bits_per_byte
+            # Calculate the number of bytes that can be stored in the image
+            raw_data_bytes = (pixels * bits_per_pixel) // bits_per_byte
 
         # Calculate the redundancy overhead
         if self.advanced_redundancy.lower() == "reed_solomon":
@@ -483,6 +652,339 @@ class Pattern:
 
         return max_data_size
 
+    @staticmethod
+    def static_redundant_size(data_size: int, repetitive_redundancy: int, repetitive_redundancy_mode: str, advanced_redundancy: str,
+                              advanced_redundancy_correction_factor: float) -> int:
+        """
+        Returns the size of data once static_apply_redundancy() applied, without applying it.
+        :return: The size of the redundant data
+        """
+        match advanced_redundancy.lower():
+            case "reed_solomon" | "rs":
+                data_size = rs_encoded_size(data_size, advanced_redundancy_correction_factor)
+            case "hamming" | "ham":
+                raise AdvancedRedundancyNotImplementedError("Hamming code")
+            case "none" | "no" | None:
+                pass
+            case _:
+                raise InvalidAdvancedRedundancyModeError(advanced_redundancy)
+
+        if repetitive_redundancy > 1:
+            if repetitive_redundancy_mode.lower() not in ["byte_per_byte", "block"]:
+                raise InvalidRepetitiveRedundancyModeError(repetitive_redundancy_mode)
+            data_size *= repetitive_redundancy
+
+        return data_size
+
+    def get_header_size(self) -> int:
+        """
+        Returns the size of the header written in the image, redundancy included.
+        :return: The size of the header, 0 when there is no header
+        """
+        if not self.header_enabled or not (self.header_write_data_size or self.header_write_pattern):
+            return 0
+
+        header_size = (4 if self.header_write_data_size else 0) + 1 + (PATTERN_BYTES.size if self.header_write_pattern else 0)
+
+        return self.static_redundant_size(header_size, self.header_repetitive_redundancy, "byte_per_byte", self.header_advanced_redundancy,
+                                          self.header_advanced_redundancy_correction_factor)
+
+    def get_encoded_data_size(self, data_size: int) -> int:
+        """
+        Returns the size of data once transformed by the encoder (hash, compression and redundancy), without transforming it. With
+        compression enabled, the data is assumed incompressible (stored as is), the size being an upper bound.
+        :param data_size: The size of the payload prepared by the encoder (data type and file name included)
+        :return: The size of the data written in the image
+        """
+        data_size += self.get_hash_size()
+        if self.compression and self.compression != "none":
+            data_size += 1
+
+        return self.static_redundant_size(data_size, self.repetitive_redundancy, self.repetitive_redundancy_mode, self.advanced_redundancy,
+                                          self.advanced_redundancy_correction_factor)
+
+    def _fits_encoded_size(self, encoded_size: int, header_size: int, image_size: tuple[int, int], image_mode: str,
+                           bit_depth: int) -> bool:
+        # The checks of the encoder: the maximum data size of the pattern, and the slots of the header and data layouts
+        if encoded_size > self.calculate_max_data_size(image_size, image_mode, bit_depth):
+            return False
+
+        image_channels = get_image_channels(image_mode)
+        header_layout, data_layout = plan_slot_layouts(self.generate_pattern(image_channels), image_channels, image_size, header_size)
+
+        if header_layout is not None and header_layout.slots_for_bytes(header_size) > header_layout.capacity:
+            return False
+
+        return data_layout.slots_for_bytes(encoded_size) <= data_layout.capacity
+
+    def fits(self, payload_size: int, image_size: tuple[int, int], image_mode: str, file: bool = False) -> bool:
+        """
+        Checks whether a payload can be encoded into an image with the pattern, computing the exact sizes without encoding anything.
+        :param payload_size: The size of the data to hide (encoded string, bytes or file content)
+        :param image_size: The size of the image (width, height)
+        :param image_mode: The Pillow image mode string
+        :param file: optional: Whether the payload is a file, whose name is stored along with it
+        :return: Whether the encoder would not raise DataSizeTooLargeError (with compression enabled, for incompressible data)
+        """
+        data_size = payload_size + PAYLOAD_DATA_TYPE_SIZE + (PAYLOAD_FILE_NAME_SIZE if file else 0)
+
+        return self._fits_encoded_size(self.get_encoded_data_size(data_size), self.get_header_size(), image_size, image_mode,
+                                       get_image_bit_depth(image_mode))
+
+    def max_payload_size(self, image_size: tuple[int, int], image_mode: str, file: bool = False) -> int:
+        """
+        Returns the exact capacity of an image with the pattern, the largest payload fits() accepts, computed from the image size and mode
+        only.
+        :param image_size: The size of the image (width, height)
+        :param image_mode: The Pillow image mode string
+        :param file: optional: Whether the payload is a file, whose name is stored along with it
+        :return: The size of the largest payload (encoded string, bytes or file content), 0 when even an empty payload does not fit
+        """
+        bit_depth = get_image_bit_depth(image_mode)
+        image_channels = get_image_channels(image_mode)
+        header_size = self.get_header_size()
+        header_layout, data_layout = plan_slot_layouts(self.generate_pattern(image_channels), image_channels, image_size, header_size)
+
+        if header_layout is not None and header_layout.slots_for_bytes(header_size) > header_layout.capacity:
+            return 0
+
+        # The same bounds as _fits_encoded_size(), the data layout holding at most capacity_bytes() bytes
+        max_encoded_size = min(self.calculate_max_data_size(image_size, image_mode, bit_depth), data_layout.capacity_bytes())
+        overhead = PAYLOAD_DATA_TYPE_SIZE + (PAYLOAD_FILE_NAME_SIZE if file else 0)
+        if self.get_encoded_data_size(overhead) > max_encoded_size:
+            return 0
+
+        # The encoded size only grows with the payload size, the largest fitting payload is found by bisection
+        low, high = 0, max_encoded_size
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.get_encoded_data_size(middle + overhead) <= max_encoded_size:
+                low = middle
+            else:
+                high = middle - 1
+
+        return low
+
+    @classmethod
+    def auto_tune(cls, payload_size: int, image_size: tuple[int, int], image_mode: str, constraints: Union[dict, None] = None,
+                  base: Union["Pattern", None] = None) -> "Pattern":
+        """
+        Finds the pattern hiding a payload in an image with the least distortion, or with the most redundancy within a distortion budget.
+        Every candidate is checked with the exact sizes of the encoder, without encoding anything.
+
+        The tuned parameters are the channels, bit_frequency, byte_spacing, and, when maximizing the redundancy, the repetitive redundancy
+        and the Reed-Solomon correction factor. For a given redundancy, the lowest bit frequency that fits gives the least distortion, and
+        the byte spacing is then widened as much as possible, spreading the changes over the whole image. The distortion is the expected
+        squared error of the values written with random data, (4 ** bit_frequency - 1) / 6 per value.
+
+        :param payload_size: The size of the data to hide (encoded string, bytes or file content)
+        :param image_size: The size of the image (width, height)
+        :param image_mode: The Pillow image mode string
+        :param constraints: optional: A dict of constraints:
+            - objective: "min_changes" (default) to keep the redundancy of the base pattern and change as few bits as possible, or
+              "max_redundancy" to add as much redundancy as fits
+            - min_psnr: The minimum expected PSNR in dB, the distortion budget (default: None)
+            - channels: The channels tried, in order of preference (default: the channels without alpha, then all the channels)
+            - max_bit_frequency: The maximum bit frequency (default: the bit depth of the image)
+            - max_byte_spacing: The maximum byte spacing (default: None)
+            - max_repetitive_redundancy: The maximum repetitive redundancy tried (default: AUTO_TUNE_MAX_REPETITIVE_REDUNDANCY)
+            - correction_factors: The Reed-Solomon correction factors tried (default: AUTO_TUNE_CORRECTION_FACTORS)
+            - file: Whether the payload is a file (default: False)
+        :param base: optional: The pattern providing the other parameters (header, hash, offset, scatter seed) and the minimum redundancy,
+        the default one when None. The tuned pattern is never compressed, the payload size being known only before compression.
+        :return: A new Pattern object
+        """
+        constraints = constraints or {}
+        base = copy.copy(base) if base is not None else cls()
+        base.compression = "none"
+
+        image_channels = get_image_channels(image_mode)
+        bit_depth = get_image_bit_depth(image_mode)
+        pixels = image_size[0] * image_size[1]
+
+        data_size = payload_size + PAYLOAD_DATA_TYPE_SIZE + (PAYLOAD_FILE_NAME_SIZE if constraints.get("file", False) else 0)
+        header_size = base.get_header_size()
+
+        channels_candidates = constraints.get("channels", None)
+        if not channels_candidates:
+            color_channels = image_channels.replace("A", "")
+            channels_candidates = [color_channels, image_channels] if color_channels and color_channels != image_channels else [image_channels]
+
+        # Matrix embedding writes a single bit per slot
+        matrix_embedding = base.matrix_embedding if base.matrix_embedding and base.matrix_embedding > 1 else 0
+        max_bit_frequency = min(constraints.get("max_bit_frequency", bit_depth), bit_depth) if not matrix_embedding else 1
+        max_byte_spacing = constraints.get("max_byte_spacing", None) or pixels
+        min_psnr = constraints.get("min_psnr", None)
+
+        # The expected squared error of the header, written with the same data whatever the pattern
+        header_error = ceil(header_size * 8 / base.header_bit_frequency) * (4 ** base.header_bit_frequency - 1) / 6
+        max_error = inf if min_psnr is None else ((1 << bit_depth) - 1) ** 2 * pixels * len(image_channels) / 10 ** (min_psnr / 10)
+
+        # The redundancies tried, the most redundant first when maximizing the redundancy
+        min_correction_factor = base.advanced_redundancy_correction_factor if base.advanced_redundancy.lower() in ["reed_solomon", "rs"] else 0
+        redundancies = [(base.repetitive_redundancy, min_correction_factor)]
+
+        if constraints.get("objective", "min_changes") == "max_redundancy":
+            factors = {min_correction_factor} | {factor for factor in constraints.get("correction_factors", AUTO_TUNE_CORRECTION_FACTORS)
+                                                 if factor > min_correction_factor}
+            repetitions = range(max(base.repetitive_redundancy, 1),
+                                constraints.get("max_repetitive_redundancy", AUTO_TUNE_MAX_REPETITIVE_REDUNDANCY) + 1, 2)
+            redundancies = sorted(((repetition, factor) for repetition in repetitions for factor in factors), reverse=True,
+                                  key=lambda redundancy: (redundancy[0] * rs_encoded_size(data_size, redundancy[1] or 0), redundancy))
+
+        pattern = copy.copy(base)
+        for repetitive_redundancy, correction_factor in redundancies:
+            pattern.repetitive_redundancy = repetitive_redundancy
+            pattern.advanced_redundancy = "reed_solomon" if correction_factor else "none"
+            pattern.advanced_redundancy_correction_factor = correction_factor or base.advanced_redundancy_correction_factor
+            encoded_size = pattern.get_encoded_data_size(data_size)
+
+            # The least distorting layout: the lowest bit frequency fitting with any of the channels
+            best = None
+            for channels in channels_candidates:
+                for bit_frequency in range(1, max_bit_frequency + 1):
+                    error = ceil(encoded_size * 8 / bit_frequency) * (4 ** bit_frequency - 1) / 6 + header_error
+                    if matrix_embedding:
+                        # A group changes one of its values by 1, unless its syndrome already matches (a probability of 2^-k)
+                        error = ceil(encoded_size * 8 / matrix_embedding) * (1 - 2 ** -matrix_embedding) + header_error
+                    if error > max_error or (best is not None and error >= best[0]):
+                        break
+
+                    pattern.channels, pattern.bit_frequency, pattern.byte_spacing = channels, bit_frequency, 1
+                    if pattern._fits_encoded_size(encoded_size, header_size, image_size, image_mode, bit_depth):
+                        best = (error, channels, bit_frequency)
+                        break
+
+            if best is None:
+                continue
+
+            # The widest byte spacing still fitting
+            _, pattern.channels, pattern.bit_frequency = best
+            low, high = 1, max_byte_spacing
+            while low < high:
+                pattern.byte_spacing = (low + high + 1) // 2
+                if pattern._fits_encoded_size(encoded_size, header_size, image_size, image_mode, bit_depth):
+                    low = pattern.byte_spacing
+                else:
+                    high = pattern.byte_spacing - 1
+
+            # The channels and header channels may have been normalized while checking the candidates
+            pattern.channels, pattern.byte_spacing, pattern.header_channels = best[1], low, base.header_channels
+
+            return pattern
+
+        raise NoFittingPatternError(payload_size)
+
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the data parameters of the pattern into its compact binary form, written in the header when header_write_pattern is set. The
+        header parameters are not part of it, as they are needed to read the header, nor is the scatter seed (only whether the data is
+        scattered).
+        :return: The PATTERN_BYTES.size bytes of the pattern
+        """
+        flags = 0
+        channels_mask = 0
+
+        channels = (self.channels or "all").lower()
+        if channels in ("all", "auto"):
+            flags |= PATTERN_FLAG_ALL_CHANNELS
+        else:
+            for channel in channels.upper():
+                if channel not in PATTERN_CHANNELS:
+                    raise PatternNotEncodableError("channels", self.channels)
+                channels_mask |= 1 << PATTERN_CHANNELS.index(channel)
+
+        if self.repetitive_redundancy_mode.lower() == "block":
+            flags |= PATTERN_FLAG_BLOCK_REPETITION
+        if self.scatter_seed is not None:
+            flags |= PATTERN_FLAG_SCATTERED
+        if (self.layout or "interleaved").lower() == "planar":
+            flags |= PATTERN_FLAG_PLANAR
+        if self.matrix_embedding and self.matrix_embedding > 1:
+            if self.matrix_embedding > MAX_MATRIX_EMBEDDING:
+                raise PatternNotEncodableError("matrix_embedding", self.matrix_embedding)
+            flags |= self.matrix_embedding << PATTERN_MATRIX_EMBEDDING_SHIFT
+
+        compression = (self.compression or "none").lower()
+        if compression not in PATTERN_COMPRESSIONS:
+            raise PatternNotEncodableError("compression_pattern", self.compression)
+
+        hash_algorithm = self._get_hash_algorithm() or "none"
+        if hash_algorithm not in PATTERN_HASHES:
+            raise PatternNotEncodableError("hash_check", self.hash_check)
+
+        advanced_redundancy = PATTERN_ADVANCED_REDUNDANCIES.get((self.advanced_redundancy or "none").lower(), None)
+        if advanced_redundancy is None:
+            raise PatternNotEncodableError("advanced_redundancy", self.advanced_redundancy)
+
+        # The correction factor must be restored exactly, as it drives the Reed-Solomon chunks layout
+        mantissa, exponent = 0, 0
+        if advanced_redundancy:
+            _, digits, exponent = Decimal(repr(float(self.advanced_redundancy_correction_factor))).normalize().as_tuple()
+            mantissa = int("".join(map(str, digits)))
+            if mantissa > 0xFFFF or not -128 <= exponent <= 127:
+                raise PatternNotEncodableError("advanced_redundancy_correction_factor", self.advanced_redundancy_correction_factor)
+
+        for parameter, value, maximum in [("bit_frequency", self.bit_frequency, 0xFF), ("byte_spacing", self.byte_spacing, 0xFFFF),
+                                          ("offset", self.offset, 0xFFFFFFFF), ("repetitive_redundancy", self.repetitive_redundancy, 0xFF)]:
+            if not 0 <= value <= maximum:
+                raise PatternNotEncodableError(parameter, value)
+
+        algorithms = PATTERN_COMPRESSIONS.index(compression) << 4 | PATTERN_HASHES.index(hash_algorithm)
+
+        return PATTERN_BYTES.pack(PATTERN_BYTES_VERSION, flags, channels_mask, self.bit_frequency, self.byte_spacing, self.offset,
+                                  self.repetitive_redundancy, algorithms, advanced_redundancy, mantissa, exponent)
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray], base: Union["Pattern", None] = None) -> "Pattern":
+        """
+        Decodes a pattern from its compact binary form.
+        :param data: The binary form, as returned by to_bytes()
+        :param base: optional: The pattern providing the header parameters and the scatter seed, the default ones when None
+        :return: A new Pattern object
+        """
+        if len(data) < PATTERN_BYTES.size:
+            raise InvalidHeaderPatternError(None)
+
+        version, flags, channels_mask, bit_frequency, byte_spacing, offset, repetitive_redundancy, compression_and_hash, \
+            advanced_redundancy, mantissa, exponent = PATTERN_BYTES.unpack_from(data)
+
+        compression, hash_algorithm = compression_and_hash >> 4, compression_and_hash & 0x0F
+        if version != PATTERN_BYTES_VERSION or not bit_frequency or not byte_spacing or not repetitive_redundancy \
+                or compression >= len(PATTERN_COMPRESSIONS) or hash_algorithm >= len(PATTERN_HASHES) or advanced_redundancy > 2 \
+                or not (channels_mask or flags & PATTERN_FLAG_ALL_CHANNELS) \
+                or (flags >> PATTERN_MATRIX_EMBEDDING_SHIFT > 1 and bit_frequency != 1):
+            raise InvalidHeaderPatternError(version)
+
+        pattern = copy.copy(base) if base is not None else cls()
+
+        if flags & PATTERN_FLAG_ALL_CHANNELS:
+            pattern.channels = "all"
+        else:
+            pattern.channels = "".join(channel for index, channel in enumerate(PATTERN_CHANNELS) if channels_mask >> index & 1)
+
+        if flags & PATTERN_FLAG_SCATTERED:
+            if pattern.scatter_seed is None:
+                raise ScatterSeedRequiredError()
+        else:
+            pattern.scatter_seed = None
+
+        pattern.bit_frequency = bit_frequency
+        pattern.byte_spacing = byte_spacing
+        pattern.offset = offset
+        pattern.repetitive_redundancy = repetitive_redundancy
+        pattern.repetitive_redundancy_mode = "block" if flags & PATTERN_FLAG_BLOCK_REPETITION else "byte_per_byte"
+        pattern.layout = "planar" if flags & PATTERN_FLAG_PLANAR else "interleaved"
+        pattern.matrix_embedding = flags >> PATTERN_MATRIX_EMBEDDING_SHIFT
+        pattern.compression = PATTERN_COMPRESSIONS[compression]
+        pattern.hash_check = PATTERN_HASHES[hash_algorithm] if hash_algorithm else False
+        pattern.advanced_redundancy = ("none", "reed_solomon", "hamming")[advanced_redundancy]
+        if advanced_redundancy:
+            pattern.advanced_redundancy_correction_factor = float(f"{mantissa}e{exponent}")
+        pattern.header_write_pattern = True
+
+        return pattern
+
     @classmethod
     def from_dict(cls, pattern_dict: dict):
         # Extracting header if nested
@@ -0,0 +1,344 @@
+# Internal modules
+import hashlib
+import threading
+import zlib
+from typing import Callable, Iterable, Union
+
+# Project modules
+from .exceptions import DataIntegrityCheckFailedError, UnsupportedTypeForParameterError
+from .pattern import Pattern
+from .progress import PROGRESS_CHUNK_SIZE, Progress
+from .utils import rs_encode, rs_encoded_size
+
+# External modules
+import numpy as np
+
+"""
+Pipeline.py is a module in the IST (Image Steganography Tools) library that models the transforms applied to a payload before it is embedded
+(hash, compression and redundancy) as a pipeline of pluggable stages. Each transform encodes and decodes a buffer, and computes the size of
+its output from the size of its input, so that the size written in the image is planned from the stage chain without transforming anything.
+Custom stages (e.g. encryption, interleaving) are inserted into the pipeline of a pattern without modifying the encoder or the decoder.
+
+The stages pass buffers (bytes, bytearray or memoryview) to each other. The outputs whose size is known beforehand are written into buffers
+taken from a BufferPool, which keeps one buffer per stage and per thread, so that the jobs run by the same worker thread reuse the buffers
+of the previous ones instead of allocating new ones. The pooled buffers being overwritten by the next job of the thread, a pipeline with a
+pool only returns a valid result until its thread encodes again: the encoder embeds it right away.
+
+Classes and Methods:
+- BufferPool: A pool of reusable buffers, one per key and per thread.
+    - __init__(self, max_buffer_size: int = MAX_POOLED_BUFFER_SIZE): Initializes the pool, larger buffers being allocated for each job.
+    - get(self, key: str, size: int) -> memoryview: Returns a writable buffer of the given size.
+- shared_buffer_pool: The BufferPool used by the encoders by default.
+- Transform: The base class of the pipeline stages.
+    - encode(self, data, checkpoint=None, pool=None, reserved=False): Returns the transformed data.
+    - decode(self, data, checkpoint=None): Returns the data the transform was applied to.
+    - encoded_size(self, size: int) -> int: Returns the size of the transformed data (an upper bound for the compression).
+- HashTransform(algorithm): Appends the digest of the data, and checks it when decoding.
+- CompressionTransform(compression, compression_strength): Compresses the data when it gets smaller, after a compression flag.
+- RedundancyTransform(repetitive_redundancy, repetitive_redundancy_mode, advanced_redundancy, advanced_redundancy_correction_factor): Applies
+  the Reed-Solomon and repetitive redundancies, and reconstructs the data when decoding.
+- Pipeline: A chain of transforms.
+    - __init__(self, transforms: Iterable[Transform], pool: Union[BufferPool, None] = None): Initializes the pipeline, without buffer reuse
+      when no pool is given.
+    - from_pattern(cls, pattern: Pattern, transforms: Iterable[Transform] = (), pool=None) -> Pipeline: Builds the pipeline of a pattern,
+      the custom transforms being inserted after the compression and before the redundancy.
+    - reserved_size: The room the payload buffer may reserve at its end for the first transform (the digest of the hash check).
+    - encoded_size(self, size: int) -> int: Returns the size of the data once encoded by the pipeline.
+    - encode(self, data, progress: Union[Progress, None] = None, reserved: bool = False): Applies the transforms in order.
+    - decode(self, data, progress: Union[Progress, None] = None): Reverts the transforms in reverse order.
+
+Usage:
+    from IST import Encoder, Decoder, Pattern
+    from IST.pipeline import Transform
+
+    class XorTransform(Transform):
+        encode_stage = decode_stage = "xor"
+
+        def __init__(self, key: int):
+            self.key = key
+
+        def encode(self, data, checkpoint=None, pool=None, reserved=False):
+            return bytes(byte ^ self.key for byte in data)
+
+        def decode(self, data, checkpoint=None):
+            return bytes(byte ^ self.key for byte in data)
+
+    Encoder(transforms=[XorTransform(0x5A)]).process(input_path="path/to/image.png", output_path="path/to/processed_image.png",
+                                                      data="Secret message", pattern=Pattern())
+    data = Decoder(transforms=[XorTransform(0x5A)]).process(file_path="path/to/processed_image.png", pattern=Pattern())
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+# Buffers larger than this size (in bytes) are not kept by the pools, so that a single large job does not hold its memory afterwards
+MAX_POOLED_BUFFER_SIZE = 64 << 20
+
+
+class BufferPool:
+    def __init__(self, max_buffer_size: int = MAX_POOLED_BUFFER_SIZE):
+        self.max_buffer_size = max_buffer_size
+
+        # Number of buffers allocated by the pool, the reused ones not being counted
+        self.allocations = 0
+
+        self._local = threading.local()
+
+    def get(self, key: str, size: int) -> memoryview:
+        """
+        Returns a writable buffer of the given size, reusing the buffer of the same key taken before by the calling thread when it is large
+        enough. The content of the buffer is undefined.
+        :param key: The key of the buffer, one per stage output
+        :param size: The size of the buffer
+        :return: A memoryview of the buffer
+        """
+        if size > self.max_buffer_size:
+            self.allocations += 1
+            return memoryview(bytearray(size))
+
+        buffers = self._local.__dict__.setdefault("buffers", {})
+
+        buffer = buffers.get(key, None)
+        if buffer is None or len(buffer) < size:
+            # The previous buffer may still be referenced by a result, it is replaced rather than resized
+            buffer = buffers[key] = bytearray(size)
+            self.allocations += 1
+
+        return memoryview(buffer)[:size]
+
+
+# The pool of the encoders, so that the jobs of a worker thread reuse the buffers whichever encoder runs them
+shared_buffer_pool = BufferPool()
+
+
+def _allocate(pool: Union[BufferPool, None], key: str, size: int) -> Union[bytearray, memoryview]:
+    return pool.get(key, size) if pool is not None else bytearray(size)
+
+
+class Transform:
+    # Names of the progress stages reported while encoding and decoding
+    encode_stage: str = "transform"
+    decode_stage: str = "transform"
+
+    # Room the transform writes to at the end of the payload buffer when it is the first of the pipeline and the buffer reserved it
+    reserved_size: int = 0
+
+    def encode(self, data: Union[bytes, bytearray, memoryview], checkpoint: Union[Callable[[float], None], None] = None,
+               pool: Union[BufferPool, None] = None, reserved: bool = False) -> Union[bytes, bytearray, memoryview]:
+        """
+        Transforms the data.
+        :param data: The data to transform
+        :param checkpoint: optional: called with the fraction of the data transformed
+        :param pool: optional: The pool the output buffers may be taken from
+        :param reserved: Whether the last reserved_size bytes of data are room for the transform, and not data
+        :return: The transformed data
+        """
+        raise NotImplementedError()
+
+    def decode(self, data: Union[bytes, bytearray, memoryview],
+               checkpoint: Union[Callable[[float], None], None] = None) -> Union[bytes, bytearray, memoryview]:
+        """
+        Reverts the transform.
+        :param data: The transformed data
+        :param checkpoint: optional: called with the fraction of the data processed
+        :return: The data the transform was applied to
+        """
+        raise NotImplementedError()
+
+    def encoded_size(self, size: int) -> int:
+        """
+        Returns the size of the transformed data, without transforming anything.
+        :param size: The size of the data to transform
+        :return: The size of the transformed data, or its upper bound when it depends on the data
+        """
+        return size
+
+
+class HashTransform(Transform):
+    encode_stage = decode_stage = "hash"
+
+    def __init__(self, algorithm: str):
+        self.algorithm = algorithm
+        self.reserved_size = hashlib.new(algorithm).digest_size
+
+    def _digest(self, data: Union[bytes, bytearray, memoryview], checkpoint: Union[Callable[[float], None], None] = None) -> bytes:
+        data_hash = hashlib.new(self.algorithm)
+        with memoryview(data) as view:
+            for start in range(0, len(view), PROGRESS_CHUNK_SIZE):
+                if checkpoint is not None:
+                    checkpoint(start / len(view))
+                data_hash.update(view[start:start + PROGRESS_CHUNK_SIZE])
+
+        return data_hash.digest()
+
+    def encode(self, data, checkpoint=None, pool=None, reserved=False):
+        if reserved:
+            # The digest is written in place, into the room reserved by the payload buffer
+            data_size = len(data) - self.reserved_size
+            with memoryview(data) as view:
+                view[data_size:] = self._digest(view[:data_size], checkpoint)
+            return data
+
+        output = _allocate(pool, "hash", len(data) + self.reserved_size)
+        output[:len(data)] = data
+        output[len(data):] = self._digest(data, checkpoint)
+        return output
+
+    def decode(self, data, checkpoint=None):
+        data_size = len(data) - self.reserved_size
+        if data_size < 0:
+            raise DataIntegrityCheckFailedError()
+
+        with memoryview(data) as view:
+            if self._digest(view[:data_size], checkpoint) != view[data_size:]:
+                raise DataIntegrityCheckFailedError()
+
+        return data[:data_size]
+
+    def encoded_size(self, size):
+        return size + self.reserved_size
+
+
+class CompressionTransform(Transform):
+    encode_stage = "compress"
+    decode_stage = "decompress"
+
+    def __init__(self, compression: str, compression_strength: int = 6):
+        self.compression = compression
+        self.compression_strength = compression_strength
+
+    def encode(self, data, checkpoint=None, pool=None, reserved=False):
+        return Pattern.static_compress_data(data, self.compression, self.compression_strength, checkpoint)
+
+    def decode(self, data, checkpoint=None):
+        if checkpoint is not None:
+            checkpoint(0.0)
+
+        try:
+            return Pattern.static_decompress_data(data, self.compression)
+        except zlib.error:
+            # Corrupted compressed data, which the hash check coming after the decompression can't report
+            raise DataIntegrityCheckFailedError()
+
+    def encoded_size(self, size):
+        # Incompressible data is stored as is, after the compression flag
+        return size + 1
+
+
+class RedundancyTransform(Transform):
+    encode_stage = decode_stage = "redundancy"
+
+    def __init__(self, repetitive_redundancy: int = 1, repetitive_redundancy_mode: str = "byte_per_byte", advanced_redundancy: str = "none",
+                 advanced_redundancy_correction_factor: float = 0.1):
+        self.repetitive_redundancy = repetitive_redundancy
+        self.repetitive_redundancy_mode = repetitive_redundancy_mode
+        self.advanced_redundancy = advanced_redundancy
+        self.advanced_redundancy_correction_factor = advanced_redundancy_correction_factor
+
+    def encode(self, data, checkpoint=None, pool=None, reserved=False):
+        # Validates the modes, and raises the errors of the redundancy not implemented
+        self.encoded_size(len(data))
+
+        if self.advanced_redundancy.lower() in ("reed_solomon", "rs") and len(data):
+            out = _allocate(pool, "redundancy.reed_solomon", rs_encoded_size(len(data), self.advanced_redundancy_correction_factor))
+            data = rs_encode(data, self.advanced_redundancy_correction_factor, checkpoint, out)
+
+        if self.repetitive_redundancy > 1:
+            size = len(data)
+            out = _allocate(pool, "redundancy.repetitive", size * self.repetitive_redundancy)
+
+            if self.repetitive_redundancy_mode.lower() == "byte_per_byte":
+                repeated = np.frombuffer(out, dtype=np.uint8).reshape(size, self.repetitive_redundancy)
+                repeated[:] = np.frombuffer(data, dtype=np.uint8)[:, None]
+            else:  # "block"
+                for start in range(0, len(out), size or 1):
+                    out[start:start + size] = data
+
+            data = out
+
+        return data
+
+    def decode(self, data, checkpoint=None):
+        return Pattern.static_reconstruct_redundancy(data, self.repetitive_redundancy, self.repetitive_redundancy_mode,
+                                                     self.advanced_redundancy, self.advanced_redundancy_correction_factor, checkpoint)
+
+    def encoded_size(self, size):
+        return Pattern.static_redundant_size(size, self.repetitive_redundancy, self.repetitive_redundancy_mode, self.advanced_redundancy,
+                                             self.advanced_redundancy_correction_factor)
+
+
+class Pipeline:
+    def __init__(self, transforms: Iterable[Transform], pool: Union[BufferPool, None] = None):
+        self.transforms: list[Transform] = list(transforms)
+        for transform in self.transforms:
+            if not isinstance(transform, Transform):
+                raise UnsupportedTypeForParameterError("transforms", transform, Transform)
+
+        self.pool = pool
+
+    @classmethod
+    def from_pattern(cls, pattern: Pattern, transforms: Iterable[Transform] = (), pool: Union[BufferPool, None] = None) -> "Pipeline":
+        """
+        Builds the pipeline of the data transforms of a pattern: hash check, compression, custom transforms, then redundancy, so that the
+        custom transforms are applied to the compressed data and protected by the redundancy.
+        :param pattern: The pattern
+        :param transforms: optional: The custom transforms
+        :param pool: optional: The pool of reusable buffers
+        :return: The pipeline
+        """
+        stages = []
+
+        hash_algorithm = pattern._get_hash_algorithm()
+        if hash_algorithm is not None:
+            stages.append(HashTransform(hash_algorithm))
+
+        if pattern.compression and pattern.compression != "none":
+            stages.append(CompressionTransform(pattern.compression, pattern.compression_strength))
+
+        stages += transforms
+        stages.append(RedundancyTransform(pattern.repetitive_redundancy, pattern.repetitive_redundancy_mode, pattern.advanced_redundancy,
+                                          pattern.advanced_redundancy_correction_factor))
+
+        return cls(stages, pool)
+
+    @property
+    def reserved_size(self) -> int:
+        return self.transforms[0].reserved_size if self.transforms else 0
+
+    def encoded_size(self, size: int) -> int:
+        """
+        Returns the size of data once encoded by the pipeline, from the sizes of its stages, without encoding anything.
+        :param size: The size of the payload
+        :return: The size of the encoded data, an upper bound when a stage depends on the data (compression)
+        """
+        for transform in self.transforms:
+            size = transform.encoded_size(size)
+
+        return size
+
+    def encode(self, data: Union[bytes, bytearray, memoryview], progress: Union[Progress, None] = None,
+               reserved: bool = False) -> Union[bytes, bytearray, memoryview]:
+        """
+        Applies the transforms in order.
+        :param data: The payload
+        :param progress: optional: The progress reporting the stage of each transform
+        :param reserved: Whether the payload buffer ends with reserved_size bytes of room for the first transform
+        :return: The encoded data, a pooled buffer valid until the thread encodes again when the pipeline has a pool
+        """
+        for position, transform in enumerate(self.transforms):
+            checkpoint = progress.stage(transform.encode_stage) if progress is not None else None
+            data = transform.encode(data, checkpoint, self.pool, reserved and position == 0)
+
+        return data
+
+    def decode(self, data: Union[bytes, bytearray, memoryview], progress: Union[Progress, None] = None) -> Union[bytes, bytearray, memoryview]:
+        """
+        Reverts the transforms in reverse order.
+        :param data: The encoded data
+        :param progress: optional: The progress reporting the stage of each transform
+        :return: The payload
+        """
+        for transform in reversed(self.transforms):
+            checkpoint = progress.stage(transform.decode_stage) if progress is not None else None
+            data = transform.decode(data, checkpoint)
+
+        return data
@@ -0,0 +1,197 @@
+# Internal modules
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Union
+
+# Project modules
+from .log_config import get_logger
+
+"""
+Profiling.py is a module in the IST (Image Steganography Tools) library that profiles a single encoding or decoding run, without modifying
+the code. The profiler is a context manager, and the progress callback of the run, so that it records:
+- a cProfile dump of the calling thread, readable with pstats, snakeviz or gprof2dot (.prof),
+- the stacks of every thread (the embedding and extraction threads included) sampled at a fixed interval, in the folded format read by
+  flamegraph.pl, inferno and speedscope (.folded),
+- a summary of the wall-clock time of each pipeline stage, and of the peak memory of the run (.json).
+
+The measurements slow the run down (tracing the memory allocations the most), the stage times being comparable between profiled runs only.
+
+Classes and Methods:
+- Profiler: Profiles the code run within its context.
+    - __init__(self, output_path: Union[str, None] = None, sample_interval: float = DEFAULT_SAMPLE_INTERVAL, trace_memory: bool = True,
+      callback: Union[Callable[[str, float], None], None] = None): Initializes the profiler, the reports being written to files prefixed
+      with output_path when given. The progress reports are forwarded to callback.
+    - __call__(self, stage: str, fraction: float): The progress callback, timing the stages.
+    - start(self) / stop(self): Starts and stops the measurements, called by the context manager.
+    - summary(self) -> dict: Returns the wall-clock time, the time of each stage and the peak memory of the run.
+    - folded_stacks(self) -> list[str]: Returns the sampled stacks in the folded format.
+    - write(self, output_path: str) -> list[str]: Writes the .prof, .folded and .json reports, and returns their paths.
+
+Usage:
+    from IST import Encoder, Pattern
+    from IST.profiling import Profiler
+
+    with Profiler("path/to/encode_profile") as profiler:
+        Encoder().process(input_path="path/to/image.png", data="Secret message", pattern=Pattern(), progress_callback=profiler)
+
+    print(profiler.summary()["stages"])
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+logger = get_logger("profiling")
+
+# Seconds between two samples of the thread stacks
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+def _peak_rss() -> Union[int, None]:
+    # The peak resident set size of the process, in bytes, when the platform reports it
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Profiler:
+    def __init__(self, output_path: Union[str, None] = None, sample_interval: float = DEFAULT_SAMPLE_INTERVAL, trace_memory: bool = True,
+                 callback: Union[Callable[[str, float], None], None] = None):
+        self.output_path = output_path
+        self.sample_interval = sample_interval
+        self.trace_memory = trace_memory
+        self.callback = callback
+
+        self.profile = cProfile.Profile()
+        self.stacks: Counter = Counter()
+        self.stages: dict[str, float] = {}
+
+        self._stage: Union[str, None] = None
+        self._stage_start = 0.0
+        self._start = self._stop_time = 0.0
+        self._peak_traced_memory: Union[int, None] = None
+        self._started_tracing = False
+        self._sampling = threading.Event()
+        self._sampler: Union[threading.Thread, None] = None
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+        # A failed run is profiled as well, the reports showing where it stopped
+        if self.output_path:
+            for path in self.write(self.output_path):
+                logger.info(f"Profile written to {path}")
+
+    def __call__(self, stage: str, fraction: float) -> None:
+        now = time.perf_counter()
+        if stage != self._stage:
+            self._end_stage(now)
+            self._stage, self._stage_start = stage, now
+
+        if self.callback is not None:
+            self.callback(stage, fraction)
+
+    def _end_stage(self, now: float) -> None:
+        # A stage reported again later (e.g. the hash of the header, then of the data) accumulates its times
+        if self._stage is not None:
+            self.stages[self._stage] = self.stages.get(self._stage, 0.0) + now - self._stage_start
+
+    def _sample(self) -> None:
+        sampler_id = threading.get_ident()
+
+        while not self._sampling.wait(self.sample_interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        if self.trace_memory:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+        self._sampling.clear()
+        self._sampler = threading.Thread(target=self._sample, name="ist-profiler", daemon=True)
+        self._sampler.start()
+
+        self._start = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+        self._stop_time = time.perf_counter()
+        self._end_stage(self._stop_time)
+        self._stage = None
+
+        self._sampling.set()
+        self._sampler.join()
+
+        if self.trace_memory:
+            self._peak_traced_memory = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+
+    def summary(self) -> dict:
+        """
+        Returns the summary of the run.
+        :return: A dict with the wall-clock time in seconds (wall_time), the time of each stage in the order they were reached (stages), the
+        time spent outside the reported stages (unstaged_time), the peak of the traced allocations in bytes (peak_traced_memory, None
+        without memory tracing), the peak RSS of the process in bytes (peak_rss, None when unknown) and the number of samples (samples)
+        """
+        wall_time = self._stop_time - self._start
+
+        return {
+            "wall_time": wall_time,
+            "stages": dict(self.stages),
+            "unstaged_time": max(0.0, wall_time - sum(self.stages.values())),
+            "peak_traced_memory": self._peak_traced_memory,
+            "peak_rss": _peak_rss(),
+            "samples": sum(self.stacks.values()),
+        }
+
+    def folded_stacks(self) -> list[str]:
+        """
+        Returns the sampled stacks in the folded format, the root frame (the thread name) first, followed by the number of samples.
+        :return: The lines of the folded stacks
+        """
+        return [f"{stack} {count}" for stack, count in sorted(self.stacks.items())]
+
+    def write(self, output_path: str) -> list[str]:
+        """
+        Writes the cProfile dump (.prof), the folded stacks (.folded) and the summary (.json).
+        :param output_path: The path of the reports, without extension
+        :return: The paths of the reports
+        """
+        paths = [f"{output_path}.prof", f"{output_path}.folded", f"{output_path}.json"]
+
+        self.profile.dump_stats(paths[0])
+        with open(paths[1], "w") as folded_file:
+            folded_file.write("\n".join(self.folded_stacks()) + "\n")
+        with open(paths[2], "w") as summary_file:
+            json.dump(self.summary(), summary_file, indent=4)
+
+        return paths
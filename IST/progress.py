@@ -0,0 +1,120 @@
+# Internal modules
+import threading
+import time
+from typing import Callable, Union
+
+# Project modules
+from .exceptions import DeadlineExceededError, OperationCancelledError
+
+"""
+Progress.py is a module in the IST (Image Steganography Tools) library that provides the progress and cancellation protocol of the encoding
+and decoding pipelines. The pipelines call a checkpoint at every chunk boundary (payload preparation, hash and compression chunks,
+Reed-Solomon chunks, embedding and extraction blocks, save) with the current stage and the fraction of the stage done. The checkpoint
+reports the progress to an optional callback, and stops the pipeline cleanly by raising an exception once its cancel token is cancelled or
+its deadline is exceeded.
+
+Classes and Methods:
+- CancelToken: A thread-safe cancellation flag, with an optional deadline.
+    - __init__(self, timeout: Union[float, None] = None, deadline: Union[float, None] = None): Initializes the token, with a timeout in
+      seconds or an absolute time.monotonic() deadline.
+    - cancel(self): Cancels the operations using the token.
+    - cancelled: Whether the token has been cancelled or its deadline exceeded.
+    - check(self): Raises OperationCancelledError or DeadlineExceededError if the operations must stop.
+- Progress: The checkpoint passed through the pipeline.
+    - __init__(self, callback: Union[Callable[[str, float], None], None] = None, cancel_token: Union[CancelToken, None] = None)
+    - __call__(self, stage: str, fraction: float = 0.0, check: bool = True): Checks the cancel token, then reports the progress of the
+      stage.
+    - stage(self, stage: str) -> Callable[[float], None]: Returns the checkpoint of a single stage, taking only the fraction done.
+- counter(checkpoint: Callable[[float], None], total: int) -> Callable[[int], None]: Returns a thread-safe counter reporting the fraction of
+  total units done to a stage checkpoint.
+
+Usage:
+    from IST import CancelToken, Encoder, Pattern
+
+    token = CancelToken(timeout=30)
+    Encoder().process(input_path="path/to/image.png", data="Secret message", pattern=Pattern(),
+                      progress_callback=lambda stage, fraction: print(f"{stage}: {fraction:.0%}"), cancel_token=token)
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+
+# Size of the chunks hashed or compressed between two checkpoints
+PROGRESS_CHUNK_SIZE = 1 << 20
+
+
+class CancelToken:
+    def __init__(self, timeout: Union[float, None] = None, deadline: Union[float, None] = None):
+        self._cancelled = threading.Event()
+        self.deadline = deadline
+
+        if timeout is not None:
+            timeout_deadline = time.monotonic() + timeout
+            self.deadline = timeout_deadline if self.deadline is None else min(self.deadline, timeout_deadline)
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.deadline is not None and time.monotonic() > self.deadline)
+
+    def check(self) -> None:
+        """
+        Raises an exception if the operations using the token must stop.
+        """
+        if self._cancelled.is_set():
+            raise OperationCancelledError()
+
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise DeadlineExceededError()
+
+
+class Progress:
+    def __init__(self, callback: Union[Callable[[str, float], None], None] = None, cancel_token: Union[CancelToken, None] = None):
+        self.callback = callback
+        self.cancel_token = cancel_token
+
+        # Checkpoints may be called from the embedding threads, the callback is never called concurrently
+        self._lock = threading.Lock()
+
+    def __call__(self, stage: str, fraction: float = 0.0, check: bool = True) -> None:
+        # The final report of a pipeline does not check the token, the work being already done
+        if check and self.cancel_token is not None:
+            self.cancel_token.check()
+
+        if self.callback is not None:
+            with self._lock:
+                self.callback(stage, min(fraction, 1.0))
+
+    def stage(self, stage: str) -> Callable[[float], None]:
+        """
+        Returns the checkpoint of a single stage.
+        :param stage: The stage name
+        :return: A checkpoint taking the fraction of the stage done
+        """
+        return lambda fraction: self(stage, fraction)
+
+
+def counter(checkpoint: Union[Callable[[float], None], None], total: int) -> Callable[[int], None]:
+    """
+    Returns a thread-safe counter of the units done, reporting the fraction of total units done to the given checkpoint.
+    :param checkpoint: The stage checkpoint, or None
+    :param total: The total number of units of the stage
+    :return: A function taking the number of units just done
+    """
+    if checkpoint is None:
+        return lambda count: None
+
+    lock = threading.Lock()
+    done = 0
+
+    def advance(count: int) -> None:
+        nonlocal done
+        with lock:
+            done += count
+            fraction = done / total if total else 1.0
+
+        checkpoint(fraction)
+
+    return advance
@@ -0,0 +1,192 @@
+# Internal modules
+from typing import Union
+
+# Project modules
+from .encoder import Encoder
+from .exceptions import NoImageLoadedError, NoPatternLoadedError, UnsupportedTypeForParameterError
+from .pattern import Pattern
+from .slots import plan_slot_layouts
+from .utils import create_image_from_array, get_image_channels
+
+# External modules
+import numpy as np
+from PIL import Image
+
+"""
+Session.py is a module in the IST (Image Steganography Tools) library that provides functionality for embedding many payloads into the same
+cover image. The cover is decoded once into a read-only values buffer, and the slot layout of the pattern is planned once. Each embedding then
+only computes the new values of the slots it needs, and keeps them as a patch over the shared cover buffer (copy-on-write): the cost of an
+embedding is proportional to the payload size, and the full image is only materialized when the variant is converted or saved.
+
+Classes and Methods:
+- CoverSession: An Encoder that keeps the cover image decoded between embeddings.
+    - __init__(self, **kwargs): Initializes the CoverSession object with optional keyword arguments (image, input_path, pattern, encoding).
+    - load_image(self, file_path: str): Loads and decodes the cover image.
+    - load_pattern(self, pattern: Pattern): Loads a Pattern object and plans its slot layout.
+    - embed(self, data=None, file=None) -> CoverVariant: Embeds a payload and returns the resulting variant.
+    - process(self, **kwargs): Embeds a payload and saves the resulting image, like Encoder.process().
+- CoverVariant: A payload embedded into a session cover, stored as a patch over the cover buffer.
+    - to_array(self) -> np.ndarray: Returns the values array of the variant.
+    - to_image(self) -> Image: Returns the variant as a Pillow image.
+    - save(self, output_path: str, image_format: Union[str, None] = None): Saves the variant image.
+
+Usage:
+    from IST import CoverSession, Pattern
+
+    session = CoverSession(input_path="path/to/cover.png", pattern=Pattern(channels="RGB"))
+
+    for recipient, payload in payloads.items():
+        session.embed(data=payload).save(f"path/to/{recipient}.png")
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+
+class CoverVariant:
+    def __init__(self, session: "CoverSession", patches: list[tuple[Union[slice, np.ndarray], np.ndarray]]):
+        self.session = session
+        self.patches = patches
+
+    def to_array(self) -> np.ndarray:
+        """
+        Returns the values array of the variant, of shape (height, width, bands).
+        :return: A new array, the cover buffer with the variant's patches applied
+        """
+        array = self.session.cover.copy()
+        flat = array.reshape(-1)
+
+        for selector, values in self.patches:
+            flat[selector] = values
+
+        return array
+
+    def to_image(self) -> Image:
+        """
+        Returns the variant as a Pillow image.
+        :return: The Pillow image
+        """
+        return create_image_from_array(self.to_array(), self.session.image.mode, self.session.image.size)
+
+    def save(self, output_path: str, image_format: Union[str, None] = None) -> None:
+        """
+        Saves the variant image.
+        :param output_path: The output path
+        :param image_format: The image format, deduced from the output path extension when None
+        """
+        image = self.to_image()
+        self.session._perform_save_image(image, output_path, image_format)
+        image.close()
+
+
+class CoverSession(Encoder):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.cover: Union[np.ndarray, None] = None
+        self._pattern_data: Union[dict, None] = None
+        self._header_layout = None
+        self._data_layout = None
+
+        input_path = kwargs.get("input_path", None)
+        if input_path:
+            self.load_image(input_path)
+        elif self.image is not None:
+            self._load_cover()
+
+    def _load_cover(self) -> None:
+        if not isinstance(self.image, Image.Image):
+            raise UnsupportedTypeForParameterError("image", self.image, Image.Image)
+
+        self.cover = np.asarray(self.image).reshape(self.image.size[1], self.image.size[0], len(self.image.getbands()))
+        self.cover.flags.writeable = False
+
+        if self.pattern is not None:
+            self._plan()
+
+    def load_image(self, file_path: str) -> None:
+        super().load_image(file_path)
+        self._load_cover()
+
+    def unload_image(self) -> None:
+        super().unload_image()
+        self.cover = None
+        self._header_layout = self._data_layout = None
+
+    def load_pattern(self, pattern: Pattern) -> None:
+        super().load_pattern(pattern)
+
+        if self.image is not None:
+            self._plan()
+
+    def _plan(self) -> None:
+        image_channels = get_image_channels(self.image.mode)
+        self._pattern_data = self.pattern.generate_pattern(image_channels)
+
+        header_size = len(self._generate_header(b"", self._pattern_data))
+        self._header_layout, self._data_layout = plan_slot_layouts(self._pattern_data, image_channels, self.image.size, header_size)
+
+    def embed(self, data: Union[str, bytes, bytearray, None] = None, file=None) -> CoverVariant:
+        """
+        Embeds a payload into the cover, without modifying the cover buffer.
+        :param data: The data to embed (str or bytes)
+        :param file: The file to embed (path or io.BytesIO), when data is None
+        :return: The resulting variant
+        """
+        if self.cover is None:
+            raise NoImageLoadedError()
+
+        if self._data_layout is None:
+            raise NoPatternLoadedError()
+
+        data = self._prepare_data(data, file, self.get_pipeline().reserved_size)
+        data = self._apply_data_transforms(data, self._pattern_data, hash_reserved=True)
+        header = self._generate_header(data, self._pattern_data)
+
+        flat = self.cover.reshape(-1)
+        patches = []
+
+        if self._header_layout is not None:
+            header_selector, header_values, _ = self._header_layout.patch(flat, header)
+            patches.append((header_selector, header_values))
+
+        data_selector, data_values, _ = self._data_layout.patch(flat, data)
+
+        if patches:
+            self._merge_overlap(patches[0], data_selector, data_values)
+
+        patches.append((data_selector, data_values))
+
+        return CoverVariant(self, patches)
+
+    def _merge_overlap(self, header_patch: tuple, data_selector: Union[slice, np.ndarray], data_values: np.ndarray) -> None:
+        # The data may start on the last pixel of the header. The data values were computed from the cover, so the header bits kept by the
+        # data mask must be brought back, as if both had been written sequentially.
+        header_selector, header_values = header_patch
+        header_indices = np.arange(header_selector.start, header_selector.stop) if isinstance(header_selector, slice) else header_selector
+        data_indices = np.arange(data_selector.start, data_selector.stop) if isinstance(data_selector, slice) else data_selector
+
+        _, header_positions, data_positions = np.intersect1d(header_indices, data_indices, assume_unique=True, return_indices=True)
+
+        if len(data_positions):
+            data_mask = data_values.dtype.type(self._data_layout.mask)
+            data_values[data_positions] = (header_values[header_positions] & ~data_mask) | (data_values[data_positions] & data_mask)
+
+    def process(self, **kwargs) -> CoverVariant:
+        pattern: Pattern = kwargs.get("pattern", None)
+        if pattern:
+            if isinstance(pattern, Pattern):
+                self.load_pattern(pattern)
+            else:
+                raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
+
+        if self.image is None:
+            raise NoImageLoadedError()
+
+        if self.image.filename:
+            output_path = kwargs.get("output_path", f"{self.image.filename.split('.')[0]}_encoded.{self.image.filename.split('.')[1]}")
+        else:
+            output_path = kwargs.get("output_path", f"ist_encoded.{self.image.format.lower()}")
+
+        variant = self.embed(kwargs.get("data", None), kwargs.get("file", None))
+        variant.save(output_path)
+
+        return variant
@@ -0,0 +1,276 @@
+# Internal modules
+import hashlib
+import os
+import struct
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+from typing import Union
+
+# Project modules
+from .decoder import Decoder
+from .encoder import Encoder
+from .exceptions import DataIntegrityCheckFailedError, DataSizeTooLargeError, InvalidDataTypeEncounteredDecodingError, \
+    InvalidHeaderPatternError, InvalidShardHeaderError, NoPatternLoadedError, NotEnoughShardsError, RequiredParameterMissingError, \
+    ShardCountMismatchError, UnsupportedTypeForParameterError
+from .pattern import Pattern
+from .progress import CancelToken
+from .utils import ERASURE_MAX_SHARDS, erasure_decode, erasure_encode
+from .log_config import get_logger
+
+# External modules
+from PIL import Image
+from reedsolo import ReedSolomonError
+
+"""
+Sharding.py is a module in the IST (Image Steganography Tools) library that provides functionality for spreading a single payload over many
+cover images. The payload is split into N data shards, and K parity shards are computed with a Reed-Solomon erasure code across the shards
+(over the same field as the redundancy applied within each image). Each shard is prefixed with a small header (shard index, shard counts,
+payload id, payload length and payload digest) and embedded into its own cover image, the covers being processed in parallel. The payload can be rebuilt
+from any N of the N+K images.
+
+Classes and Methods:
+- ShardedEncoder: Embeds a payload into several cover images.
+    - __init__(self, **kwargs): Initializes the ShardedEncoder object with optional keyword arguments (pattern, parity_shards, encoding, workers,
+      cancel_token).
+    - load_pattern(self, pattern: Pattern): Loads the Pattern object used for every cover image.
+    - process(self, **kwargs) -> bytes: Splits the payload, embeds one shard per cover image (input_paths or images) and saves them to
+      output_paths. Returns the payload id.
+- ShardedDecoder: Rebuilds a payload from several encoded images.
+    - __init__(self, **kwargs): Initializes the ShardedDecoder object with optional keyword arguments (pattern, encoding, workers, cancel_token).
+    - load_pattern(self, pattern: Pattern): Loads the Pattern object used for every image.
+    - process(self, **kwargs): Extracts the shards of the images (file_paths or images), and rebuilds and returns the payload like
+      Decoder.process().
+
+Functions:
+- split_payload(payload, data_shards, parity_shards, payload_id) -> list[bytes]: Splits a payload into shards, headers included.
+- parse_shard(shard) -> (int, int, int, bytes, int, Union[bytes, None], bytes): Parses a shard, header included.
+- join_shards(shards) -> bytes: Rebuilds a payload from its shards, headers included, and checks its digest.
+
+Usage:
+    from IST import Pattern, ShardedEncoder, ShardedDecoder
+
+    # 3 data shards and 2 parity shards, any 3 of the 5 images are enough to rebuild the payload
+    ShardedEncoder(pattern=Pattern(), parity_shards=2).process(input_paths=covers, output_paths=outputs, data="Secret message")
+
+    data = ShardedDecoder(pattern=Pattern()).process(file_paths=outputs[1:4])
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+logger = get_logger("sharding")
+
+# Magic, version, shard index, data shards count, parity shards count, payload id, payload length, payload digest (SHA-256)
+SHARD_HEADER = struct.Struct(">4sBBBB8sQ32s")
+SHARD_MAGIC = b"ISTS"
+SHARD_VERSION = 2
+
+# Header of the first version, without the payload digest
+SHARD_HEADER_V1 = struct.Struct(">4sBBBB8sQ")
+
+# Errors of a missing, damaged or unrelated image, which is then only a missing shard. The errors of the pattern or of the parameters are
+# raised, the same ones failing every image.
+SHARD_DECODING_ERRORS = (OSError, IndexError, UnicodeDecodeError, ReedSolomonError, DataIntegrityCheckFailedError, DataSizeTooLargeError,
+                         InvalidDataTypeEncounteredDecodingError, InvalidHeaderPatternError, InvalidShardHeaderError)
+
+
+def split_payload(payload: Union[bytes, bytearray], data_shards: int, parity_shards: int, payload_id: bytes) -> list[bytes]:
+    """
+    Splits a payload into data shards and computes the parity shards, each shard being prefixed with its header.
+    :param payload: The payload to split
+    :param data_shards: The number of data shards
+    :param parity_shards: The number of parity shards
+    :param payload_id: The 8 bytes id shared by all the shards of the payload
+    :return: The data shards followed by the parity shards
+    """
+    if data_shards < 1 or parity_shards < 0 or data_shards + parity_shards > ERASURE_MAX_SHARDS:
+        raise ValueError(f"Invalid shard counts ({data_shards} data, {parity_shards} parity), at most {ERASURE_MAX_SHARDS} shards in total.")
+
+    shard_size = max(ceil(len(payload) / data_shards), 1)
+    padded = bytes(payload).ljust(shard_size * data_shards, b"\0")
+
+    shards = [padded[index * shard_size:(index + 1) * shard_size] for index in range(data_shards)]
+    shards += erasure_encode(shards, parity_shards)
+    digest = hashlib.sha256(payload).digest()
+
+    return [SHARD_HEADER.pack(SHARD_MAGIC, SHARD_VERSION, index, data_shards, parity_shards, payload_id, len(payload), digest) + shard
+            for index, shard in enumerate(shards)]
+
+
+def parse_shard(shard: Union[bytes, bytearray]) -> (int, int, int, bytes, int, Union[bytes, None], bytes):
+    """
+    Parses a shard.
+    :param shard: The shard, header included
+    :return: The shard index, data shards count, parity shards count, payload id, payload length, payload digest (None for the shards of
+        the first version) and the shard data
+    """
+    if not isinstance(shard, (bytes, bytearray, memoryview)):
+        raise InvalidShardHeaderError()
+
+    version = shard[4] if len(shard) > 4 else None
+    header = SHARD_HEADER_V1 if version == 1 else SHARD_HEADER
+    if len(shard) < header.size:
+        raise InvalidShardHeaderError()
+
+    magic, version, index, data_shards, parity_shards, payload_id, payload_length, *digest = header.unpack_from(shard)
+    if magic != SHARD_MAGIC or version not in (1, SHARD_VERSION) or index >= data_shards + parity_shards:
+        raise InvalidShardHeaderError()
+
+    return index, data_shards, parity_shards, payload_id, payload_length, (digest or [None])[0], bytes(shard[header.size:])
+
+
+def join_shards(shards: list[Union[bytes, bytearray]]) -> bytes:
+    """
+    Rebuilds a payload from its shards. Shards of other payloads are ignored, the payload with the most shards is rebuilt. The shards
+    whose shard counts, payload length or digest disagree with most of the shards of the payload are ignored as well.
+    :param shards: The available shards, headers included, in any order
+    :return: The payload, checked against its digest
+    """
+    parsed = [parse_shard(shard) for shard in shards]
+    if not parsed:
+        raise NotEnoughShardsError(0, 1)
+
+    # The shards of a payload share their whole header but the index: shard counts, payload id, payload length and digest
+    payload_id, _ = Counter(shard[3] for shard in parsed).most_common(1)[0]
+    parsed = [shard for shard in parsed if shard[3] == payload_id]
+    header, _ = Counter(shard[1:6] for shard in parsed).most_common(1)[0]
+    agreeing = [shard for shard in parsed if shard[1:6] == header]
+    if len(agreeing) < len(parsed):
+        logger.warning(f"Ignoring {len(parsed) - len(agreeing)} shards of payload {payload_id.hex()} whose header disagrees with the "
+                       f"other shards")
+
+    data_shards, parity_shards, _, payload_length, digest = header
+    available = {index: data for index, _, _, _, _, _, data in agreeing}
+    if len(available) < data_shards:
+        raise NotEnoughShardsError(len(available), data_shards)
+
+    payload = b"".join(erasure_decode(available, data_shards, parity_shards))[:payload_length]
+    if digest is not None and hashlib.sha256(payload).digest() != digest:
+        raise DataIntegrityCheckFailedError()
+
+    return payload
+
+
+class ShardedEncoder:
+    def __init__(self, **kwargs):
+        self.pattern: Pattern = kwargs.get("pattern", None)
+        self.parity_shards: int = kwargs.get("parity_shards", 1)
+        self.encoding: str = kwargs.get("encoding", "utf-8")
+        self.cancel_token: CancelToken = kwargs.get("cancel_token", None)
+
+        # Each cover image is encoded on its own thread
+        self.workers: int = kwargs.get("workers", os.cpu_count() or 1)
+
+    def load_pattern(self, pattern: Pattern):
+        self.pattern = pattern
+
+    def _encode_shard(self, cover: Union[str, Image.Image], output_path: str, shard: bytes) -> None:
+        encoder = Encoder(pattern=self.pattern, encoding=self.encoding, workers=1, cancel_token=self.cancel_token)
+
+        if isinstance(cover, Image.Image):
+            encoder.process(image=cover, data=shard, output_path=output_path)
+        else:
+            encoder.process(input_path=cover, data=shard, output_path=output_path)
+            encoder.unload_image()
+
+        encoder.processed_image.close()
+
+    def process(self, **kwargs) -> bytes:
+        covers: list = kwargs.get("images", None) or kwargs.get("input_paths", None)
+        output_paths: list[str] = kwargs.get("output_paths", None)
+
+        if not covers:
+            raise RequiredParameterMissingError("input_paths or images")
+        if not output_paths:
+            raise RequiredParameterMissingError("output_paths")
+        if len(output_paths) != len(covers):
+            raise ShardCountMismatchError(len(output_paths), len(covers))
+
+        pattern: Pattern = kwargs.get("pattern", None)
+        if not self.pattern or pattern:
+            if pattern:
+                if isinstance(pattern, Pattern):
+                    self.load_pattern(pattern)
+                else:
+                    raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
+            else:
+                raise NoPatternLoadedError()
+
+        data_shards = len(covers) - self.parity_shards
+        if data_shards < 1:
+            raise ShardCountMismatchError(len(covers), self.parity_shards + 1)
+
+        # The shards carry the prepared payload (data type included), so that the rebuilt payload is processed like a single image one
+        payload = Encoder(encoding=self.encoding)._prepare_data(kwargs.get("data", None), kwargs.get("file", None))
+        payload_id = kwargs.get("payload_id", None) or os.urandom(8)
+
+        shards = split_payload(payload, data_shards, self.parity_shards, payload_id)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(covers)))) as executor:
+            for future in [executor.submit(self._encode_shard, *job) for job in zip(covers, output_paths, shards)]:
+                future.result()
+
+        logger.info(f"Payload {payload_id.hex()} encoded into {data_shards} data shards and {self.parity_shards} parity shards")
+
+        return payload_id
+
+
+class ShardedDecoder:
+    def __init__(self, **kwargs):
+        self.pattern: Pattern = kwargs.get("pattern", None)
+        self.encoding: str = kwargs.get("encoding", "utf-8")
+        self.cancel_token: CancelToken = kwargs.get("cancel_token", None)
+
+        # Each image is decoded on its own thread
+        self.workers: int = kwargs.get("workers", os.cpu_count() or 1)
+
+    def load_pattern(self, pattern: Pattern):
+        self.pattern = pattern
+
+    def _decode_shard(self, image: Union[str, Image.Image]) -> Union[bytes, None]:
+        decoder = Decoder(pattern=self.pattern, encoding=self.encoding, workers=1, cancel_token=self.cancel_token)
+
+        # A missing, damaged or unrelated image is only a missing shard. The payload is extracted raw, so that nothing is ever written
+        try:
+            if isinstance(image, Image.Image):
+                decoder.image = image
+                payload = decoder.process(raw=True)
+            else:
+                payload = decoder.process(file_path=image, raw=True)
+                decoder.unload_image()
+
+            # Shards are hidden as bytes, the images holding text, files or containers are unrelated ones
+            data_type, _, shard = decoder.split_payload(payload)
+            if data_type != 2:
+                raise InvalidShardHeaderError()
+
+            shard = bytes(shard)
+            parse_shard(shard)
+        except SHARD_DECODING_ERRORS as error:
+            logger.warning(f"Skipping shard {getattr(image, 'filename', image)}: {error}")
+            return None
+
+        return shard
+
+    def process(self, **kwargs):
+        images: list = kwargs.get("images", None) or kwargs.get("file_paths", None)
+        if not images:
+            raise RequiredParameterMissingError("file_paths or images")
+
+        pattern: Pattern = kwargs.get("pattern", None)
+        if not self.pattern or pattern:
+            if pattern:
+                if isinstance(pattern, Pattern):
+                    self.load_pattern(pattern)
+                else:
+                    raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
+            else:
+                raise NoPatternLoadedError()
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(images)))) as executor:
+            shards = [shard for shard in executor.map(self._decode_shard, images) if shard is not None]
+
+        if not shards:
+            raise NotEnoughShardsError(0, 1)
+
+        return Decoder(encoding=self.encoding)._process_data(join_shards(shards))
@@ -0,0 +1,817 @@
+# Internal modules
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil, gcd, isqrt, lcm
+from typing import Callable, Union
+
+# Project modules
+from .exceptions import DataSizeTooLargeError, InvalidBitFrequencyError
+from .progress import counter
+from .utils import ranges_overlap
+
+# External modules
+import numpy as np
+
+"""
+Slots.py is a module in the IST (Image Steganography Tools) library that maps encoding patterns to carrier slots. A carrier slot is one
+channel value of one pixel (uint8, or uint16 for high bit-depth images) that receives `bit_frequency` bits of data. Because every selected
+channel of a pixel is visited once per pixel, the per-channel `byte_spacing` counters are all equal, and the position of any slot can be
+computed arithmetically instead of walking the image pixel by pixel. This lets the encoder and decoder touch only the values they need, using vectorized array operations.
+
+The slots are ordered in one of two layouts. The interleaved layout visits the selected channels of each carrier pixel in turn, while the
+planar layout fills the plane of a channel (the given channel of every carrier pixel) before the next one, so that each plane is a single
+strided view of the values, and the data held by a plane is read without touching the others.
+
+With matrix embedding (Hamming syndrome coding), the slots are grouped by 2^k - 1, and each group carries k bits of data in the syndrome
+of its least significant bits: the XOR of the (1-based) positions of the slots whose LSB is set. Writing k bits flips at most one LSB of the
+group, the one at the position given by the XOR of the current syndrome and the data, against half of the LSBs with plain LSB replacement.
+
+Classes and Methods:
+- KeyedPermutation: A keyed pseudo-random permutation of [0, size[ moving runs of consecutive indices, evaluated lazily on the requested
+  indices only.
+    - __call__(self, indices: np.ndarray) -> np.ndarray: Returns the permuted indices.
+    - inverse(self, values: np.ndarray) -> np.ndarray: Returns the indices permuted to the given values.
+    - permute_range(self, start: int, stop: int) -> np.ndarray: Returns the permuted indices of a range, encrypting each run once.
+    - permute_runs(self, first_run: int, stop_run: int) -> np.ndarray: Returns the permuted first indices of a range of runs.
+    - inverse_range(self, start: int, stop: int) -> np.ndarray: Returns the indices permuted to a range of values, decrypting each run once.
+- SlotLayout: Describes the carrier slots of an image for a channels / bit_frequency / byte_spacing / offset / layout combination. When a
+  scatter seed is given, the data slots are spread over the whole layout by runs of 16 slots following a keyed permutation.
+    - capacity: The number of slots available in the image.
+    - alignment_bytes: The number of data bytes held by aligned slots, the granularity of the data offsets read with extract().
+    - slots_for_bytes(self, length: int) -> int: Returns the number of slots needed to store the given number of bytes.
+    - capacity_bytes(self) -> int: Returns the number of bytes that fit in the layout.
+    - data_bit(self, slot: int) -> int: Returns the position of the first data bit held by a slot.
+    - selector(self, start: int, stop: int) -> Union[slice, np.ndarray]: Returns the flat value indices of the slots [start, stop[.
+    - slot_indices(self, slots: np.ndarray) -> np.ndarray: Returns the flat value indices of the given physical slots.
+    - blocks(self, start: int, stop: int) -> list[tuple[int, int]]: Splits a slots range into blocks processed at once.
+    - row_bands(self, slots: int, workers: int, min_band_slots: int) -> list[tuple[int, int]]: Splits the slots into bands processed in parallel.
+    - last_pixel(self, slots: int) -> int: Returns the pixel (relative to the offset) holding the last of the given number of slots.
+    - window_slots(self, first_value: int, stop_value: int) -> list[tuple[int, int]]: Returns the physical slots ranges of a window of whole
+      pixels.
+    - embed_window(self, window: np.ndarray, first_value: int, data_array: np.ndarray, slots: int): Writes the data slots lying in a window
+      of whole pixels, so that an image can be encoded strip by strip.
+    - patch(self, flat: np.ndarray, data: bytes) -> (selector, values, int): Computes the new slot values for the data, without writing.
+    - embed(self, flat: np.ndarray, data: bytes, workers: int = 1, min_band_slots: int = MIN_BAND_SLOTS, checkpoint=None) -> int: Writes
+      the data into the flat values array, on several threads for large data.
+    - extract(self, flat: np.ndarray, length: int, workers: int = 1, min_band_slots: int = MIN_BAND_SLOTS, checkpoint=None,
+      data_offset: int = 0) -> (bytearray, int): Reads the given number of bytes from the flat values array (from an aligned position of
+      the data), on several threads for large data.
+- matrix_syndromes(lsbs: np.ndarray, group_slots: int) -> np.ndarray: Returns the syndromes of groups of LSBs (matrix embedding).
+- matrix_changes(lsbs: np.ndarray, symbols: np.ndarray, group_slots: int) -> np.ndarray: Returns the slots to flip to write symbols.
+- plan_slot_layouts(pattern_data: dict, image_channels: str, image_size: tuple[int, int], header_length: int): Computes the header and
+  data slot layouts of a generated pattern.
+- derive_scatter_key(seed: Union[int, str, bytes]) -> int: Derives the 64 bits permutation key from a scatter seed.
+- bytes_to_symbols(data: bytes, bit_frequency: int) -> np.ndarray: Splits bytes into bit_frequency wide symbols (MSB first).
+- symbols_at(data_array: np.ndarray, slots: np.ndarray, bit_frequency: int) -> np.ndarray: Returns the symbols of the given slots only.
+- symbols_to_bytes(symbols: np.ndarray, bit_frequency: int, length: int) -> bytearray: Joins bit_frequency wide symbols back into bytes.
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+
+# Default minimum number of slots per thread when embedding or extracting on several threads
+MIN_BAND_SLOTS = 1 << 20
+
+# Orders of the slots: the channels of each pixel in turn, or the plane of each channel in turn
+LAYOUTS = ("interleaved", "planar")
+
+# Bits per group of 2^k - 1 slots with matrix embedding, 0 (or 1, a group of a single slot) for plain LSB replacement
+MAX_MATRIX_EMBEDDING = 7
+
+
+def bytes_to_symbols(data: Union[bytes, bytearray, memoryview], bit_frequency: int) -> np.ndarray:
+    """
+    Splits bytes into symbols of bit_frequency bits (1 to 16), most significant bit first. The last symbol is padded with zeros.
+    :param data: The data to split
+    :param bit_frequency: The number of bits per symbol
+    :return: The symbols array, of uint8 symbols up to 8 bits and of uint16 symbols above
+    """
+    data_array = np.frombuffer(data, dtype=np.uint8)
+
+    if bit_frequency == 8:
+        return data_array
+
+    if bit_frequency == 16:
+        if len(data_array) % 2:
+            data_array = np.concatenate((data_array, np.zeros(1, dtype=np.uint8)))
+        return data_array.view(">u2").astype(np.uint16)
+
+    if bit_frequency == 1:
+        return np.unpackbits(data_array)
+
+    if 8 % bit_frequency == 0:
+        # Whole symbols per byte, shift each of them out of every byte
+        symbols_per_byte = 8 // bit_frequency
+        symbols = np.empty((len(data_array), symbols_per_byte), dtype=np.uint8)
+        for index in range(symbols_per_byte):
+            np.right_shift(data_array, 8 - bit_frequency * (index + 1), out=symbols[:, index])
+            symbols[:, index] &= (1 << bit_frequency) - 1
+
+        return symbols.reshape(-1)
+
+    bits = np.unpackbits(data_array)
+    padding = -len(bits) % bit_frequency
+    if padding:
+        bits = np.concatenate((bits, np.zeros(padding, dtype=np.uint8)))
+
+    weights = (1 << np.arange(bit_frequency - 1, -1, -1)).astype(np.uint8 if bit_frequency <= 8 else np.uint16)
+    return bits.reshape(-1, bit_frequency) @ weights
+
+
+def _symbols_to_array(symbols: np.ndarray, bit_frequency: int, length: int) -> np.ndarray:
+    symbols = symbols.astype(np.uint8 if bit_frequency <= 8 else np.uint16, copy=False)
+
+    if bit_frequency == 8:
+        return symbols[:length]
+
+    if bit_frequency == 16:
+        return symbols[:ceil(length / 2)].astype(">u2").view(np.uint8)[:length]
+
+    if bit_frequency == 1:
+        return np.packbits(symbols[:length * 8])
+
+    if 8 % bit_frequency == 0:
+        symbols_per_byte = 8 // bit_frequency
+        padding = -len(symbols) % symbols_per_byte
+        if padding:
+            symbols = np.concatenate((symbols, np.zeros(padding, dtype=np.uint8)))
+
+        symbols = symbols[:length * symbols_per_byte].reshape(-1, symbols_per_byte)
+        data_array = symbols[:, 0] << (8 - bit_frequency)
+        for index in range(1, symbols_per_byte):
+            data_array |= symbols[:, index] << (8 - bit_frequency * (index + 1))
+
+        return data_array
+
+    shifts = np.arange(bit_frequency - 1, -1, -1, dtype=symbols.dtype)
+    bits = ((symbols[:, None] >> shifts) & 1).astype(np.uint8).reshape(-1)
+    return np.packbits(bits[:length * 8])
+
+
+def symbols_at(data_array: np.ndarray, slots: np.ndarray, bit_frequency: int) -> np.ndarray:
+    """
+    Returns the symbols of bit_frequency bits (1 to 16) of the given slots, as bytes_to_symbols() splits the data, without splitting the
+    whole data.
+    :param data_array: The uint8 data array, followed by 2 zero bytes
+    :param slots: The slots array
+    :param bit_frequency: The number of bits per symbol
+    :return: The uint16 symbols array
+    """
+    # A symbol starts anywhere in a byte and spans up to 3 bytes, which are read as a 24 bits window
+    bit_positions = slots * bit_frequency
+    byte_positions = bit_positions >> 3
+    windows = data_array[byte_positions].astype(np.uint32) << 16
+    windows |= data_array[byte_positions + 1].astype(np.uint32) << 8
+    windows |= data_array[byte_positions + 2]
+
+    windows >>= (24 - bit_frequency - (bit_positions & 7)).astype(np.uint32)
+    return (windows & ((1 << bit_frequency) - 1)).astype(np.uint16)
+
+
+def symbols_to_bytes(symbols: np.ndarray, bit_frequency: int, length: int) -> bytearray:
+    """
+    Joins symbols of bit_frequency bits (1 to 16) back into bytes, most significant bit first.
+    :param symbols: The symbols array
+    :param bit_frequency: The number of bits per symbol
+    :param length: The number of bytes to rebuild
+    :return: The rebuilt bytes
+    """
+    return bytearray(_symbols_to_array(symbols, bit_frequency, length).tobytes())
+
+
+def matrix_syndromes(lsbs: np.ndarray, group_slots: int) -> np.ndarray:
+    """
+    Returns the syndromes of groups of LSBs, the XOR of the (1-based) positions of the set LSBs of each group: the product of the group by
+    the parity check matrix of the Hamming code, whose columns are the binary forms of 1 to group_slots.
+    :param lsbs: The LSBs array, of a whole number of groups
+    :param group_slots: The number of slots of a group (2^k - 1)
+    :return: The uint8 syndromes array, one per group
+    """
+    columns = np.arange(1, group_slots + 1, dtype=np.uint8)
+    return np.bitwise_xor.reduce(lsbs.astype(np.uint8, copy=False).reshape(-1, group_slots) * columns, axis=1)
+
+
+def matrix_changes(lsbs: np.ndarray, symbols: np.ndarray, group_slots: int) -> np.ndarray:
+    """
+    Returns the slots whose LSB is flipped so that the syndromes of the groups are the given symbols, at most one per group.
+    :param lsbs: The LSBs array, of a whole number of groups
+    :param symbols: The symbols to write, one per group
+    :param group_slots: The number of slots of a group (2^k - 1)
+    :return: The indices of the slots to flip in the LSBs array
+    """
+    positions = matrix_syndromes(lsbs, group_slots) ^ symbols.astype(np.uint8, copy=False)
+    groups = np.flatnonzero(positions)
+
+    return groups * group_slots + positions[groups].astype(np.int64) - 1
+
+
+def derive_scatter_key(seed: Union[int, str, bytes, bytearray]) -> int:
+    """
+    Derives the 64 bits permutation key from a scatter seed.
+    :param seed: The secret seed
+    :return: The key
+    """
+    if isinstance(seed, int):
+        seed = seed.to_bytes(max(1, (seed.bit_length() + 8) // 8), "big", signed=True)
+    elif isinstance(seed, str):
+        seed = seed.encode("utf-8")
+
+    return int.from_bytes(hashlib.blake2b(bytes(seed), digest_size=8, person=b"IST-scatter").digest(), "big")
+
+
+class KeyedPermutation:
+    ROUNDS = 4
+    # The indices are moved by runs of 2^RUN_BITS consecutive indices: a single encryption per run, and whole cache lines accessed at once
+    RUN_BITS = 4
+
+    def __init__(self, size: int, key: int):
+        """
+        A keyed pseudo-random permutation of [0, size[, moving runs of consecutive indices. The runs are permuted by a mixed radix Feistel
+        network over a domain barely larger than their number, with cycle walking to stay in range, and the indices of the last partial
+        run stay in place. The round function is a counter-based integer hash of the round key and the half block, so any index can be
+        permuted independently with vectorized arithmetic, and only the requested indices are computed.
+        :param size: The size of the permuted range
+        :param key: The 64 bits key
+        """
+        self.size = size
+        self.runs = size >> self.RUN_BITS
+
+        # Mixed radix halves, the domain (left_size x right_size) exceeds the number of runs by less than left_size, so that the cycle
+        # walking is seldom needed
+        self.left_size = isqrt(self.runs - 1) + 1 if self.runs else 1
+        self.right_size = -(-self.runs // self.left_size) or 1
+
+        self.round_keys = [np.uint32((key >> (16 * (index % 4)) ^ (index * 0x9E3779B9)) & 0xFFFFFFFF) for index in range(self.ROUNDS)]
+
+    @staticmethod
+    def _round(values: np.ndarray, round_key: np.uint32, modulus: int) -> np.ndarray:
+        # 32 bits integer hash (xorshift-multiply), uint32 arithmetic wraps around
+        hashed = values.astype(np.uint32) ^ round_key
+        hashed ^= hashed >> np.uint32(16)
+        hashed *= np.uint32(0x7FEB352D)
+        hashed ^= hashed >> np.uint32(15)
+        hashed *= np.uint32(0x846CA68B)
+        hashed ^= hashed >> np.uint32(16)
+        hashed %= np.uint32(modulus)
+        return hashed
+
+    def _encrypt(self, values: np.ndarray) -> np.ndarray:
+        # Each round maps (left, right) in [0, left_size[ x [0, right_size[ to (right, left + F(right)) in [0, right_size[ x [0, left_size[
+        left_size, right_size = self.left_size, self.right_size
+        left, right = np.divmod(values, right_size)
+
+        for round_key in self.round_keys:
+            left, right = right, (left + self._round(right, round_key, left_size)) % left_size
+            left_size, right_size = right_size, left_size
+
+        return left * right_size + right
+
+    def _decrypt(self, values: np.ndarray) -> np.ndarray:
+        # The rounds undone in reverse order, starting from the halves sizes reached by the last round
+        left_size, right_size = (self.right_size, self.left_size) if self.ROUNDS % 2 else (self.left_size, self.right_size)
+        left, right = np.divmod(values, right_size)
+
+        for round_key in reversed(self.round_keys):
+            left_size, right_size = right_size, left_size
+            left, right = (right - self._round(left, round_key, left_size).astype(np.int64)) % left_size, left
+
+        return left * right_size + right
+
+    def _walk(self, cipher: Callable[[np.ndarray], np.ndarray], runs: np.ndarray) -> np.ndarray:
+        # Cycle walking: apply the cipher again to the runs that fell out of range
+        values = cipher(runs)
+        out_of_range = np.flatnonzero(values >= self.runs)
+        while len(out_of_range):
+            walked = cipher(values[out_of_range])
+            values[out_of_range] = walked
+            out_of_range = out_of_range[walked >= self.runs]
+
+        return values
+
+    def _apply(self, cipher: Callable[[np.ndarray], np.ndarray], indices: np.ndarray) -> np.ndarray:
+        indices = indices.astype(np.int64)
+        runs = indices >> self.RUN_BITS
+        moved = runs < self.runs
+        indices[moved] = (self._walk(cipher, runs[moved]) << self.RUN_BITS) | (indices[moved] & ((1 << self.RUN_BITS) - 1))
+        return indices
+
+    def _apply_runs(self, cipher: Callable[[np.ndarray], np.ndarray], first_run: int, stop_run: int) -> np.ndarray:
+        # Each run is encrypted once, the last partial run stays in place
+        run_starts = np.arange(first_run, stop_run, dtype=np.int64)
+        moved = min(max(self.runs - first_run, 0), len(run_starts))
+        run_starts[:moved] = self._walk(cipher, run_starts[:moved])
+        run_starts <<= self.RUN_BITS
+        return run_starts
+
+    def _apply_range(self, cipher: Callable[[np.ndarray], np.ndarray], start: int, stop: int) -> np.ndarray:
+        # The runs covering the range, expanded to their indices
+        first_run, stop_run = start >> self.RUN_BITS, -(-stop >> self.RUN_BITS)
+        indices = (self._apply_runs(cipher, first_run, stop_run)[:, None] + np.arange(1 << self.RUN_BITS, dtype=np.int64)).reshape(-1)
+        return indices[start - (first_run << self.RUN_BITS):stop - (first_run << self.RUN_BITS)]
+
+    def __call__(self, indices: np.ndarray) -> np.ndarray:
+        """
+        Returns the permuted indices.
+        :param indices: The indices to permute, in [0, size[
+        :return: The permuted indices, in [0, size[
+        """
+        return self._apply(self._encrypt, indices)
+
+    def inverse(self, values: np.ndarray) -> np.ndarray:
+        """
+        Returns the indices permuted to the given values, walking the cycles backwards.
+        :param values: The permuted indices, in [0, size[
+        :return: The indices, in [0, size[
+        """
+        return self._apply(self._decrypt, values)
+
+    def permute_range(self, start: int, stop: int) -> np.ndarray:
+        """
+        Returns the permuted indices of [start, stop[, the same as self(np.arange(start, stop)) with one encryption per run.
+        :param start: The first index
+        :param stop: The index after the last one
+        :return: The permuted indices, in [0, size[
+        """
+        return self._apply_range(self._encrypt, start, stop)
+
+    def permute_runs(self, first_run: int, stop_run: int) -> np.ndarray:
+        """
+        Returns the permuted first indices of the runs [first_run, stop_run[, each run being moved as a whole.
+        :param first_run: The first run
+        :param stop_run: The run after the last one
+        :return: The permuted indices of the first index of each run
+        """
+        return self._apply_runs(self._encrypt, first_run, stop_run)
+
+    def inverse_range(self, start: int, stop: int) -> np.ndarray:
+        """
+        Returns the indices permuted to the values [start, stop[, the same as self.inverse(np.arange(start, stop)) with one decryption per
+        run.
+        :param start: The first permuted index
+        :param stop: The permuted index after the last one
+        :return: The indices, in [0, size[
+        """
+        return self._apply_range(self._decrypt, start, stop)
+
+
+class SlotLayout:
+    # Number of slots processed at once, large enough to amortize the NumPy calls, small enough for the temporaries to stay in cache
+    BLOCK_SLOTS = 1 << 16
+
+    def __init__(self, image_channels: str, image_size: tuple[int, int], channels: str, bit_frequency: int, byte_spacing: int,
+                 offset: int = 0, scatter_seed: Union[int, str, bytes, None] = None, layout: str = "interleaved",
+                 matrix_embedding: int = 0):
+        self.image_channels = image_channels
+        self.image_size = image_size
+        self.channels = channels
+        self.bit_frequency = bit_frequency
+        self.byte_spacing = byte_spacing
+        self.offset = max(offset, 0)
+
+        self.bands = len(image_channels)
+        self.pixel_count = image_size[0] * image_size[1]
+        self.selected_bands = np.array([index for index, channel in enumerate(image_channels) if channel in channels], dtype=np.int64)
+        self.slots_per_pixel = len(self.selected_bands)
+        self.mask = (1 << bit_frequency) - 1
+
+        # With matrix embedding, groups of 2^k - 1 slots of 1 bit carry k bits each
+        self.matrix_bits = matrix_embedding if matrix_embedding and matrix_embedding > 1 else 0
+        self.group_slots = (1 << self.matrix_bits) - 1 if self.matrix_bits else 1
+        self.symbol_bits = self.matrix_bits or bit_frequency
+
+        self.carrier_pixels = ceil(max(self.pixel_count - self.offset, 0) / byte_spacing)
+        self.capacity = self.carrier_pixels * self.slots_per_pixel
+
+        # A single plane is ordered the same way in both layouts
+        self.planar = layout == "planar" and self.slots_per_pixel > 1
+
+        # Keyed scattering of the slots over the whole layout
+        self.permutation = KeyedPermutation(self.capacity, derive_scatter_key(scatter_seed)) if scatter_seed is not None else None
+        if self.permutation is not None and not self.planar:
+            # The offsets of the values of a run from the value of its first slot, for each position of the first slot in a pixel
+            phases = np.arange(self.slots_per_pixel, dtype=np.int64)[:, None]
+            self.run_offsets = self.slot_indices(phases + np.arange(1 << KeyedPermutation.RUN_BITS)) - self.slot_indices(phases)
+
+        # Every value from the offset is a slot, the slots can be addressed with a plain slice
+        self.contiguous = self.slots_per_pixel == self.bands and byte_spacing == 1 and self.permutation is None and not self.planar
+
+        # Blocks and bands start on a data byte boundary (and on a group boundary with matrix embedding), and on a pixel boundary so that
+        # consecutive slots can be addressed through a strided view of the carrier pixels
+        self.alignment = lcm(self.group_slots * 8 // gcd(self.symbol_bits, 8), max(self.slots_per_pixel, 1))
+        self.block_slots = max(self.BLOCK_SLOTS // self.alignment, 1) * self.alignment
+
+        # The data held by aligned slots, the granularity of the data read from the middle of the layout
+        self.alignment_bytes = self.data_bit(self.alignment) // 8
+
+    def slots_for_bytes(self, length: int) -> int:
+        """
+        Returns the number of slots needed to store the given number of bytes.
+        :param length: The number of bytes
+        :return: The number of slots
+        """
+        return ceil(length * 8 / self.symbol_bits) * self.group_slots
+
+    def capacity_bytes(self) -> int:
+        """
+        Returns the number of bytes that fit in the layout.
+        :return: The number of bytes
+        """
+        return (self.capacity // self.group_slots * self.symbol_bits) // 8
+
+    def data_bit(self, slot: int) -> int:
+        """
+        Returns the position of the first data bit held by a slot, for slots on a group boundary.
+        :param slot: The slot
+        :return: The bit position in the data
+        """
+        return slot // self.group_slots * self.symbol_bits
+
+    def selector(self, start: int, stop: int) -> Union[slice, np.ndarray]:
+        """
+        Returns the flat value indices of the slots [start, stop[.
+        :param start: The first slot
+        :param stop: The slot after the last one
+        :return: A slice when the slots are contiguous, an indices array otherwise
+        """
+        if self.contiguous:
+            base = self.offset * self.bands
+            return slice(base + start, base + stop)
+
+        if self.permutation is not None and not self.planar:
+            # The slots are moved by runs, the indices of a run only depend on the index of its first slot and on its position in a pixel
+            run_bits = KeyedPermutation.RUN_BITS
+            first_run, stop_run = start >> run_bits, -(-stop >> run_bits)
+            run_starts = self.permutation.permute_runs(first_run, stop_run)
+            indices = self.slot_indices(run_starts)[:, None] + self.run_offsets[run_starts % self.slots_per_pixel]
+
+            skipped = start - (first_run << run_bits)
+            return indices.reshape(-1)[skipped:skipped + stop - start]
+
+        if self.permutation is not None or self.planar:
+            return self.slot_indices(self.permutation.permute_range(start, stop) if self.permutation is not None
+                                     else np.arange(start, stop, dtype=np.int64))
+
+        # Consecutive slots: every carrier pixel of the range, combined with every selected band
+        first_pixel, last_pixel = start // self.slots_per_pixel, (stop - 1) // self.slots_per_pixel
+        pixels = self.offset + np.arange(first_pixel, last_pixel + 1, dtype=np.int64) * self.byte_spacing
+        indices = (pixels * self.bands)[:, None] + self.selected_bands
+
+        skipped = start - first_pixel * self.slots_per_pixel
+        return indices.reshape(-1)[skipped:skipped + stop - start]
+
+    def slot_indices(self, slots: np.ndarray) -> np.ndarray:
+        """
+        Returns the flat value indices of the given physical slots.
+        :param slots: The slots array
+        :return: The indices array
+        """
+        if self.slots_per_pixel == 1:
+            return (self.offset + slots * self.byte_spacing) * self.bands + self.selected_bands[0]
+        if self.slots_per_pixel == self.bands and self.byte_spacing == 1 and not self.planar:
+            # Every value from the offset is a slot
+            return self.offset * self.bands + slots
+
+        if self.planar:
+            selected, carrier_pixels = np.divmod(slots, self.carrier_pixels)
+        else:
+            carrier_pixels, selected = np.divmod(slots, self.slots_per_pixel)
+        return (self.offset + carrier_pixels * self.byte_spacing) * self.bands + self.selected_bands[selected]
+
+    def blocks(self, start: int, stop: int) -> list[tuple[int, int]]:
+        """
+        Splits the slots [start, stop[ into blocks processed at once.
+        :param start: The first slot
+        :param stop: The slot after the last one
+        :return: The list of (start, stop) blocks
+        """
+        return [(block_start, min(block_start + self.block_slots, stop)) for block_start in range(start, stop, self.block_slots)]
+
+    def row_bands(self, slots: int, workers: int, min_band_slots: int) -> list[tuple[int, int]]:
+        """
+        Splits the slots [0, slots[ into contiguous bands processed in parallel. Consecutive slots lie on consecutive rows, so each band
+        covers a band of rows of the image (or a band of the permuted order when scattering). Bands are aligned like blocks, so that they
+        always start on a data byte boundary, whatever the bit frequency.
+        :param slots: The number of slots
+        :param workers: The maximum number of bands
+        :param min_band_slots: The minimum number of slots of a band
+        :return: The list of (start, stop) bands
+        """
+        count = min(max(workers, 1), slots // max(min_band_slots, 1))
+        if count <= 1:
+            return [(0, slots)]
+
+        band_slots = ceil(slots / count / self.alignment) * self.alignment
+        return [(start, min(start + band_slots, slots)) for start in range(0, slots, band_slots)]
+
+    def last_pixel(self, slots: int) -> int:
+        """
+        Returns the pixel (relative to the offset) holding the last of the given number of slots.
+        :param slots: The number of used slots
+        :return: The pixel index relative to the offset
+        """
+        if slots <= 0:
+            return 0
+
+        if self.permutation is not None:
+            last_index = max(int(self.selector(start, stop).max()) for start, stop in self.blocks(0, slots))
+            return last_index // self.bands - self.offset
+
+        if self.planar:
+            # The first plane is filled before the others
+            return (min(slots, self.carrier_pixels) - 1) * self.byte_spacing
+
+        return ((slots - 1) // self.slots_per_pixel) * self.byte_spacing
+
+    def window_slots(self, first_value: int, stop_value: int) -> list[tuple[int, int]]:
+        """
+        Returns the physical slots whose values lie in a window of whole pixels of the flat values array.
+        :param first_value: The flat index of the first value of the window
+        :param stop_value: The flat index of the value after the window
+        :return: The (start, stop) ranges of the physical slots, one per plane for the planar layout
+        """
+        first_pixel, stop_pixel = first_value // self.bands, -(-stop_value // self.bands)
+
+        start = min(max(-(-(first_pixel - self.offset) // self.byte_spacing), 0), self.carrier_pixels)
+        stop = min(max(-(-(stop_pixel - self.offset) // self.byte_spacing), 0), self.carrier_pixels)
+
+        if self.planar:
+            return [(plane * self.carrier_pixels + start, plane * self.carrier_pixels + stop) for plane in range(self.slots_per_pixel)]
+
+        return [(start * self.slots_per_pixel, stop * self.slots_per_pixel)]
+
+    def embed_window(self, window: np.ndarray, first_value: int, data_array: np.ndarray, slots: int) -> None:
+        """
+        Writes the symbols of the data slots whose values lie in a window of whole pixels (e.g. a strip of rows), so that an image can be
+        encoded window by window. Each window only computes its own slots, the scattered ones included.
+        :param window: The flat values of the window
+        :param first_value: The flat index of the first value of the window in the whole image
+        :param data_array: The uint8 data array, followed by 2 zero bytes (see symbols_at())
+        :param slots: The number of slots of the data
+        """
+        self._check_bit_depth(window)
+        ranges = self.window_slots(first_value, first_value + len(window))
+        if self.permutation is None:
+            # The data fills the first slots
+            ranges = [(start, min(stop, slots)) for start, stop in ranges]
+
+        clear_mask = ~window.dtype.type(self.mask)
+        for block_start, block_stop in (block for start, stop in ranges for block in self.blocks(start, stop)):
+            physical_slots = np.arange(block_start, block_stop, dtype=np.int64)
+
+            data_slots = physical_slots
+            if self.permutation is not None:
+                data_slots = self.permutation.inverse_range(block_start, block_stop)
+                used = data_slots < slots
+                physical_slots, data_slots = physical_slots[used], data_slots[used]
+
+            indices = self.slot_indices(physical_slots) - first_value
+            window[indices] = (window[indices] & clear_mask) | symbols_at(data_array, data_slots, self.bit_frequency).astype(window.dtype)
+
+    def _check_bit_depth(self, flat: np.ndarray) -> None:
+        # uint8 values carry up to 8 bits per slot, uint16 values up to 16 bits
+        bit_depth = flat.dtype.itemsize * 8
+        if not 1 <= self.bit_frequency <= bit_depth:
+            raise InvalidBitFrequencyError(self.bit_frequency, bit_depth)
+
+    def _check_capacity(self, length: int) -> int:
+        slots = self.slots_for_bytes(length)
+        if slots > self.capacity:
+            raise DataSizeTooLargeError(length, self.capacity_bytes())
+
+        return slots
+
+    def patch(self, flat: np.ndarray, data: Union[bytes, bytearray, memoryview]) -> (Union[slice, np.ndarray], np.ndarray, int):
+        """
+        Computes the new values of the slots receiving the data, without writing them.
+        :param flat: The flat array of the image values
+        :param data: The data to store
+        :return: The slots selector, their new values and the last pixel used (relative to the offset)
+        """
+        self._check_bit_depth(flat)
+        slots = self._check_capacity(len(data))
+        symbols = bytes_to_symbols(data, self.symbol_bits).astype(flat.dtype, copy=False)
+        clear_mask = ~flat.dtype.type(self.mask)
+
+        if self.matrix_bits:
+            selector = (np.arange(slots, dtype=np.int64) + self.offset * self.bands if self.contiguous
+                        else np.concatenate([self.selector(start, stop) for start, stop in self.blocks(0, slots)]))
+            values = flat[selector]
+            values[matrix_changes(values & 1, symbols[:slots // self.group_slots], self.group_slots)] ^= 1
+
+            last_pixel = int(selector.max()) // self.bands - self.offset if self.permutation is not None else self.last_pixel(slots)
+            return selector, values, last_pixel
+
+        if self.contiguous:
+            selector = self.selector(0, slots)
+            return selector, (flat[selector] & clear_mask) | symbols, self.last_pixel(slots)
+
+        selector = np.empty(slots, dtype=np.int64)
+        values = np.empty(slots, dtype=flat.dtype)
+        for start, stop in self.blocks(0, slots):
+            block_selector = selector[start:stop] = self.selector(start, stop)
+            values[start:stop] = (flat[block_selector] & clear_mask) | symbols[start:stop]
+
+        last_pixel = int(selector.max()) // self.bands - self.offset if self.permutation is not None else self.last_pixel(slots)
+        return selector, values, last_pixel
+
+    def _run_bands(self, function, slots: int, workers: int, min_band_slots: int) -> list:
+        bands = self.row_bands(slots, workers, min_band_slots)
+        if len(bands) == 1:
+            return [function(*bands[0])]
+
+        # NumPy releases the GIL on the array operations of the bands
+        with ThreadPoolExecutor(max_workers=len(bands)) as executor:
+            return list(executor.map(lambda band: function(*band), bands))
+
+    def _last_pixel_from_index(self, last_index: int, slots: int) -> int:
+        return last_index // self.bands - self.offset if self.permutation is not None else self.last_pixel(slots)
+
+    def _pixels_view(self, flat: np.ndarray, start: int, stop: int) -> Union[np.ndarray, None]:
+        # Strided (carrier pixels, bands) view of the slots [start, stop[, when they cover whole consecutive pixels
+        if self.permutation is not None or self.planar or start % self.slots_per_pixel or stop % self.slots_per_pixel:
+            return None
+
+        first_value = (self.offset + start // self.slots_per_pixel * self.byte_spacing) * self.bands
+        pixels = (stop - start) // self.slots_per_pixel
+        return flat[first_value:first_value + ((pixels - 1) * self.byte_spacing + 1) * self.bands].reshape(-1, self.bands)[::self.byte_spacing]
+
+    def _plane_views(self, flat: np.ndarray, start: int, stop: int) -> list[tuple[int, int, np.ndarray]]:
+        # Strided views of the values of the slots [start, stop[, split at the plane boundaries
+        views = []
+        while start < stop:
+            plane, first_pixel = divmod(start, self.carrier_pixels)
+            piece_stop = min(stop, (plane + 1) * self.carrier_pixels)
+
+            first_value = (self.offset + first_pixel * self.byte_spacing) * self.bands + int(self.selected_bands[plane])
+            step = self.byte_spacing * self.bands
+            views.append((start, piece_stop, flat[first_value:first_value + (piece_stop - start - 1) * step + 1:step]))
+            start = piece_stop
+
+        return views
+
+    def _write_block(self, flat: np.ndarray, start: int, stop: int, symbols: np.ndarray, clear_mask) -> int:
+        if self.matrix_bits:
+            return self._write_matrix_block(flat, start, stop, symbols)
+
+        if self.planar and self.permutation is None:
+            for piece_start, piece_stop, plane_view in self._plane_views(flat, start, stop):
+                plane_view &= clear_mask
+                plane_view |= symbols[piece_start - start:piece_stop - start]
+            return 0
+
+        pixels_view = None if self.contiguous else self._pixels_view(flat, start, stop)
+
+        if pixels_view is not None:
+            for index, band in enumerate(self.selected_bands):
+                band_view = pixels_view[:, band]
+                band_view &= clear_mask
+                band_view |= symbols[index::self.slots_per_pixel]
+            return 0
+
+        selector = self.selector(start, stop)
+        flat[selector] = (flat[selector] & clear_mask) | symbols
+
+        return int(selector.max()) if self.permutation is not None else 0
+
+    def _write_matrix_block(self, flat: np.ndarray, start: int, stop: int, symbols: np.ndarray) -> int:
+        # Only the LSBs to flip are written, at most one per group
+        lsbs, last_index = self._read_block(flat, start, stop)
+        changes = start + matrix_changes(lsbs, symbols, self.group_slots)
+        flat[self.slot_indices(self.permutation(changes) if self.permutation is not None else changes)] ^= 1
+
+        return last_index
+
+    def _read_block(self, flat: np.ndarray, start: int, stop: int) -> (np.ndarray, int):
+        if self.planar and self.permutation is None:
+            symbols = np.empty(stop - start, dtype=flat.dtype)
+            for piece_start, piece_stop, plane_view in self._plane_views(flat, start, stop):
+                np.bitwise_and(plane_view, self.mask, out=symbols[piece_start - start:piece_stop - start])
+            return symbols, 0
+
+        pixels_view = None if self.contiguous else self._pixels_view(flat, start, stop)
+
+        if pixels_view is not None:
+            symbols = np.empty(stop - start, dtype=flat.dtype)
+            for index, band in enumerate(self.selected_bands):
+                np.bitwise_and(pixels_view[:, band], self.mask, out=symbols[index::self.slots_per_pixel])
+            return symbols, 0
+
+        selector = self.selector(start, stop)
+        return flat[selector] & self.mask, int(selector.max()) if self.permutation is not None else 0
+
+    def embed(self, flat: np.ndarray, data: Union[bytes, bytearray, memoryview], workers: int = 1,
+              min_band_slots: int = MIN_BAND_SLOTS, checkpoint: Union[Callable[[float], None], None] = None) -> int:
+        """
+        Writes the data into the flat array of the image values.
+        :param flat: The flat array of the image values
+        :param data: The data to store
+        :param workers: The number of threads the slots can be split on
+        :param min_band_slots: The minimum number of slots per thread, below which the data is written on a single thread
+        :param checkpoint: optional: called after each block (from any thread) with the fraction of the slots written
+        :return: The last pixel used (relative to the offset)
+        """
+        self._check_bit_depth(flat)
+        slots = self._check_capacity(len(data))
+        advance = counter(checkpoint, slots)
+        data = memoryview(data).cast("B")
+        clear_mask = ~flat.dtype.type(self.mask)
+
+        def embed_band(band_start: int, band_stop: int) -> int:
+            last_index = 0
+            for start, stop in self.blocks(band_start, band_stop):
+                # Blocks start on a data byte boundary, so their symbols only depend on their own bytes
+                block_data = data[self.data_bit(start) // 8:ceil(self.data_bit(stop) / 8)]
+                symbols = bytes_to_symbols(block_data, self.symbol_bits)[:(stop - start) // self.group_slots].astype(flat.dtype, copy=False)
+
+                last_index = max(last_index, self._write_block(flat, start, stop, symbols, clear_mask))
+                advance(stop - start)
+
+            return last_index
+
+        last_indices = self._run_bands(embed_band, slots, workers, min_band_slots)
+        return self._last_pixel_from_index(max(last_indices, default=0), slots)
+
+    def extract(self, flat: np.ndarray, length: int, workers: int = 1, min_band_slots: int = MIN_BAND_SLOTS,
+                checkpoint: Union[Callable[[float], None], None] = None, data_offset: int = 0) -> (bytearray, int):
+        """
+        Reads the given number of bytes from the flat array of the image values.
+        :param flat: The flat array of the image values
+        :param length: The number of bytes to read
+        :param workers: The number of threads the slots can be split on
+        :param min_band_slots: The minimum number of slots per thread, below which the data is read on a single thread
+        :param checkpoint: optional: called after each block (from any thread) with the fraction of the slots read
+        :param data_offset: optional: The position in the data of the first byte to read, a multiple of alignment_bytes, so that a part of
+        the data is read without touching the slots before it
+        :return: The data and the last pixel used (relative to the offset)
+        """
+        if data_offset % self.alignment_bytes:
+            raise ValueError(f"Invalid data offset {data_offset}, expected a multiple of {self.alignment_bytes} bytes.")
+
+        self._check_bit_depth(flat)
+        first_slot = self.slots_for_bytes(data_offset)
+        stop_slot = self._check_capacity(data_offset + length)
+        advance = counter(checkpoint, stop_slot - first_slot)
+        data = bytearray(length)
+        data_array = np.frombuffer(data, dtype=np.uint8)
+
+        def extract_band(band_start: int, band_stop: int) -> int:
+            last_index = 0
+            for start, stop in self.blocks(first_slot + band_start, first_slot + band_stop):
+                symbols, block_last_index = self._read_block(flat, start, stop)
+                last_index = max(last_index, block_last_index)
+                if self.matrix_bits:
+                    symbols = matrix_syndromes(symbols, self.group_slots)
+
+                # Blocks start on a data byte boundary, and all but the last one end on a data byte boundary
+                data_start = self.data_bit(start) // 8 - data_offset
+                data_stop = min(length, self.data_bit(stop) // 8 - data_offset)
+                data_array[data_start:data_stop] = _symbols_to_array(symbols, self.symbol_bits, data_stop - data_start)
+                advance(stop - start)
+
+            return last_index
+
+        # The bands are aligned from the first slot, itself aligned
+        last_indices = self._run_bands(extract_band, stop_slot - first_slot, workers, min_band_slots)
+        return data, self._last_pixel_from_index(max(last_indices, default=0), stop_slot)
+
+
+def plan_slot_layouts(pattern_data: dict, image_channels: str, image_size: tuple[int, int],
+                      header_length: int) -> (Union[SlotLayout, None], SlotLayout):
+    """
+    Computes the header and data slot layouts of a generated pattern. The data position depends on the header size only, so both layouts
+    can be planned before any data is known.
+    :param pattern_data: The pattern dictionary, as returned by Pattern.generate_pattern()
+    :param image_channels: The channels of the image. E.g. "RGBA".
+    :param image_size: The size of the image (width, height)
+    :param header_length: The length of the header (redundancy included), 0 if there is no header
+    :return: The header layout (None if there is no header) and the data layout
+    """
+    position = pattern_data["position"]
+
+    if not header_length:
+        return None, SlotLayout(image_channels, image_size, pattern_data["channels"], pattern_data["bit_frequency"],
+                                pattern_data["byte_spacing"], position, pattern_data["scatter_seed"], pattern_data["layout"],
+                                pattern_data["matrix_embedding"])
+
+    # Compute the header position
+    header_position = 0
+    if pattern_data["header_position"] == "image_start":
+        header_position = 0
+    elif pattern_data["header_position"] == "before_data":
+        header_position = position
+
+    header_layout = SlotLayout(image_channels, image_size, pattern_data["header_channels"], pattern_data["header_bit_frequency"],
+                               pattern_data["header_byte_spacing"], header_position)
+    header_added_offset = header_layout.last_pixel(header_layout.slots_for_bytes(header_length))
+
+    # If header is set to image_start, and the data is not overlapping with the header, don't add the header offset
+    if pattern_data["header_position"] == "image_start" and not ranges_overlap(0, header_added_offset, position, position):
+        data_position = position
+    else:
+        data_position = position + header_added_offset
+
+    data_layout = SlotLayout(image_channels, image_size, pattern_data["channels"], pattern_data["bit_frequency"],
+                             pattern_data["byte_spacing"], data_position, pattern_data["scatter_seed"], pattern_data["layout"],
+                             pattern_data["matrix_embedding"])
+
+    return header_layout, data_layout
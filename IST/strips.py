@@ -0,0 +1,484 @@
+# Internal modules
+import io
+import os
+import struct
+import threading
+import zlib
+from typing import BinaryIO, Iterator, Union
+
+# Project modules
+from .constants import currently_supported_formats
+from .encoder import Encoder
+from .exceptions import NoPatternLoadedError, RequiredParameterMissingError, StripProcessingNotSupportedError, \
+    UnsupportedImageFormatError, UnsupportedTypeForParameterError
+from .pattern import Pattern
+from .progress import Progress
+from .slots import plan_slot_layouts
+from .utils import create_image_from_array, get_image_array, get_image_bit_depth, get_image_channels
+from .log_config import get_logger
+
+# External modules
+import numpy as np
+from PIL import BmpImagePlugin, Image
+
+"""
+Strips.py is a module in the IST (Image Steganography Tools) library that encodes data into very large cover images (e.g. gigapixel scans)
+with a bounded memory. The cover is never decoded as a whole: it is read in horizontal strips of rows, the slots of each strip are written
+(the scattered ones included), and the strip is written to the output image before the next one is read. The peak memory is set by the
+strip budget, whatever the size of the image, the encoded image being identical to the one of the Encoder.
+
+The strips are read from the uncompressed images (BMP, PPM and PGM) by seeking to their rows, and from the non-interlaced PNG images by
+inflating their data stream progressively. The output is written as PNG (row filters and compression applied strip by strip) or as BMP.
+
+Classes and Methods:
+- StripReader: Reads an image strip by strip.
+    - __init__(self, source: Union[str, BinaryIO], max_image_pixels: Union[int, None] = None): Opens the image, reading its header only.
+      Pillow's decompression bomb limit (Image.MAX_IMAGE_PIXELS) only applies to the max_image_pixels given, none by default, the image
+      never being decoded at once.
+    - strips(self, rows: int) -> Iterator[tuple[int, Image.Image]]: Yields the first row and the image of each strip.
+    - close(self): Closes the image.
+- PngStripWriter: Writes a PNG image strip by strip.
+    - __init__(self, output: BinaryIO, size: tuple[int, int], mode: str, palette=None, compress_level: int = 6): Writes the PNG header.
+    - write(self, strip: Image.Image, y: int): Filters, compresses and writes the rows of a strip.
+    - close(self): Writes the end of the image.
+- BmpStripWriter: Writes a BMP image strip by strip, to a seekable output.
+    - __init__(self, output: BinaryIO, size: tuple[int, int], mode: str, palette=None): Writes the BMP header.
+    - write(self, strip: Image.Image, y: int): Writes the rows of a strip.
+    - close(self): Does nothing, the rows being written in place.
+- StripEncoder: An Encoder processing the cover image in strips.
+    - __init__(self, **kwargs): Initializes the StripEncoder object with the keyword arguments of the Encoder, strip_budget and
+      max_image_pixels (the pixels limit of the cover images, None by default).
+    - strip_rows(self, width: int, mode: str) -> int: Returns the number of rows of a strip within the strip budget.
+    - process(self, **kwargs): Hides the data, reading input_path and writing output_path strip by strip.
+
+Usage:
+    from IST import Pattern
+    from IST.strips import StripEncoder
+
+    encoder = StripEncoder(pattern=Pattern(channels="RGB"), strip_budget=64 << 20)
+    encoder.process(input_path="path/to/scan.png", output_path="path/to/processed_scan.png", data="Secret message")
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+logger = get_logger("strips")
+
+# Default memory budget of the strips, in bytes. The slots and the PNG rows are processed in blocks of a fixed size on top of it.
+DEFAULT_STRIP_BUDGET = 64 << 20
+
+# Copies of a strip alive at once (read, unfiltered, values, encoded and output rows), the rows of a strip being sized accordingly
+STRIP_BUFFERS = 6
+
+# Size of the PNG data read at once, and of the rows filtered at once when writing a PNG image
+READ_CHUNK_SIZE = 1 << 16
+FILTER_BLOCK_SIZE = 1 << 18
+
+# Image.MAX_IMAGE_PIXELS is a global of Pillow, only replaced while a header is parsed
+_max_image_pixels_lock = threading.Lock()
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Channels of the PNG color types
+PNG_COLOR_TYPE_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# Modes unfiltering the PNG rows as they are, by bytes per pixel: the filters only depend on the bytes per pixel
+PNG_UNFILTER_MODES = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}
+
+# Raw mode, bit depth and color type of the PNG images written, by image mode
+PNG_OUTPUT_MODES = {
+    "1": ("1", 1, 0),
+    "L": ("L", 8, 0),
+    "LA": ("LA", 8, 4),
+    "I": ("I;16B", 16, 0),
+    "I;16": ("I;16B", 16, 0),
+    "I;16B": ("I;16B", 16, 0),
+    "P": ("P", 8, 3),
+    "RGB": ("RGB", 8, 2),
+    "RGBA": ("RGBA", 8, 6),
+}
+
+# Resolution of the BMP images written, as Pillow writes them: 96 dpi, in pixels per meter
+BMP_PIXELS_PER_METER = int(96 * 39.3701 + 0.5)
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def _paeth(left: np.ndarray, up: np.ndarray, up_left: np.ndarray) -> np.ndarray:
+    left, up, up_left = left.astype(np.int16), up.astype(np.int16), up_left.astype(np.int16)
+    left_distance, up_distance, up_left_distance = np.abs(up - up_left), np.abs(left - up_left), np.abs(left + up - 2 * up_left)
+
+    return np.where((left_distance <= up_distance) & (left_distance <= up_left_distance), left,
+                    np.where(up_distance <= up_left_distance, up, up_left)).astype(np.uint8)
+
+
+def filter_png_rows(rows: np.ndarray, previous_row: np.ndarray, pixel_bytes: int) -> np.ndarray:
+    """
+    Filters PNG rows, choosing for each row the filter with the smallest sum of absolute differences, like libpng does.
+    :param rows: The uint8 array of the raw rows, of shape (rows, row bytes)
+    :param previous_row: The raw row before the first one (zeros for the first row of the image)
+    :param pixel_bytes: The number of bytes per pixel (at least 1)
+    :return: The uint8 array of the filtered rows, each starting with its filter type
+    """
+    up = np.concatenate((previous_row[None], rows[:-1]))
+    left, up_left = np.zeros_like(rows), np.zeros_like(rows)
+    left[:, pixel_bytes:], up_left[:, pixel_bytes:] = rows[:, :-pixel_bytes], up[:, :-pixel_bytes]
+
+    # None, Sub, Up, Average and Paeth, the differences wrapping around
+    average = ((left.astype(np.uint16) + up) >> 1).astype(np.uint8)
+    candidates = np.stack((rows, rows - left, rows - up, rows - average, rows - _paeth(left, up, up_left)))
+
+    scores = np.abs(candidates.view(np.int8).astype(np.int16)).sum(axis=2, dtype=np.int64)
+    filter_types = scores.argmin(axis=0)
+
+    filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = filter_types
+    filtered[:, 1:] = candidates[filter_types, np.arange(rows.shape[0])]
+    return filtered
+
+
+class StripReader:
+    def __init__(self, source: Union[str, BinaryIO], max_image_pixels: Union[int, None] = None):
+        # Pillow only parses the header when opening an image, the pixels are never decoded as a whole: its decompression bomb limit
+        # would reject the very large images strips are made for
+        with _max_image_pixels_lock:
+            max_image_pixels, Image.MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS, max_image_pixels
+            try:
+                self.image = Image.open(source)
+            finally:
+                Image.MAX_IMAGE_PIXELS = max_image_pixels
+        if self.image.format not in currently_supported_formats:
+            self.image.close()
+            raise UnsupportedImageFormatError()
+
+        self.format: str = self.image.format
+        self.mode: str = self.image.mode
+        self.size: tuple[int, int] = self.image.size
+        self.palette: Union[list[int], None] = self.image.getpalette() if self.mode == "P" else None
+
+        if len(self.image.tile) != 1 or self.image.tile[0][1] != (0, 0) + self.size:
+            self.image.close()
+            raise StripProcessingNotSupportedError(f"{self.format} images made of several tiles")
+
+        decoder_name = self.image.tile[0][0]
+        if decoder_name == "raw":
+            pass
+        elif decoder_name == "zip" and self.format == "PNG":
+            if self.image.info.get("interlace", 0):
+                self.image.close()
+                raise StripProcessingNotSupportedError("the rows of interlaced PNG images are spread over the whole image")
+        else:
+            self.image.close()
+            raise StripProcessingNotSupportedError(f"{self.format} images with {decoder_name} data")
+
+    def __enter__(self) -> "StripReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def strips(self, rows: int) -> Iterator[tuple[int, Image.Image]]:
+        """
+        Reads the image strip by strip.
+        :param rows: The number of rows of a strip
+        :return: For each strip, from the top of the image, its first row and its image
+        """
+        if self.image.tile[0][0] == "raw":
+            return self._raw_strips(max(rows, 1))
+
+        return self._png_strips(max(rows, 1))
+
+    def _raw_strips(self, rows: int) -> Iterator[tuple[int, Image.Image]]:
+        _, _, offset, args = self.image.tile[0][:4]
+        raw_mode, stride, orientation = (tuple(args) + (0, 1))[:3] if isinstance(args, tuple) else (args, 0, 1)
+        width, height = self.size
+
+        if not stride:
+            stride = len(Image.new(self.mode, (width, 1)).tobytes("raw", raw_mode))
+
+        for y in range(0, height, rows):
+            count = min(rows, height - y)
+
+            # Bottom-up images (e.g. BMP) store the strip rows reversed, from the row below the strip
+            first_row = y if orientation > 0 else height - y - count
+            self.image.fp.seek(offset + first_row * stride)
+            data = self.image.fp.read(count * stride)
+            if len(data) < count * stride:
+                raise OSError("image file is truncated")
+
+            yield y, Image.frombytes(self.mode, (width, count), data, "raw", raw_mode, stride, orientation)
+
+    def _idat_data(self) -> Iterator[bytes]:
+        # The compressed data stream of a PNG image, split over its IDAT chunks
+        fp = self.image.fp
+        fp.seek(len(PNG_SIGNATURE))
+
+        while True:
+            chunk_header = fp.read(8)
+            if len(chunk_header) < 8:
+                return
+            length, chunk_type = struct.unpack(">I4s", chunk_header)
+
+            if chunk_type == b"IDAT":
+                while length:
+                    data = fp.read(min(length, READ_CHUNK_SIZE))
+                    if not data:
+                        return
+                    length -= len(data)
+                    yield data
+                fp.seek(4, os.SEEK_CUR)
+            elif chunk_type == b"IEND":
+                return
+            else:
+                fp.seek(length + 4, os.SEEK_CUR)
+
+    def _png_strips(self, rows: int) -> Iterator[tuple[int, Image.Image]]:
+        raw_mode = self.image.tile[0][3]
+        width, height = self.size
+
+        self.image.fp.seek(len(PNG_SIGNATURE) + 8)
+        _, _, bit_depth, color_type = struct.unpack(">IIBB", self.image.fp.read(10))
+        row_bytes = (width * bit_depth * PNG_COLOR_TYPE_CHANNELS[color_type] + 7) // 8
+        pixel_bytes = max(1, bit_depth * PNG_COLOR_TYPE_CHANNELS[color_type] // 8)
+
+        unfilter_mode = PNG_UNFILTER_MODES.get(pixel_bytes, None)
+        if unfilter_mode is None:
+            raise StripProcessingNotSupportedError(f"PNG images of {pixel_bytes} bytes per pixel")
+
+        inflater = zlib.decompressobj()
+        idat_data = self._idat_data()
+        filtered = bytearray()
+        previous_row = b""
+
+        for y in range(0, height, rows):
+            count = min(rows, height - y)
+            needed = count * (row_bytes + 1)
+
+            # Only the rows of the strip are inflated
+            while len(filtered) < needed:
+                if inflater.unconsumed_tail:
+                    filtered += inflater.decompress(inflater.unconsumed_tail, needed - len(filtered))
+                    continue
+
+                data = next(idat_data, None)
+                if data is None:
+                    raise OSError("image file is truncated")
+                filtered += inflater.decompress(data, needed - len(filtered))
+
+            # The rows are unfiltered by the PNG decoder of Pillow, as an image of the same bytes per pixel. The filters of the first row
+            # refer to the previous strip, whose last row is given back unfiltered (filter type 0) before the strip rows.
+            strip_data = (b"\x00" + previous_row if previous_row else b"") + filtered[:needed]
+            del filtered[:needed]
+            strip_rows = count + (1 if previous_row else 0)
+            unfiltered = Image.frombytes(unfilter_mode, (row_bytes // pixel_bytes, strip_rows), zlib.compress(strip_data, 0), "zip",
+                                         unfilter_mode).tobytes()
+            del strip_data
+
+            strip = memoryview(unfiltered)[len(previous_row):]
+            previous_row = bytes(strip[-row_bytes:])
+
+            yield y, Image.frombytes(self.mode, (width, count), strip, "raw", raw_mode)
+
+    def close(self) -> None:
+        self.image.close()
+
+
+class PngStripWriter:
+    def __init__(self, output: BinaryIO, size: tuple[int, int], mode: str, palette: Union[list[int], None] = None,
+                 compress_level: int = 6):
+        if mode not in PNG_OUTPUT_MODES:
+            raise StripProcessingNotSupportedError(f"{mode} images can't be written as PNG")
+
+        self.output = output
+        self.size = size
+        self.mode = mode
+        self.raw_mode, bit_depth, color_type = PNG_OUTPUT_MODES[mode]
+
+        self.row_bytes = (size[0] * bit_depth * PNG_COLOR_TYPE_CHANNELS[color_type] + 7) // 8
+        self.pixel_bytes = max(1, bit_depth * PNG_COLOR_TYPE_CHANNELS[color_type] // 8)
+        self.previous_row = np.zeros(self.row_bytes, dtype=np.uint8)
+        self.compressor = zlib.compressobj(compress_level)
+
+        output.write(PNG_SIGNATURE)
+        output.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", size[0], size[1], bit_depth, color_type, 0, 0, 0)))
+        if mode == "P":
+            output.write(_png_chunk(b"PLTE", bytes(palette or [value for value in range(256) for _ in range(3)])))
+
+    def write(self, strip: Image.Image, y: int) -> None:
+        """
+        Filters, compresses and writes the rows of a strip. The strips must be written in order.
+        :param strip: The image of the strip
+        :param y: The first row of the strip
+        """
+        rows = np.frombuffer(strip.tobytes("raw", self.raw_mode), dtype=np.uint8).reshape(-1, self.row_bytes)
+
+        # The rows are filtered by blocks, the candidate filters of a block being computed at once
+        block_rows = max(1, FILTER_BLOCK_SIZE // self.row_bytes)
+        for start in range(0, len(rows), block_rows):
+            block = rows[start:start + block_rows]
+            compressed = self.compressor.compress(filter_png_rows(block, self.previous_row, self.pixel_bytes))
+            self.previous_row = block[-1]
+
+            if compressed:
+                self.output.write(_png_chunk(b"IDAT", compressed))
+
+    def close(self) -> None:
+        self.output.write(_png_chunk(b"IDAT", self.compressor.flush()))
+        self.output.write(_png_chunk(b"IEND", b""))
+
+
+class BmpStripWriter:
+    def __init__(self, output: BinaryIO, size: tuple[int, int], mode: str, palette: Union[list[int], None] = None):
+        if mode not in BmpImagePlugin.SAVE:
+            raise StripProcessingNotSupportedError(f"{mode} images can't be written as BMP")
+        if not output.seekable():
+            raise StripProcessingNotSupportedError("the rows of BMP images are written bottom-up, to a seekable output")
+
+        self.output = output
+        self.size = size
+        self.raw_mode, bits, colors = BmpImagePlugin.SAVE[mode]
+        self.stride = ((size[0] * bits + 7) // 8 + 3) & ~3
+
+        if mode == "1":
+            color_table = b"\x00" * 4 + b"\xff" * 4
+        elif mode == "L":
+            color_table = b"".join(bytes((value,)) * 4 for value in range(256))
+        elif mode == "P":
+            palette = palette or [value for value in range(256) for _ in range(3)]
+            color_table = b"".join(bytes((palette[index + 2], palette[index + 1], palette[index], 0)) for index in range(0, len(palette), 3))
+            colors = len(color_table) // 4
+        else:
+            color_table = b""
+
+        # The headers written by Pillow, so that the image is identical to the one of the Encoder
+        self.data_offset = 14 + 40 + colors * 4
+        image_size = self.stride * size[1]
+        if self.data_offset + image_size > 2 ** 32 - 1:
+            raise StripProcessingNotSupportedError("the image is too large for the BMP format")
+
+        output.write(b"BM" + struct.pack("<IIIIiiHHIIiiII", self.data_offset + image_size, 0, self.data_offset, 40, size[0], size[1], 1,
+                                         bits, 0, image_size, BMP_PIXELS_PER_METER, BMP_PIXELS_PER_METER, colors, colors))
+        output.write(color_table)
+        self.start = output.tell() - self.data_offset
+
+    def write(self, strip: Image.Image, y: int) -> None:
+        """
+        Writes the rows of a strip at their place, the strips being written in any order.
+        :param strip: The image of the strip
+        :param y: The first row of the strip
+        """
+        self.output.seek(self.start + self.data_offset + (self.size[1] - y - strip.size[1]) * self.stride)
+        self.output.write(strip.tobytes("raw", self.raw_mode, self.stride, -1))
+
+    def close(self) -> None:
+        self.output.seek(self.start + self.data_offset + self.size[1] * self.stride)
+
+
+STRIP_WRITERS = {"PNG": PngStripWriter, "BMP": BmpStripWriter}
+
+
+class StripEncoder(Encoder):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        # Memory budget of the strips, in bytes
+        self.strip_budget: int = kwargs.get("strip_budget", DEFAULT_STRIP_BUDGET)
+
+        # Pixels limit of the cover images (see Image.MAX_IMAGE_PIXELS), None for no limit
+        self.max_image_pixels: Union[int, None] = kwargs.get("max_image_pixels", None)
+
+    def strip_rows(self, width: int, mode: str) -> int:
+        """
+        Returns the number of rows of a strip, so that the copies of a strip alive at once fit in the strip budget.
+        :param width: The width of the image
+        :param mode: The mode of the image
+        :return: The number of rows, at least 1
+        """
+        # Pillow keeps at least 4 bytes per pixel, the values array 1 or 2 bytes per channel
+        row_size = width * max(4, len(Image.new(mode, (1, 1)).getbands()) * get_image_bit_depth(mode) // 8)
+        return max(1, self.strip_budget // (row_size * STRIP_BUFFERS))
+
+    def process(self, **kwargs) -> None:
+        input_path = kwargs.get("input_path", None)
+        output_path = kwargs.get("output_path", None)
+        if not input_path:
+            raise RequiredParameterMissingError("input_path")
+        if not output_path:
+            raise RequiredParameterMissingError("output_path")
+        for name, path in [("input_path", input_path), ("output_path", output_path)]:
+            if not isinstance(path, (str, io.IOBase)):
+                raise UnsupportedTypeForParameterError(name, path, (str, io.IOBase))
+
+        pattern: Pattern = kwargs.get("pattern", None)
+        if pattern:
+            if not isinstance(pattern, Pattern):
+                raise UnsupportedTypeForParameterError("pattern", pattern, Pattern)
+            self.load_pattern(pattern)
+        elif not self.pattern:
+            raise NoPatternLoadedError()
+
+        if "progress_callback" in kwargs or "cancel_token" in kwargs:
+            self.progress = Progress(kwargs.get("progress_callback", self.progress.callback),
+                                     kwargs.get("cancel_token", self.progress.cancel_token))
+
+        with StripReader(input_path, self.max_image_pixels) as reader:
+            # Binary streams have no extension, they are written in the given format or in the format of the cover image
+            image_format = kwargs.get("image_format", None)
+            if image_format is None:
+                image_format = output_path.split(".")[-1] if isinstance(output_path, str) else reader.format
+            image_format = image_format.upper()
+            if image_format not in STRIP_WRITERS:
+                raise StripProcessingNotSupportedError(f"{image_format} images are not written in strips, use PNG or BMP")
+
+            self.progress("prepare", 0.0)
+            data = self._prepare_data(kwargs.get("data", None), kwargs.get("file", None), self.get_pipeline().reserved_size)
+
+            image_channels = get_image_channels(reader.mode)
+            pattern_data = self.pattern.generate_pattern(image_channels)
+            if pattern_data["matrix_embedding"]:
+                # The values of a group are read before one of them is written, and a group may straddle several strips
+                raise StripProcessingNotSupportedError("matrix embedding writes each group of slots depending on all its values")
+            data = self._apply_data_transforms(data, pattern_data, reader.size, reader.mode, get_image_bit_depth(reader.mode), True)
+            header = self._generate_header(data, pattern_data)
+
+            # The header is written before the data, so that the data wins on the values they share, like Encoder
+            header_layout, data_layout = plan_slot_layouts(pattern_data, image_channels, reader.size, len(header))
+            layouts = [(header_layout, header), (data_layout, data)] if header_layout is not None else [(data_layout, data)]
+            writes = [(layout, np.concatenate((np.frombuffer(payload, dtype=np.uint8), np.zeros(2, dtype=np.uint8))),
+                       layout._check_capacity(len(payload))) for layout, payload in layouts]
+
+            if isinstance(output_path, str):
+                with open(output_path, "wb") as output:
+                    try:
+                        self._encode_strips(reader, output, image_format, writes)
+                    except BaseException:
+                        output.close()
+                        os.remove(output_path)
+                        raise
+            else:
+                self._encode_strips(reader, output_path, image_format, writes)
+
+        self.progress("save", 1.0, check=False)
+
+    def _encode_strips(self, reader: StripReader, output: BinaryIO, image_format: str, writes: list) -> None:
+        width, height = reader.size
+        bands = len(get_image_channels(reader.mode))
+        rows = self.strip_rows(width, reader.mode)
+        logger.debug(f"Encoding {width}x{height} image in strips of {rows} rows")
+
+        writer = STRIP_WRITERS[image_format](output, reader.size, reader.mode, reader.palette)
+        checkpoint = self.progress.stage("embed")
+
+        for y, strip in reader.strips(rows):
+            checkpoint(y / height)
+
+            values = get_image_array(strip)
+            flat = values.reshape(-1)
+            for layout, data_array, slots in writes:
+                layout.embed_window(flat, y * width * bands, data_array, slots)
+
+            writer.write(create_image_from_array(values, reader.mode, strip.size), y)
+
+        self.progress("save", 0.0)
+        writer.close()
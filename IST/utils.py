@@ -1,14 +1,16 @@
 # Internal modules
+from functools import lru_cache
 from math import ceil, floor
-from typing import Union
+from typing import Callable, Union
 
 # Project modules
-from .exceptions import UnsupportedImageFormatError
+from .exceptions import ImageValuesOutOfRangeError, InvalidImageArrayError, UnsupportedImageFormatError, UnsupportedTypeForParameterError
 
 # External modules
 import PIL
-from PIL import Image
-from reedsolo import RSCodec
+from PIL import Image, ImageMode
+from reedsolo import init_tables, rs_correct_msg, rs_encode_msg, rs_generator_poly
+import numpy as np
 
 from l10n import Locales
 
@@ -32,6 +34,114 @@ def get_image_pixels(img: Image) -> list[tuple[int, ...], ...]:
     return list(img.getdata())
 
 
+# Pillow modes of 16-bit carriers. 16-bit grayscale PNG and PGM images are opened in the 32-bit "I" mode, holding 16-bit values, the "I"
+# images holding values out of the 16-bit range are refused (see get_image_array()).
+HIGH_BIT_DEPTH_MODES = {
+    "I;16": "<u2",
+    "I;16L": "<u2",
+    "I;16B": ">u2",
+    "I": "<u2",
+}
+
+# Size of the strips of values exported at once from an image
+EXPORT_STRIP_BYTES = 1 << 16
+
+
+def get_image_channels(mode: str) -> str:
+    """
+    Returns the channels of an image mode, as a string of band names (e.g. "RGBA" for "RGBA", "I" for "I;16"). A string that is not a
+    Pillow mode is considered to already be a channels string.
+    :param mode: The Pillow image mode
+    :return: str
+    """
+    try:
+        return "".join(ImageMode.getmode(mode).bands)
+    except KeyError:
+        return mode
+
+
+def get_image_bit_depth(mode: str) -> int:
+    """
+    Returns the number of bits of each channel value of an image mode, 16 for high bit-depth modes and 8 otherwise.
+    :param mode: The Pillow image mode
+    :return: int
+    """
+    return 16 if mode in HIGH_BIT_DEPTH_MODES else 8
+
+
+def get_image_array(img: Image, writable: bool = True) -> np.ndarray:
+    """
+    Returns the image's values as an array of shape (height, width, bands), of uint16 values for high bit-depth images and of uint8
+    values otherwise. The values of "I" images must be 16-bit values.
+    :param img: the Pillow image object
+    :param writable: optional: When False, the array is read-only
+    :return: np.ndarray
+    """
+    width, height = img.size
+    bands = len(img.getbands())
+    if img.mode == "I" and width and height:
+        # Only the 32-bit images holding 16-bit values are 16-bit carriers, the other ones would be truncated
+        extrema = img.getextrema()
+        if extrema[0] < 0 or extrema[1] > 0xFFFF:
+            raise ImageValuesOutOfRangeError(img.mode, extrema)
+
+    if not width or not height:
+        return np.asarray(img, dtype=np.uint16 if img.mode in HIGH_BIT_DEPTH_MODES else None).reshape(height, width, bands)
+
+    # The values are exported strip by strip, exporting the whole image at once goes through bytes copies of twice its size
+    rows = max(EXPORT_STRIP_BYTES // (width * bands), 1)
+    array = None
+    for top in range(0, height, rows):
+        strip = np.asarray(img.crop((0, top, width, min(top + rows, height))))
+        if array is None:
+            array = np.empty((height, width, bands), dtype=np.uint16 if img.mode in HIGH_BIT_DEPTH_MODES else strip.dtype)
+        array[top:top + rows] = strip.reshape(-1, width, bands)
+
+    array.flags.writeable = writable
+    return array
+
+
+def check_image_array(array: np.ndarray, mode: str) -> tuple[int, int]:
+    """
+    Checks that an array can hold the values of an image of the given mode.
+    :param array: The uint8 or uint16 values array, of shape (height, width, bands), or (height, width) for single band modes
+    :param mode: The image mode
+    :return: The size of the image (width, height)
+    """
+    if not isinstance(array, np.ndarray):
+        raise UnsupportedTypeForParameterError("array", array, np.ndarray)
+
+    try:
+        bands = Image.getmodebands(mode)
+    except (KeyError, ValueError):
+        raise InvalidImageArrayError(array.shape, mode)
+
+    # 8-bit modes also accept uint16 arrays, holding 16-bit values of the same channels
+    if array.dtype not in (np.uint8, np.uint16) or (mode in HIGH_BIT_DEPTH_MODES and array.dtype != np.uint16):
+        raise InvalidImageArrayError(array.shape, mode, array.dtype)
+
+    if not (array.ndim == 3 and array.shape[2] == bands) and not (array.ndim == 2 and bands == 1):
+        raise InvalidImageArrayError(array.shape, mode)
+
+    return array.shape[1], array.shape[0]
+
+
+def create_image_from_array(array: np.ndarray, mode: str, size: tuple[int, int]) -> Image:
+    """
+    Creates a new image from the given array of values.
+    :param array: the values array, of shape (height, width, bands) or flat
+    :param mode: the image mode
+    :param size: a tuple with size of the image (x, y)
+    :return:
+    """
+    if mode in HIGH_BIT_DEPTH_MODES:
+        dtype = HIGH_BIT_DEPTH_MODES[mode]
+        return Image.frombytes(mode, size, np.ascontiguousarray(array, dtype=dtype), "raw", "I;16B" if dtype == ">u2" else "I;16")
+
+    # The array buffer is read directly, without an intermediate bytes copy
+    return Image.frombytes(mode, size, np.ascontiguousarray(array))
+
+
 def create_image_from_pixels(pixels: list, mode: str, size: tuple[int, int], ext: Union[str, None] = None) -> Image:
     """
     Creates a new image from the given list of pixels and prepares the image for saving it in desired format.
@@ -60,16 +170,34 @@ def create_image_from_pixels(pixels: list, mode: str, size: tuple[int, int], ext
     return img
 
 
-# Reed Solomon
+# Reed Solomon, over the GF(2^8) field of reedsolo. Its tables are module globals, rebound by init_tables() (and so by each RSCodec
+# constructor): they are initialized once here, and the chunks are coded by the functional API of reedsolo instead of RSCodec objects, so
+# that threads never see the tables being rebuilt
+_gf_log, _gf_exp, _ = init_tables()
+_gf_log = np.array(_gf_log, dtype=np.int32)
+_gf_exp = np.array(_gf_exp, dtype=np.uint8)
+
+# GF_MUL_TABLE[a] is the multiplication by a of all the field elements, so that GF_MUL_TABLE[a][values] multiplies a whole array
+GF_MUL_TABLE = _gf_exp[_gf_log[:, None] + _gf_log[None, :]]
+GF_MUL_TABLE[0, :] = 0
+GF_MUL_TABLE[:, 0] = 0
+
 RS_CHUNK_SIZE = 255
 
+# Number of chunks checked at once by rs_check_chunks(), its temporaries take about 16 bytes per symbol of the batch
+RS_CHECK_BATCH_SIZE = 1024
+
 
-def rs_encode(data: Union[bytearray, bytes], correction_factor: Union[float, int] = 0.5) -> bytearray:
+def rs_encode(data: Union[bytearray, bytes, memoryview], correction_factor: Union[float, int] = 0.5,
+              checkpoint: Union[Callable[[float], None], None] = None,
+              out: Union[bytearray, memoryview, None] = None) -> Union[bytearray, memoryview]:
     """
     Encodes the given data using Reed Solomon algorithm.
     :param data: The data to encode
     :param correction_factor: The correction factor
-    :return: The encoded data
+    :param checkpoint: optional: called before each chunk with the fraction of the data encoded
+    :param out: optional: A writable buffer of rs_encoded_size() bytes the chunks are written to, allocated when None
+    :return: The encoded data (out, when given)
     """
     data_size = len(data)
     total_redundant_symbols = ceil(round(correction_factor * data_size * 2, 10))
@@ -80,15 +208,21 @@ def rs_encode(data: Union[bytearray, bytes], correction_factor: Union[float, int
     if num_chunks == 0:
         return data
 
+    # The encoded size is planned beforehand, so that each chunk is written in place instead of growing the output
+    encoded_size = rs_encoded_size(data_size, correction_factor)
+    if out is None:
+        out = bytearray(encoded_size)
+    elif len(out) != encoded_size:
+        raise ValueError(f"The output buffer holds {len(out)} bytes, {encoded_size} bytes are encoded")
+
     remaining_data_symbols = data_size
     remaining_redundant_symbols = total_redundant_symbols
 
-    rs_sum = 0
-    data_sum = 0
-
-    i = 0
-    encoded_data = bytearray()
+    position = 0
     while remaining_data_symbols > 0:
+        if checkpoint is not None:
+            checkpoint(1 - remaining_data_symbols / data_size)
+
         max_data_symbols_in_chunk = floor(RS_CHUNK_SIZE / (1 + correction_factor * 2))
         data_symbols = min(remaining_data_symbols, max_data_symbols_in_chunk)
         rs_redundant_symbols = min(remaining_redundant_symbols, ceil(correction_factor * data_symbols * 2))
@@ -96,78 +230,239 @@ def rs_encode(data: Union[bytearray, bytes], correction_factor: Union[float, int
         chunk_start = data_size - remaining_data_symbols
         chunk_end = chunk_start + data_symbols
 
-        data_chunk = data[chunk_start:chunk_end]
-        data_symbols = len(data_chunk)
-
         remaining_data_symbols -= data_symbols
         remaining_redundant_symbols -= rs_redundant_symbols
 
-        # print(f"Chunk {i}: {data_symbols} data symbols, {rs_redundant_symbols} redundant symbols")
-        data_sum += data_symbols
-        rs_sum += rs_redundant_symbols
+        encoded_chunk = rs_encode_msg(data[chunk_start:chunk_end], rs_redundant_symbols, gen=_rs_generator(rs_redundant_symbols))
 
-        rs = RSCodec(rs_redundant_symbols, nsize=RS_CHUNK_SIZE)
-        encoded_chunk = rs.encode(data_chunk)
+        out[position:position + len(encoded_chunk)] = encoded_chunk
+        position += len(encoded_chunk)
 
-        encoded_data.extend(encoded_chunk)
-        i += 1
+    return out
 
-    # print(f"Total: {data_sum} data symbols, {rs_sum} redundant symbols")
 
-    return encoded_data
+def rs_encoded_size(data_size: int, correction_factor: Union[float, int] = 0.5) -> int:
+    """
+    Returns the size of data once encoded by rs_encode(), computed from the chunks plan without encoding anything.
+    :param data_size: The size of the data to encode
+    :param correction_factor: The correction factor
+    :return: The size of the encoded data
+    """
+    if data_size <= 0:
+        return data_size
+
+    total_redundant_symbols = ceil(round(correction_factor * data_size * 2, 10))
+    max_data_symbols_in_chunk = floor(RS_CHUNK_SIZE / (1 + correction_factor * 2))
+
+    # Each chunk takes the redundant symbols it needs from the remaining ones, so that the chunks take their total needs, up to the total
+    full_chunks, last_chunk_symbols = divmod(data_size, max_data_symbols_in_chunk)
+    chunks_redundant_symbols = full_chunks * ceil(correction_factor * max_data_symbols_in_chunk * 2)
+    if last_chunk_symbols:
+        chunks_redundant_symbols += ceil(correction_factor * last_chunk_symbols * 2)
 
+    return data_size + min(total_redundant_symbols, chunks_redundant_symbols)
 
-def rs_decode(encoded_data: Union[bytearray, bytes], used_correction_factor: Union[float, int] = 0.5) -> bytearray:
+
+def rs_decode(encoded_data: Union[bytearray, bytes], used_correction_factor: Union[float, int] = 0.5,
+              checkpoint: Union[Callable[[float], None], None] = None) -> bytearray:
     """
-    Decodes the given data using Reed Solomon algorithm.
+    Decodes the given data using Reed Solomon algorithm. The code being systematic, the chunks without any error (all their syndromes,
+    checked in bulk, are zero) hold their data as is, only the other chunks are corrected.
     :param encoded_data: The encoded data to decode
     :param used_correction_factor: The correction factor used to encode the data
+    :param checkpoint: optional: called before each corrected chunk with the fraction of the data decoded
     :return: The decoded data
     """
 
     encoded_data_size = len(encoded_data)
 
-    decoded_data = bytearray()
     remaining_data_symbols = floor(round(encoded_data_size / (1 + used_correction_factor * 2), 10))
     remaining_redundant_symbols = encoded_data_size - remaining_data_symbols
 
-    data_sum = 0
-    rs_sum = 0
+    total_data_symbols = remaining_data_symbols
 
-    i = 0
+    # Chunks layout (start, data symbols, redundant symbols), as split by rs_encode()
+    chunks = []
     while remaining_data_symbols > 0:
         max_data_symbols_in_chunk = floor(RS_CHUNK_SIZE / (1 + used_correction_factor * 2))
         data_symbols = min(remaining_data_symbols, max_data_symbols_in_chunk)
         rs_redundant_symbols = min(remaining_redundant_symbols, ceil(used_correction_factor * data_symbols * 2))
 
-        chunk_start = encoded_data_size - remaining_data_symbols - remaining_redundant_symbols
-        chunk_end = chunk_start + data_symbols + rs_redundant_symbols
-
-        encoded_chunk = encoded_data[chunk_start:chunk_end]
+        chunks.append((encoded_data_size - remaining_data_symbols - remaining_redundant_symbols, data_symbols, rs_redundant_symbols))
 
         remaining_data_symbols -= data_symbols
         remaining_redundant_symbols -= rs_redundant_symbols
 
-        # print(f"Chunk {i}: {data_symbols} data symbols, {rs_redundant_symbols} redundant symbols")
-        data_sum += data_symbols
-        rs_sum += rs_redundant_symbols
+    if checkpoint is not None:
+        checkpoint(0.0)
 
-        if rs_redundant_symbols == 0:
-            decoded_data.extend(encoded_chunk)
-            continue
+    clean = rs_check_chunks(encoded_data, chunks)
 
-        rs = RSCodec(rs_redundant_symbols, nsize=RS_CHUNK_SIZE)
-        decoded_chunk, _, _ = rs.decode(encoded_chunk)
-
-        decoded_data.extend(decoded_chunk[:data_symbols])
+    decoded_data = bytearray()
+    decoded_symbols = 0
+    for (chunk_start, data_symbols, rs_redundant_symbols), chunk_clean in zip(chunks, clean):
+        if chunk_clean or rs_redundant_symbols == 0:
+            decoded_data += encoded_data[chunk_start:chunk_start + data_symbols]
+        else:
+            if checkpoint is not None:
+                checkpoint(decoded_symbols / total_data_symbols)
 
-        i += 1
+            decoded_chunk, _, _ = rs_correct_msg(encoded_data[chunk_start:chunk_start + data_symbols + rs_redundant_symbols], rs_redundant_symbols)
+            decoded_data += decoded_chunk[:data_symbols]
 
-    # print(f"Total: {data_sum} data symbols, {rs_sum} redundant symbols")
+        decoded_symbols += data_symbols
 
     return decoded_data
 
 
+def rs_check_chunks(encoded_data: Union[bytearray, bytes], chunks: list[tuple[int, int, int]]) -> np.ndarray:
+    """
+    Checks in bulk which Reed Solomon chunks are free of errors, i.e. have all their syndromes equal to zero.
+    :param encoded_data: The encoded data
+    :param chunks: The chunks, as (start, data symbols, redundant symbols) tuples
+    :return: A boolean array, True for the chunks without any error (chunks running past the data are never clean)
+    """
+    values = np.frombuffer(encoded_data, dtype=np.uint8)
+    clean = np.zeros(len(chunks), dtype=bool)
+
+    # Chunks of the same shape are checked together, as rows of a matrix
+    shapes = {}
+    for index, (chunk_start, data_symbols, rs_redundant_symbols) in enumerate(chunks):
+        if rs_redundant_symbols and chunk_start + data_symbols + rs_redundant_symbols <= len(values):
+            shapes.setdefault((data_symbols + rs_redundant_symbols, rs_redundant_symbols), []).append(index)
+
+    for (length, rs_redundant_symbols), indices in shapes.items():
+        # Degree of each symbol in the codeword polynomial, the first symbol having the highest degree
+        degrees = np.arange(length - 1, -1, -1, dtype=np.int32)
+
+        for batch_start in range(0, len(indices), RS_CHECK_BATCH_SIZE):
+            batch = np.array(indices[batch_start:batch_start + RS_CHECK_BATCH_SIZE])
+            starts = np.array([chunks[index][0] for index in batch])
+            codewords = values[starts[:, None] + np.arange(length)]
+
+            nonzero = codewords != 0
+            logs = _gf_log[codewords]
+            batch_clean = np.ones(len(batch), dtype=bool)
+
+            # Syndrome i is the codeword polynomial evaluated at alpha^i (reedsolo's fcr=0 and generator=2)
+            for i in range(rs_redundant_symbols):
+                exponents = logs + i * degrees
+                exponents %= 255
+                terms = np.where(nonzero, _gf_exp[exponents], 0)
+                batch_clean &= np.bitwise_xor.reduce(terms, axis=1) == 0
+
+                if not batch_clean.any():
+                    break
+
+            clean[batch] = batch_clean
+
+    return clean
+
+
+@lru_cache(maxsize=None)
+def _rs_generator(rs_redundant_symbols: int) -> bytearray:
+    # Only reads the tables, a generator polynomial computed twice by concurrent threads is the same
+    return rs_generator_poly(rs_redundant_symbols)
+
+
+# Erasure coding (Reed Solomon across shards, over the same GF(2^8) field as reedsolo)
+ERASURE_MAX_SHARDS = 255
+
+
+def gf_inverse(value: int) -> int:
+    """
+    Returns the multiplicative inverse of a non-zero GF(2^8) element.
+    :param value: The element
+    :return: The inverse
+    """
+    return int(_gf_exp[255 - _gf_log[value]])
+
+
+def _erasure_matrix(data_count: int, parity_count: int) -> np.ndarray:
+    """
+    Returns the Cauchy matrix generating the parity shards. Any square matrix made of rows of the identity and of this matrix is
+    invertible, so that any data_count shards are enough to rebuild the data shards.
+    """
+    if data_count < 1 or parity_count < 0 or data_count + parity_count > ERASURE_MAX_SHARDS:
+        raise ValueError(f"Invalid shard counts ({data_count} data, {parity_count} parity), at most {ERASURE_MAX_SHARDS} shards in total.")
+
+    matrix = np.zeros((parity_count, data_count), dtype=np.uint8)
+    for row in range(parity_count):
+        for column in range(data_count):
+            matrix[row, column] = gf_inverse((data_count + row) ^ column)
+
+    return matrix
+
+
+def _gf_combine(coefficients: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Returns the linear combination of the given rows with the given coefficients.
+    """
+    combination = np.zeros(rows.shape[1], dtype=np.uint8)
+    for coefficient, row in zip(coefficients, rows):
+        if coefficient:
+            combination ^= GF_MUL_TABLE[coefficient][row]
+
+    return combination
+
+
+def _gf_invert_matrix(matrix: np.ndarray) -> np.ndarray:
+    """
+    Inverts a square GF(2^8) matrix with Gauss-Jordan elimination.
+    """
+    size = len(matrix)
+    augmented = np.concatenate([matrix, np.eye(size, dtype=np.uint8)], axis=1)
+
+    for column in range(size):
+        pivot = column + int(np.flatnonzero(augmented[column:, column])[0])
+        augmented[[column, pivot]] = augmented[[pivot, column]]
+        augmented[column] = GF_MUL_TABLE[gf_inverse(augmented[column, column])][augmented[column]]
+
+        for row in np.flatnonzero(augmented[:, column]):
+            if row != column:
+                augmented[row] ^= GF_MUL_TABLE[augmented[row, column]][augmented[column]]
+
+    return augmented[:, size:]
+
+
+def erasure_encode(shards: list[Union[bytes, bytearray]], parity_count: int) -> list[bytes]:
+    """
+    Computes the parity shards of the given data shards, so that any len(shards) of the data and parity shards are enough to rebuild
+    the data shards.
+    :param shards: The data shards, all of the same size
+    :param parity_count: The number of parity shards to compute
+    :return: The parity shards
+    """
+    matrix = _erasure_matrix(len(shards), parity_count)
+    rows = np.frombuffer(b"".join(shards), dtype=np.uint8).reshape(len(shards), -1)
+
+    return [_gf_combine(coefficients, rows).tobytes() for coefficients in matrix]
+
+
+def erasure_decode(shards: dict[int, Union[bytes, bytearray]], data_count: int, parity_count: int) -> list[bytes]:
+    """
+    Rebuilds the data shards from any data_count of the data and parity shards.
+    :param shards: The available shards, by shard index (data shards first, then parity shards)
+    :param data_count: The number of data shards
+    :param parity_count: The number of parity shards
+    :return: The data shards
+    """
+    if len(shards) < data_count:
+        raise ValueError(f"Not enough shards to rebuild the data ({len(shards)}/{data_count}).")
+
+    # Prefer the data shards, that do not need any computation
+    indices = sorted(shards)[:data_count]
+    if indices == list(range(data_count)):
+        return [bytes(shards[index]) for index in indices]
+
+    generator = np.concatenate([np.eye(data_count, dtype=np.uint8), _erasure_matrix(data_count, parity_count)])
+    decoding_matrix = _gf_invert_matrix(generator[indices])
+    rows = np.frombuffer(b"".join(shards[index] for index in indices), dtype=np.uint8).reshape(data_count, -1)
+
+    return [bytes(shards[index]) if index in shards else _gf_combine(decoding_matrix[index], rows).tobytes()
+            for index in range(data_count)]
+
+
 def calculate_byte_distance(candidate_byte: int, neighbors: list[int]) -> int:
     """
     Calculates the distance between a candidate byte and its neighbors.
@@ -0,0 +1,292 @@
+# Internal modules
+import base64
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Union
+
+# Project modules
+from .cache import DecodeCache, file_content_hash
+from .constants import currently_supported_formats
+from .container import unpack_files
+from .decoder import Decoder
+from .exceptions import RequiredParameterMissingError, WatchDirectoryNotFoundError
+from .pattern import Pattern
+from .log_config import get_logger
+
+"""
+Watch.py is a module in the IST (Image Steganography Tools) library that provides an ingestion daemon for spool directories. The watcher
+scans the directories for new or changed images, decodes them on a pool of threads and emits one JSON result per image. The processed files
+are recorded in an on-disk index (path, size, modification time, content hash and status), so that a file is never decoded twice, even
+across restarts: an unchanged file costs one stat() call per scan, and the CPU only goes to the new arrivals. The processed images can be
+moved to a done or a failed directory.
+
+A file is only picked up once its modification time is older than the settle delay, so that images still being written are not decoded.
+
+Classes and Methods:
+- FolderWatcher: Watches spool directories and decodes the new or changed images.
+    - __init__(self, **kwargs): Initializes the FolderWatcher object with keyword arguments (directories, pattern, index_path, done_directory,
+      failed_directory, extract_directory, workers, interval, settle, encoding, cache, output).
+    - scan(self) -> list[tuple[str, os.stat_result]]: Returns the new or changed images ready to be decoded.
+    - process_file(self, path: str, stat: os.stat_result) -> Union[dict, None]: Decodes an image, records it in the index, moves it and
+      emits its result. Returns the result, or None when its content was already processed.
+    - run(self, once: bool = False) -> int: Scans and decodes the new images until stopped (or once), returns the number of results emitted.
+    - stop(self): Stops the run loop after the images being decoded.
+    - close(self): Closes the index.
+
+Usage:
+    from IST import FolderWatcher, Pattern
+
+    watcher = FolderWatcher(directories=["path/to/spool"], pattern=Pattern(), done_directory="path/to/done",
+                            failed_directory="path/to/failed")
+    watcher.run()  # Prints one JSON line per image, until watcher.stop() is called
+
+This module is part of the IST (Image Steganography Tools) library, which provides a comprehensive set of tools for hiding and extracting data within images.
+"""
+
+logger = get_logger("watch")
+
+# Name of the index created in the first watched directory when no index path is given
+DEFAULT_INDEX_NAME = ".ist_index.sqlite"
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    location TEXT NOT NULL,
+    error TEXT,
+    processed_at REAL NOT NULL
+);
+"""
+
+
+def _available_path(directory: str, name: str, content_hash: str) -> str:
+    # An existing file is never overwritten, the name of the new one is suffixed with its content hash, then with a counter
+    path = os.path.join(directory, name)
+    stem, extension = os.path.splitext(name)
+    suffix = 0
+    while os.path.exists(path):
+        path = os.path.join(directory, f"{stem}-{content_hash[:12]}{f'-{suffix}' if suffix else ''}{extension}")
+        suffix += 1
+
+    return path
+
+
+class FolderWatcher:
+    def __init__(self, **kwargs):
+        self.directories: list[str] = [os.path.abspath(directory) for directory in kwargs.get("directories", None) or []]
+        if not self.directories:
+            raise RequiredParameterMissingError("directories")
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                raise WatchDirectoryNotFoundError(directory)
+
+        self.pattern: Union[Pattern, None] = kwargs.get("pattern", None)
+        self.encoding: str = kwargs.get("encoding", "utf-8")
+        self.cache: Union[DecodeCache, None] = kwargs.get("cache", None)
+
+        # Processed images are left in place when no directory is given
+        self.done_directory: Union[str, None] = kwargs.get("done_directory", None)
+        self.failed_directory: Union[str, None] = kwargs.get("failed_directory", None)
+        self.extract_directory: Union[str, None] = kwargs.get("extract_directory", None) or self.done_directory
+        for directory in [self.done_directory, self.failed_directory, self.extract_directory]:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        # Seconds between two scans, and minimum age of a file before it is decoded
+        self.interval: float = kwargs.get("interval", 1.0)
+        self.settle: float = kwargs.get("settle", 1.0)
+
+        # Each image is decoded on its own thread
+        self.workers: int = kwargs.get("workers", os.cpu_count() or 1)
+
+        # Called with the result of each image, writes JSON lines to the standard output by default
+        self.output: Callable[[dict], None] = kwargs.get("output", None) or self._write_json_line
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._in_flight: set[str] = set()
+
+        index_path = kwargs.get("index_path", None) or os.path.join(self.directories[0], DEFAULT_INDEX_NAME)
+        self._connection = sqlite3.connect(index_path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(INDEX_SCHEMA)
+
+        # The stat of the indexed files is kept in memory, so that a scan only compares the directory entries to it
+        self._known: dict[str, tuple[int, int]] = {
+            path: (size, mtime_ns) for path, size, mtime_ns in self._connection.execute("SELECT path, size, mtime_ns FROM files")
+        }
+
+    @staticmethod
+    def _write_json_line(result: dict) -> None:
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+    def scan(self) -> list[tuple[str, os.stat_result]]:
+        """
+        Lists the images of the watched directories which are not indexed, or changed since, and old enough to be complete.
+        :return: The paths and stats of the images to decode
+        """
+        now = time.time_ns()
+        ready = []
+
+        for directory in self.directories:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or entry.name.rsplit(".", 1)[-1].upper() not in currently_supported_formats:
+                        continue
+                    if entry.path in self._in_flight or not entry.is_file():
+                        continue
+
+                    stat = entry.stat()
+                    if self._known.get(entry.path, None) == (stat.st_size, stat.st_mtime_ns):
+                        continue
+                    if now - stat.st_mtime_ns < self.settle * 1e9:
+                        continue
+
+                    ready.append((entry.path, stat))
+
+        return ready
+
+    def _decode(self, path: str, content_hash: str) -> dict:
+        decoder = Decoder(pattern=self.pattern, encoding=self.encoding, workers=1, cache=self.cache)
+        try:
+            payload = decoder.process(file_path=path, raw=True)
+        finally:
+            decoder.unload_image()
+
+        data_type, file_name, content = decoder.split_payload(payload)
+        if data_type == 0:
+            return {"type": "text", "data": str(content, self.encoding)}
+        elif data_type == 2:
+            return {"type": "bytes", "data_base64": base64.b64encode(content).decode("ascii")}
+        elif data_type == 3:
+            # The files of a container, written like a single file
+            file_paths = []
+            for name, file_content in unpack_files(content, self.encoding):
+                file_path = _available_path(self.extract_directory or os.path.dirname(path), os.path.basename(name) or "extracted_file",
+                                            content_hash)
+                with open(file_path, "wb") as file:
+                    file.write(file_content)
+                file_paths.append(file_path)
+            return {"type": "files", "files": file_paths}
+        else:
+            # The file name comes from the image, only its base name is kept so that nothing is written outside the extract directory
+            file_path = _available_path(self.extract_directory or os.path.dirname(path), os.path.basename(file_name) or "extracted_file",
+                                        content_hash)
+            with open(file_path, "wb") as file:
+                file.write(content)
+            return {"type": "file", "file": file_path}
+
+    def process_file(self, path: str, stat: os.stat_result) -> Union[dict, None]:
+        """
+        Decodes an image, moves it to the done or failed directory, records it in the index and emits its result.
+        :param path: The path of the image
+        :param stat: The stat of the image when it was scanned
+        :return: The result, or None when the image was left in place with the content it was already processed with
+        """
+        start = time.perf_counter()
+        result = {"path": path, "size": stat.st_size}
+
+        try:
+            content_hash = file_content_hash(path)
+        except OSError as error:
+            # The file was removed or is not readable yet, it is picked up again by a later scan if it changes
+            logger.warning(f"Skipping {path}: {error}")
+            return None
+
+        with self._lock:
+            row = self._connection.execute("SELECT content_hash, location FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row == (content_hash, path):
+            # Touched but not changed, only its stat is updated
+            with self._lock:
+                self._connection.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", (stat.st_size, stat.st_mtime_ns, path))
+                self._known[path] = (stat.st_size, stat.st_mtime_ns)
+            return None
+
+        result["content_hash"] = content_hash
+        error = None
+        try:
+            result.update(self._decode(path, content_hash))
+            result["status"] = "done"
+        except Exception as decoding_error:
+            # Any failure of a single image (damaged data, corrupted compression, wrong pattern...) moves it to the failed directory, a
+            # bad image never stops the watcher
+            error = f"{type(decoding_error).__name__}: {decoding_error}"
+            result.update(status="failed", error=error)
+
+        location = path
+        destination = self.done_directory if result["status"] == "done" else self.failed_directory
+        if destination:
+            location = _available_path(destination, os.path.basename(path), content_hash)
+            try:
+                shutil.move(path, location)
+                result["moved_to"] = location
+            except OSError as move_error:
+                logger.warning(f"Could not move {path} to {destination}: {move_error}")
+                location = path
+
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                     (path, stat.st_size, stat.st_mtime_ns, content_hash, result["status"], location, error, time.time()))
+            self._known[path] = (stat.st_size, stat.st_mtime_ns)
+
+        result["elapsed"] = round(time.perf_counter() - start, 6)
+        self.output(result)
+
+        return result
+
+    def run(self, once: bool = False) -> int:
+        """
+        Scans the watched directories every interval and decodes the new or changed images, until stop() is called.
+        :param once: Whether to return once the images found by a single scan are processed
+        :return: The number of results emitted
+        """
+        self._stop.clear()
+        emitted = 0
+        scanned = False
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            while True:
+                if not self._stop.is_set() and not (once and scanned):
+                    scanned = True
+                    for path, stat in self.scan():
+                        self._in_flight.add(path)
+                        futures[executor.submit(self.process_file, path, stat)] = path
+
+                if not futures:
+                    if once or self._stop.wait(self.interval):
+                        break
+                    continue
+
+                # A new scan starts as soon as an image is processed, or after the interval
+                done, _ = wait(futures, timeout=None if once or self._stop.is_set() else self.interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = futures.pop(future)
+                    self._in_flight.discard(path)
+                    try:
+                        if future.result() is not None:
+                            emitted += 1
+                    except Exception as error:
+                        # An error outside of the decoding (e.g. of the index), the other images are still processed
+                        logger.error(f"Could not process {path}: {type(error).__name__}: {error}")
+
+        logger.info(f"{emitted} images processed")
+        return emitted
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -1,8 +1,55 @@
 # Internal modules
 import argparse
+import json
+import os
+import signal
+import sys
+from contextlib import contextmanager
+from math import isinf
+from typing import Union
 
 # Project modules
-from IST import Encoder, Decoder, Pattern, version
+from IST import Encoder, Decoder, DecodeCache, FolderWatcher, Pattern, version
+from IST.analysis import analyze
+from IST.capacity import capacity_report
+from IST.profiling import Profiler
+from IST.strips import StripEncoder
+from IST.constants import currently_supported_formats_string
+
+# Size of the chunks read from the standard input and written to the outputs
+STREAM_CHUNK_SIZE = 1 << 20
+
+
+def read_stream(stream) -> bytearray:
+    data = bytearray()
+    while chunk := stream.read(STREAM_CHUNK_SIZE):
+        data += chunk
+
+    return data
+
+
+def write_stream(stream, data) -> None:
+    view = memoryview(data)
+    for offset in range(0, len(view), STREAM_CHUNK_SIZE):
+        stream.write(view[offset:offset + STREAM_CHUNK_SIZE])
+    stream.flush()
+
+
+@contextmanager
+def profile(output_path: Union[str, None]):
+    # Yields the progress callback of the run, a Profiler when profiling, None otherwise
+    if not output_path:
+        yield None
+        return
+
+    with Profiler(output_path) as profiler:
+        yield profiler
+
+    # The summary goes to the standard error, the standard output may carry the image or the data
+    summary = profiler.summary()
+    stages = ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in summary["stages"].items())
+    print(f"Profile: {summary['wall_time']:.3f} s ({stages}), peak traced memory {summary['peak_traced_memory'] / 2 ** 20:.1f} MB, "
+          f"written to {output_path}.prof, {output_path}.folded and {output_path}.json", file=sys.stderr)
 
 
 def add_pattern_arguments(parser):
@@ -13,8 +60,17 @@ def add_pattern_arguments(parser):
     pattern_group.add_argument("--channels", default="all",
                                help="Channels to be used for encoding. "
                                     "When None, empty, 'all' or unknown, all channels are used. (default: 'all')")
-    pattern_group.add_argument("--bit-frequency", type=int, default=1, help="Frequency of bits used for encoding (default: 1)")
+    pattern_group.add_argument("--bit-frequency", type=int, default=1, help="Frequency of bits used for encoding, up to 8 for 8-bit images and 16 for 16-bit images (default: 1)")
     pattern_group.add_argument("--byte-spacing", type=int, default=1, help="Spacing between bytes in the encoding (default: 1)")
+    pattern_group.add_argument("--layout", choices=["interleaved", "planar"], default="interleaved",
+                               help="Order of the carrier slots: the channels of each pixel in turn, or the plane of each channel in turn "
+                                    "(default: interleaved)")
+    pattern_group.add_argument("--matrix-embedding", type=int, default=0, metavar="K",
+                               help="Write K bits into each group of 2^K - 1 slots, changing at most one value per group (2 to 7, with a "
+                                    "bit frequency of 1, default: 0, disabled)")
+    pattern_group.add_argument("--scatter-seed", default=None,
+                               help="Secret seed spreading the data over the image with a keyed pseudo-random permutation of the "
+                                    "carrier slots. When not set, the data is written in consecutive slots. (default: None)")
     pattern_group.add_argument("--hash-check", default="sha256",
                                help="Hash algorithm for data integrity check. Set to 'none' to disable. (default: 'sha256')")
     pattern_group.add_argument("--compression", default="none", help="Data compression method. Options: 'zlib', 'none' (default)")
@@ -32,7 +88,8 @@ def add_pattern_arguments(parser):
     pattern_group.add_argument("--header-write-data-size", action="store", nargs="?", const=True, default=True, type=bool,
                                help="Enable or disable writing data size in the header (default: True)")
     pattern_group.add_argument("--header-write-pattern", action="store", nargs="?", const=True, default=False, type=bool,
-                               help="Enable writing pattern in the header (default: False)")
+                               help="Enable writing the pattern in the header. Images encoded with it are decoded with this option "
+                                    "only, plus the header options and scatter seed if they were changed (default: False)")
     pattern_group.add_argument("--header-channels", default="auto",
                                help="Channels to be used for header encoding. "
                                     "When 'auto', channels are selected based on header discoverability. (default: 'auto')")
@@ -56,28 +113,99 @@ def main():
 
     # Encoder
     encode_parser = subparsers.add_parser("encode", help="Encode data into an image")
-    encode_parser.add_argument("input_image", help="Path to the input image")
-    encode_parser.add_argument("output_image", help="Path to the output image")
+    encode_parser.add_argument("input_image", help="Path to the input image, or - to read it from the standard input")
+    encode_parser.add_argument("output_image", help="Path to the output image, or - to write it to the standard output")
     encode_parser.add_argument("--data", help="Data to be encoded")
-    encode_parser.add_argument("--data-file", help="Path to a file containing data to be encoded")
+    encode_parser.add_argument("--data-file",
+                               help="Path to a file containing data to be encoded, or - to read raw bytes from the standard input")
+    encode_parser.add_argument("--files", nargs="+", default=None, metavar="PATH",
+                               help="Paths to several files encoded in a multi-file container, each one can then be listed and extracted "
+                                    "on its own")
+    encode_parser.add_argument("--format", default=None,
+                               help=f"Format of the output image ({currently_supported_formats_string}) (default: from the output path, "
+                                    f"or the format of the input image when written to the standard output)")
+    encode_parser.add_argument("--workers", type=int, default=None,
+                               help="Number of threads used to embed large data (default: number of CPUs)")
+    encode_parser.add_argument("--strip-budget", type=float, default=None, metavar="MB",
+                               help="Encode the image in strips of rows within this memory budget, for images too large to be decoded "
+                                    "at once (PNG or BMP output only)")
+    encode_parser.add_argument("--profile", default=None, metavar="PATH",
+                               help="Profile the run, writing PATH.prof (cProfile), PATH.folded (flamegraph stacks) and PATH.json (stage "
+                                    "times and peak memory)")
     add_pattern_arguments(encode_parser)
 
     # Decoder
     decode_parser = subparsers.add_parser("decode", help="Decode data from an image")
-    decode_parser.add_argument("input_image", help="Path to the input image")
+    decode_parser.add_argument("input_image", help="Path to the input image, or - to read it from the standard input")
+    decode_parser.add_argument("--output", "-o", default=None,
+                               help="Path to write the decoded data to as raw bytes, or - for the standard output (default: print it)")
+    decode_parser.add_argument("--workers", type=int, default=None,
+                               help="Number of threads used to extract large data (default: number of CPUs)")
+    decode_parser.add_argument("--list", action="store_true",
+                               help="List the files of a multi-file container, reading only its index")
+    decode_parser.add_argument("--entry", default=None, metavar="NAME",
+                               help="Extract a single file of a multi-file container, written to --output or to a file of its name")
+    decode_parser.add_argument("--cache", default=None,
+                               help="Path to a decoding cache database, returning the stored result of an image already decoded with the "
+                                    "same pattern (default: no cache)")
+    decode_parser.add_argument("--profile", default=None, metavar="PATH",
+                               help="Profile the run, writing PATH.prof (cProfile), PATH.folded (flamegraph stacks) and PATH.json (stage "
+                                    "times and peak memory)")
     add_pattern_arguments(decode_parser)
 
+    # Watcher
+    watch_parser = subparsers.add_parser("watch", help="Decode the images dropped into spool directories, printing one JSON line per image")
+    watch_parser.add_argument("directories", nargs="+", help="Paths to the watched directories")
+    watch_parser.add_argument("--index", default=None,
+                              help="Path to the index of the processed files (default: .ist_index.sqlite in the first directory)")
+    watch_parser.add_argument("--done-dir", default=None, help="Directory the decoded images are moved to (default: left in place)")
+    watch_parser.add_argument("--failed-dir", default=None, help="Directory the images failing to decode are moved to (default: left in place)")
+    watch_parser.add_argument("--extract-dir", default=None, help="Directory the extracted files are written to (default: --done-dir)")
+    watch_parser.add_argument("--interval", type=float, default=1.0, help="Seconds between two scans (default: 1)")
+    watch_parser.add_argument("--settle", type=float, default=1.0,
+                              help="Seconds a file must be left unmodified before it is decoded (default: 1)")
+    watch_parser.add_argument("--workers", type=int, default=None, help="Number of images decoded in parallel (default: number of CPUs)")
+    watch_parser.add_argument("--cache", default=None, help="Path to a decoding cache database (default: no cache)")
+    watch_parser.add_argument("--once", action="store_true", help="Process the images found by a single scan, then exit")
+    add_pattern_arguments(watch_parser)
+
+    # Capacity
+    capacity_parser = subparsers.add_parser("capacity", help="Compute the payload capacity of images, reading only their headers")
+    capacity_parser.add_argument("images", nargs="+", help="Paths to the images, or to directories of images")
+    capacity_parser.add_argument("--patterns", default=None,
+                                 help="Path to a JSON file mapping pattern names to Pattern keyword arguments (default: the pattern options)")
+    capacity_parser.add_argument("--file", action="store_true", help="Count the file name stored along with a file payload")
+    capacity_parser.add_argument("--min-capacity", type=int, default=None, help="Only list the images holding at least this many bytes")
+    capacity_parser.add_argument("--json", action="store_true", help="Print one JSON object per image and pattern")
+    capacity_parser.add_argument("--workers", type=int, default=None, help="Number of threads reading the headers (default: number of CPUs)")
+    add_pattern_arguments(capacity_parser)
+
+    # Analysis
+    analyze_parser = subparsers.add_parser("analyze", help="Check the distortion and detectability of an encoded image")
+    analyze_parser.add_argument("input_image", help="Path to the encoded image")
+    analyze_parser.add_argument("--cover", help="Path to the cover image, to measure the distortion")
+    analyze_parser.add_argument("--block-size", type=int, default=16, help="Side of the blocks of the modified regions map (default: 16)")
+    analyze_parser.add_argument("--map", action="store_true", help="Print the map of the modified blocks")
+    analyze_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    analyze_parser.add_argument("--min-psnr", type=float, default=None, help="Fail when the PSNR is lower, in dB (requires --cover)")
+    analyze_parser.add_argument("--min-ssim", type=float, default=None, help="Fail when the SSIM is lower (requires --cover)")
+    analyze_parser.add_argument("--max-detectability", type=float, default=None,
+                                help="Fail when a steganalysis statistic of a channel is higher, between 0 and 1")
+
     # Version
     version_parser = subparsers.add_parser("version", help="Show the current version of the package")
 
     args = parser.parse_args()
 
-    if args.command in ["encode", "decode"]:
+    if args.command in ["encode", "decode", "watch", "capacity"]:
         pattern = Pattern(
             offset=args.offset,
             channels=args.channels,
             bit_frequency=args.bit_frequency,
             byte_spacing=args.byte_spacing,
+            layout=args.layout,
+            matrix_embedding=args.matrix_embedding,
+            scatter_seed=args.scatter_seed,
             hash_check=args.hash_check,
             compression=args.compression,
             compression_strength=args.compression_strength,
@@ -98,19 +226,142 @@ def main():
         )
 
         if args.command == "encode":
-            if not (args.data or args.data_file):
-                parser.error("Either --data or --data-file must be provided for encoding")
+            if not (args.data or args.data_file or args.files):
+                parser.error("Either --data, --data-file or --files must be provided for encoding")
+            if args.files and args.strip_budget:
+                parser.error("A multi-file container cannot be encoded in strips")
+            if args.input_image == "-" and args.data_file == "-":
+                parser.error("The input image and the data file cannot both be read from the standard input")
+
+            # The data read from the standard input is hidden as raw bytes, without any file name
+            data, file = args.data, args.data_file
+            if file == "-":
+                data, file = read_stream(sys.stdin.buffer), None
 
-            encoder = Encoder(pattern=pattern)
-            encoder.load_image(args.input_image)
-            encoder.process(data=args.data, file=args.data_file, output_path=args.output_image)
-            print(f"Data encoded into {args.output_image}")
+            if args.strip_budget:
+                encoder = StripEncoder(pattern=pattern, strip_budget=int(args.strip_budget * (1 << 20)))
+            else:
+                encoder = Encoder(pattern=pattern, workers=args.workers or os.cpu_count() or 1)
+            with profile(args.profile) as profiler:
+                encoder.process(input_path=sys.stdin.buffer if args.input_image == "-" else args.input_image, data=data, file=file,
+                                files=args.files, output_path=sys.stdout.buffer if args.output_image == "-" else args.output_image, image_format=args.format,
+                                progress_callback=profiler)
+
+            if args.output_image == "-":
+                sys.stdout.buffer.flush()
+            else:
+                print(f"Data encoded into {args.output_image}")
 
         elif args.command == "decode":
-            decoder = Decoder(pattern=pattern)
-            decoder.load_image(args.input_image)
-            decoded_data = decoder.process()
-            print("Decoded data:", decoded_data)
+            cache = DecodeCache(args.cache) if args.cache else None
+            decoder = Decoder(pattern=pattern, workers=args.workers or os.cpu_count() or 1, cache=cache)
+            # The image is only loaded when its result is not cached
+            file_path = sys.stdin.buffer if args.input_image == "-" else args.input_image
+
+            if args.list:
+                # Only the index of the container is read
+                for entry in decoder.list_entries(file_path=file_path):
+                    print(f"{entry.size:>12}  {entry.name}")
+            elif args.entry is not None:
+                extracted = decoder.extract_entry(args.entry, file_path=file_path)
+                if args.output == "-":
+                    write_stream(sys.stdout.buffer, extracted.content)
+                else:
+                    # The entry name comes from the image, only its base name is kept
+                    output_path = args.output or os.path.basename(extracted.name) or "extracted_file"
+                    with open(output_path, "wb") as output_file:
+                        write_stream(output_file, extracted.content)
+                    print(f"File '{extracted.name}' has been extracted to {output_path}")
+            elif args.output:
+                # The content is written as raw bytes: text in its encoding, files without their name
+                with profile(args.profile) as profiler:
+                    _, _, content = decoder.split_payload(decoder.process(file_path=file_path, raw=True, progress_callback=profiler))
+                if args.output == "-":
+                    write_stream(sys.stdout.buffer, content)
+                else:
+                    with open(args.output, "wb") as output_file:
+                        write_stream(output_file, content)
+            else:
+                with profile(args.profile) as profiler:
+                    decoded_data = decoder.process(file_path=file_path, progress_callback=profiler)
+                print("Decoded data:", decoded_data)
+
+        elif args.command == "capacity":
+            patterns = {"default": pattern}
+            if args.patterns:
+                with open(args.patterns) as patterns_file:
+                    patterns = {name: Pattern(**pattern_kwargs) for name, pattern_kwargs in json.load(patterns_file).items()}
+
+            if not args.json:
+                print(f"{'image':<40}{'size':>12}{'mode':>6}{'format':>7}{'pattern':>12}{'capacity':>12}{'bits/change':>13}")
+
+            for result in capacity_report(args.images, patterns, file=args.file, workers=args.workers):
+                if args.min_capacity is not None and result.get("capacity", -1) < args.min_capacity:
+                    continue
+
+                if args.json:
+                    print(json.dumps(result))
+                elif "error" in result:
+                    print(f"{result['path']:<40}{'':>25}{result['pattern']:>12}  {result['error']}")
+                else:
+                    size = f"{result['width']}x{result['height']}"
+                    print(f"{result['path']:<40}{size:>12}{result['mode']:>6}{result['format']:>7}{result['pattern']:>12}"
+                          f"{result['capacity']:>12}{result['efficiency']:>13.2f}")
+
+        elif args.command == "watch":
+            watcher = FolderWatcher(directories=args.directories, pattern=pattern, index_path=args.index, done_directory=args.done_dir,
+                                    failed_directory=args.failed_dir, extract_directory=args.extract_dir, interval=args.interval,
+                                    settle=args.settle, workers=args.workers or os.cpu_count() or 1,
+                                    cache=DecodeCache(args.cache) if args.cache else None)
+
+            # The images being decoded are finished before exiting
+            signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+            try:
+                watcher.run(once=args.once)
+            except KeyboardInterrupt:
+                watcher.stop()
+            finally:
+                watcher.close()
+
+    elif args.command == "analyze":
+        if (args.min_psnr is not None or args.min_ssim is not None) and not args.cover:
+            parser.error("--cover must be provided to check the PSNR or the SSIM")
+
+        report = analyze(args.input_image, cover=args.cover, block_size=args.block_size)
+        quality = report.get("quality", None)
+        block_map = ["".join("#" if block else "." for block in row) for row in quality["modified_blocks"]] if quality else []
+
+        if args.json:
+            # The report is printed from a copy, the PSNR of identical images is infinite, which JSON can't represent
+            json_report = report
+            if quality:
+                json_report = {**report, "quality": {**quality, "modified_blocks": block_map,
+                                                     "psnr": None if isinf(quality["psnr"]) else quality["psnr"]}}
+            print(json.dumps(json_report, indent=4, allow_nan=False))
+        else:
+            print(f"Image: {args.input_image} ({report['size'][0]}x{report['size'][1]}, channels {report['channels']})")
+            for channel, statistics in report["steganalysis"].items():
+                print(f"Channel {channel}: chi-square {statistics['chi_square']:.3f}, RS {statistics['rs']:.3f}, "
+                      f"sample pairs {statistics['sample_pairs']:.3f}")
+
+            if quality:
+                print(f"PSNR: {quality['psnr']:.2f} dB, SSIM: {quality['ssim']:.6f}, modified box: {quality['modified_box']}")
+                for channel, changes in quality["changed_bits"].items():
+                    print(f"Channel {channel}: {changes['values']} values and {changes['bits']} bits changed, by bit plane {changes['planes']}")
+                if args.map:
+                    print("\n".join(block_map))
+
+        failures = []
+        if args.min_psnr is not None and quality["psnr"] < args.min_psnr:
+            failures.append(f"PSNR {quality['psnr']:.2f} dB below {args.min_psnr} dB")
+        if args.min_ssim is not None and quality["ssim"] < args.min_ssim:
+            failures.append(f"SSIM {quality['ssim']:.6f} below {args.min_ssim}")
+        if args.max_detectability is not None:
+            failures += [f"Channel {channel} detectability {detectability:.3f} above {args.max_detectability}"
+                         for channel, detectability in report["detectability"].items() if detectability > args.max_detectability]
+
+        if failures:
+            parser.exit(1, "\n".join(failures) + "\n")
 
     elif args.command == "version":
         print(f"Image Steganography Tools v{version}")
@@ -1,20 +1,25 @@
 # Internal modules
 import base64
-import io
+import itertools
 import os
+import queue
+import shutil
 import sys
-import threading
-
-from PIL import Image
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Project modules
-from IST import Encoder, Decoder, Pattern
+from IST import CancelToken, Encoder, Decoder, Pattern
+from IST.exceptions import OperationCancelledError
 
 # External modules
 import eel
 
-
-main_lock = threading.Lock()
+try:
+    import tkinter
+    from tkinter import filedialog
+except ImportError:
+    tkinter = None
 
 
 def is_chrome_installed():
@@ -44,47 +49,173 @@ if not is_chrome_installed():
 eel.init("web")
 
 
-@eel.expose
-def encode_data(input_image, output_image, data, file_name, pattern):
-    with main_lock:
+# Jobs run on a pool of real threads, so that the Eel (gevent) loop stays responsive. The workers never call Eel themselves: they post
+# events on a queue, forwarded to the window by a greenlet of the Eel loop.
+executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+events = queue.Queue()
+jobs = {}
+job_ids = itertools.count(1)
+
+uploads = {}
+upload_ids = itertools.count(1)
+uploads_directory = tempfile.mkdtemp(prefix="ist-gui-")
+
+
+class Job:
+    def __init__(self, kind: str, temporary_paths: list[str]):
+        self.id = next(job_ids)
+        self.kind = kind
+        self.temporary_paths = temporary_paths
+        self.cancel_token = CancelToken()
+        self.future = None
+        self.last_progress = (None, 0.0)
+
+    def progress(self, stage: str, fraction: float) -> None:
+        # Progress callback of the pipeline, throttled to one event per stage and percent
+        last_stage, last_fraction = self.last_progress
+        if stage != last_stage or fraction - last_fraction >= 0.01 or fraction == 1.0:
+            self.last_progress = (stage, fraction)
+            events.put(("job_progress", (self.id, stage, fraction)))
+
+    def run(self, function, *args) -> None:
         try:
-            input_image_content = base64.b64decode(input_image.split(',')[1])
-            input_image_file = io.BytesIO(input_image_content)
-            input_image_pil = Image.open(input_image_file)
-
-            encoder = Encoder(image=input_image_pil)
-            encoder.load_pattern(Pattern.from_dict(pattern))
-            if isinstance(data, str) and data.startswith("data:"):
-                data_content = base64.b64decode(data.split(',')[1])
-                data_file = io.BytesIO(data_content)
-                data_file.name = file_name  # Set the name attribute for the io.BytesIO object
-                encoder.process(file=data_file, output_path=output_image)
-            else:
-                encoder.process(data=data, output_path=output_image)
-            return f"Data encoded and saved to {output_image}"
+            result = function(self, *args)
+            events.put(("job_finished", (self.id, "done", result)))
+        except OperationCancelledError:
+            events.put(("job_finished", (self.id, "cancelled", f"{self.kind.capitalize()} cancelled")))
         except Exception as e:
-            return f"Error while encoding: {e}"
+            events.put(("job_finished", (self.id, "failed", f"Error while {self.kind}: {e}")))
+        finally:
+            self.cleanup()
 
+    def cleanup(self) -> None:
+        # Only uploaded files are removed, never files chosen by path
+        for path in self.temporary_paths:
+            directory = os.path.dirname(os.path.abspath(path))
+            if os.path.commonpath([directory, uploads_directory]) == uploads_directory and directory != uploads_directory:
+                shutil.rmtree(directory, ignore_errors=True)
+        jobs.pop(self.id, None)
 
-@eel.expose
-def decode_data(input_image, pattern, enforce_provided_pattern, data_length):
-    with main_lock:
+
+def submit_job(kind: str, function, temporary_paths: list[str], *args) -> int:
+    job = Job(kind, temporary_paths)
+    jobs[job.id] = job
+    job.future = executor.submit(job.run, function, *args)
+    events.put(("job_progress", (job.id, "queued", 0.0)))
+    return job.id
+
+
+def forward_events():
+    while True:
         try:
-            if data_length:
-                data_length = int(data_length)
+            while True:
+                name, args = events.get_nowait()
+                getattr(eel, name)(*args)
+        except queue.Empty:
+            pass
 
-            input_image_content = base64.b64decode(input_image.split(',')[1])
-            input_image_file = io.BytesIO(input_image_content)
-            input_image_pil = Image.open(input_image_file)
+        eel.sleep(0.05)
 
-            decoder = Decoder(image=input_image_pil)
-            decoder.load_pattern(Pattern.from_dict(pattern))
-            decoded_data = decoder.process(enforce_provided_pattern=bool(enforce_provided_pattern), data_length=data_length)
-            return f"Decoded data: {decoded_data}"
-        except Exception as e:
-            return f"Error while decoding: {e}"
+
+# Transfers: files are either chosen by path, or uploaded in chunks written to a temporary file
+@eel.expose
+def choose_file(title):
+    if tkinter is None:
+        return None
+
+    root = tkinter.Tk()
+    root.withdraw()
+    root.attributes("-topmost", True)
+    path = filedialog.askopenfilename(title=title)
+    root.destroy()
+
+    return path or None
+
+
+@eel.expose
+def begin_upload(file_name):
+    upload_id = next(upload_ids)
+
+    # One directory per upload, so that the file keeps its original name (embedded along with file data)
+    directory = tempfile.mkdtemp(dir=uploads_directory)
+    path = os.path.join(directory, os.path.basename(file_name))
+    uploads[upload_id] = (path, open(path, "wb"))
+
+    return upload_id
+
+
+@eel.expose
+def upload_chunk(upload_id, chunk):
+    uploads[upload_id][1].write(base64.b64decode(chunk))
 
 
+@eel.expose
+def end_upload(upload_id):
+    path, file = uploads.pop(upload_id)
+    file.close()
+
+    return path
+
+
+@eel.expose
+def cancel_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return False
+
+    job.cancel_token.cancel()
+
+    # A job still waiting in the pool is cancelled right away
+    if job.future is not None and job.future.cancel():
+        job.cleanup()
+        events.put(("job_finished", (job_id, "cancelled", f"{job.kind.capitalize()} cancelled")))
+
+    return True
+
+
+# Jobs
+def run_encode(job, input_path, output_image, data, data_path, pattern):
+    encoder = Encoder(pattern=Pattern.from_dict(pattern), progress_callback=job.progress, cancel_token=job.cancel_token)
+    encoder.load_image(input_path)
+
+    try:
+        if data_path:
+            encoder.process(file=data_path, output_path=output_image)
+        else:
+            encoder.process(data=data, output_path=output_image)
+    finally:
+        encoder.unload_image()
+
+    return f"Data encoded and saved to {output_image}"
+
+
+def run_decode(job, input_path, pattern, enforce_provided_pattern, data_length):
+    decoder = Decoder(pattern=Pattern.from_dict(pattern), progress_callback=job.progress, cancel_token=job.cancel_token)
+    decoder.load_image(input_path)
+
+    try:
+        decoded_data = decoder.process(enforce_provided_pattern=bool(enforce_provided_pattern), data_length=data_length)
+    finally:
+        decoder.unload_image()
+
+    return f"Decoded data: {decoded_data}"
+
+
+@eel.expose
+def encode_data(input_path, output_image, data, data_path, pattern, temporary_paths=None):
+    return submit_job("encoding", run_encode, temporary_paths or [], input_path, output_image, data, data_path, pattern)
+
+
+@eel.expose
+def decode_data(input_path, pattern, enforce_provided_pattern, data_length, temporary_paths=None):
+    data_length = int(data_length) if data_length else None
+    return submit_job("decoding", run_decode, temporary_paths or [], input_path, pattern, enforce_provided_pattern, data_length)
+
+
+eel.spawn(forward_events)
 eel.start('index.html', size=(1200, 700))
 
+executor.shutdown(wait=False, cancel_futures=True)
+shutil.rmtree(uploads_directory, ignore_errors=True)
+
 sys.exit()
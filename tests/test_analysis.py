@@ -0,0 +1,113 @@
+# Internal modules
+import json
+import subprocess
+import unittest
+import sys
+from math import inf
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.analysis import analyze, changed_bits, chi_square_attack, load_values, modified_regions, psnr, rs_analysis, \
+    sample_pair_analysis, ssim, _chi_square_survival  # noqa: E402
+from IST.exceptions import ImageSizeMismatchError  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+
+
+class TestAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.cover, _, _ = load_values(str(self.test_images_path / "pgm/test_image.pgm"))
+        self.rng = np.random.default_rng(0)
+
+    def embed(self, values: np.ndarray, rate: float) -> np.ndarray:
+        # LSB replacement of a random message on a random subset of the values
+        stego = values.copy()
+        selected = self.rng.random(values.shape) < rate
+        stego[selected] = (stego[selected] & 0xFE) | self.rng.integers(0, 2, values.shape, dtype=values.dtype)[selected]
+        return stego
+
+    def test_quality(self):
+        stego = self.cover.copy()
+        stego[10:20, 30:35, 0] ^= 0b101
+
+        self.assertEqual(psnr(self.cover, self.cover), inf)
+        squared_error = ((self.cover.astype(np.int64) - stego) ** 2).sum()
+        self.assertAlmostEqual(psnr(self.cover, stego), 10 * np.log10(255 ** 2 * self.cover.size / squared_error))
+        self.assertEqual(ssim(self.cover, self.cover), 1.0)
+        self.assertLess(ssim(self.cover, 255 - self.cover), 0)
+
+        changes = changed_bits(self.cover, stego, "L")
+        self.assertEqual(changes["L"], {"values": 50, "bits": 100, "planes": [50, 0, 50, 0, 0, 0, 0, 0]})
+
+        blocks, box = modified_regions(self.cover, stego, 16)
+        self.assertEqual(blocks.shape, (-(-self.cover.shape[0] // 16), -(-self.cover.shape[1] // 16)))
+        self.assertEqual(np.argwhere(blocks).tolist(), [[0, 1], [0, 2], [1, 1], [1, 2]])
+        self.assertEqual(box, (30, 10, 35, 20))
+        self.assertIsNone(modified_regions(self.cover, self.cover)[1])
+
+        with self.assertRaises(ImageSizeMismatchError):
+            psnr(self.cover, self.cover[1:])
+
+    def test_steganalysis(self):
+        values = self.cover[..., 0]
+
+        self.assertLess(chi_square_attack(values), 0.01)
+        self.assertGreater(chi_square_attack(self.embed(values, 1.0)), 0.99)
+
+        for rate in [0.0, 0.2, 0.6]:
+            stego = self.embed(values, rate)
+            with self.subTest(rate=rate):
+                self.assertAlmostEqual(rs_analysis(stego), rate, delta=0.05)
+                self.assertAlmostEqual(sample_pair_analysis(stego), rate, delta=0.05)
+
+        # 16-bit values are analyzed the same way
+        stego = self.embed(values.astype(np.uint16), 0.4)
+        self.assertAlmostEqual(rs_analysis(stego), 0.4, delta=0.05)
+        self.assertAlmostEqual(sample_pair_analysis(stego), 0.4, delta=0.05)
+
+    def test_chi_square_survival(self):
+        for statistic, degrees_of_freedom, expected in [(3.841, 1, 0.05), (18.307, 10, 0.05), (100, 100, 0.4812), (0, 5, 1.0)]:
+            self.assertAlmostEqual(_chi_square_survival(statistic, degrees_of_freedom), expected, places=3)
+
+    def test_analyze(self):
+        rgb = np.repeat(self.cover, 3, axis=2)
+        stego = rgb.copy()
+        stego[..., 1] = self.embed(rgb[..., 1], 0.5)
+
+        report = analyze(stego, cover=rgb)
+        self.assertEqual(report["size"], (rgb.shape[1], rgb.shape[0]))
+        self.assertEqual(report["channels"], "RGB")
+        self.assertLess(report["detectability"]["R"], 0.05)
+        self.assertGreater(report["detectability"]["G"], 0.4)
+        self.assertEqual(report["quality"]["changed_bits"]["R"]["values"], 0)
+
+        self.assertNotIn("quality", analyze(str(self.test_images_path / "png/test_image.png")))
+
+    def test_json_report(self):
+        # The PSNR of identical images is infinite, the JSON report holds null instead of the invalid Infinity
+        image_path = str(self.test_images_path / "png/test_image.png")
+        cli_path = str(Path(src_path).parent / "cli.py")
+        result = subprocess.run([sys.executable, cli_path, "analyze", image_path, "--cover", image_path, "--json"], capture_output=True,
+                                text=True, check=True)
+
+        def reject_constant(constant: str):
+            raise ValueError(f"Invalid JSON constant {constant}")
+
+        report = json.loads(result.stdout, parse_constant=reject_constant)
+        self.assertIsNone(report["quality"]["psnr"])
+        self.assertEqual(report["quality"]["ssim"], 1.0)
+
+        # The gates are checked on the infinite PSNR
+        result = subprocess.run([sys.executable, cli_path, "analyze", image_path, "--cover", image_path, "--json", "--min-psnr", "40",
+                                 "--min-ssim", "0.99"], capture_output=True, text=True)
+        self.assertEqual((result.returncode, result.stderr), (0, ""))
+        self.assertIsNone(json.loads(result.stdout, parse_constant=reject_constant)["quality"]["psnr"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+# Internal modules
+import os
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.decoder import Decoder  # noqa: E402
+from IST.exceptions import InvalidImageArrayError  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+
+class TestArrays(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.input_path = str(self.test_images_path / "png/test_image.png")
+        self.output_path = str(self.test_images_path / "png/array_image.png")
+        self.pattern = Pattern(channels="RGB", bit_frequency=2, byte_spacing=2)
+
+        with Image.open(self.input_path) as image:
+            self.frame = np.array(image)
+            self.mode = image.mode
+
+    def test_in_place(self):
+        frame = self.frame.copy()
+        encoded = Encoder().encode_array(frame, self.mode, "Frame payload", self.pattern)
+
+        self.assertIs(encoded, frame)
+        self.assertFalse(np.array_equal(frame, self.frame))
+        self.assertEqual(Decoder().decode_array(frame, self.mode, self.pattern), "Frame payload")
+
+    def test_matches_encoder(self):
+        Encoder().process(input_path=self.input_path, data="Frame payload", pattern=self.pattern, output_path=self.output_path)
+        with Image.open(self.output_path) as image:
+            expected = np.array(image)
+
+        out = np.empty_like(self.frame)
+        Encoder().encode_array(self.frame, self.mode, "Frame payload", self.pattern, out=out)
+
+        np.testing.assert_array_equal(out, expected)
+
+    def test_non_contiguous(self):
+        # A crop of a larger frame, and a single band frame
+        frame = self.frame.copy()
+        crop = frame[10:200, 20:300]
+        Encoder().encode_array(crop, self.mode, b"Crop payload", self.pattern)
+
+        np.testing.assert_array_equal(frame[:10], self.frame[:10])
+        self.assertEqual(Decoder().decode_array(crop, self.mode, self.pattern), b"Crop payload")
+
+        gray = np.ascontiguousarray(self.frame[:, :, 0])
+        Encoder().encode_array(gray, "L", "Gray payload", Pattern(channels="all"))
+        self.assertEqual(Decoder().decode_array(gray, "L", Pattern(channels="all")), "Gray payload")
+
+    def test_invalid_arrays(self):
+        with self.assertRaises(InvalidImageArrayError):
+            Encoder().encode_array(self.frame, "RGB", "Payload", self.pattern)
+
+        with self.assertRaises(InvalidImageArrayError):
+            Encoder().encode_array(self.frame.astype(np.float32), self.mode, "Payload", self.pattern)
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
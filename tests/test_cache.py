@@ -0,0 +1,130 @@
+# Internal modules
+import os
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.decoder import Decoder  # noqa: E402
+from IST.cache import DecodeCache, pattern_fingerprint  # noqa: E402
+from IST.exceptions import DataIntegrityCheckFailedError  # noqa: E402
+
+# External modules
+from PIL import Image  # noqa: E402
+from reedsolo import ReedSolomonError  # noqa: E402
+
+
+class TestDecodeCache(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.directory = tempfile.TemporaryDirectory()
+        self.image_path = os.path.join(self.directory.name, "encoded_image.png")
+        self.pattern = Pattern(channels="RGB", bit_frequency=2)
+        self.cache = DecodeCache(os.path.join(self.directory.name, "cache.sqlite"))
+
+        Encoder().process(input_path=str(self.test_images_path / "png/test_image.png"), data="Cached " * 100, pattern=self.pattern,
+                          output_path=self.image_path)
+
+    def test_hit(self):
+        self.assertEqual(Decoder(pattern=self.pattern, cache=self.cache).process(file_path=self.image_path), "Cached " * 100)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+        # The image is not loaded again
+        decoder = Decoder(pattern=Pattern(channels="rgb", bit_frequency=2), cache=self.cache)
+        self.assertEqual(decoder.process(file_path=self.image_path), "Cached " * 100)
+        self.assertIsNone(decoder.image)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        # Pillow images are hashed from their values
+        decoder = Decoder(pattern=self.pattern, image=Image.open(self.image_path), cache=self.cache)
+        self.assertEqual(decoder.process(), "Cached " * 100)
+        self.assertEqual(decoder.process(), "Cached " * 100)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+        # A modified file is decoded again
+        with open(self.image_path, "ab") as image_file:
+            image_file.write(b"\0")
+        Decoder(pattern=self.pattern, cache=self.cache).process(file_path=self.image_path)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 3))
+
+    def test_reused_decoder(self):
+        # Images describing their own patterns, decoded by the same decoder without any pattern
+        paths = [self.image_path]
+        for index, pattern in enumerate([Pattern(channels="RGB", header_write_pattern=True, bit_frequency=3),
+                                         Pattern(channels="RGB", header_write_pattern=True, byte_spacing=2)]):
+            paths.append(os.path.join(self.directory.name, f"header_image_{index}.png"))
+            Encoder().process(input_path=str(self.test_images_path / "png/test_image.png"), data=f"Header {index}", pattern=pattern,
+                              output_path=paths[-1])
+
+        # The results are stored under the pattern given to the decoder, not under the one read from the last image
+        decoder = Decoder(cache=self.cache)
+        self.assertEqual([decoder.process(file_path=path) for path in paths[1:] * 3], ["Header 0", "Header 1"] * 3)
+        self.assertEqual((self.cache.hits, self.cache.misses), (4, 2))
+        self.assertIs(decoder.pattern, decoder.provided_pattern)
+
+        # The pattern read from the header of the image decoded is kept
+        decoder = Decoder(cache=self.cache)
+        decoder.process(file_path=paths[2], cache=None)
+        self.assertEqual(decoder.pattern.byte_spacing, 2)
+
+        # A decoder given a pattern decodes each image from it
+        decoder = Decoder(pattern=self.pattern, cache=self.cache)
+        self.assertEqual([decoder.process(file_path=self.image_path) for _ in range(3)], ["Cached " * 100] * 3)
+        self.assertEqual((self.cache.hits, self.cache.misses), (6, 3))
+
+    def test_failure(self):
+        pattern = Pattern(channels="RGB", bit_frequency=3)
+
+        errors = []
+        for _ in range(2):
+            with self.assertRaises((DataIntegrityCheckFailedError, ReedSolomonError)) as context:
+                Decoder(pattern=pattern, cache=self.cache).process(file_path=self.image_path)
+            errors.append((type(context.exception), str(context.exception)))
+
+        # The stored failure is raised again with the same type and message
+        self.assertEqual(errors[0], errors[1])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_foreign_failure(self):
+        image_hash = self.cache.image_hash(self.image_path)
+        foreign_error = type("ForeignError", (ValueError,), {"__module__": "this"})
+        self.cache.store(image_hash, "foreign", error=foreign_error("Foreign failure"))
+
+        # A failure of a type outside the IST and Reed Solomon errors is raised again as a ValueError, without importing its module
+        sys.modules.pop("this", None)
+        _, error = self.cache.lookup(image_hash, "foreign")
+        self.assertIs(type(error), ValueError)
+        self.assertEqual(str(error), "Foreign failure")
+        self.assertNotIn("this", sys.modules)
+
+    def test_eviction(self):
+        image_hash = self.cache.image_hash(self.image_path)
+        cache = DecodeCache(os.path.join(self.directory.name, "small_cache.sqlite"), max_size=300)
+
+        for index in range(3):
+            cache.store(image_hash, str(index), data=bytes(100))
+        cache.lookup(image_hash, "0")
+        cache.store(image_hash, "3", data=bytes(100))
+
+        # The least recently used results are evicted
+        self.assertEqual([cache.lookup(image_hash, str(index))[0] for index in range(4)], [True, False, True, True])
+        cache.close()
+
+    def test_fingerprint(self):
+        self.assertEqual(pattern_fingerprint(Pattern(channels="RGB")), pattern_fingerprint(Pattern(channels="rgb")))
+        self.assertNotEqual(pattern_fingerprint(Pattern(scatter_seed="Seed")), pattern_fingerprint(Pattern(scatter_seed="seed")))
+        self.assertNotEqual(pattern_fingerprint(self.pattern), pattern_fingerprint(self.pattern, data_length=10))
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# Internal modules
+import os
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.capacity import capacity_report, list_images, read_image_info  # noqa: E402
+from IST.exceptions import DataSizeTooLargeError  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+
+
+class TestCapacity(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.png_path = str(self.test_images_path / "png/test_image.png")
+
+    def test_max_payload_size(self):
+        values = np.zeros((40, 30, 3), dtype=np.uint8)
+
+        for pattern_kwargs in [dict(), dict(bit_frequency=2, repetitive_redundancy=3), dict(byte_spacing=3, scatter_seed="Seed"),
+                               dict(advanced_redundancy="none", header_write_pattern=True)]:
+            pattern = Pattern(channels="RGB", **pattern_kwargs)
+            capacity = pattern.max_payload_size((30, 40), "RGB")
+
+            with self.subTest(pattern=pattern_kwargs):
+                # The largest payload accepted by the encoder
+                Encoder().encode_array(values, "RGB", bytes(capacity), Pattern(channels="RGB", **pattern_kwargs))
+                with self.assertRaises(DataSizeTooLargeError):
+                    Encoder().encode_array(values, "RGB", bytes(capacity + 1), Pattern(channels="RGB", **pattern_kwargs))
+
+        self.assertEqual(Pattern(channels="RGB").max_payload_size((2, 2), "RGB"), 0)
+
+    def test_matrix_embedding_capacity(self):
+        plain = Pattern(channels="RGB", header_enabled=False, hash_check=False, advanced_redundancy="none")
+        matrix = Pattern(channels="RGB", header_enabled=False, hash_check=False, advanced_redundancy="none", matrix_embedding=3)
+
+        # 7 slots carry 3 bits instead of 7, for 2 changes less on average
+        self.assertEqual(plain.max_payload_size((70, 80), "RGB"), 2099)
+        self.assertEqual(matrix.max_payload_size((70, 80), "RGB"), 899)
+        self.assertAlmostEqual(matrix.embedding_efficiency(), 24 / 7)
+        self.assertEqual(matrix.calculate_max_data_size((70, 80), "RGB"), 900)
+
+    def test_read_image_info(self):
+        self.assertEqual(read_image_info(self.png_path), {"width": 640, "height": 360, "mode": "RGBA", "format": "PNG"})
+
+    def test_capacity_report(self):
+        patterns = {"plain": Pattern(channels="RGB"), "dense": Pattern(channels="RGB", bit_frequency=4)}
+
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ["first.png", "second.png", "notes.txt"]:
+                with open(self.png_path, "rb") as source, open(os.path.join(directory, name), "wb") as target:
+                    target.write(source.read())
+            missing_path = os.path.join(directory, "missing.png")
+
+            self.assertEqual([os.path.basename(path) for path in list_images([directory])], ["first.png", "second.png"])
+            results = list(capacity_report([directory, missing_path], patterns, workers=2))
+
+        self.assertEqual([(os.path.basename(result["path"]), result["pattern"]) for result in results],
+                         [("first.png", "plain"), ("first.png", "dense"), ("second.png", "plain"), ("second.png", "dense"),
+                          ("missing.png", "plain"), ("missing.png", "dense")])
+        self.assertEqual(results[0]["capacity"], patterns["plain"].max_payload_size((640, 360), "RGBA"))
+        self.assertGreater(results[1]["capacity"], results[0]["capacity"])
+        self.assertEqual(results[0]["efficiency"], 2.0)
+        self.assertIn("FileNotFoundError", results[-1]["error"])
+
+        # A pattern not applying to an image is reported as an error
+        result, = capacity_report([str(self.test_images_path / "pgm/test_image.pgm")], Pattern(channels="RGB"))
+        self.assertIn("InvalidChannelsError", result["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
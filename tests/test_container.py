@@ -0,0 +1,183 @@
+# Internal modules
+import io
+import os
+import unittest
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.decoder import Decoder  # noqa: E402
+from IST.container import ContainerReader, build_container, pack_files, read_container_files, unpack_files  # noqa: E402
+from IST.core import ExtractedFile, decode, encode, extract_entry, list_entries, open_container, read_header  # noqa: E402
+from IST.slots import SlotLayout  # noqa: E402
+from IST.exceptions import ConflictingParametersError, ContainerEntryNotFoundError, DataIntegrityCheckFailedError, \
+    DuplicateContainerEntryError, InvalidContainerEntryNameError, InvalidContainerError, RequiredParameterMissingError  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+
+class TestContainer(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.cover = Image.fromarray(rng.integers(0, 256, (300, 400, 3), dtype=np.uint8), "RGB")
+        self.files = [("notes.txt", b"Some notes " * 40), ("key.bin", rng.bytes(2000)), ("empty", b"")]
+
+    def test_round_trip(self):
+        patterns = [Pattern(channels="RGB"),
+                    Pattern(channels="RGB", scatter_seed=3, compression_pattern="zlib", repetitive_redundancy=3),
+                    Pattern(channels="RGB", header_write_pattern=True, bit_frequency=2, layout="planar"),
+                    Pattern(channels="RGB", matrix_embedding=2)]
+
+        for pattern in patterns:
+            with self.subTest(pattern=vars(pattern)):
+                encoded = encode(self.cover, pattern=pattern, files=self.files)
+
+                self.assertEqual(decode(encoded, pattern), [ExtractedFile(name, content) for name, content in self.files])
+                self.assertEqual([(entry.name, entry.size) for entry in list_entries(encoded, pattern)],
+                                 [(name, len(content)) for name, content in self.files])
+                self.assertEqual(extract_entry(encoded, "key.bin", pattern), ExtractedFile("key.bin", self.files[1][1]))
+
+        # Without any pattern, the image must hold its pattern in a header
+        encoded = encode(self.cover, pattern=Pattern(channels="RGB", header_write_pattern=True, scatter_seed=None), files=self.files)
+        self.assertEqual(extract_entry(encoded, "notes.txt").content, self.files[0][1])
+
+    def test_encoder_decoder(self):
+        pattern = Pattern(channels="RGB", scatter_seed="seed")
+        values = Encoder(pattern=pattern).encode_array(np.array(self.cover), "RGB", files=self.files)
+        image = Image.fromarray(values, "RGB")
+
+        decoder = Decoder(pattern=pattern, image=image)
+        self.assertEqual([entry.name for entry in decoder.list_entries()], ["notes.txt", "key.bin", "empty"])
+        self.assertEqual(decoder.extract_entry("key.bin").content, self.files[1][1])
+        self.assertEqual(decoder.process(raw=True)[0], 3)
+
+        # The files of the container are written in the working directory
+        directory = os.getcwd()
+        output_path = Path(__file__).resolve().parent / "test_images"
+        try:
+            os.chdir(output_path)
+            self.assertEqual(decoder.process(), "Files 'notes.txt', 'key.bin', 'empty' have been extracted.")
+            self.assertEqual((output_path / "key.bin").read_bytes(), self.files[1][1])
+        finally:
+            os.chdir(directory)
+            for name, _ in self.files:
+                if (output_path / name).exists():
+                    os.remove(output_path / name)
+
+    def test_partial_read(self):
+        pattern = Pattern(channels="RGB", scatter_seed=5)
+        files = [("first", os.urandom(6000)), ("second", os.urandom(300)), ("third", os.urandom(6000))]
+        encoded = encode(self.cover, pattern=pattern, files=files)
+
+        # Extracting an entry reads the header, the preamble, the index and the entry, not the other entries
+        lengths = []
+        extract = SlotLayout.extract
+
+        def spy(layout, flat, length, *args, **kwargs):
+            lengths.append(length)
+            return extract(layout, flat, length, *args, **kwargs)
+
+        with mock.patch.object(SlotLayout, "extract", autospec=True, side_effect=spy):
+            self.assertEqual(extract_entry(encoded, "second", pattern).content, files[1][1])
+        self.assertLess(sum(lengths), 2000)
+
+        # Every value of the slots of the other entries can be damaged, the entry is still read
+        values = np.array(encoded)
+        flat = values.reshape(-1)
+        reader = open_container(flat, "RGB", encoded.size, pattern)
+        _, data_layout, _, _ = read_header(flat, "RGB", encoded.size, pattern)
+        for entry in reader.entries:
+            if entry.name != "second":
+                start = data_layout.slots_for_bytes(reader._entries_offset + entry.offset)
+                flat[data_layout.selector(start, start + data_layout.slots_for_bytes(entry.length))] ^= 1
+
+        damaged = Image.fromarray(values, "RGB")
+        self.assertEqual(extract_entry(damaged, "second", pattern).content, files[1][1])
+        with self.assertRaises(Exception):
+            extract_entry(damaged, "first", pattern)
+
+    def test_corrupted_entry(self):
+        pattern = Pattern(channels="RGB", advanced_redundancy="none")
+        data, entries = build_container(self.files, pattern, alignment=4)
+
+        # The entries start on aligned positions
+        self.assertTrue(all(entry.offset % 4 == 0 for entry in entries))
+
+        def read(offset: int, length: int) -> bytes:
+            return bytes(data[offset:offset + length])
+
+        reader = ContainerReader(read, pattern, alignment=4)
+        self.assertEqual(reader.read_all(), self.files)
+
+        # The content of an entry is checked against its digest in the index
+        position = len(data) - entries[-1].length - entries[1].length
+        data[position] ^= 0xFF
+        reader = ContainerReader(read, pattern, alignment=4)
+        self.assertEqual(reader.read_entry("notes.txt"), self.files[0][1])
+        with self.assertRaises(DataIntegrityCheckFailedError):
+            reader.read_entry("key.bin")
+
+    def test_errors(self):
+        pattern = Pattern(channels="RGB")
+
+        # A regular payload is not a container
+        encoded = encode(self.cover, "Secret message", pattern)
+        with self.assertRaises(InvalidContainerError):
+            list_entries(encoded, pattern)
+
+        encoded = encode(self.cover, pattern=pattern, files=self.files)
+        with self.assertRaises(ContainerEntryNotFoundError):
+            extract_entry(encoded, "missing", pattern)
+
+        with self.assertRaises(DuplicateContainerEntryError):
+            encode(self.cover, pattern=pattern, files=[("a", b"1"), ("a", b"2")])
+
+        # Either a payload, a file or files are embedded
+        with self.assertRaises(ConflictingParametersError):
+            encode(self.cover, "Secret message", pattern, files=self.files)
+        with self.assertRaises(RequiredParameterMissingError):
+            encode(self.cover, pattern=pattern)
+
+    def test_entry_names(self):
+        # The names of the entries are file names, they can't be empty nor hold a path
+        for name in ("", ".", "..", "path/to/file", "..\\file", "file\0"):
+            with self.subTest(name=name):
+                with self.assertRaises(InvalidContainerEntryNameError):
+                    read_container_files([(name, b"Content")])
+
+        # A crafted container can still hold paths, the files extracted never overwrite each other
+        decoder = Decoder(pattern=Pattern(channels="RGB"))
+        content = pack_files([("x/a.txt", b"First"), ("y/a.txt", b"Second"), ("../a.txt", b"Third"), ("", b"Fourth")])
+        directory = os.getcwd()
+        output_path = Path(__file__).resolve().parent / "test_images"
+        names = ["a.txt", "a-1.txt", "a-2.txt", "extracted_file"]
+        try:
+            os.chdir(output_path)
+            with mock.patch.object(Decoder, "split_payload", return_value=(3, None, content)):
+                self.assertEqual(decoder._process_data(b""), f"Files {', '.join(repr(name) for name in names)} have been extracted.")
+            self.assertEqual([(output_path / name).read_bytes() for name in names], [b"First", b"Second", b"Third", b"Fourth"])
+        finally:
+            os.chdir(directory)
+            for name in names:
+                if (output_path / name).exists():
+                    os.remove(output_path / name)
+
+    def test_container_files(self):
+        stream = io.BytesIO(b"Stream content")
+        stream.name = "path/to/stream.bin"
+        files = read_container_files([stream, ("tuple.txt", "Text content")])
+        self.assertEqual(files, [("stream.bin", b"Stream content"), ("tuple.txt", b"Text content")])
+
+        self.assertEqual(unpack_files(pack_files(self.files)), self.files)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# Internal modules
+import copy
+import io
+import os
+import unittest
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.decoder import Decoder  # noqa: E402
+from IST.core import ExtractedFile, decode, encode  # noqa: E402
+from IST.exceptions import RequiredParameterMissingError  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+
+class TestCore(unittest.TestCase):
+    def setUp(self):
+        self.cover = Image.fromarray(np.random.default_rng(0).integers(0, 256, (120, 160, 3), dtype=np.uint8), "RGB")
+        self.pattern = Pattern(channels="rgb", header_channels="AUTO", scatter_seed=3, repetitive_redundancy=3)
+
+    def test_round_trip(self):
+        cover_values = np.array(self.cover)
+        encoded = encode(self.cover, "Secret message", self.pattern)
+
+        # The cover is left untouched, and the image is the one of the Encoder
+        self.assertTrue(np.array_equal(np.array(self.cover), cover_values))
+        expected = Encoder(pattern=self.pattern).encode_array(cover_values.copy(), "RGB", "Secret message")
+        self.assertTrue(np.array_equal(np.array(encoded), expected))
+
+        self.assertEqual(decode(encoded, self.pattern), "Secret message")
+        self.assertEqual(Decoder(pattern=self.pattern).decode_array(expected, "RGB"), "Secret message")
+
+    def test_sources(self):
+        output = io.BytesIO()
+        encode(self.cover, b"Bytes", self.pattern, output=output, image_format="png")
+
+        self.assertEqual(decode(output.getvalue(), self.pattern), b"Bytes")
+        self.assertEqual(decode(io.BytesIO(output.getvalue()), self.pattern), b"Bytes")
+
+        # Arrays need their mode, and are encoded into a copy
+        values = np.array(self.cover)
+        with self.assertRaises(RequiredParameterMissingError):
+            encode(values, "Array", self.pattern)
+        encoded = encode(values, "Array", self.pattern, mode="RGB")
+        self.assertTrue(np.array_equal(values, np.array(self.cover)))
+        self.assertEqual(decode(encoded, self.pattern, mode="RGB"), "Array")
+
+    def test_file(self):
+        file = io.BytesIO(os.urandom(300))
+        file.name = "secret.bin"
+
+        encoded = encode(self.cover, None, self.pattern, file=file)
+
+        # Nothing is written, the file is returned
+        self.assertEqual(decode(encoded, self.pattern), ExtractedFile("secret.bin", file.getvalue()))
+
+    def test_pattern_not_modified(self):
+        state = copy.deepcopy(vars(self.pattern))
+        encoded = encode(self.cover, "Secret message", self.pattern)
+        decode(encoded, self.pattern)
+
+        self.assertEqual(vars(self.pattern), state)
+
+        # The pattern read from the header is never loaded into the given one
+        base = Pattern(header_write_pattern=True, channels="auto")
+        state = copy.deepcopy(vars(base))
+        encoded = encode(self.cover, "Header pattern", Pattern(header_write_pattern=True, bit_frequency=3, channels="RGB"))
+        self.assertEqual(decode(encoded, base), "Header pattern")
+        self.assertEqual(vars(base), state)
+
+    def test_concurrent(self):
+        patterns = [self.pattern, Pattern(channels="RGB", compression_pattern="zlib", hash_check="sha512")]
+        jobs = [(patterns[index % 2], f"Message {index} " * (index + 1)) for index in range(32)]
+
+        def run(job):
+            pattern, message = job
+            return decode(encode(self.cover, message, pattern), pattern)
+
+        # The same cover and patterns are shared by all the threads
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(run, jobs))
+
+        self.assertEqual(results, [message for _, message in jobs])
+
+    def test_concurrent_redundancy(self):
+        # The patterns use different numbers of Reed Solomon redundant symbols, whose codes are built while other threads decode
+        patterns = [Pattern(channels="RGB", advanced_redundancy_correction_factor=correction_factor, scatter_seed=index)
+                    for index, correction_factor in enumerate([0.05, 0.1, 0.15, 0.2, 0.3, 0.4])]
+        patterns.append(Pattern(channels="RGB", header_write_pattern=True, compression_pattern="zlib"))
+        jobs = [(patterns[index % len(patterns)], os.urandom(100 + index * 7)) for index in range(96)]
+
+        def run(job):
+            pattern, data = job
+            return decode(encode(self.cover, data, pattern), pattern)
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(run, jobs))
+
+        self.assertEqual(results, [data for _, data in jobs])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,7 @@
 # Internal modules
+import io
+import os
+import tempfile
 import unittest
 import sys
 from pathlib import Path
@@ -10,6 +13,13 @@ sys.path.insert(0, src_path)
 from test_pattern import generate_test_patterns, filter_patterns  # noqa: E402
 from IST.encoder import Encoder  # noqa: E402
 from IST.decoder import Decoder  # noqa: E402
+from IST.pattern import Pattern  # noqa: E402
+from IST.cache import DecodeCache  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+from reedsolo import ReedSolomonError  # noqa: E402
 
 
 class TestEncoderDecoder(unittest.TestCase):
@@ -94,6 +104,88 @@ class TestEncoderDecoder(unittest.TestCase):
 
             print(f">>> Tested {count} patterns for image format: {img_format}, {success_count} successful")
 
+    def test_prepare_data(self):
+        encoder = Encoder()
+        file_data = bytes(range(256)) * 40
+        name_field = "payload.bin".ljust(64, "\0").encode()
+
+        self.assertEqual(encoder._prepare_data("Text", None), b"\0Text")
+        self.assertEqual(encoder._prepare_data(b"Bytes", None, 4), b"\2Bytes\0\0\0\0")
+
+        stream = io.BytesIO(b"skipped" + file_data)
+        stream.name = "payload.bin"
+        stream.seek(7)
+        self.assertEqual(encoder._prepare_data(None, stream, 2), b"\1" + name_field + file_data + b"\0\0")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "payload.bin")
+            with open(path, "wb") as file:
+                file.write(file_data)
+            self.assertEqual(encoder._prepare_data(None, path), b"\1" + name_field + file_data)
+
+        # The hash is written in place, into the room reserved at the end of the payload
+        pattern = Pattern(channels="RGB", compression_pattern="none", advanced_redundancy="none")
+        encoder.load_pattern(pattern)
+        payload = encoder._prepare_data("Hashed", None, pattern.get_hash_size())
+        data = encoder._apply_data_transforms(payload, pattern.generate_pattern("RGB"), hash_reserved=True, image_size=(64, 64),
+                                              image_mode="RGB")
+
+        self.assertIs(data, payload)
+        self.assertEqual(bytes(data), b"\0Hashed" + pattern.compute_hash(b"\0Hashed"))
+
+    def test_pattern_in_header(self):
+        data = "Self-describing image " * 20
+        pattern = Pattern(header_write_pattern=True, channels="RB", bit_frequency=2, byte_spacing=3, offset=40, repetitive_redundancy=3,
+                          advanced_redundancy_correction_factor=0.25)
+
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, "encoded_image.png")
+            Encoder().process(input_path="test_images/png/test_image.png", data=data, pattern=pattern, output_path=output_path)
+
+            # The decoder needs no pattern, and configures itself from the header
+            decoder = Decoder()
+            self.assertEqual(decoder.process(file_path=output_path), data)
+            self.assertEqual((decoder.pattern.bit_frequency, decoder.pattern.byte_spacing, decoder.pattern.offset), (2, 3, 40))
+
+            # Unless the provided pattern is enforced
+            with self.assertRaises((ValueError, ReedSolomonError)):
+                Decoder().process(file_path=output_path, pattern=Pattern(header_write_pattern=True), enforce_provided_pattern=True)
+
+    def test_pattern_in_header_channels(self):
+        # Without any pattern, the decoder reads the header from the channels of the image, not only from RGBA images
+        data = "Self-describing image"
+        with tempfile.TemporaryDirectory() as directory, Image.open("test_images/png/test_image.png") as cover:
+            for mode, channels in [("RGB", "RGB"), ("L", "L")]:
+                with self.subTest(mode=mode):
+                    input_path, output_path = os.path.join(directory, f"{mode}.png"), os.path.join(directory, f"encoded_{mode}.png")
+                    cover.convert(mode).save(input_path)
+                    Encoder().process(input_path=input_path, data=data, pattern=Pattern(header_write_pattern=True, channels=channels),
+                                      output_path=output_path)
+
+                    self.assertEqual(Decoder().process(file_path=output_path), data)
+                    self.assertEqual(Decoder(cache=DecodeCache(os.path.join(directory, "cache.sqlite"))).process(file_path=output_path),
+                                     data)
+                    with Image.open(output_path) as encoded:
+                        self.assertEqual(Decoder().decode_array(np.array(encoded), mode), data)
+
+    def test_streams(self):
+        pattern = Pattern(channels="RGB", bit_frequency=2)
+        payload = os.urandom(3000)
+
+        with open("test_images/bmp/test_image.bmp", "rb") as cover:
+            output = io.BytesIO()
+            Encoder().process(input_path=cover, data=payload, pattern=pattern, output_path=output, image_format="png")
+
+        # The stream is written in the given format, and decoded without any extension
+        self.assertEqual(output.getvalue()[:4], b"\x89PNG")
+        output.seek(0)
+        decoder = Decoder(pattern=pattern)
+        data_bytes = decoder.process(file_path=output, raw=True)
+
+        data_type, file_name, content = decoder.split_payload(data_bytes)
+        self.assertEqual((data_type, file_name, bytes(content)), (2, None, payload))
+        self.assertEqual(decoder.split_payload(b"\1" + b"name.txt".ljust(64, b"\0") + b"File")[1:], ("name.txt", b"File"))
+
 
 if __name__ == "__main__":
     unittest.main()
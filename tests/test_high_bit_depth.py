@@ -0,0 +1,98 @@
+# Internal modules
+import os
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.decoder import Decoder  # noqa: E402
+from IST.core import decode, encode  # noqa: E402
+from IST.exceptions import ImageValuesOutOfRangeError, InvalidBitFrequencyError, InvalidImageArrayError  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+
+class TestHighBitDepth(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.paths = {(extension, name): str(self.test_images_path / f"{extension}/high_bit_depth_{name}.{extension}")
+                      for extension in ["png", "pgm"] for name in ["input", "output"]}
+        self.pixels = np.random.default_rng(0).integers(0, 1 << 16, (96, 128), dtype=np.uint16)
+
+    def test_gray_images(self):
+        data = "Sixteen bits carrier " * 40
+        pattern = Pattern(channels="all", bit_frequency=12)
+
+        for extension in ["png", "pgm"]:
+            with self.subTest(extension=extension):
+                input_path, output_path = self.paths[extension, "input"], self.paths[extension, "output"]
+                Image.fromarray(self.pixels.astype(np.int32), "I").save(input_path)
+
+                Encoder().process(input_path=input_path, data=data, pattern=pattern, output_path=output_path)
+
+                # The image stays 16 bits, only the 12 least significant bits of the samples changed
+                with Image.open(output_path) as image:
+                    pixels = np.array(image).astype(np.int64)
+                self.assertLess(int(np.abs(pixels - self.pixels).max()), 1 << 12)
+                self.assertGreaterEqual(int(np.abs(pixels - self.pixels).max()), 1 << 8)
+
+                self.assertEqual(Decoder().process(file_path=output_path, pattern=pattern), data)
+
+    def test_32_bit_images(self):
+        # The "I" images holding 16-bit values are 16-bit carriers
+        encoded = encode(Image.fromarray(self.pixels.astype(np.int32), "I"), "Sixteen bits", Pattern(channels="all"))
+        self.assertEqual(decode(encoded, Pattern(channels="all")), "Sixteen bits")
+
+        # The other ones would be truncated, they are refused
+        for low, high in [(0, 1 << 20), (-1, 100)]:
+            with self.subTest(low=low, high=high):
+                values = np.random.default_rng(2).integers(low, high, (96, 128), dtype=np.int32)
+                with self.assertRaises(ImageValuesOutOfRangeError):
+                    encode(Image.fromarray(values, "I"), "Thirty-two bits", Pattern(channels="all"))
+                with self.assertRaises(ImageValuesOutOfRangeError):
+                    decode(Image.fromarray(values, "I"), Pattern(channels="all"))
+
+    def test_color_arrays(self):
+        frame = np.random.default_rng(1).integers(0, 1 << 16, (64, 64, 3), dtype=np.uint16)
+        pattern = Pattern(channels="RGB", bit_frequency=16)
+
+        encoded = Encoder().encode_array(frame.copy(), "RGB", "Deep color payload", pattern)
+        self.assertEqual(encoded.dtype, np.uint16)
+        self.assertEqual(Decoder().decode_array(encoded, "RGB", pattern), "Deep color payload")
+
+        # 16-bit modes require 16-bit samples
+        with self.assertRaises(InvalidImageArrayError):
+            Encoder().encode_array(self.pixels.astype(np.uint8), "I;16", "Payload", Pattern(channels="all"))
+
+    def test_capacity(self):
+        pattern = Pattern(channels="all")
+
+        pattern.bit_frequency = 8
+        eight_bits = pattern.calculate_max_data_size((128, 96), "I;16")
+        pattern.bit_frequency = 16
+        sixteen_bits = pattern.calculate_max_data_size((128, 96), "I;16")
+        self.assertAlmostEqual(sixteen_bits / eight_bits, 2, delta=0.05)
+
+        pattern.bit_frequency = 9
+        with self.assertRaises(InvalidBitFrequencyError):
+            pattern.calculate_max_data_size((128, 96), "L")
+
+        pattern.bit_frequency = 17
+        with self.assertRaises(InvalidBitFrequencyError):
+            pattern.calculate_max_data_size((128, 96), "I;16")
+
+    def tearDown(self):
+        for path in self.paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,7 +8,13 @@ from pathlib import Path
 src_path = str(Path(__file__).resolve().parent.parent / "IST")
 sys.path.insert(0, src_path)
 
-from IST.pattern import Pattern  # noqa: E402
+from IST.pattern import Pattern, PATTERN_BYTES  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.exceptions import DataSizeTooLargeError, InvalidHeaderPatternError, NoFittingPatternError, PatternNotEncodableError, \
+    ScatterSeedRequiredError  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
 
 
 def generate_test_patterns(default_params: dict, test_params: dict):
@@ -79,6 +85,93 @@ class TestPattern(unittest.TestCase):
         data_hash = pattern.compute_hash(data)
         self.assertIsInstance(data_hash, bytes)
 
+    def test_majority_vote(self):
+        data = bytes(range(200))
+        repeated = bytearray(Pattern.static_apply_redundancy(data, 3, "byte_per_byte", "none", 0.1))
+        self.assertEqual(Pattern.majority_vote(bytes(repeated), 3), data)
+
+        # One damaged repetition is outvoted, a tie is broken by the neighbors
+        repeated[30] ^= 0xFF
+        repeated[61] ^= 0x0F
+        repeated[62] ^= 0xF0
+        self.assertEqual(Pattern.majority_vote(bytes(repeated), 3), data)
+
+        tie = bytes([9, 9, 10, 10, 11, 11, 50, 200])
+        self.assertEqual(Pattern.majority_vote(tie, 2), bytes([9, 10, 11, 50]))
+
+    def test_pattern_bytes(self):
+        pattern = Pattern(channels="RB", bit_frequency=3, byte_spacing=2, offset=100, repetitive_redundancy=3,
+                          repetitive_redundancy_mode="block", compression_pattern="zlib", hash_check="sha3_256",
+                          advanced_redundancy_correction_factor=0.123, scatter_seed="seed", header_bit_frequency=2, layout="planar")
+        data = pattern.to_bytes()
+        self.assertEqual(len(data), PATTERN_BYTES.size)
+
+        # The header parameters and the seed come from the base pattern
+        decoded = Pattern.from_bytes(data, Pattern(scatter_seed="seed", header_repetitive_redundancy=7))
+        for parameter in ["channels", "bit_frequency", "byte_spacing", "offset", "repetitive_redundancy", "repetitive_redundancy_mode",
+                          "compression", "hash_check", "advanced_redundancy", "advanced_redundancy_correction_factor", "scatter_seed",
+                          "layout"]:
+            self.assertEqual(getattr(decoded, parameter), getattr(pattern, parameter), parameter)
+        self.assertEqual(decoded.header_repetitive_redundancy, 7)
+        self.assertEqual(decoded.header_bit_frequency, 1)
+
+        with self.assertRaises(ScatterSeedRequiredError):
+            Pattern.from_bytes(data)
+
+        decoded = Pattern.from_bytes(Pattern(channels="all", hash_check=False, advanced_redundancy="none").to_bytes(), Pattern(scatter_seed="seed"))
+        self.assertEqual((decoded.channels, decoded.hash_check, decoded.advanced_redundancy, decoded.scatter_seed), ("all", False, "none", None))
+        self.assertEqual(decoded.layout, "interleaved")
+
+        decoded = Pattern.from_bytes(Pattern(matrix_embedding=5).to_bytes())
+        self.assertEqual((decoded.matrix_embedding, decoded.layout, decoded.scatter_seed), (5, "interleaved", None))
+        self.assertEqual(Pattern.from_bytes(data, Pattern(scatter_seed="seed")).matrix_embedding, 0)
+
+        with self.assertRaises(InvalidHeaderPatternError):
+            Pattern.from_bytes(b"\x02" + data[1:])
+        with self.assertRaises(PatternNotEncodableError):
+            Pattern(advanced_redundancy_correction_factor=1 / 3).to_bytes()
+
+    def test_encoded_sizes(self):
+        pattern = Pattern(hash_check="sha256", repetitive_redundancy=3, advanced_redundancy_correction_factor=0.2,
+                          header_write_pattern=True)
+        data = bytes(1234)
+
+        self.assertEqual(pattern.get_encoded_data_size(len(data)), len(pattern.apply_redundancy(data + pattern.compute_hash(data))))
+        self.assertEqual(pattern.get_header_size(), len(pattern.generate_header(len(data))))
+        self.assertEqual(Pattern(header_enabled=False).get_header_size(), 0)
+
+    def test_auto_tune(self):
+        cover = np.random.default_rng(0).integers(0, 256, (120, 160, 4), dtype=np.uint8)
+
+        def encodes(pattern: Pattern, payload: bytes) -> bool:
+            try:
+                Encoder().encode_array(cover.copy(), "RGBA", payload, pattern)
+            except DataSizeTooLargeError:
+                return False
+            return True
+
+        for payload_size, constraints, base in product([10, 500], [{}, {"objective": "max_redundancy", "min_psnr": 40}],
+                                                        [Pattern(), Pattern(repetitive_redundancy=3, header_write_pattern=True)]):
+            with self.subTest(payload_size=payload_size, constraints=constraints):
+                payload = bytes(payload_size)
+                pattern = Pattern.auto_tune(payload_size, (160, 120), "RGBA", constraints, base)
+
+                # The tuned pattern fits, exactly: the next byte spacing does not
+                self.assertTrue(pattern.fits(payload_size, (160, 120), "RGBA"))
+                self.assertTrue(encodes(pattern, payload))
+                pattern.byte_spacing += 1
+                self.assertFalse(encodes(pattern, payload))
+                self.assertGreaterEqual(pattern.repetitive_redundancy, base.repetitive_redundancy)
+
+        # Small payloads only use the lowest bits of the color channels
+        pattern = Pattern.auto_tune(100, (160, 120), "RGBA")
+        self.assertEqual((pattern.channels.upper(), pattern.bit_frequency), ("RGB", 1))
+
+        with self.assertRaises(NoFittingPatternError):
+            Pattern.auto_tune(100000, (160, 120), "RGBA")
+        with self.assertRaises(NoFittingPatternError):
+            Pattern.auto_tune(20000, (160, 120), "RGBA", {"min_psnr": 60})
+
 
 if __name__ == "__main__":
     unittest.main()
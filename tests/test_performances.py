@@ -1 +1,201 @@
-# Not implemented yet
+# Internal modules
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+root_path = str(Path(__file__).resolve().parent.parent)
+src_path = str(Path(root_path) / "IST")
+sys.path.insert(0, src_path)
+sys.path.insert(0, root_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+"""
+Memory benchmarks of the encoding and decoding pipelines. Each measurement runs in a fresh interpreter, which loads the cover image and
+processes it once to record the peak RSS growth, then once more under tracemalloc to record the peak of the traced allocations (NumPy
+arrays included). Both peaks are reported relative to the raw size of the image values, and in bytes per pixel. The traced peak covers the
+memory the library allocates itself, while the RSS peak also covers the storage of the Pillow images and the codec buffers.
+
+The budget tests are opt-in, as they create large images and take a while:
+
+    IST_MEMORY_BENCHMARKS=1 python -m pytest -q test_performances.py
+
+Environment variables:
+- IST_MEMORY_BENCHMARKS: Enables the budget tests when set to 1.
+- IST_MEMORY_BUDGET: The maximum traced peak, as a multiple of the raw image size (default: 3).
+- IST_RSS_BUDGET: The maximum RSS peak, as a multiple of the raw image size (default: 4). Pillow stores RGB images with 4 bytes per
+  pixel, so that an encoding holds at least 3.67 times the raw size: the cover and the encoded images, and the values array in between.
+- IST_MEMORY_SIZES: The image sizes measured (default: 2048x2048). Small images are dominated by the allocator, not by the image.
+
+Running this file directly prints the report of every size and pattern instead:
+
+    python test_performances.py report
+"""
+
+MEMORY_BENCHMARKS = os.environ.get("IST_MEMORY_BENCHMARKS", "0") == "1"
+MEMORY_BUDGET = float(os.environ.get("IST_MEMORY_BUDGET", "3"))
+RSS_BUDGET = float(os.environ.get("IST_RSS_BUDGET", "4"))
+MEMORY_SIZES = [tuple(int(side) for side in size.split("x")) for size in os.environ.get("IST_MEMORY_SIZES", "2048x2048").split(",")]
+
+# Patterns measured, the payload filling an eighth of the capacity of each image (before redundancy)
+MEMORY_PATTERNS = {
+    "plain": dict(channels="RGB", bit_frequency=1),
+    "dense": dict(channels="RGB", bit_frequency=4),
+    "redundancy": dict(channels="RGB", bit_frequency=2, repetitive_redundancy=3, advanced_redundancy_correction_factor=0.2),
+    "scatter": dict(channels="RGB", bit_frequency=2, scatter_seed="benchmark"),
+}
+
+# Run in the measured interpreter, prints the measurements as JSON
+MEASURE_SCRIPT = """
+import json, sys, tracemalloc
+sys.path.insert(0, {root_path!r})
+
+from IST import Decoder, Encoder, Pattern
+
+arguments = json.loads(sys.argv[1])
+pattern = Pattern(**arguments["pattern"])
+
+
+def rss(field):
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) * 1024 for line in status if line.startswith(field))
+
+
+def reset_peak_rss():
+    # Resets the peak RSS (VmHWM) to the current RSS, the imports and the warm-up may have reached a higher peak
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+
+
+def run(input_path, payload_path):
+    if arguments["operation"] == "encode":
+        with open(payload_path, "rb") as payload_file:
+            payload = payload_file.read()
+        Encoder(workers=1).process(input_path=input_path, data=payload, pattern=pattern, output_path=arguments["output_path"])
+    else:
+        Decoder(workers=1).process(file_path=input_path, pattern=pattern)
+
+
+# A first run on a small image loads the lazily imported modules and tables, so that only the memory used by the image is measured
+run(arguments["warm_up_input_path"], arguments["warm_up_payload_path"])
+
+reset_peak_rss()
+baseline = rss("VmRSS:")
+run(arguments["input_path"], arguments["payload_path"])
+rss_peak = rss("VmHWM:") - baseline
+
+tracemalloc.start()
+run(arguments["input_path"], arguments["payload_path"])
+traced_peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+
+print(json.dumps(dict(rss_peak=rss_peak, traced_peak=traced_peak)))
+"""
+
+
+def create_cover(path: str, size: tuple[int, int]) -> int:
+    """
+    Creates a random RGB cover image.
+    :param path: The path of the image
+    :param size: The width and height of the image
+    :return: The raw size of the image values, in bytes
+    """
+    values = np.random.default_rng(0).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    Image.fromarray(values, "RGB").save(path)
+
+    return values.nbytes
+
+
+def measure_memory(operation: str, size: tuple[int, int], pattern_name: str) -> dict:
+    """
+    Measures the memory peaks of an encoding or a decoding in a fresh interpreter.
+    :param operation: "encode" or "decode"
+    :param size: The width and height of the cover image
+    :param pattern_name: The name of the pattern, in MEMORY_PATTERNS
+    :return: The peaks in bytes (rss_peak, traced_peak), relative to the raw image size (rss_ratio, traced_ratio) and per pixel
+    (rss_per_pixel, traced_per_pixel)
+    """
+    pattern_kwargs = MEMORY_PATTERNS[pattern_name]
+
+    with tempfile.TemporaryDirectory() as directory:
+        arguments = dict(operation=operation, pattern=pattern_kwargs, output_path=os.path.join(directory, "output.png"))
+
+        for name, image_size in [("warm_up_", (64, 64)), ("", size)]:
+            cover_path = os.path.join(directory, f"{name}cover.png")
+            payload_path = os.path.join(directory, f"{name}payload.bin")
+            raw_size = create_cover(cover_path, image_size)
+
+            capacity = Pattern(**pattern_kwargs).calculate_max_data_size(image_size, "RGB")
+            with open(payload_path, "wb") as payload_file:
+                payload_file.write(os.urandom(max(capacity // 8, 1)))
+
+            # Decodings are measured on an encoded image
+            if operation == "decode":
+                with open(payload_path, "rb") as payload_file:
+                    Encoder().process(input_path=cover_path, data=payload_file.read(), pattern=Pattern(**pattern_kwargs),
+                                      output_path=os.path.join(directory, f"{name}encoded.png"))
+                cover_path = os.path.join(directory, f"{name}encoded.png")
+
+            arguments[f"{name}input_path"] = cover_path
+            arguments[f"{name}payload_path"] = payload_path
+
+        result = subprocess.run([sys.executable, "-c", MEASURE_SCRIPT.format(root_path=root_path), json.dumps(arguments)],
+                                capture_output=True, text=True)
+        if result.returncode:
+            raise RuntimeError(f"The {operation} measurement failed:\n{result.stderr}")
+
+    measurements = json.loads(result.stdout.strip().splitlines()[-1])
+    for peak in ["rss", "traced"]:
+        measurements[f"{peak}_ratio"] = measurements[f"{peak}_peak"] / raw_size
+        measurements[f"{peak}_per_pixel"] = measurements[f"{peak}_peak"] / (size[0] * size[1])
+
+    return measurements
+
+
+def report() -> None:
+    print(f"{'operation':<10}{'size':>12}{'pattern':>12}{'RSS (MB)':>11}{'RSS B/px':>10}{'traced (MB)':>13}{'traced B/px':>13}"
+          f"{'x raw':>8}")
+
+    for operation in ["encode", "decode"]:
+        for size in MEMORY_SIZES:
+            for pattern_name in MEMORY_PATTERNS:
+                m = measure_memory(operation, size, pattern_name)
+                print(f"{operation:<10}{f'{size[0]}x{size[1]}':>12}{pattern_name:>12}{m['rss_peak'] / 2 ** 20:>11.1f}"
+                      f"{m['rss_per_pixel']:>10.2f}{m['traced_peak'] / 2 ** 20:>13.1f}{m['traced_per_pixel']:>13.2f}"
+                      f"{max(m['rss_ratio'], m['traced_ratio']):>8.2f}")
+
+
+@unittest.skipUnless(MEMORY_BENCHMARKS, "memory benchmarks are opt-in, set IST_MEMORY_BENCHMARKS=1")
+@unittest.skipUnless(sys.platform.startswith("linux"), "peak RSS is read from /proc")
+class TestMemoryBudgets(unittest.TestCase):
+    def check_budget(self, operation: str) -> None:
+        for size in MEMORY_SIZES:
+            for pattern_name in MEMORY_PATTERNS:
+                with self.subTest(size=size, pattern=pattern_name):
+                    measurements = measure_memory(operation, size, pattern_name)
+
+                    self.assertLessEqual(measurements["traced_ratio"], MEMORY_BUDGET, measurements)
+                    self.assertLessEqual(measurements["rss_ratio"], RSS_BUDGET, measurements)
+
+    def test_encode_budget(self):
+        self.check_budget("encode")
+
+    def test_decode_budget(self):
+        self.check_budget("decode")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["report"]:
+        report()
+    else:
+        unittest.main()
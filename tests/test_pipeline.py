@@ -0,0 +1,124 @@
+# Internal modules
+import os
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.decoder import Decoder  # noqa: E402
+from IST.pipeline import BufferPool, Pipeline, Transform  # noqa: E402
+from IST.exceptions import DataIntegrityCheckFailedError  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+
+
+class XorTransform(Transform):
+    encode_stage = decode_stage = "xor"
+
+    def __init__(self, key: int):
+        self.key = key
+
+    def encode(self, data, checkpoint=None, pool=None, reserved=False):
+        return (np.frombuffer(data, dtype=np.uint8) ^ self.key).tobytes()
+
+    def decode(self, data, checkpoint=None):
+        return (np.frombuffer(data, dtype=np.uint8) ^ self.key).tobytes()
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.patterns = [
+            Pattern(),
+            Pattern(hash_check="sha512", advanced_redundancy="none"),
+            Pattern(repetitive_redundancy=3, advanced_redundancy_correction_factor=0.3),
+            Pattern(repetitive_redundancy=2, repetitive_redundancy_mode="block", hash_check=False),
+        ]
+        self.cover = np.random.default_rng(0).integers(0, 256, (96, 128, 3), dtype=np.uint8)
+
+    def test_encoded_size(self):
+        data = os.urandom(1000)
+        for index, pattern in enumerate(self.patterns):
+            pipeline = Pipeline.from_pattern(pattern)
+            with self.subTest(pattern=index):
+                self.assertEqual(pipeline.encoded_size(len(data)), pattern.get_encoded_data_size(len(data)))
+                self.assertEqual(len(pipeline.encode(data)), pipeline.encoded_size(len(data)))
+                self.assertEqual(pipeline.reserved_size, pattern.get_hash_size())
+
+        # With compression, the size is an upper bound
+        pattern = Pattern(compression_pattern="zlib")
+        pipeline = Pipeline.from_pattern(pattern)
+        self.assertEqual(pipeline.encoded_size(1000), pattern.get_encoded_data_size(1000))
+        self.assertLess(len(pipeline.encode(bytes(1000))), pipeline.encoded_size(1000))
+
+    def test_round_trip(self):
+        data = os.urandom(3000)
+        for pattern in self.patterns + [Pattern(compression_pattern="zlib")]:
+            pipeline = Pipeline.from_pattern(pattern, pool=BufferPool())
+            encoded = bytes(pipeline.encode(bytearray(data)))
+
+            # The stages give the data the pattern methods give
+            expected = data + pattern.compute_hash(data) if pattern.get_hash_size() else data
+            expected = pattern.apply_redundancy(pattern.compress_data(expected))
+            self.assertEqual(encoded, bytes(expected))
+
+            self.assertEqual(bytes(pipeline.decode(encoded)), data)
+
+        # Compressible data is decompressed
+        pipeline = Pipeline.from_pattern(Pattern(compression_pattern="zlib"))
+        self.assertEqual(bytes(pipeline.decode(bytes(pipeline.encode(b"IST " * 1000)))), b"IST " * 1000)
+
+    def test_reserved(self):
+        pattern = Pattern(hash_check="sha512")
+        pipeline = Pipeline.from_pattern(pattern)
+        data = os.urandom(500)
+
+        self.assertEqual(bytes(pipeline.encode(bytearray(data) + bytearray(pipeline.reserved_size), reserved=True)),
+                         bytes(pipeline.encode(data)))
+
+    def test_buffer_reuse(self):
+        pool = BufferPool()
+        pipeline = Pipeline.from_pattern(Pattern(repetitive_redundancy=3), pool=pool)
+
+        first = bytes(pipeline.encode(os.urandom(2000)))
+        allocations = pool.allocations
+
+        # The following jobs of the thread reuse the buffers, smaller payloads included
+        for size in [2000, 1500, 10]:
+            data = os.urandom(size)
+            self.assertEqual(bytes(pipeline.encode(data)), bytes(Pipeline.from_pattern(Pattern(repetitive_redundancy=3)).encode(data)))
+        self.assertEqual(pool.allocations, allocations)
+        self.assertEqual(len(first), pipeline.encoded_size(2000))
+
+        # Buffers over the maximum size are never kept, the hash and Reed-Solomon outputs being allocated for each job
+        pool = BufferPool(max_buffer_size=100)
+        Pipeline.from_pattern(Pattern(), pool=pool).encode(os.urandom(1000))
+        Pipeline.from_pattern(Pattern(), pool=pool).encode(os.urandom(1000))
+        self.assertEqual(pool.allocations, 4)
+
+    def test_integrity(self):
+        pipeline = Pipeline.from_pattern(Pattern(advanced_redundancy="none"))
+        encoded = bytearray(pipeline.encode(b"Secret message"))
+        encoded[0] ^= 1
+
+        with self.assertRaises(DataIntegrityCheckFailedError):
+            pipeline.decode(encoded)
+
+    def test_custom_transform(self):
+        pattern = Pattern(channels="RGB", compression_pattern="zlib")
+        payload = "Custom transform " * 20
+
+        encoded = Encoder(transforms=[XorTransform(0x5A)]).encode_array(self.cover.copy(), "RGB", payload, pattern=pattern)
+
+        self.assertEqual(Decoder(transforms=[XorTransform(0x5A)]).decode_array(encoded, "RGB", pattern=pattern), payload)
+        with self.assertRaises(DataIntegrityCheckFailedError):
+            Decoder().decode_array(encoded, "RGB", pattern=pattern)
+
+
+if __name__ == "__main__":
+    unittest.main()
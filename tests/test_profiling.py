@@ -0,0 +1,55 @@
+# Internal modules
+import json
+import os
+import pstats
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.profiling import Profiler  # noqa: E402
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.pattern = Pattern(channels="RGB", bit_frequency=2, repetitive_redundancy=3)
+
+    def test_profile(self):
+        reports = []
+
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, "profile")
+            with Profiler(output_path, sample_interval=0.001, callback=lambda stage, fraction: reports.append(stage)) as profiler:
+                Encoder().process(input_path=str(self.test_images_path / "png/test_image.png"), data=os.urandom(5000), pattern=self.pattern,
+                                  output_path=os.path.join(directory, "encoded_image.png"), progress_callback=profiler)
+
+            # The progress reports are forwarded
+            self.assertEqual(list(dict.fromkeys(reports)), list(profiler.stages))
+
+            summary = profiler.summary()
+            self.assertEqual(list(summary["stages"]), ["prepare", "hash", "redundancy", "embed", "save"])
+            self.assertLessEqual(sum(summary["stages"].values()), summary["wall_time"])
+            self.assertGreater(summary["peak_traced_memory"], 0)
+
+            with open(f"{output_path}.json") as summary_file:
+                self.assertEqual(json.load(summary_file)["stages"], summary["stages"])
+
+            stats = pstats.Stats(f"{output_path}.prof")
+            self.assertTrue(any(function == "process" and file.endswith("encoder.py") for file, _, function in stats.stats))
+
+            # Folded stacks: the frames from the thread name to the leaf, separated by semicolons, then the number of samples
+            with open(f"{output_path}.folded") as folded_file:
+                lines = folded_file.read().splitlines()
+            self.assertEqual(sum(int(line.rsplit(" ", 1)[1]) for line in lines), summary["samples"])
+            self.assertTrue(any(line.startswith("MainThread;") and "process (encoder.py:" in line for line in lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
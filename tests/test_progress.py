@@ -0,0 +1,88 @@
+# Internal modules
+import os
+import time
+import unittest
+import sys
+import zlib
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.decoder import Decoder  # noqa: E402
+from IST.progress import CancelToken  # noqa: E402
+from IST.exceptions import DeadlineExceededError, OperationCancelledError  # noqa: E402
+
+
+class TestProgress(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.input_path = str(self.test_images_path / "png/test_image.png")
+        self.output_path = str(self.test_images_path / "png/progress_image.png")
+        self.pattern = Pattern(channels="RGB", bit_frequency=2, compression_pattern="zlib", advanced_redundancy_correction_factor=0.2)
+
+    def test_stages(self):
+        reports = []
+        Encoder().process(input_path=self.input_path, data="Progress " * 500, pattern=self.pattern, output_path=self.output_path,
+                          progress_callback=lambda stage, fraction: reports.append((stage, fraction)))
+
+        stages = list(dict.fromkeys(stage for stage, _ in reports))
+        self.assertEqual(stages, ["prepare", "hash", "compress", "redundancy", "embed", "save"])
+        self.assertEqual(reports[-1], ("save", 1.0))
+
+        # The fractions of a stage never decrease
+        for stage in stages:
+            fractions = [fraction for report_stage, fraction in reports if report_stage == stage]
+            self.assertEqual(fractions, sorted(fractions))
+
+        pattern = Pattern(channels="RGB", repetitive_redundancy=3)
+        Encoder().process(input_path=self.input_path, data="Progress " * 500, pattern=pattern, output_path=self.output_path)
+
+        reports.clear()
+        data = Decoder().process(file_path=self.output_path, pattern=pattern,
+                                 progress_callback=lambda stage, fraction: reports.append((stage, fraction)))
+
+        self.assertEqual(data, "Progress " * 500)
+        self.assertEqual(list(dict.fromkeys(stage for stage, _ in reports)), ["load", "extract", "redundancy", "hash", "process"])
+
+    def test_cancel(self):
+        token = CancelToken()
+
+        def cancel_during_redundancy(stage, fraction):
+            if stage == "redundancy" and fraction > 0:
+                token.cancel()
+
+        with self.assertRaises(OperationCancelledError):
+            Encoder().process(input_path=self.input_path, data=os.urandom(5000), pattern=self.pattern, output_path=self.output_path,
+                              progress_callback=cancel_during_redundancy, cancel_token=token)
+
+        # The process stopped before saving anything
+        self.assertFalse(os.path.exists(self.output_path))
+
+    def test_deadline(self):
+        token = CancelToken(timeout=0.01)
+        time.sleep(0.02)
+
+        self.assertTrue(token.cancelled)
+        with self.assertRaises(DeadlineExceededError):
+            Encoder(cancel_token=token).process(input_path=self.input_path, data="Late", pattern=self.pattern,
+                                                output_path=self.output_path)
+
+    def test_chunked_compression(self):
+        data = bytes(range(256)) * (1 << 12) * 10
+        fractions = []
+
+        compressed = Pattern.static_compress_data(data, "zlib", 6, fractions.append)
+        self.assertEqual(compressed, b"1" + zlib.compress(data, 6))
+        self.assertEqual(len(fractions), 10)
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+# Internal modules
+import os
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.decoder import Decoder  # noqa: E402
+from IST.session import CoverSession  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+
+class TestCoverSession(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.input_path = str(self.test_images_path / "png/test_image.png")
+        self.output_path = str(self.test_images_path / "png/session_image.png")
+
+    def test_matches_encoder(self):
+        # Both header positions, so that the data starts on the last header pixel at least once
+        for header_position in ["before_data", "image_start"]:
+            for bit_frequency in [1, 3]:
+                with self.subTest(header_position=header_position, bit_frequency=bit_frequency):
+                    pattern = Pattern(channels="RGB", bit_frequency=bit_frequency, header_position=header_position,
+                                      header_bit_frequency=2)
+
+                    Encoder().process(input_path=self.input_path, data="Session test", pattern=pattern, output_path=self.output_path)
+                    with Image.open(self.output_path) as encoded_image:
+                        expected = np.array(encoded_image)
+
+                    session = CoverSession(input_path=self.input_path, pattern=pattern)
+                    variant = session.embed(data="Session test")
+
+                    np.testing.assert_array_equal(variant.to_array().reshape(expected.shape), expected)
+
+    def test_many_payloads(self):
+        pattern = Pattern(channels="RGBA", byte_spacing=2, repetitive_redundancy=3)
+        session = CoverSession(input_path=self.input_path, pattern=pattern)
+        cover = session.cover.copy()
+
+        for index in range(3):
+            payload = f"Payload for recipient {index}" * (index + 1)
+            session.embed(data=payload).save(self.output_path)
+
+            self.assertEqual(Decoder().process(file_path=self.output_path, pattern=pattern), payload)
+
+        # The cover buffer is shared by the variants and must never be modified
+        np.testing.assert_array_equal(session.cover, cover)
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+# Internal modules
+import os
+import random
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.sharding import SHARD_HEADER, SHARD_HEADER_V1, ShardedDecoder, ShardedEncoder, join_shards, parse_shard, \
+    split_payload  # noqa: E402
+from IST.exceptions import DataIntegrityCheckFailedError, InvalidChannelsError, InvalidShardHeaderError, NotEnoughShardsError  # noqa: E402
+from IST.utils import erasure_decode, erasure_encode  # noqa: E402
+
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.input_path = str(self.test_images_path / "png/test_image.png")
+        self.output_paths = [str(self.test_images_path / f"png/shard_image_{index}.png") for index in range(5)]
+
+    def test_erasure_code(self):
+        rng = random.Random(0)
+        for data_count, parity_count in [(1, 0), (1, 3), (4, 2), (10, 5)]:
+            shards = [rng.randbytes(40) for _ in range(data_count)]
+            all_shards = shards + erasure_encode(shards, parity_count)
+
+            # Any data_count shards are enough
+            for _ in range(10):
+                indices = rng.sample(range(data_count + parity_count), data_count)
+                self.assertEqual(erasure_decode({index: all_shards[index] for index in indices}, data_count, parity_count), shards)
+
+    def test_split_join(self):
+        payload = bytes(range(256)) * 3 + b"tail"
+        shards = split_payload(payload, 3, 2, b"payload1")
+
+        self.assertEqual(join_shards(shards), payload)
+        self.assertEqual(join_shards([shards[4], shards[1], shards[3]]), payload)
+
+        with self.assertRaises(NotEnoughShardsError):
+            join_shards(shards[:2])
+
+    def test_join_checks_headers(self):
+        payload = bytes(range(256)) * 3 + b"tail"
+        shards = split_payload(payload, 3, 2, b"payload1")
+
+        # A shard whose header disagrees with the other shards of the payload is ignored
+        tampered = bytearray(shards[0])
+        tampered[SHARD_HEADER.size - 33] ^= 0x01
+        self.assertEqual(join_shards([bytes(tampered)] + shards[1:]), payload)
+        with self.assertRaises(NotEnoughShardsError):
+            join_shards([bytes(tampered)] + shards[1:3])
+
+        # The rebuilt payload is checked against the digest of the shards
+        damaged = [bytearray(shard) for shard in shards[:3]]
+        damaged[1][-1] ^= 0xFF
+        with self.assertRaises(DataIntegrityCheckFailedError):
+            join_shards([bytes(shard) for shard in damaged])
+
+        # The shards of the first version have no digest
+        legacy = []
+        for shard in shards:
+            magic, _, *fields, _ = SHARD_HEADER.unpack_from(shard)
+            legacy.append(SHARD_HEADER_V1.pack(magic, 1, *fields) + shard[SHARD_HEADER.size:])
+        self.assertEqual(parse_shard(legacy[0])[5], None)
+        self.assertEqual(join_shards(legacy[2:]), payload)
+
+        with self.assertRaises(InvalidShardHeaderError):
+            parse_shard("Not a shard")
+
+    def test_encode_decode(self):
+        data = "Sharded secret message " * 20
+        pattern = Pattern(channels="RGB", bit_frequency=2)
+
+        ShardedEncoder(pattern=pattern, parity_shards=2).process(input_paths=[self.input_path] * 5, output_paths=self.output_paths,
+                                                                  data=data)
+
+        # Two images lost, and one replaced by an image without any shard
+        self.assertEqual(ShardedDecoder(pattern=pattern).process(file_paths=self.output_paths[2:] + [self.input_path]), data)
+
+        with self.assertRaises(NotEnoughShardsError):
+            ShardedDecoder(pattern=pattern).process(file_paths=self.output_paths[3:])
+
+    def test_decode_errors(self):
+        pattern = Pattern(channels="RGB", bit_frequency=2)
+        ShardedEncoder(pattern=pattern, parity_shards=2).process(input_paths=[self.input_path] * 5, output_paths=self.output_paths,
+                                                                  data=b"Sharded bytes")
+
+        # Images holding text or a file are unrelated ones, nothing is written
+        Encoder(pattern=pattern).process(input_path=self.input_path, output_path=self.output_paths[0], data="Text")
+        Encoder(pattern=pattern).process(input_path=self.input_path, output_path=self.output_paths[1], file=self.input_path)
+        self.assertEqual(ShardedDecoder(pattern=pattern).process(file_paths=self.output_paths), b"Sharded bytes")
+        self.assertFalse(os.path.exists("test_image.png"))
+
+        # The errors of the pattern are raised, instead of making every image a missing shard
+        with self.assertRaises(InvalidChannelsError):
+            ShardedDecoder(pattern=Pattern(channels="L", bit_frequency=2)).process(file_paths=self.output_paths)
+
+    def tearDown(self):
+        for output_path in self.output_paths:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
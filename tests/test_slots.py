@@ -0,0 +1,212 @@
+# Internal modules
+import os
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.decoder import Decoder  # noqa: E402
+from IST.exceptions import InvalidLayoutError, InvalidMatrixEmbeddingError  # noqa: E402
+from IST.slots import KeyedPermutation, SlotLayout, bytes_to_symbols, matrix_changes, matrix_syndromes, symbols_to_bytes  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+
+
+class TestSlots(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.output_path = str(self.test_images_path / "png/slots_image.png")
+
+    def test_symbols_round_trip(self):
+        data = bytes(range(256))
+        for bit_frequency in range(1, 9):
+            symbols = bytes_to_symbols(data, bit_frequency)
+            self.assertEqual(symbols_to_bytes(symbols, bit_frequency, len(data)), data)
+
+    def test_layout_positions(self):
+        # RGBA image, data in R and B every other pixel from pixel 3
+        layout = SlotLayout("RGBA", (10, 10), "RB", 1, 2, 3)
+        self.assertEqual(layout.selector(0, 4).tolist(), [12, 14, 20, 22])
+        self.assertEqual(layout.last_pixel(4), 2)
+        self.assertEqual(layout.capacity, 98)
+
+    def test_planar_layout(self):
+        # RGBA image, the R plane every other pixel from pixel 3, then the B plane
+        layout = SlotLayout("RGBA", (10, 10), "RB", 1, 2, 3, layout="planar")
+        self.assertEqual(layout.capacity, 98)
+        self.assertEqual(layout.selector(0, 3).tolist(), [12, 20, 28])
+        self.assertEqual(layout.selector(48, 51).tolist(), [396, 14, 22])
+        self.assertEqual(layout.last_pixel(4), 6)
+        self.assertEqual(layout.last_pixel(60), 96)
+
+        data = bytes(range(256)) * 8
+        for channels in ["RGB", "GA", "B"]:
+            for scatter_seed in [None, 7]:
+                with self.subTest(channels=channels, scatter_seed=scatter_seed):
+                    layout = SlotLayout("RGBA", (150, 100), channels, 3, 1, 5, scatter_seed, "planar")
+                    flat = np.random.default_rng(0).integers(0, 256, 60000, dtype=np.uint8)
+                    single, threaded = flat.copy(), flat.copy()
+
+                    layout.embed(single, data)
+                    layout.embed(threaded, data, workers=4, min_band_slots=1000)
+                    np.testing.assert_array_equal(single, threaded)
+                    self.assertEqual(layout.extract(single, len(data))[0], data)
+
+                    # The slots are the ones of the selector, the strided plane views write the same values
+                    expected = flat.copy()
+                    selector = layout.selector(0, layout.slots_for_bytes(len(data)))
+                    expected[selector] = (expected[selector] & ~np.uint8(layout.mask)) | bytes_to_symbols(data, 3)[:len(selector)]
+                    np.testing.assert_array_equal(single, expected)
+
+                    # Strip by strip
+                    strips = flat.copy()
+                    data_array = np.concatenate((np.frombuffer(data, dtype=np.uint8), np.zeros(2, dtype=np.uint8)))
+                    for first_value in range(0, len(flat), 7 * 600):
+                        layout.embed_window(strips[first_value:first_value + 7 * 600], first_value, data_array, len(selector))
+                    np.testing.assert_array_equal(strips, single)
+
+    def test_planar_encode_decode(self):
+        cover = np.random.default_rng(0).integers(0, 256, (64, 80, 3), dtype=np.uint8)
+        data = "Planar data " * 20
+
+        for pattern in [Pattern(channels="RGB", layout="planar"), Pattern(channels="RGB", layout="planar", header_write_pattern=True)]:
+            encoded = Encoder().encode_array(cover.copy(), "RGB", data, pattern)
+            self.assertEqual(Decoder().decode_array(encoded, "RGB", pattern), data)
+
+            # The layout is read from the header
+            if pattern.header_write_pattern:
+                self.assertEqual(Decoder().decode_array(encoded, "RGB", Pattern(channels="auto", header_write_pattern=True)), data)
+
+        # Interleaved images are unchanged
+        interleaved = Encoder().encode_array(cover.copy(), "RGB", data, Pattern(channels="RGB"))
+        self.assertFalse(np.array_equal(interleaved, encoded))
+        self.assertEqual(Decoder().decode_array(interleaved, "RGB", Pattern(channels="RGB", layout="interleaved")), data)
+
+        with self.assertRaises(InvalidLayoutError):
+            Pattern(channels="RGB", layout="diagonal").generate_pattern("RGB")
+
+    def test_matrix_syndromes(self):
+        # Every group of 7 LSBs reaches every syndrome of 3 bits with at most one flip
+        rng = np.random.default_rng(0)
+        lsbs = rng.integers(0, 2, 7 * 1000, dtype=np.uint8)
+        symbols = rng.integers(0, 8, 1000, dtype=np.uint8)
+
+        changes = matrix_changes(lsbs, symbols, 7)
+        self.assertTrue(np.all(np.diff(changes // 7) > 0))
+        lsbs[changes] ^= 1
+        self.assertTrue(np.array_equal(matrix_syndromes(lsbs, 7), symbols))
+
+    def test_matrix_encode_decode(self):
+        cover = np.random.default_rng(0).integers(0, 256, (64, 80, 3), dtype=np.uint8)
+        data = os.urandom(120)
+
+        for parameters in [{}, {"scatter_seed": 5}, {"layout": "planar"}, {"byte_spacing": 3, "scatter_seed": "seed"},
+                           {"header_write_pattern": True}]:
+            with self.subTest(parameters=parameters):
+                plain = Pattern(channels="RGB", **parameters)
+                matrix = Pattern(channels="RGB", matrix_embedding=3, **parameters)
+
+                encoded = Encoder().encode_array(cover.copy(), "RGB", data, matrix)
+                self.assertEqual(Decoder().decode_array(encoded, "RGB", matrix), data)
+                if matrix.header_write_pattern:
+                    self.assertEqual(Decoder().decode_array(encoded, "RGB", Pattern(channels="auto", header_write_pattern=True)), data)
+
+                # Values only change by 1, and fewer of them than with plain LSB replacement
+                changes = np.abs(encoded.astype(np.int16) - cover)
+                self.assertLessEqual(changes.max(), 1)
+                plain_encoded = Encoder().encode_array(cover.copy(), "RGB", data, plain)
+                self.assertLess(np.count_nonzero(changes), 0.8 * np.count_nonzero(plain_encoded != cover))
+
+        # The layout written on several threads is the same
+        layout = SlotLayout("RGB", (80, 64), "RGB", 1, 1, 0, None, "interleaved", 4)
+        data = os.urandom(layout.capacity_bytes())
+        single, threaded = cover.reshape(-1).copy(), cover.reshape(-1).copy()
+        layout.embed(single, data)
+        layout.embed(threaded, data, workers=4, min_band_slots=1000)
+        self.assertTrue(np.array_equal(single, threaded))
+        self.assertEqual(bytes(layout.extract(threaded, len(data), workers=3, min_band_slots=1000)[0]), data)
+
+        selector, values, _ = layout.patch(cover.reshape(-1), data)
+        patched = cover.reshape(-1).copy()
+        patched[selector] = values
+        self.assertTrue(np.array_equal(patched, single))
+
+        for matrix_embedding, bit_frequency in [(8, 1), (3, 2)]:
+            with self.assertRaises(InvalidMatrixEmbeddingError):
+                Pattern(channels="RGB", matrix_embedding=matrix_embedding, bit_frequency=bit_frequency).generate_pattern("RGB")
+
+    def test_extract_data_offset(self):
+        cover = np.random.default_rng(1).integers(0, 256, (64, 80, 3), dtype=np.uint8).reshape(-1)
+
+        for arguments in [(1, 1, 0, None, "interleaved", 0), (3, 2, 5, "seed", "interleaved", 0), (1, 1, 0, None, "planar", 0),
+                          (1, 1, 0, 7, "interleaved", 3)]:
+            with self.subTest(arguments=arguments):
+                layout = SlotLayout("RGB", (80, 64), "RGB", *arguments)
+                data = os.urandom(layout.capacity_bytes())
+                flat = cover.copy()
+                layout.embed(flat, data)
+
+                # A part of the data is read from an aligned offset, on one or several threads
+                offset = layout.alignment_bytes * 2
+                self.assertEqual(bytes(layout.extract(flat, 100, data_offset=offset)[0]), data[offset:offset + 100])
+                self.assertEqual(bytes(layout.extract(flat, 300, 3, 10, data_offset=offset)[0]), data[offset:offset + 300])
+
+                if layout.alignment_bytes > 1:
+                    with self.assertRaises(ValueError):
+                        layout.extract(flat, 10, data_offset=1)
+
+    def test_permutation_is_bijective(self):
+        for size in [1, 2, 7, 255, 1000, 4097, 100003]:
+            permutation = KeyedPermutation(size, 1234)
+            permuted = permutation(np.arange(size))
+            self.assertEqual(sorted(permuted.tolist()), list(range(size)))
+            self.assertEqual(permutation.inverse(permuted).tolist(), list(range(size)))
+
+            # The ranges are permuted run by run, the same as the indices one by one
+            for start, stop in [(0, size), (size // 3, min(size // 3 + 50, size)), (size - 1, size)]:
+                self.assertEqual(permutation.permute_range(start, stop).tolist(), permuted[start:stop].tolist())
+                self.assertEqual(permutation.inverse_range(start, stop).tolist(), permutation.inverse(np.arange(start, stop)).tolist())
+
+        # Lazy evaluation: a prefix gives the same indices as the whole permutation
+        permutation = KeyedPermutation(10 ** 8, 42)
+        self.assertEqual(permutation(np.arange(5000, 6000)).tolist(), permutation(np.arange(10000))[5000:6000].tolist())
+
+    def test_bands(self):
+        data = bytes(range(256)) * 64
+        for bit_frequency in [1, 3]:
+            for scatter_seed in [None, 7]:
+                with self.subTest(bit_frequency=bit_frequency, scatter_seed=scatter_seed):
+                    layout = SlotLayout("RGBA", (300, 300), "RGB", bit_frequency, 1, 5, scatter_seed)
+                    single, threaded = np.zeros(360000, dtype=np.uint8), np.zeros(360000, dtype=np.uint8)
+
+                    self.assertEqual(layout.embed(single, data), layout.embed(threaded, data, workers=4, min_band_slots=1000))
+                    np.testing.assert_array_equal(single, threaded)
+
+                    self.assertEqual(layout.extract(threaded, len(data), workers=4, min_band_slots=1000), layout.extract(single, len(data)))
+                    self.assertEqual(layout.extract(threaded, len(data), workers=3, min_band_slots=1000)[0], data)
+
+    def test_scatter_encode_decode(self):
+        data = "Scattered data " * 10
+        pattern = Pattern(channels="RGB", scatter_seed="secret", byte_spacing=2)
+
+        Encoder().process(input_path=str(self.test_images_path / "png/test_image.png"), data=data, pattern=pattern,
+                          output_path=self.output_path)
+        self.assertEqual(Decoder().process(file_path=self.output_path, pattern=pattern), data)
+
+        # A wrong seed reads unrelated slots, the decoding fails (error correction or integrity check)
+        with self.assertRaises(Exception):
+            Decoder().process(file_path=self.output_path, pattern=Pattern(channels="RGB", scatter_seed="wrong", byte_spacing=2))
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+# Internal modules
+import io
+import os
+import struct
+import tempfile
+import tracemalloc
+import unittest
+import sys
+import zlib
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.decoder import Decoder  # noqa: E402
+from IST.strips import BmpStripWriter, StripEncoder, StripReader  # noqa: E402
+from IST.exceptions import StripProcessingNotSupportedError  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+
+class TestStrips(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data = "Strip encoding " * 40
+
+        rng = np.random.default_rng(0)
+        self.covers = {}
+        for mode, shape, image_formats in [("RGB", (150, 201, 3), ["png", "bmp"]), ("RGBA", (97, 130, 4), ["png"]),
+                                           ("L", (120, 173), ["png", "pgm"])]:
+            for image_format in image_formats:
+                path = os.path.join(self.directory.name, f"cover_{mode}.{image_format}")
+                Image.fromarray(rng.integers(0, 256, shape, dtype=np.uint8), mode).save(path)
+                self.covers[path] = mode
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_reader(self):
+        for path in self.covers:
+            with Image.open(path) as image:
+                expected = np.asarray(image)
+
+            for rows in [1, 7, 1000]:
+                with StripReader(path) as reader, self.subTest(path=path, rows=rows):
+                    strips = list(reader.strips(rows))
+                    self.assertEqual([y for y, _ in strips], list(range(0, expected.shape[0], rows)))
+                    self.assertTrue(np.array_equal(np.concatenate([np.asarray(strip) for _, strip in strips]), expected))
+
+    def test_large_image(self):
+        # The header of a 20000x20000 BMP image, beyond the decompression bomb limit of Pillow, whose rows are never written
+        header = io.BytesIO()
+        BmpStripWriter(header, (20000, 20000), "RGB")
+        limit = Image.MAX_IMAGE_PIXELS
+
+        with StripReader(io.BytesIO(header.getvalue())) as reader:
+            self.assertEqual((reader.format, reader.mode, reader.size), ("BMP", "RGB", (20000, 20000)))
+        self.assertEqual(Image.MAX_IMAGE_PIXELS, limit)
+
+        # The limit is only applied when given
+        with self.assertRaises(Image.DecompressionBombError):
+            StripReader(io.BytesIO(header.getvalue()), max_image_pixels=limit)
+        self.assertEqual(Image.MAX_IMAGE_PIXELS, limit)
+
+    def test_identical_to_encoder(self):
+        patterns = [{}, {"scatter_seed": 42, "bit_frequency": 3, "byte_spacing": 2}]
+
+        for path, mode in self.covers.items():
+            # BMP images have no alpha channel
+            for image_format in ["png", "bmp"] if mode != "RGBA" else ["png"]:
+                for parameters in patterns:
+                    with self.subTest(path=path, image_format=image_format, parameters=parameters):
+                        parameters = dict(parameters, channels=mode)
+                        Encoder(pattern=Pattern(**parameters)).process(input_path=path, output_path=self.path(f"full.{image_format}"),
+                                                                       data=self.data)
+                        StripEncoder(pattern=Pattern(**parameters), strip_budget=10000).process(
+                            input_path=path, output_path=self.path(f"strips.{image_format}"), data=self.data)
+
+                        with Image.open(self.path(f"full.{image_format}")) as full, \
+                                Image.open(self.path(f"strips.{image_format}")) as strips:
+                            self.assertEqual(strips.mode, full.mode)
+                            self.assertTrue(np.array_equal(np.asarray(strips), np.asarray(full)))
+
+                        # The BMP images are written with the same headers
+                        if image_format == "bmp":
+                            with open(self.path("full.bmp"), "rb") as full, open(self.path("strips.bmp"), "rb") as strips:
+                                self.assertEqual(strips.read(), full.read())
+
+                        decoded = Decoder(pattern=Pattern(**parameters)).process(file_path=self.path(f"strips.{image_format}"))
+                        self.assertEqual(decoded, self.data)
+
+    def test_stream_output(self):
+        path = next(path for path, mode in self.covers.items() if mode == "RGB")
+        output = io.BytesIO()
+        StripEncoder(pattern=Pattern(channels="RGB"), strip_budget=10000).process(input_path=path, output_path=output, data=self.data,
+                                                                                  image_format="png")
+
+        output.seek(0)
+        self.assertEqual(Decoder(pattern=Pattern(channels="RGB")).process(file_path=output), self.data)
+
+    def test_bounded_memory(self):
+        path = self.path("large.bmp")
+        Image.fromarray(np.random.default_rng(1).integers(0, 256, (3000, 2000, 3), dtype=np.uint8)).save(path)
+        budget = 1 << 20
+
+        tracemalloc.start()
+        try:
+            StripEncoder(pattern=Pattern(channels="RGB", scatter_seed=7), strip_budget=budget).process(
+                input_path=path, output_path=self.path("large_encoded.png"), data=os.urandom(20000))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        # The whole image takes 18 MB, the strips are processed within the budget and blocks of a fixed size
+        self.assertLess(peak, 6 * budget)
+
+    def test_unsupported(self):
+        path = next(path for path, mode in self.covers.items() if mode == "RGB")
+
+        with self.assertRaises(StripProcessingNotSupportedError):
+            StripEncoder(pattern=Pattern(channels="RGB")).process(input_path=path, output_path=self.path("encoded.ppm"), data=self.data)
+
+        with self.assertRaises(StripProcessingNotSupportedError):
+            StripEncoder(pattern=Pattern(channels="RGB", matrix_embedding=3)).process(input_path=path, output_path=self.path("encoded.png"),
+                                                                                       data=self.data)
+
+        interlaced = self.path("interlaced.png")
+        with open(interlaced, "wb") as file:
+            file.write(self.interlaced_png())
+        with self.assertRaises(StripProcessingNotSupportedError):
+            StripReader(interlaced)
+
+        # Nothing is left behind by a failed encoding
+        with self.assertRaises(ValueError):
+            StripEncoder(pattern=Pattern(channels="RGB")).process(input_path=path, output_path=self.path("encoded.bmp"),
+                                                                  data=os.urandom(100000))
+        self.assertFalse(os.path.exists(self.path("encoded.bmp")))
+
+    @staticmethod
+    def interlaced_png() -> bytes:
+        # Pillow never writes interlaced images, a tiny one is written by hand
+        def chunk(chunk_type, data):
+            return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+        # A 1x1 grayscale image has a single pass
+        return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 1))
+                + chunk(b"IDAT", zlib.compress(b"\x00\x80")) + chunk(b"IEND", b""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,9 @@
+import random
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 from PIL import Image
+import numpy as np
 
 import sys
 from pathlib import Path
@@ -7,8 +11,9 @@ from pathlib import Path
 src_path = str(Path(__file__).resolve().parent.parent / "IST")
 sys.path.insert(0, src_path)
 
-from IST.utils import (get_image_bytes_size, get_image_pixels,
-                       create_image_from_pixels, calculate_byte_distance)  # noqa: E402
+from IST.utils import (get_image_array, get_image_bytes_size, get_image_pixels,
+                       create_image_from_pixels, calculate_byte_distance, rs_check_chunks, rs_decode, rs_encode,
+                       rs_encoded_size, _rs_generator)  # noqa: E402
 
 
 class TestUtils(unittest.TestCase):
@@ -22,6 +27,22 @@ class TestUtils(unittest.TestCase):
         pixels = get_image_pixels(img)
         self.assertEqual(len(pixels), 4)
 
+    def test_get_image_array(self):
+        values = np.random.default_rng(0).integers(0, 256, (37, 23, 3), dtype=np.uint8)
+        image = Image.fromarray(values, "RGB")
+        high_bit_depth = Image.fromarray(np.arange(37 * 23, dtype=np.uint16).reshape(37, 23) * 70)
+
+        # The values are exported in strips of a few rows, the last one shorter
+        with mock.patch("IST.utils.EXPORT_STRIP_BYTES", 200):
+            for img in [image, image.convert("L"), image.convert("RGBA"), high_bit_depth, high_bit_depth.convert("I")]:
+                with self.subTest(mode=img.mode):
+                    array = get_image_array(img)
+                    expected = np.array(img).astype(np.uint16 if img.mode.startswith("I") else np.uint8)
+                    np.testing.assert_array_equal(array, expected.reshape(37, 23, -1))
+                    self.assertTrue(array.flags.writeable)
+
+            self.assertFalse(get_image_array(image, writable=False).flags.writeable)
+
     def test_create_image_from_pixels(self):
         pixels = [(0, 0, 0), (255, 255, 255), (255, 255, 255), (0, 0, 0)]
         img = create_image_from_pixels(pixels, "RGB", (2, 2))
@@ -33,6 +54,42 @@ class TestUtils(unittest.TestCase):
         distance = calculate_byte_distance(candidate_byte, neighbors)
         self.assertEqual(distance, 122)
 
+    def test_rs_check_chunks(self):
+        data = random.Random(0).randbytes(5000)
+        encoded = rs_encode(data, 0.2)
+
+        # Full chunks of 182 data symbols and 73 redundant symbols
+        chunks = [(start, 182, 73) for start in range(0, 255 * 5, 255)]
+        self.assertTrue(rs_check_chunks(encoded, chunks).all())
+
+        # Only the damaged chunks fail the check, and are corrected
+        damaged = bytearray(encoded)
+        damaged[300] ^= 0xFF
+        damaged[1000] ^= 0x01
+        self.assertEqual(rs_check_chunks(damaged, chunks).tolist(), [True, False, True, False, True])
+        self.assertEqual(rs_decode(damaged, 0.2), data)
+        self.assertEqual(rs_decode(encoded, 0.2), data)
+
+    def test_rs_encoded_size(self):
+        for correction_factor in [0.05, 0.1, 1 / 3, 0.5, 1]:
+            for data_size in [0, 1, 84, 85, 86, 254, 255, 256, 1000, 4321]:
+                self.assertEqual(rs_encoded_size(data_size, correction_factor), len(rs_encode(bytes(data_size), correction_factor)),
+                                 (data_size, correction_factor))
+
+    def test_rs_concurrent(self):
+        jobs = [(random.Random(index).randbytes(2000), [0.05, 0.1, 0.2, 1 / 3, 0.5][index % 5]) for index in range(64)]
+
+        def run(job):
+            data, correction_factor = job
+            damaged = rs_encode(data, correction_factor)
+            damaged[100] ^= 0xFF
+            return rs_decode(damaged, correction_factor) == data
+
+        # Cold generator polynomials cache, each thread uses several numbers of redundant symbols
+        _rs_generator.cache_clear()
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            self.assertTrue(all(executor.map(run, jobs)))
+
 
 if __name__ == "__main__":
     unittest.main()
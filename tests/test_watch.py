@@ -0,0 +1,141 @@
+# Internal modules
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# Project modules
+src_path = str(Path(__file__).resolve().parent.parent / "IST")
+sys.path.insert(0, src_path)
+
+from IST.pattern import Pattern  # noqa: E402
+from IST.encoder import Encoder  # noqa: E402
+from IST.watch import FolderWatcher, _available_path  # noqa: E402
+from IST.exceptions import WatchDirectoryNotFoundError  # noqa: E402
+
+# External modules
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+
+class TestFolderWatcher(unittest.TestCase):
+    def setUp(self):
+        self.test_images_path = Path(__file__).resolve().parent / "test_images"
+        self.directory = tempfile.TemporaryDirectory()
+        self.spool, self.done, self.failed = (os.path.join(self.directory.name, name) for name in ["spool", "done", "failed"])
+        os.makedirs(self.spool)
+        self.pattern = Pattern(channels="RGB", bit_frequency=2)
+        self.results = []
+
+    def encode(self, name: str, **kwargs) -> str:
+        path = os.path.join(self.spool, name)
+        Encoder().process(input_path=str(self.test_images_path / "png/test_image.png"), pattern=self.pattern, output_path=path, **kwargs)
+        return path
+
+    def watcher(self, **kwargs) -> FolderWatcher:
+        kwargs = {"settle": 0, **kwargs}
+        watcher = FolderWatcher(directories=[self.spool], pattern=self.pattern, interval=0.01, workers=2, output=self.results.append,
+                                **kwargs)
+        self.addCleanup(watcher.close)
+        return watcher
+
+    def test_incremental(self):
+        self.encode("first.png", data="First")
+        self.encode("second.png", data=b"\x00\x01")
+        shutil.copy(self.test_images_path / "png/test_image.png", os.path.join(self.spool, "cover.png"))
+
+        watcher = self.watcher()
+        self.assertEqual(watcher.run(once=True), 3)
+        results = {os.path.basename(result["path"]): result for result in self.results}
+        self.assertEqual((results["first.png"]["status"], results["first.png"]["data"]), ("done", "First"))
+        self.assertEqual(results["second.png"]["data_base64"], "AAE=")
+        self.assertEqual(results["cover.png"]["status"], "failed")
+
+        # Nothing changed, even for a new watcher reading the index
+        self.assertEqual(watcher.scan(), [])
+        self.assertEqual(self.watcher().run(once=True), 0)
+
+        # A touched file is not decoded again, a modified one is
+        os.utime(os.path.join(self.spool, "first.png"), ns=(0, 0))
+        self.encode("second.png", data="Second")
+        self.assertEqual(watcher.run(once=True), 1)
+        self.assertEqual(self.results[-1]["data"], "Second")
+
+    def test_move(self):
+        self.encode("image.png", data="Moved")
+        self.encode("file.png", file=str(self.test_images_path / "png/test_image.png"))
+        shutil.copy(self.test_images_path / "png/test_image.png", os.path.join(self.spool, "cover.png"))
+
+        self.watcher(done_directory=self.done, failed_directory=self.failed).run(once=True)
+
+        self.assertEqual(sorted(os.listdir(self.done)), ["file.png", "image.png", "test_image.png"])
+        self.assertEqual(os.listdir(self.failed), ["cover.png"])
+        self.assertEqual([name for name in os.listdir(self.spool) if not name.startswith(".")], [])
+
+        with open(self.test_images_path / "png/test_image.png", "rb") as original, open(os.path.join(self.done, "test_image.png"), "rb") as file:
+            self.assertEqual(original.read(), file.read())
+
+    def test_available_path(self):
+        # An existing file is never overwritten, even by files of the same name and content
+        paths = []
+        for _ in range(3):
+            paths.append(_available_path(self.spool, "file.txt", "0123456789abcdef"))
+            Path(paths[-1]).touch()
+
+        self.assertEqual([os.path.basename(path) for path in paths], ["file.txt", "file-0123456789ab.txt", "file-0123456789ab-1.txt"])
+
+    def test_corrupted(self):
+        # The compressed data of an image is damaged, without any hash check or error correction to catch it first
+        self.pattern = Pattern(channels="RGB", bit_frequency=2, compression_pattern="zlib", hash_check=False, advanced_redundancy="none")
+        words = ["alpha", "beta", "gamma", "delta", "epsilon"]
+        self.encode("good.png", data=" ".join(words[index % 7 % 5] for index in range(3000)))
+        path = self.encode("corrupted.png", data=" ".join(words[index * 7 % 11 % 5] for index in range(3000)))
+
+        with Image.open(path) as image:
+            values = np.array(image)
+        values.reshape(-1)[400:420] ^= 3
+        Image.fromarray(values).save(path)
+
+        self.assertEqual(self.watcher(done_directory=self.done, failed_directory=self.failed).run(once=True), 2)
+        results = {os.path.basename(result["path"]): result for result in self.results}
+        self.assertEqual(results["good.png"]["status"], "done")
+        self.assertEqual(results["corrupted.png"]["status"], "failed")
+        self.assertTrue(results["corrupted.png"]["error"].startswith("DataIntegrityCheckFailedError"))
+        self.assertEqual(os.listdir(self.failed), ["corrupted.png"])
+
+        # Without any header nor data length, the image fails instead of stopping the watcher
+        self.results.clear()
+        shutil.copy(self.test_images_path / "png/test_image.png", os.path.join(self.spool, "cover.png"))
+        self.pattern = Pattern(channels="RGB", header_enabled=False, hash_check=False, advanced_redundancy="none")
+        self.assertEqual(self.watcher().run(once=True), 1)
+        self.assertEqual(self.results[0]["status"], "failed")
+
+    def test_daemon(self):
+        # The image is only decoded once it is completely written
+        watcher = self.watcher(settle=0.5)
+        thread = threading.Thread(target=watcher.run)
+        thread.start()
+
+        self.encode("late.png", data="Late")
+        deadline = time.monotonic() + 10
+        while not self.results and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        watcher.stop()
+        thread.join()
+        self.assertEqual([result["data"] for result in self.results], ["Late"])
+
+    def test_missing_directory(self):
+        with self.assertRaises(WatchDirectoryNotFoundError):
+            FolderWatcher(directories=[os.path.join(self.directory.name, "missing")])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
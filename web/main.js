@@ -4,36 +4,27 @@ async function encode() {
         return;
     }
 
-    disableControls();
-
-    const inputImageFile = document.getElementById("input-image").files[0];
-    const inputImage = await fileToBase64(inputImageFile);
     const outputImageName = document.getElementById("output-image").value;
     const outputFormat = document.getElementById("output-format").value;
     const outputImage = outputImageName + '.' + outputFormat;
     const dataInput = document.getElementById("data-input").value;
-    const dataFile = document.getElementById("data-file").files[0];
-    let data = null;
-    let fileName = null;
-    if (dataFile) {
-        data = await fileToBase64(dataFile);
-        fileName = dataFile.name;
-    } else {
-        data = dataInput;
-    }
     const pattern = getPattern();
 
-    const result = await eel.encode_data(inputImage, outputImage, data, fileName, pattern)();
-    document.getElementById("console-output").innerHTML = result;
+    const temporaryPaths = [];
+    const inputPath = await getInputPath("input-image", temporaryPaths);
+    const dataPath = await getInputPath("data-file", temporaryPaths);
+    if (!inputPath) {
+        return;
+    }
 
-    enableControls();
+    const jobId = await eel.encode_data(inputPath, outputImage, dataPath ? null : dataInput, dataPath, pattern, temporaryPaths)();
+    addJob(jobId, "Encode " + outputImage);
 }
 
 function validateEncodeParameters() {
-    const inputImageFile = document.getElementById("input-image").files[0];
     const outputImageName = document.getElementById("output-image").value;
 
-    if (!inputImageFile) {
+    if (!hasInput("input-image")) {
         document.getElementById("console-output").innerHTML = "Error: Please select an input image.";
         return false;
     }
@@ -52,24 +43,22 @@ async function decode() {
         return;
     }
 
-    disableControls();
-
-    const inputImageFile = document.getElementById("input-image").files[0];
-    const inputImage = await fileToBase64(inputImageFile);
     const pattern = getPattern();
     const enforceProvidedPattern = document.getElementById("enforce-provided-pattern").checked;
     const dataLength = document.getElementById("data-length").value;
 
-    const result = await eel.decode_data(inputImage, pattern, enforceProvidedPattern, dataLength)();
-    document.getElementById("console-output").innerHTML = result;
+    const temporaryPaths = [];
+    const inputPath = await getInputPath("input-image", temporaryPaths);
+    if (!inputPath) {
+        return;
+    }
 
-    enableControls();
+    const jobId = await eel.decode_data(inputPath, pattern, enforceProvidedPattern, dataLength, temporaryPaths)();
+    addJob(jobId, "Decode " + inputPath.split(/[\\/]/).pop());
 }
 
 function validateDecodeParameters() {
-    const inputImageFile = document.getElementById("input-image").files[0];
-
-    if (!inputImageFile) {
+    if (!hasInput("input-image")) {
         document.getElementById("console-output").innerHTML = "Error: Please select an input image.";
         return false;
     }
@@ -77,13 +66,114 @@ function validateDecodeParameters() {
     return true;
 }
 
+// Transfers: a file chosen with the Browse button is passed by path, a file selected in the file input is uploaded in chunks
+const UPLOAD_CHUNK_SIZE = 1024 * 1024;
+
+async function browse(inputId, title) {
+    const path = await eel.choose_file(title)();
+    const input = document.getElementById(inputId);
+
+    if (path) {
+        input.value = "";
+        input.dataset.path = path;
+        document.getElementById(inputId + "-path").innerHTML = path;
+    }
+}
+
+function clearPath(input) {
+    delete input.dataset.path;
+    document.getElementById(input.id + "-path").innerHTML = "";
+}
+
+function hasInput(inputId) {
+    const input = document.getElementById(inputId);
+    return Boolean(input.dataset.path || input.files[0]);
+}
+
+async function getInputPath(inputId, temporaryPaths) {
+    const input = document.getElementById(inputId);
+
+    if (input.dataset.path) {
+        return input.dataset.path;
+    }
+
+    const file = input.files[0];
+    if (!file) {
+        return null;
+    }
+
+    try {
+        const path = await uploadFile(file);
+        temporaryPaths.push(path);
+        return path;
+    } catch (error) {
+        document.getElementById("console-output").innerHTML = "Error while uploading " + file.name + ": " + error;
+        return null;
+    }
+}
+
+async function uploadFile(file) {
+    const uploadId = await eel.begin_upload(file.name)();
+    const uploadProgress = document.getElementById("upload-progress");
+
+    for (let start = 0; start < file.size; start += UPLOAD_CHUNK_SIZE) {
+        const chunk = await blobToBase64(file.slice(start, start + UPLOAD_CHUNK_SIZE));
+        await eel.upload_chunk(uploadId, chunk)();
+        uploadProgress.innerHTML = "Uploading " + file.name + ": " + Math.round(100 * Math.min(start + UPLOAD_CHUNK_SIZE, file.size) / file.size) + "%";
+    }
+
+    uploadProgress.innerHTML = "";
+    return await eel.end_upload(uploadId)();
+}
+
+// Jobs: progress and results are reported by the backend through job_progress and job_finished
+function addJob(jobId, label) {
+    // The first progress event may arrive before the job is added
+    const existingJob = document.getElementById("job-" + jobId);
+    if (existingJob) {
+        existingJob.querySelector(".job-label").textContent = label;
+        return existingJob;
+    }
+
+    const job = document.createElement("div");
+    job.id = "job-" + jobId;
+    job.className = "job mb-2";
+    job.innerHTML =
+        '<div class="d-flex justify-content-between align-items-center">' +
+            '<span class="job-label"></span>' +
+            '<button type="button" class="btn btn-sm btn-outline-danger" onclick="eel.cancel_job(' + jobId + ')">Cancel</button>' +
+        '</div>' +
+        '<div class="progress"><div class="progress-bar" role="progressbar" style="width: 0%"></div></div>';
+    job.querySelector(".job-label").textContent = label;
+
+    document.getElementById("jobs").appendChild(job);
+    return job;
+}
+
+function jobProgress(jobId, stage, fraction) {
+    const job = document.getElementById("job-" + jobId) || addJob(jobId, "Job " + jobId);
+    const bar = job.querySelector(".progress-bar");
+
+    bar.style.width = Math.round(100 * fraction) + "%";
+    bar.textContent = stage;
+}
+
+function jobFinished(jobId, status, result) {
+    const job = document.getElementById("job-" + jobId);
+    if (job) {
+        job.remove();
+    }
+
+    document.getElementById("console-output").textContent = result;
+}
+
 // Helper functions
-function fileToBase64(file) {
+function blobToBase64(blob) {
     return new Promise((resolve, reject) => {
         const reader = new FileReader();
-        reader.onload = () => resolve(reader.result);
+        reader.onload = () => resolve(reader.result.split(',')[1]);
         reader.onerror = error => reject(error);
-        reader.readAsDataURL(file);
+        reader.readAsDataURL(blob);
     });
 }
 
@@ -152,6 +242,8 @@ document.addEventListener('DOMContentLoaded', function () {
 // Eel exposed Functions
 eel.expose(encode);
 eel.expose(decode);
+eel.expose(jobProgress, "job_progress");
+eel.expose(jobFinished, "job_finished");
 
 // Function to manually ensure that the min and max values of input[type="number"] elements are enforced
 function enforceMinMaxValues(event) {
@@ -183,18 +275,3 @@ function selectOption(button) {
     $(button).siblings().removeClass("active");
     $(button).addClass("active");
 }
-
-// Enable and disable all controls for pending operations
-function disableControls() {
-    const controls = document.querySelectorAll("button, input, select");
-    controls.forEach(control => {
-        control.disabled = true;
-    });
-}
-
-function enableControls() {
-    const controls = document.querySelectorAll("button, input, select");
-    controls.forEach(control => {
-        control.disabled = false;
-    });
-}